@@ -1,15 +1,34 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 import joblib
-from src.config import MIN_TRADES_FOR_AI
+import copy
+import json
+import hashlib
+from src.config import MIN_TRADES_FOR_AI, ARVORES_POR_ATUALIZACAO, MAX_ARVORES, MIN_TRADES_VALIDACAO_INCREMENTAL
+from src.floresta_compacta import FlorestaCompacta
 import os
 
 # Caminho para o modelo treinado
 MODEL_PATH = "models/bollinger_ai.pkl"
 
+# Caminho para a versão compacta do modelo, usada na inferência
+MODEL_COMPACTO_PATH = "models/bollinger_ai_compacto.npz"
+
+# Marca d'água do treino: data de entrada do último trade já usado pelo modelo
+MARCA_TREINO_PATH = "models/marca_treino.json"
+
+# Melhor configuração encontrada pela busca de hiperparâmetros (src/busca_hiperparametros.py)
+HIPERPARAMETROS_PATH = "models/hiperparametros.json"
+
+# Parâmetros da floresta quando não há busca de hiperparâmetros salva
+PARAMETROS_PADRAO = {'n_estimators': 100}
+
+# Características usadas pelo modelo, na ordem das colunas
+CARACTERISTICAS = ['bb_position', 'adx', 'volatility', 'rsi', 'macd_position', 'stochastic_position', 'day_of_week', 'hour']
+
+# Colunas de indicadores usadas para extrair as características
+COLUNAS_CARACTERISTICAS = ['bb_upper', 'bb_middle', 'bb_lower', 'adx', 'rsi', 'macd', 'macd_signal', 'slowk', 'slowd']
+
 def extrair_caracteristicas(df, index):
     """
     Extrai características do mercado no momento da entrada.
@@ -24,6 +43,10 @@ def extrair_caracteristicas(df, index):
     if index < 20:  # Precisamos de pelo menos 20 candles para os indicadores
         return None
     
+    # Características já calculadas (ex: DataFrame montado a partir do armazém de características)
+    if all(nome in df.columns for nome in CARACTERISTICAS):
+        return {nome: df[nome].iloc[index] for nome in CARACTERISTICAS}
+    
     # Calcular posição relativa do preço em relação às bandas de Bollinger
     bb_upper = df['bb_upper'].iloc[index]
     bb_lower = df['bb_lower'].iloc[index]
@@ -77,6 +100,59 @@ def extrair_caracteristicas(df, index):
     
     return caracteristicas
 
+def extrair_caracteristicas_vetorizado(df, indices):
+    """
+    Extrai as características de vários candles de uma vez.
+    
+    Cada linha tem os mesmos valores que extrair_caracteristicas daria para o
+    índice correspondente. Índices menores que 20 devem ser descartados antes.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com dados de preços e indicadores.
+        indices (np.ndarray): Posições dos candles.
+        
+    Returns:
+        pd.DataFrame: Uma linha por índice, com as colunas de CARACTERISTICAS.
+    """
+    indices = np.asarray(indices)
+    
+    def coluna(nome):
+        return df[nome].to_numpy(dtype=float)[indices]
+    
+    bb_upper = coluna('bb_upper')
+    bb_lower = coluna('bb_lower')
+    bb_middle = coluna('bb_middle')
+    close = coluna('close')
+    
+    # Evitar divisão por zero
+    bb_width = bb_upper - bb_lower
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_position = np.where(bb_width == 0, 0.5, (close - bb_lower) / bb_width)
+        volatility = np.where(bb_middle == 0, 0, bb_width / bb_middle)
+        
+        macd_position = np.zeros(len(indices))
+        if 'macd' in df.columns and 'macd_signal' in df.columns:
+            macd_signal = coluna('macd_signal')
+            macd_position = np.where(macd_signal != 0, coluna('macd') / macd_signal, 0)
+        
+        stochastic_position = np.zeros(len(indices))
+        if 'slowk' in df.columns and 'slowd' in df.columns:
+            slowd = coluna('slowd')
+            stochastic_position = np.where(slowd != 0, coluna('slowk') / slowd, 0)
+    
+    tempos = pd.DatetimeIndex(df['time'].to_numpy()[indices])
+    
+    return pd.DataFrame({
+        'bb_position': bb_position,
+        'adx': coluna('adx'),
+        'volatility': volatility,
+        'rsi': coluna('rsi') if 'rsi' in df.columns else np.zeros(len(indices)),
+        'macd_position': macd_position,
+        'stochastic_position': stochastic_position,
+        'day_of_week': tempos.dayofweek,
+        'hour': tempos.hour,
+    })
+
 def treinar_modelo(dados_trades):
     """
     Treina o modelo de Aprendizado de Máquina com os dados de trades.
@@ -91,16 +167,22 @@ def treinar_modelo(dados_trades):
         print(f"Não há dados suficientes para treinar o modelo. Mínimo necessário: {MIN_TRADES_FOR_AI}")
         return None
     
+    # O scikit-learn só é necessário no treino; a inferência usa a floresta compacta
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+    
     # Preparar os dados para treinamento
-    caracteristicas_cols = ['bb_position', 'adx', 'volatility', 'rsi', 'macd_position', 'stochastic_position', 'day_of_week', 'hour']
-    X = dados_trades[caracteristicas_cols]
+    X = dados_trades[CARACTERISTICAS]
     y = dados_trades['resultado']  # 1 para lucro, 0 para prejuízo
     
     # Dividir os dados em treinamento e teste
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    # Criar e treinar o modelo
-    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Criar e treinar o modelo com os melhores parâmetros da busca, se houver
+    hiperparametros = carregar_hiperparametros()
+    parametros = hiperparametros['parametros'] if hiperparametros else PARAMETROS_PADRAO
+    modelo = RandomForestClassifier(random_state=42, **parametros)
     modelo.fit(X_train, y_train)
     
     # Avaliar o modelo
@@ -109,11 +191,189 @@ def treinar_modelo(dados_trades):
     print(f"Acurácia do modelo: {acuracia:.2f}")
     
     # Salvar o modelo
+    salvar_modelo(modelo)
+    salvar_marca_treino(dados_trades, {'tipo': 'completo', 'acuracia': acuracia})
+    
+    return modelo
+
+def salvar_modelo(modelo):
+    """
+    Salva o modelo treinado e a sua versão compacta.
+    
+    Args:
+        modelo (RandomForestClassifier): Modelo treinado.
+    """
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
     joblib.dump(modelo, MODEL_PATH)
+    exportar_modelo_compacto(modelo)
+
+def carregar_hiperparametros():
+    """
+    Carrega a melhor configuração salva pela busca de hiperparâmetros.
+    
+    Returns:
+        dict: Parâmetros da floresta, limiar e pontuações, ou None se não houver busca salva.
+    """
+    if not os.path.exists(HIPERPARAMETROS_PATH):
+        return None
+    
+    with open(HIPERPARAMETROS_PATH) as arquivo:
+        return json.load(arquivo)
+
+def salvar_hiperparametros(resultado):
+    """
+    Salva a melhor configuração da busca de hiperparâmetros.
+    
+    Args:
+        resultado (dict): Resultado de buscar_hiperparametros.
+    """
+    os.makedirs(os.path.dirname(HIPERPARAMETROS_PATH), exist_ok=True)
+    caminho_temporario = HIPERPARAMETROS_PATH + ".tmp"
+    with open(caminho_temporario, 'w') as arquivo:
+        json.dump(resultado, arquivo, indent=2)
+    os.replace(caminho_temporario, HIPERPARAMETROS_PATH)
+
+def carregar_limiar_sinal():
+    """
+    Retorna o limiar de probabilidade do filtro de sinais definido pela busca.
+    
+    Returns:
+        float: Limiar, ou None para usar a classe prevista pelo modelo.
+    """
+    hiperparametros = carregar_hiperparametros()
+    return hiperparametros.get('limiar') if hiperparametros else None
+
+def carregar_marca_treino():
+    """
+    Carrega a marca d'água do último treino.
+    
+    Returns:
+        dict: Marca com 'data_entrada' do último trade usado, ou None se não existir.
+    """
+    if not os.path.exists(MARCA_TREINO_PATH):
+        return None
     
+    with open(MARCA_TREINO_PATH) as arquivo:
+        return json.load(arquivo)
+
+def salvar_marca_treino(dados_trades, informacoes=None):
+    """
+    Registra até qual trade os dados já foram usados no treino.
+    
+    Sem a coluna 'data_entrada' não há como marcar os trades, e nada é gravado.
+    
+    Args:
+        dados_trades (pd.DataFrame): Trades usados no treino.
+        informacoes (dict): Informações adicionais do treino (tipo, acurácia etc.).
+    """
+    if 'data_entrada' not in dados_trades.columns or len(dados_trades) == 0:
+        return
+    
+    marca = {'data_entrada': str(pd.to_datetime(dados_trades['data_entrada']).max())}
+    if informacoes:
+        marca.update(informacoes)
+    
+    os.makedirs(os.path.dirname(MARCA_TREINO_PATH), exist_ok=True)
+    caminho_temporario = MARCA_TREINO_PATH + ".tmp"
+    with open(caminho_temporario, 'w') as arquivo:
+        json.dump(marca, arquivo)
+    os.replace(caminho_temporario, MARCA_TREINO_PATH)
+
+def treinar_modelo_incremental(dados_trades, arvores_por_atualizacao=ARVORES_POR_ATUALIZACAO, max_arvores=MAX_ARVORES):
+    """
+    Atualiza o modelo apenas com os trades posteriores à marca d'água do último treino.
+    
+    Novas árvores são treinadas só com os trades novos (warm_start) e somadas às
+    existentes; acima de `max_arvores`, as mais antigas são descartadas. Assim o
+    custo de cada atualização depende apenas dos trades novos, não do histórico.
+    Os trades novos mais recentes (20%, e pelo menos MIN_TRADES_VALIDACAO_INCREMENTAL)
+    ficam de fora do treino e servem para comparar o modelo atual com o atualizado,
+    que só o substitui se não for pior. A marca d'água só avança quando a atualização
+    é aceita; recusada ou adiada, os trades novos se acumulam para a próxima tentativa.
+    
+    Sem modelo salvo ou sem marca d'água, faz o treino completo com treinar_modelo.
+    
+    Args:
+        dados_trades (pd.DataFrame): Histórico de trades, com 'data_entrada', as
+            características e o 'resultado'.
+        arvores_por_atualizacao (int): Árvores treinadas a cada atualização.
+        max_arvores (int): Número máximo de árvores do modelo.
+        
+    Returns:
+        object: Modelo em uso após a atualização (None se não houver modelo).
+    """
+    modelo = carregar_modelo()
+    marca = carregar_marca_treino()
+    if modelo is None or marca is None or 'data_entrada' not in dados_trades.columns:
+        return treinar_modelo(dados_trades)
+    
+    # Apenas os trades posteriores à marca d'água, em ordem cronológica
+    datas = pd.to_datetime(dados_trades['data_entrada'])
+    novos = dados_trades[datas > pd.Timestamp(marca['data_entrada'])]
+    novos = novos.iloc[np.argsort(pd.to_datetime(novos['data_entrada']).to_numpy(), kind='stable')]
+    if len(novos) < MIN_TRADES_FOR_AI:
+        print(f"Trades novos insuficientes para atualizar o modelo: {len(novos)} (mínimo {MIN_TRADES_FOR_AI})")
+        return modelo
+    
+    # Os trades mais recentes avaliam os dois modelos; com poucos, a comparação não decide nada
+    num_treino = int(len(novos) * 0.8)
+    if len(novos) - num_treino < MIN_TRADES_VALIDACAO_INCREMENTAL:
+        print(f"Trades novos insuficientes para avaliar a atualização: {len(novos) - num_treino} fora do treino "
+              f"(mínimo {MIN_TRADES_VALIDACAO_INCREMENTAL})")
+        return modelo
+    
+    from sklearn.metrics import accuracy_score
+    
+    X_treino, y_treino = novos[CARACTERISTICAS].iloc[:num_treino], novos['resultado'].iloc[:num_treino]
+    X_teste, y_teste = novos[CARACTERISTICAS].iloc[num_treino:], novos['resultado'].iloc[num_treino:]
+    
+    # As árvores novas precisam conhecer as mesmas classes do modelo
+    if set(np.unique(y_treino)) != set(modelo.classes_):
+        print("Trades novos sem todas as classes do modelo. Atualização adiada.")
+        return modelo
+    
+    novo_modelo = copy.deepcopy(modelo)
+    novo_modelo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + arvores_por_atualizacao)
+    novo_modelo.fit(X_treino, y_treino)
+    
+    # Descartar as árvores mais antigas acima do limite
+    excesso = len(novo_modelo.estimators_) - max_arvores
+    if excesso > 0:
+        novo_modelo.estimators_ = novo_modelo.estimators_[excesso:]
+        novo_modelo.n_estimators = len(novo_modelo.estimators_)
+    
+    acuracia_atual = accuracy_score(y_teste, modelo.predict(X_teste))
+    acuracia_nova = accuracy_score(y_teste, novo_modelo.predict(X_teste))
+    print(f"Acurácia nos trades novos: modelo atual {acuracia_atual:.2f}, modelo atualizado {acuracia_nova:.2f}")
+    
+    # A marca d'água só avança com a atualização aceita
+    if acuracia_nova >= acuracia_atual:
+        salvar_modelo(novo_modelo)
+        salvar_marca_treino(novos, {'tipo': 'incremental', 'acuracia': acuracia_nova,
+                                    'arvores': len(novo_modelo.estimators_), 'trades': len(novos)})
+        return novo_modelo
+    
+    print("Modelo atualizado não superou o atual. Mantendo o modelo atual; os trades novos ficam para a próxima atualização.")
     return modelo
 
+def exportar_modelo_compacto(modelo, caminho=None):
+    """
+    Exporta o modelo treinado para a floresta compacta em arrays planos.
+    
+    Args:
+        modelo (RandomForestClassifier): Modelo treinado.
+        caminho (str): Caminho do arquivo .npz (padrão: MODEL_COMPACTO_PATH).
+        
+    Returns:
+        FlorestaCompacta: Floresta exportada, com as mesmas previsões do modelo.
+    """
+    if caminho is None:
+        caminho = MODEL_COMPACTO_PATH
+    floresta = FlorestaCompacta.de_floresta(modelo)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    floresta.salvar(caminho)
+    return floresta
+
 def carregar_modelo():
     """
     Carrega o modelo treinado do disco.
@@ -128,13 +388,50 @@ def carregar_modelo():
     modelo = joblib.load(MODEL_PATH)
     return modelo
 
-def prever_qualidade_sinal(modelo, caracteristicas):
+def carregar_modelo_compacto():
+    """
+    Carrega a floresta compacta usada na inferência.
+    
+    Se ela não existir ou for mais antiga que o modelo salvo, é exportada novamente
+    a partir dele.
+    
+    Returns:
+        FlorestaCompacta: Floresta carregada ou None se não houver modelo treinado.
+    """
+    if os.path.exists(MODEL_COMPACTO_PATH) and (
+            not os.path.exists(MODEL_PATH) or os.path.getmtime(MODEL_COMPACTO_PATH) >= os.path.getmtime(MODEL_PATH)):
+        return FlorestaCompacta.carregar(MODEL_COMPACTO_PATH)
+    
+    modelo = carregar_modelo()
+    if modelo is None:
+        return None
+    return exportar_modelo_compacto(modelo)
+
+def versao_modelo_compacto():
+    """
+    Identifica a floresta compacta gravada, para que resultados calculados com outro
+    modelo não sejam reaproveitados.
+    
+    Returns:
+        str: Hash do arquivo da floresta compacta, ou None se ela não existir.
+    """
+    if not os.path.exists(MODEL_COMPACTO_PATH):
+        return None
+    with open(MODEL_COMPACTO_PATH, 'rb') as arquivo:
+        return hashlib.sha1(arquivo.read()).hexdigest()[:16]
+
+def prever_qualidade_sinal(modelo, caracteristicas, limiar=None):
     """
     Usa o modelo para prever a qualidade de um sinal.
     
+    Se o modelo for um ClienteInferencia e o servidor falhar, a previsão é feita
+    com a floresta compacta local (ou o sinal é aceito, se não houver modelo).
+    
     Args:
-        modelo (object): Modelo treinado.
+        modelo (object): Modelo treinado ou ClienteInferencia.
         caracteristicas (dict): Características do sinal.
+        limiar (float): Probabilidade mínima de lucro para aceitar o sinal. Se None,
+            usa a classe prevista pelo modelo.
         
     Returns:
         int: 1 se o sinal for classificado como bom, 0 se ruim.
@@ -155,7 +452,36 @@ def prever_qualidade_sinal(modelo, caracteristicas):
         caracteristicas['hour']
     ]])
     
-    # Fazer a previsão
+    try:
+        return classificar_sinal(modelo, caracteristicas_array, limiar)
+    except (OSError, EOFError, RuntimeError) as erro:
+        # Servidor de inferência fora do ar ou sem modelo: usar a floresta compacta local
+        # (o cliente tenta reconectar na próxima previsão)
+        print(f"Falha no servidor de inferência ({erro}). Usando o modelo local.")
+        modelo_local = carregar_modelo_compacto()
+        if modelo_local is None:
+            return 1
+        return classificar_sinal(modelo_local, caracteristicas_array, limiar)
+
+def classificar_sinal(modelo, caracteristicas_array, limiar=None):
+    """
+    Classifica um sinal pela classe prevista ou pela probabilidade de lucro.
+    
+    Args:
+        modelo (object): Modelo treinado ou ClienteInferencia.
+        caracteristicas_array (np.ndarray): Características do sinal, em uma linha.
+        limiar (float): Probabilidade mínima de lucro para aceitar o sinal. Se None,
+            usa a classe prevista pelo modelo.
+        
+    Returns:
+        int: 1 se o sinal for classificado como bom, 0 se ruim.
+    """
+    if limiar is not None:
+        probabilidades = modelo.predict_proba(caracteristicas_array)[0]
+        classes = list(modelo.classes_)
+        probabilidade_lucro = probabilidades[classes.index(1)] if 1 in classes else 0.0
+        return int(probabilidade_lucro >= limiar)
+    
     previsao = modelo.predict(caracteristicas_array)
     
     return previsao[0]
\ No newline at end of file
@@ -0,0 +1,196 @@
+import os
+import numpy as np
+from src.historico import abrir_historico, barras_para_dataframe, converter_tempo, nome_timeframe
+from src.strategy import preparar_dados_para_estrategia
+from src.ai_model import extrair_caracteristicas_vetorizado, CARACTERISTICAS
+
+# Diretório dos arquivos de características por ativo/timeframe
+ARMAZEM_DIR = "data/caracteristicas"
+
+# Colunas de indicadores guardadas para cada barra
+INDICADORES = ['bb_upper', 'bb_middle', 'bb_lower', 'adx', 'rsi', 'macd', 'macd_signal', 'slowk', 'slowd', 'atr']
+
+# Layout de cada linha: tempo da barra, indicadores e as características do modelo
+# ('adx' e 'rsi' são ao mesmo tempo indicadores e características)
+DTYPE_CARACTERISTICAS = np.dtype(
+    [('time', '<i8')]
+    + [(nome, '<f8') for nome in INDICADORES]
+    + [(nome, '<f8') for nome in CARACTERISTICAS if nome not in INDICADORES]
+)
+
+# Barras anteriores recalculadas para aquecer os indicadores numa atualização
+# (os indicadores exponenciais convergem bem antes disso)
+AQUECIMENTO_CARACTERISTICAS = 500
+
+# Barras novas calculadas por vez, para limitar a memória na primeira carga
+TAMANHO_BLOCO_ARMAZEM = 100000
+
+def caminho_armazem(ativo, timeframe):
+    """
+    Retorna o caminho do arquivo de características de um ativo/timeframe.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+
+    Returns:
+        str: Caminho do arquivo binário.
+    """
+    return os.path.join(ARMAZEM_DIR, f"{ativo}_{nome_timeframe(timeframe)}.bin")
+
+def calcular_linhas(barras):
+    """
+    Calcula os indicadores e as características de uma sequência de barras.
+
+    Args:
+        barras (np.ndarray): Barras com dtype DTYPE_BARRAS.
+
+    Returns:
+        np.ndarray: Uma linha por barra, com dtype DTYPE_CARACTERISTICAS.
+    """
+    df = preparar_dados_para_estrategia(barras_para_dataframe(barras), INDICADORES)
+    caracteristicas = extrair_caracteristicas_vetorizado(df, np.arange(len(df)))
+
+    linhas = np.zeros(len(df), dtype=DTYPE_CARACTERISTICAS)
+    linhas['time'] = barras['time']
+    for nome in INDICADORES:
+        linhas[nome] = df[nome].to_numpy()
+    for nome in CARACTERISTICAS:
+        linhas[nome] = caracteristicas[nome].to_numpy()
+
+    return linhas
+
+def abrir_armazem(ativo, timeframe):
+    """
+    Abre as características de um ativo/timeframe como array mapeado em memória (somente leitura).
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+
+    Returns:
+        np.ndarray: np.memmap com dtype DTYPE_CARACTERISTICAS, ou array vazio se não houver dados.
+    """
+    caminho = caminho_armazem(ativo, timeframe)
+    if not os.path.exists(caminho):
+        return np.zeros(0, dtype=DTYPE_CARACTERISTICAS)
+
+    num_linhas = os.path.getsize(caminho) // DTYPE_CARACTERISTICAS.itemsize
+    if num_linhas == 0:
+        return np.zeros(0, dtype=DTYPE_CARACTERISTICAS)
+
+    return np.memmap(caminho, dtype=DTYPE_CARACTERISTICAS, mode='r', shape=(num_linhas,))
+
+def atualizar_armazem(ativo, timeframe):
+    """
+    Calcula as características das barras do histórico local que ainda não estão no armazém.
+
+    Só as barras novas são calculadas, junto com AQUECIMENTO_CARACTERISTICAS barras
+    anteriores para aquecer os indicadores, e acrescentadas ao final do arquivo. Se o
+    histórico mudou no meio (ex: uma lacuna preenchida por gravar_barras), o armazém
+    é cortado na primeira barra cujo tempo não confere e recalculado a partir dela.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+
+    Returns:
+        int: Número de linhas calculadas.
+    """
+    barras = abrir_historico(ativo, timeframe)
+    if len(barras) == 0:
+        return 0
+
+    caminho = caminho_armazem(ativo, timeframe)
+    existentes = abrir_armazem(ativo, timeframe)
+    comuns = min(len(existentes), len(barras))
+    diferentes = np.flatnonzero(existentes['time'][:comuns] != barras['time'][:comuns])
+    i_novo = int(diferentes[0]) if len(diferentes) > 0 else comuns
+    cortar = i_novo < len(existentes)
+    del existentes
+
+    if cortar:
+        os.truncate(caminho, i_novo * DTYPE_CARACTERISTICAS.itemsize)
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    calculadas = 0
+    with open(caminho, 'ab') as arquivo:
+        while i_novo < len(barras):
+            i_fim = min(i_novo + TAMANHO_BLOCO_ARMAZEM, len(barras))
+            i_inicio = max(0, i_novo - AQUECIMENTO_CARACTERISTICAS)
+            linhas = calcular_linhas(barras[i_inicio:i_fim])[i_novo - i_inicio:]
+            arquivo.write(linhas.tobytes())
+            calculadas += len(linhas)
+            i_novo = i_fim
+
+    return calculadas
+
+def ler_caracteristicas(ativo, timeframe, inicio=None, fim=None):
+    """
+    Lê as características de um intervalo de datas sem carregar o arquivo inteiro.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+        inicio: Data inicial (inclusiva). None para o início do armazém.
+        fim: Data final (inclusiva). None para o fim do armazém.
+
+    Returns:
+        np.ndarray: Fatia do armazém com dtype DTYPE_CARACTERISTICAS.
+    """
+    linhas = abrir_armazem(ativo, timeframe)
+    if len(linhas) == 0:
+        return linhas
+
+    tempos = linhas['time']
+    i_inicio = 0 if inicio is None else np.searchsorted(tempos, converter_tempo(inicio), side='left')
+    i_fim = len(linhas) if fim is None else np.searchsorted(tempos, converter_tempo(fim), side='right')
+
+    return linhas[i_inicio:i_fim]
+
+def caracteristicas_candle(ativo, timeframe, tempo):
+    """
+    Retorna as características do modelo para um candle fechado.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+        tempo: Tempo de abertura do candle.
+
+    Returns:
+        dict: Características no formato de extrair_caracteristicas, ou None se o
+            candle não estiver no armazém ou ainda não tiver indicadores.
+    """
+    linhas = abrir_armazem(ativo, timeframe)
+    tempo = converter_tempo(tempo)
+    i = np.searchsorted(linhas['time'], tempo) if len(linhas) > 0 else 0
+    if i >= len(linhas) or linhas['time'][i] != tempo:
+        return None
+
+    linha = linhas[i]
+    if np.isnan(linha['bb_middle']) or np.isnan(linha['adx']):
+        return None
+
+    return {nome: linha[nome].item() for nome in CARACTERISTICAS}
+
+def juntar_barras_caracteristicas(barras, linhas):
+    """
+    Monta o DataFrame da estratégia com as barras e as colunas do armazém.
+
+    Args:
+        barras (np.ndarray): Barras com dtype DTYPE_BARRAS.
+        linhas (np.ndarray): Linhas do armazém para as mesmas barras.
+
+    Returns:
+        pd.DataFrame: Preços, indicadores e características, uma linha por barra.
+    """
+    if len(barras) != len(linhas) or not np.array_equal(barras['time'], linhas['time']):
+        raise ValueError("Armazém de características desalinhado com as barras. Execute atualizar_armazem.")
+
+    df = barras_para_dataframe(barras)
+    for nome in linhas.dtype.names:
+        if nome != 'time':
+            df[nome] = linhas[nome]
+
+    return df
@@ -1,12 +1,21 @@
 import pandas as pd
 import numpy as np
-from src.strategy import preparar_dados_para_estrategia, verificar_sinal_compra, verificar_sinal_venda, filtrar_mercado_lateralizado
-from src.risk_management import aplicar_gestao_risco
-from src.ai_model import extrair_caracteristicas, prever_qualidade_sinal, carregar_modelo
+from src.strategy import preparar_dados_para_estrategia, gerar_sinais, COLUNAS_ESTRATEGIA
+from src.risk_management import aplicar_gestao_risco_vetorizado, COLUNAS_RISCO
+from src.config import RISCO_POR_TRADE
+from src.ai_model import COLUNAS_CARACTERISTICAS, extrair_caracteristicas, prever_qualidade_sinal, carregar_modelo_compacto, carregar_limiar_sinal, versao_modelo_compacto
 from src.mt5_connection import obter_dados_historicos
-from src.indicators import calcular_rsi, calcular_macd, calcular_stochastic
+from src.historico import ler_barras, barras_para_dataframe
+from src.armazem_caracteristicas import atualizar_armazem, ler_caracteristicas, juntar_barras_caracteristicas
+from src.registro_trades import RegistroTrades
+from src.metricas import calcular_metricas_registro
+from src.execucao import ModeloExecucao
+from src.historico import nome_timeframe
 import MetaTrader5 as mt5
 import os
+import csv
+import json
+import hashlib
 from datetime import datetime
 
 # Caminho para o arquivo de log de trades
@@ -15,6 +24,21 @@ TRADES_LOG_PATH = "data/trades_log.csv"
 # Caminho para o arquivo de log de decisões
 DECISIONS_LOG_PATH = "data/decisions_log.csv"
 
+# Diretório dos checkpoints e trades do backtest em blocos
+CHECKPOINT_DIR = "data/checkpoints"
+
+# Barras processadas por bloco no backtest em blocos
+TAMANHO_BLOCO = 5000
+
+# Versão do formato do checkpoint (muda quando o estado gravado ou a simulação mudam)
+FORMATO_CHECKPOINT = 2
+
+# Barras anteriores ao bloco reaproveitadas para aquecer os indicadores
+AQUECIMENTO_BARRAS = 200
+
+# Colunas dos trades gravados pelo backtest
+CAMPOS_TRADE = ['ativo', 'data_entrada', 'tipo', 'preco_entrada', 'sl', 'tp', 'resultado', 'lucro', 'data_saida']
+
 def registrar_trade(trade_info):
     """
     Registra informações de um trade em um arquivo CSV.
@@ -34,141 +58,220 @@ def registrar_trade(trade_info):
     else:
         df_trade.to_csv(TRADES_LOG_PATH, index=False)
 
-def executar_backtest(ativo, dados_historicos):
+def executar_backtest(ativo, dados_historicos, modelo_execucao=None, calcular_indicadores=True, risco_carteira=None,
+                      dados_carteira=None):
     """
     Executa um backtest da estratégia para um ativo.
     
     Args:
         ativo (str): Símbolo do ativo.
-        dados_historicos (pd.DataFrame): Dados históricos do ativo.
+        dados_historicos (pd.DataFrame | np.ndarray): Dados históricos do ativo, como
+            DataFrame ou como fatia de barras do histórico local (ver src/historico.py).
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados
+            (padrão: ModeloExecucao com os custos de src/config.py).
+        calcular_indicadores (bool): Se False, usa os indicadores e características
+            que já estão no DataFrame (ex: lidos do armazém de características).
+        risco_carteira (RiscoCarteira): Limites de risco correlacionado e diário aplicados a
+            cada sinal; o lucro dos sinais reduzidos é escalado pelo fator de risco
+            (None para não aplicar).
+        dados_carteira (dict): {ativo: DataFrame ou barras com 'time' e 'close'} dos ativos
+            da carteira, cujos retornos até cada sinal alimentam a correlação de
+            `risco_carteira` (padrão: apenas o próprio ativo).
         
     Returns:
-        dict: Resultados do backtest.
+        dict: Resultados do backtest, com os trades em um RegistroTrades.
     """
-    # Preparar dados com indicadores adicionais
-    df = preparar_dados_para_estrategia(dados_historicos)
-    df = calcular_rsi(df)
-    df = calcular_macd(df)
-    df = calcular_stochastic(df)
+    # Fatias do histórico local chegam como array estruturado
+    if isinstance(dados_historicos, np.ndarray):
+        dados_historicos = barras_para_dataframe(dados_historicos)
+    
+    # Carregar modelo de IA e o limiar de probabilidade da busca de hiperparâmetros
+    modelo = carregar_modelo_compacto()
+    limiar = carregar_limiar_sinal()
+    
+    # Indicadores da estratégia e da gestão de risco (ATR incluído), mais os das
+    # características quando há modelo, cada um calculado uma única vez
+    colunas = COLUNAS_ESTRATEGIA + COLUNAS_RISCO + (COLUNAS_CARACTERISTICAS if modelo is not None else [])
+    df = dados_historicos
+    if calcular_indicadores:
+        df = df.drop(columns=colunas, errors='ignore')
+    df = preparar_dados_para_estrategia(df, colunas)
     
     # Inicializar variáveis para resultados
-    trades = []
-    saldo = 10000  # Saldo inicial para o backtest
-    num_trades = 0
-    acertos = 0
-    
-    # Carregar modelo de IA
-    modelo = carregar_modelo()
-    
-    # Percorrer os dados para identificar sinais
-    for i in range(20, len(df)-1):  # Começar após ter dados suficientes para indicadores
-        # Verificar se mercado está lateralizado
-        if not filtrar_mercado_lateralizado(df.iloc[:i+1]):
-            continue
-            
-        # Verificar sinais de compra e venda
-        sinal_compra = verificar_sinal_compra(df.iloc[:i+1])
-        sinal_venda = verificar_sinal_venda(df.iloc[:i+1])
-        
-        # Processar sinal de compra
-        if sinal_compra:
-            # Extrair características para IA
-            caracteristicas = extrair_caracteristicas(df, i-1)  # i-1 porque o sinal é no candle anterior
-            if caracteristicas:
-                # Verificar com IA se é um bom sinal
-                qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas)
-                if qualidade_sinal == 0:
-                    continue  # Ignorar sinal classificado como ruim
-            
-            # Aplicar gestão de risco
-            gestao = aplicar_gestao_risco(ativo, df.iloc[:i+1], 'compra')
-            
-            # Registrar trade (simulado)
-            preco_entrada = df['close'].iloc[i]
-            sl = gestao['stop_loss']
-            tp = gestao['take_profit']
-            
-            # Simular resultado do trade
-            # Encontrar quando SL ou TP seriam atingidos
-            resultado = simular_trade(df.iloc[i+1:], preco_entrada, sl, tp, 'compra')
-            
-            # Atualizar saldo e estatísticas
-            saldo += resultado['lucro']
-            num_trades += 1
-            if resultado['lucro'] > 0:
-                acertos += 1
-                
-            # Registrar informações do trade
-            trade_info = {
-                'ativo': ativo,
-                'data_entrada': df['time'].iloc[i],
-                'tipo': 'compra',
-                'preco_entrada': preco_entrada,
-                'sl': sl,
-                'tp': tp,
-                'resultado': 'lucro' if resultado['lucro'] > 0 else 'prejuizo',
-                'lucro': resultado['lucro'],
-                'data_saida': resultado['data_saida']
-            }
-            trades.append(trade_info)
-        
-        # Processar sinal de venda
-        elif sinal_venda:
-            # Extrair características para IA
-            caracteristicas = extrair_caracteristicas(df, i-1)  # i-1 porque o sinal é no candle anterior
-            if caracteristicas:
-                # Verificar com IA se é um bom sinal
-                qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas)
-                if qualidade_sinal == 0:
-                    continue  # Ignorar sinal classificado como ruim
-            
-            # Aplicar gestão de risco
-            gestao = aplicar_gestao_risco(ativo, df.iloc[:i+1], 'venda')
-            
-            # Registrar trade (simulado)
-            preco_entrada = df['close'].iloc[i]
-            sl = gestao['stop_loss']
-            tp = gestao['take_profit']
-            
-            # Simular resultado do trade
-            resultado = simular_trade(df.iloc[i+1:], preco_entrada, sl, tp, 'venda')
-            
-            # Atualizar saldo e estatísticas
-            saldo += resultado['lucro']
-            num_trades += 1
-            if resultado['lucro'] > 0:
-                acertos += 1
-                
-            # Registrar informações do trade
-            trade_info = {
-                'ativo': ativo,
-                'data_entrada': df['time'].iloc[i],
-                'tipo': 'venda',
-                'preco_entrada': preco_entrada,
-                'sl': sl,
-                'tp': tp,
-                'resultado': 'lucro' if resultado['lucro'] > 0 else 'prejuizo',
-                'lucro': resultado['lucro'],
-                'data_saida': resultado['data_saida']
-            }
-            trades.append(trade_info)
-    
-    # Calcular métricas finais
-    taxa_acerto = acertos / num_trades if num_trades > 0 else 0
-    lucro_total = saldo - 10000
+    trades = RegistroTrades()
+    saldo_inicial = 10000  # Saldo inicial para o backtest
+    
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+    
+    if risco_carteira is not None:
+        carteira = barras_carteira(dados_carteira if dados_carteira is not None else {ativo: df})
+        tempos = tempos_em_segundos(df['time'])
+    
+    # Sinais, SL, TP e distância do stop de todos os candles em uma única passada
+    # vetorizada (os mesmos valores das verificações candle a candle)
+    gestao = aplicar_gestao_risco_vetorizado(df, gerar_sinais(df))
+    
+    # Percorrer os sinais, começando após ter dados suficientes para indicadores
+    for n in np.flatnonzero((gestao['indices'] >= 20) & (gestao['indices'] < len(df) - 1)):
+        i = int(gestao['indices'][n])
+        tipo_operacao = gestao['tipos'][n]
+        
+        # Extrair características para IA
+        caracteristicas = extrair_caracteristicas(df, i-1)  # i-1 porque o sinal é no candle anterior
+        if caracteristicas:
+            # Verificar com IA se é um bom sinal
+            qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas, limiar)
+            if qualidade_sinal == 0:
+                continue  # Ignorar sinal classificado como ruim
+        
+        # Limites de risco da carteira
+        fator_risco = 1.0
+        if risco_carteira is not None:
+            alimentar_correlacoes(risco_carteira, carteira, tempos[i])
+            fator_risco = risco_carteira.avaliar_sinal(ativo, tipo_operacao, tempo=df['time'].iloc[i])
+            if fator_risco == 0:
+                continue
+        
+        # Registrar trade (simulado)
+        preco_entrada = modelo_execucao.preco_entrada(ativo, df['close'].iloc[i], tipo_operacao, spread_barra(df, i))
+        sl = gestao['stop_loss'][n]
+        tp = gestao['take_profit'][n]
+        
+        # Simular resultado do trade
+        # Encontrar quando SL ou TP seriam atingidos
+        resultado = simular_trade(df.iloc[i+1:], preco_entrada, sl, tp, tipo_operacao, ativo, modelo_execucao)
+        
+        # Registrar informações do trade
+        if risco_carteira is not None:
+            risco_carteira.registrar_abertura((ativo, i), ativo, tipo_operacao, RISCO_POR_TRADE * fator_risco,
+                                              tempo=df['time'].iloc[i], fim=resultado['data_saida'])
+        trades.adicionar(ativo, df['time'].iloc[i], tipo_operacao, preco_entrada, sl, tp,
+                         resultado['lucro'] * fator_risco, resultado['data_saida'])
+    
+    # Calcular métricas finais a partir do registro colunar
+    resumo = trades.resumo(saldo_inicial)
     
     resultados = {
         'ativo': ativo,
-        'saldo_final': saldo,
-        'lucro_total': lucro_total,
-        'num_trades': num_trades,
-        'taxa_acerto': taxa_acerto,
+        'saldo_final': saldo_inicial + resumo['lucro_total'],
+        'lucro_total': resumo['lucro_total'],
+        'num_trades': resumo['num_trades'],
+        'taxa_acerto': resumo['taxa_acerto'],
+        'expectativa': resumo['expectativa'],
+        'drawdown_maximo': resumo['drawdown_maximo'],
+        'metricas': calcular_metricas_registro(trades, saldo_inicial)['agregado'],
         'trades': trades
     }
     
     return resultados
 
-def simular_trade(df_futuro, preco_entrada, sl, tp, tipo_operacao):
+def consolidar_resultados(lista_resultados, saldo_inicial=10000):
+    """
+    Consolida os resultados de backtests de vários ativos.
+    
+    Args:
+        lista_resultados (list): Resultados retornados por executar_backtest.
+        saldo_inicial (float): Saldo inicial da carteira consolidada.
+        
+    Returns:
+        dict: {'agregado': métricas da carteira, 'por_ativo': {ativo: métricas}}.
+    """
+    registros = [resultados['trades'] for resultados in lista_resultados if resultados]
+    
+    return calcular_metricas_registro(RegistroTrades.concatenar(registros), saldo_inicial)
+
+def executar_backtest_historico(ativo, timeframe, inicio=None, fim=None):
+    """
+    Executa o backtest lendo apenas o intervalo pedido do histórico local.
+    
+    Indicadores e características vêm do armazém de características, que é
+    atualizado antes apenas com as barras que ainda não tem.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras gravadas.
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        
+    Returns:
+        dict: Resultados do backtest ou None se não houver dados no intervalo.
+    """
+    barras = ler_barras(ativo, timeframe, inicio, fim)
+    if len(barras) == 0:
+        print(f"Sem dados no histórico local para {ativo}")
+        return None
+    
+    atualizar_armazem(ativo, timeframe)
+    df = juntar_barras_caracteristicas(barras, ler_caracteristicas(ativo, timeframe, inicio, fim))
+    
+    return executar_backtest(ativo, df, calcular_indicadores=False)
+
+def tempos_em_segundos(tempos):
+    """
+    Converte uma coluna de tempos (datetime ou segundos) para segundos desde a época.
+    
+    Args:
+        tempos (array-like): Tempos das barras.
+        
+    Returns:
+        np.ndarray: Tempos em segundos (int64).
+    """
+    tempos = np.asarray(tempos)
+    if np.issubdtype(tempos.dtype, np.datetime64):
+        return tempos.astype('datetime64[s]').astype(np.int64)
+    return tempos.astype(np.int64)
+
+def barras_carteira(dados_carteira):
+    """
+    Prepara os fechamentos dos ativos da carteira para alimentar a correlação no backtest.
+    
+    Args:
+        dados_carteira (dict): {ativo: DataFrame ou barras com 'time' e 'close'}.
+        
+    Returns:
+        dict: {ativo: DataFrame com 'time' em segundos e 'close'}.
+    """
+    return {
+        ativo: pd.DataFrame({'time': tempos_em_segundos(dados['time']), 'close': np.asarray(dados['close'], dtype=float)})
+        for ativo, dados in dados_carteira.items()
+    }
+
+def alimentar_correlacoes(risco_carteira, carteira, tempo):
+    """
+    Acrescenta à correlação da carteira as barras de todos os ativos até `tempo`, inclusive.
+    
+    Só as barras posteriores às já processadas são lidas, de modo que alimentar a
+    correlação antes de cada sinal percorre cada barra uma única vez.
+    
+    Args:
+        risco_carteira (RiscoCarteira): Limites de risco da carteira.
+        carteira (dict): Barras preparadas por barras_carteira.
+        tempo (int): Tempo da barra atual, em segundos.
+    """
+    lote = {}
+    for ativo, barras in carteira.items():
+        tempos = barras['time'].to_numpy()
+        inicio = 0
+        if risco_carteira.ultimo_tempo is not None:
+            inicio = np.searchsorted(tempos, risco_carteira.ultimo_tempo, side='right')
+        lote[ativo] = barras.iloc[inicio:np.searchsorted(tempos, tempo, side='right')]
+    risco_carteira.adicionar_barras(lote)
+
+def spread_barra(df, i):
+    """
+    Retorna o spread registrado em um candle, em pontos.
+    
+    Args:
+        df (pd.DataFrame): Dados do ativo.
+        i (int): Posição do candle.
+        
+    Returns:
+        float: Spread do candle, ou None se os dados não trazem a coluna 'spread'.
+    """
+    return df['spread'].iloc[i] if 'spread' in df.columns else None
+
+def simular_trade(df_futuro, preco_entrada, sl, tp, tipo_operacao, ativo=None, modelo_execucao=None):
     """
     Simula o resultado de um trade.
     
@@ -178,38 +281,370 @@ def simular_trade(df_futuro, preco_entrada, sl, tp, tipo_operacao):
         sl (float): Nível do stop loss.
         tp (float): Nível do take profit.
         tipo_operacao (str): 'compra' ou 'venda'.
+        ativo (str): Símbolo do ativo, para a especificação de contrato e custos.
+        modelo_execucao (ModeloExecucao): Modelo de execução (padrão: ModeloExecucao()).
         
     Returns:
         dict: Resultado da simulação com lucro e data de saída.
     """
-    for index, row in df_futuro.iterrows():
-        if tipo_operacao == 'compra':
-            # Verificar se atingiu SL (mínima do candle)
-            if row['low'] <= sl:
-                lucro = (sl - preco_entrada) * 100000  # Assumindo 1 lote padrão
-                return {'lucro': lucro, 'data_saida': row['time']}
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+    
+    # Candles candidatos localizados de forma vetorizada pelo modelo de execução
+    # (se não atingir nem SL nem TP, sai no último candle)
+    preco_saida, i_saida = modelo_execucao.simular_saida(
+        ativo, df_futuro['time'].array, df_futuro['open'].to_numpy(), df_futuro['high'].to_numpy(),
+        df_futuro['low'].to_numpy(), df_futuro['close'].to_numpy(), sl, tp, tipo_operacao,
+        df_futuro['spread'].to_numpy() if 'spread' in df_futuro.columns else None
+    )
+    lucro = modelo_execucao.calcular_lucro(ativo, preco_entrada, preco_saida, tipo_operacao)
+    
+    return {'lucro': lucro, 'data_saida': df_futuro['time'].iloc[i_saida]}
+
+def caminhos_backtest_em_blocos(ativo, timeframe):
+    """
+    Retorna os caminhos do checkpoint e do arquivo de trades de um backtest em blocos.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+        
+    Returns:
+        tuple: (caminho do checkpoint, caminho do CSV de trades).
+    """
+    base = os.path.join(CHECKPOINT_DIR, f"{ativo}_{nome_timeframe(timeframe)}")
+    return base + "_checkpoint.json", base + "_trades.csv"
+
+def parametros_backtest_em_blocos(barras, linhas, tamanho_bloco, modelo_execucao, limiar, risco_carteira=None):
+    """
+    Reúne tudo o que determina os trades de um backtest em blocos, para validar o checkpoint.
+    
+    A versão dos dados é um hash das barras, das características do armazém e do
+    modelo de IA, de modo que um histórico corrigido ou um modelo re-treinado não
+    são misturados com os trades já gravados.
+    
+    Args:
+        barras (np.ndarray): Barras do intervalo.
+        linhas (np.ndarray): Características do armazém para as mesmas barras.
+        tamanho_bloco (int): Número de barras processadas por bloco.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+        limiar (float): Limiar de probabilidade do filtro de IA.
+        risco_carteira (RiscoCarteira): Limites de risco da carteira (None se não aplicados).
+        
+    Returns:
+        dict: Parâmetros do backtest, já no formato em que são gravados em JSON.
+    """
+    versao = hashlib.sha1(np.ascontiguousarray(barras).tobytes())
+    versao.update(np.ascontiguousarray(linhas).tobytes())
+    versao.update(str(versao_modelo_compacto()).encode())
+    
+    parametros = {
+        'formato': FORMATO_CHECKPOINT,
+        'primeira_barra': int(barras['time'][0]),
+        'ultima_barra': int(barras['time'][-1]),
+        'num_barras': len(barras),
+        'tamanho_bloco': tamanho_bloco,
+        'modelo_execucao': modelo_execucao.parametros(),
+        'limiar_sinal': limiar,
+        'risco_carteira': risco_carteira.parametros() if risco_carteira is not None else None,
+        'versao_dados': versao.hexdigest()[:16],
+    }
+    return json.loads(json.dumps(parametros))
+
+def carregar_checkpoint(caminho_checkpoint, caminho_trades, parametros):
+    """
+    Carrega o estado salvo de um backtest em blocos.
+    
+    O checkpoint só é retomado se foi gravado com exatamente os mesmos parâmetros
+    (intervalo, tamanho do bloco, custos, limites de risco e versão dos dados). O CSV
+    de trades é truncado para o tamanho registrado no checkpoint, descartando trades
+    gravados depois do último checkpoint (que serão gerados novamente).
+    
+    Args:
+        caminho_checkpoint (str): Caminho do arquivo de checkpoint.
+        caminho_trades (str): Caminho do CSV de trades.
+        parametros (dict): Parâmetros do backtest (ver parametros_backtest_em_blocos).
+        
+    Returns:
+        dict: Estado do backtest (novo se não houver checkpoint válido).
+    """
+    estado_inicial = {
+        'parametros': parametros,
+        'proxima_barra': 0,
+        'saldo': 10000,  # Saldo inicial para o backtest
+        'num_trades': 0,
+        'acertos': 0,
+        'posicoes_abertas': [],
+        'bytes_trades': 0,
+    }
+    
+    if os.path.exists(caminho_checkpoint):
+        with open(caminho_checkpoint) as arquivo:
+            estado = json.load(arquivo)
+        salvos = estado.get('parametros', {})
+        if salvos == parametros:
+            print(f"Retomando backtest a partir da barra {estado['proxima_barra']}")
+            with open(caminho_trades, 'a') as arquivo:
+                arquivo.truncate(estado['bytes_trades'])
+            return estado
+        diferentes = sorted(chave for chave in parametros if salvos.get(chave) != parametros[chave])
+        print(f"Checkpoint com outros parâmetros ({', '.join(diferentes)}) encontrado. Reiniciando backtest.")
+    
+    # Sem checkpoint válido: começar do zero
+    if os.path.exists(caminho_trades):
+        os.remove(caminho_trades)
+    
+    return estado_inicial
+
+def salvar_checkpoint(caminho_checkpoint, estado):
+    """
+    Salva o estado do backtest de forma atômica.
+    
+    Args:
+        caminho_checkpoint (str): Caminho do arquivo de checkpoint.
+        estado (dict): Estado do backtest.
+    """
+    caminho_temporario = caminho_checkpoint + ".tmp"
+    with open(caminho_temporario, 'w') as arquivo:
+        json.dump(estado, arquivo)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(caminho_temporario, caminho_checkpoint)
+
+def restaurar_risco_carteira(risco_carteira, estado, carteira, tempo):
+    """
+    Reconstrói os limites da carteira ao retomar um backtest em blocos.
+    
+    A correlação é alimentada com as barras até a última já processada, as posições
+    abertas voltam a contar como exposições e o risco do dia é lido do checkpoint.
+    
+    Args:
+        risco_carteira (RiscoCarteira): Limites de risco da carteira.
+        estado (dict): Estado do backtest carregado do checkpoint.
+        carteira (dict): Barras preparadas por barras_carteira.
+        tempo (int): Tempo da última barra processada, em segundos.
+    """
+    alimentar_correlacoes(risco_carteira, carteira, tempo)
+    for posicao in estado['posicoes_abertas']:
+        risco_carteira.registrar_abertura((posicao['ativo'], posicao['barra_entrada']), posicao['ativo'], posicao['tipo'],
+                                          RISCO_POR_TRADE * posicao['fator_risco'], tempo=posicao['data_entrada'])
+    if estado.get('dia_risco') is not None:
+        risco_carteira.dia = pd.Timestamp(estado['dia_risco']).date()
+        risco_carteira.risco_dia = estado['risco_dia']
+
+def fechar_posicao(estado, posicao, preco_saida, data_saida, escritor, modelo_execucao):
+    """
+    Fecha uma posição simulada, atualiza o estado e grava o trade no CSV.
+    
+    Args:
+        estado (dict): Estado do backtest.
+        posicao (dict): Posição aberta.
+        preco_saida (float): Preço de saída.
+        data_saida: Data do candle de saída.
+        escritor (csv.DictWriter): Escritor do CSV de trades.
+        modelo_execucao (ModeloExecucao): Modelo de execução usado para o lucro.
+    """
+    # Posições reduzidas pelos limites da carteira têm o lucro escalado pelo fator de risco
+    lucro = modelo_execucao.calcular_lucro(posicao['ativo'], posicao['preco_entrada'], preco_saida, posicao['tipo'])
+    lucro *= posicao.get('fator_risco', 1.0)
+    
+    estado['saldo'] += lucro
+    estado['num_trades'] += 1
+    if lucro > 0:
+        estado['acertos'] += 1
+    
+    escritor.writerow({
+        'ativo': posicao['ativo'],
+        'data_entrada': posicao['data_entrada'],
+        'tipo': posicao['tipo'],
+        'preco_entrada': posicao['preco_entrada'],
+        'sl': posicao['sl'],
+        'tp': posicao['tp'],
+        'resultado': 'lucro' if lucro > 0 else 'prejuizo',
+        'lucro': lucro,
+        'data_saida': str(data_saida)
+    })
+
+def executar_backtest_em_blocos(ativo, timeframe, inicio=None, fim=None, tamanho_bloco=TAMANHO_BLOCO, retomar=True,
+                                modelo_execucao=None, risco_carteira=None):
+    """
+    Executa o backtest sobre o histórico local em blocos, com checkpoint e retomada.
+    
+    Cada bloco é lido do histórico junto com AQUECIMENTO_BARRAS barras anteriores,
+    usadas pelas regras que olham candles passados. Indicadores e características
+    vêm do armazém de características. Posições abertas passam de um bloco para o outro
+    e são verificadas candle a candle pelo mesmo modelo de execução de simular_trade.
+    Trades fechados são gravados no CSV à medida que fecham e o estado é salvo
+    ao fim de cada bloco, de modo que uma execução interrompida pode ser retomada.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras gravadas.
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        tamanho_bloco (int): Número de barras processadas por bloco.
+        retomar (bool): Se True, retoma a partir do último checkpoint, se existir.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados
+            (padrão: ModeloExecucao com os custos de src/config.py).
+        risco_carteira (RiscoCarteira): Limites de risco correlacionado e diário aplicados a
+            cada sinal, com a correlação alimentada pelo histórico local dos ativos da
+            carteira; o lucro dos sinais reduzidos é escalado pelo fator de risco
+            (None para não aplicar).
+        
+    Returns:
+        dict: Resultados do backtest, com os trades em um RegistroTrades e o caminho
+            do CSV em 'arquivo_trades', ou None se não houver dados no intervalo.
+    """
+    barras = ler_barras(ativo, timeframe, inicio, fim)
+    num_barras = len(barras)
+    if num_barras == 0:
+        print(f"Sem dados no histórico local para {ativo}")
+        return None
+    
+    atualizar_armazem(ativo, timeframe)
+    linhas = ler_caracteristicas(ativo, timeframe, inicio, fim)
+    
+    caminho_checkpoint, caminho_trades = caminhos_backtest_em_blocos(ativo, timeframe)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    if not retomar and os.path.exists(caminho_checkpoint):
+        os.remove(caminho_checkpoint)
+    
+    # Carregar modelo de IA e o limiar de probabilidade da busca de hiperparâmetros
+    modelo = carregar_modelo_compacto()
+    limiar = carregar_limiar_sinal()
+    
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+    
+    parametros = parametros_backtest_em_blocos(barras, linhas, tamanho_bloco, modelo_execucao, limiar, risco_carteira)
+    estado = carregar_checkpoint(caminho_checkpoint, caminho_trades, parametros)
+    
+    if risco_carteira is not None:
+        dados_carteira = {outro: ler_barras(outro, timeframe, inicio, fim) for outro in risco_carteira.ativos}
+        dados_carteira[ativo] = barras
+        carteira = barras_carteira(dados_carteira)
+        if estado['proxima_barra'] > 0:
+            restaurar_risco_carteira(risco_carteira, estado, carteira, int(barras['time'][estado['proxima_barra'] - 1]))
+    
+    with open(caminho_trades, 'a', newline='') as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_TRADE)
+        if arquivo.tell() == 0:
+            escritor.writeheader()
+        
+        inicio_bloco = estado['proxima_barra']
+        while inicio_bloco < num_barras:
+            fim_bloco = min(inicio_bloco + tamanho_bloco, num_barras)
+            
+            # Dados do bloco com as barras de aquecimento e os indicadores do armazém
+            deslocamento = max(0, inicio_bloco - AQUECIMENTO_BARRAS)
+            df = juntar_barras_caracteristicas(barras[deslocamento:fim_bloco], linhas[deslocamento:fim_bloco])
             
-            # Verificar se atingiu TP (máxima do candle)
-            if row['high'] >= tp:
-                lucro = (tp - preco_entrada) * 100000  # Assumindo 1 lote padrão
-                return {'lucro': lucro, 'data_saida': row['time']}
+            # Sinais e gestão de risco do bloco em uma única passada vetorizada
+            gestao = aplicar_gestao_risco_vetorizado(df, gerar_sinais(df))
+            sinais_bloco = dict(zip(gestao['indices'].tolist(), range(len(gestao['indices']))))
+            
+            for i in range(inicio_bloco - deslocamento, fim_bloco - deslocamento):
+                i_global = i + deslocamento
+                
+                # Verificar SL/TP das posições abertas neste candle
+                posicoes_abertas = []
+                for posicao in estado['posicoes_abertas']:
+                    preco_saida = modelo_execucao.resolver_saida(ativo, df['time'].iloc[i], df['open'].iloc[i],
+                                                                 df['high'].iloc[i], df['low'].iloc[i],
+                                                                 posicao['sl'], posicao['tp'], posicao['tipo'],
+                                                                 spread_barra(df, i))
+                    if preco_saida is None:
+                        posicoes_abertas.append(posicao)
+                    else:
+                        fechar_posicao(estado, posicao, preco_saida, df['time'].iloc[i], escritor, modelo_execucao)
+                        if risco_carteira is not None:
+                            risco_carteira.registrar_fechamento((ativo, posicao['barra_entrada']))
+                estado['posicoes_abertas'] = posicoes_abertas
+                
+                # Mesmo intervalo de sinais do backtest completo
+                if i_global < 20 or i_global >= num_barras - 1:
+                    continue
+                
+                # Sinal de compra ou venda neste candle (já filtrado pelo ADX)
+                n = sinais_bloco.get(i)
+                if n is None:
+                    continue
+                tipo_operacao = gestao['tipos'][n]
+                
+                # Verificar com IA se é um bom sinal
+                caracteristicas = extrair_caracteristicas(df, i-1)  # i-1 porque o sinal é no candle anterior
+                if caracteristicas and prever_qualidade_sinal(modelo, caracteristicas, limiar) == 0:
+                    continue
+                
+                # Limites de risco da carteira
+                fator_risco = 1.0
+                if risco_carteira is not None:
+                    alimentar_correlacoes(risco_carteira, carteira, int(barras['time'][i_global]))
+                    fator_risco = risco_carteira.avaliar_sinal(ativo, tipo_operacao, tempo=df['time'].iloc[i])
+                    if fator_risco == 0:
+                        continue
+                    risco_carteira.registrar_abertura((ativo, i_global), ativo, tipo_operacao,
+                                                      RISCO_POR_TRADE * fator_risco, tempo=df['time'].iloc[i])
                 
-        elif tipo_operacao == 'venda':
-            # Verificar se atingiu SL (máxima do candle)
-            if row['high'] >= sl:
-                lucro = (preco_entrada - sl) * 100000  # Assumindo 1 lote padrão
-                return {'lucro': lucro, 'data_saida': row['time']}
+                # Abrir a posição simulada com os níveis da gestão de risco
+                estado['posicoes_abertas'].append({
+                    'ativo': ativo,
+                    'data_entrada': str(df['time'].iloc[i]),
+                    'tipo': tipo_operacao,
+                    'preco_entrada': float(modelo_execucao.preco_entrada(ativo, df['close'].iloc[i], tipo_operacao,
+                                                                   spread_barra(df, i))),
+                    'sl': float(gestao['stop_loss'][n]),
+                    'tp': float(gestao['take_profit'][n]),
+                    'fator_risco': fator_risco,
+                    'barra_entrada': i_global,
+                })
             
-            # Verificar se atingiu TP (mínima do candle)
-            if row['low'] <= tp:
-                lucro = (preco_entrada - tp) * 100000  # Assumindo 1 lote padrão
-                return {'lucro': lucro, 'data_saida': row['time']}
-    
-    # Se não atingiu nem SL nem TP, sair no último candle
-    ultimo_preco = df_futuro['close'].iloc[-1]
-    if tipo_operacao == 'compra':
-        lucro = (ultimo_preco - preco_entrada) * 100000
-    else:
-        lucro = (preco_entrada - ultimo_preco) * 100000
+            # Salvar checkpoint ao fim do bloco
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            estado['proxima_barra'] = fim_bloco
+            estado['bytes_trades'] = arquivo.tell()
+            estado['saldo'] = float(estado['saldo'])
+            if risco_carteira is not None:
+                estado['risco_dia'] = risco_carteira.risco_dia
+                estado['dia_risco'] = str(risco_carteira.dia) if risco_carteira.dia is not None else None
+            salvar_checkpoint(caminho_checkpoint, estado)
+            print(f"Backtest {ativo}: {fim_bloco}/{num_barras} barras processadas")
+            
+            inicio_bloco = fim_bloco
+        
+        # Se não atingiu nem SL nem TP, sair no último candle
+        ultima_barra = barras_para_dataframe(barras[-1:])
+        for posicao in estado['posicoes_abertas']:
+            ultimo_preco = ultima_barra['close'].iloc[0]
+            if posicao['tipo'] == 'venda':
+                ultimo_preco += modelo_execucao.spread(ativo, spread_barra(ultima_barra, 0))
+            fechar_posicao(estado, posicao, ultimo_preco, ultima_barra['time'].iloc[0], escritor, modelo_execucao)
+            if risco_carteira is not None:
+                risco_carteira.registrar_fechamento((ativo, posicao['barra_entrada']))
+        estado['posicoes_abertas'] = []
         
-    return {'lucro': lucro, 'data_saida': df_futuro['time'].iloc[-1]}
\ No newline at end of file
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+        estado['bytes_trades'] = arquivo.tell()
+        estado['saldo'] = float(estado['saldo'])
+        salvar_checkpoint(caminho_checkpoint, estado)
+    
+    # Calcular métricas finais a partir do registro colunar dos trades gravados
+    trades = RegistroTrades.de_dataframe(pd.read_csv(caminho_trades))
+    resumo = trades.resumo(10000)
+    
+    resultados = {
+        'ativo': ativo,
+        'saldo_final': estado['saldo'],
+        'lucro_total': resumo['lucro_total'],
+        'num_trades': resumo['num_trades'],
+        'taxa_acerto': resumo['taxa_acerto'],
+        'expectativa': resumo['expectativa'],
+        'drawdown_maximo': resumo['drawdown_maximo'],
+        'metricas': calcular_metricas_registro(trades, 10000)['agregado'],
+        'trades': trades,
+        'arquivo_trades': caminho_trades
+    }
+    
+    return resultados
@@ -0,0 +1,163 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingRandomSearchCV)
+from sklearn.model_selection import HalvingRandomSearchCV, TimeSeriesSplit
+from src.ai_model import CARACTERISTICAS, salvar_hiperparametros
+
+# Espaço de busca da floresta (o número de árvores é o recurso do successive halving)
+ESPACO_BUSCA = {
+    'max_depth': [None, 4, 6, 8, 12, 16],
+    'min_samples_leaf': [1, 2, 5, 10, 20, 50],
+    'max_features': ['sqrt', 0.5, None],
+    'class_weight': [None, 'balanced', 'balanced_subsample'],
+}
+
+# Árvores usadas na primeira e na última rodada do successive halving
+MIN_ARVORES = 25
+MAX_ARVORES_BUSCA = 400
+
+# Limiares de probabilidade avaliados para aceitar um sinal
+LIMIARES = np.round(np.arange(0.30, 0.81, 0.02), 2)
+
+def prever_fold(parametros, X, y, treino, teste, random_state):
+    """
+    Treina a floresta em um fold e retorna a probabilidade de lucro no teste.
+
+    Args:
+        parametros (dict): Parâmetros da floresta.
+        X (np.ndarray): Características.
+        y (np.ndarray): Resultados (1 lucro, 0 prejuízo).
+        treino (np.ndarray): Índices de treino.
+        teste (np.ndarray): Índices de teste.
+        random_state (int): Semente da floresta.
+
+    Returns:
+        np.ndarray: Probabilidade da classe 1 para cada índice de teste.
+    """
+    modelo = RandomForestClassifier(random_state=random_state, **parametros)
+    modelo.fit(X[treino], y[treino])
+    if 1 not in modelo.classes_:
+        return np.zeros(len(teste))
+    return modelo.predict_proba(X[teste])[:, list(modelo.classes_).index(1)]
+
+def escolher_limiar(probabilidades, y, lucro=None):
+    """
+    Escolhe o limiar de probabilidade que maximiza o resultado dos sinais aceitos.
+
+    Args:
+        probabilidades (np.ndarray): Probabilidade de lucro fora da amostra.
+        y (np.ndarray): Resultados (1 lucro, 0 prejuízo).
+        lucro (np.ndarray): Lucro de cada trade. Se None, maximiza a acurácia.
+
+    Returns:
+        tuple: (melhor limiar, dict com a pontuação de cada limiar).
+    """
+    aceitos = probabilidades[None, :] >= LIMIARES[:, None]
+    if lucro is not None:
+        pontuacoes = (aceitos * lucro[None, :]).sum(axis=1)
+    else:
+        pontuacoes = (aceitos == (y[None, :] == 1)).mean(axis=1)
+
+    melhor = int(np.argmax(pontuacoes))
+    return float(LIMIARES[melhor]), {f"{limiar:.2f}": float(p) for limiar, p in zip(LIMIARES, pontuacoes)}
+
+def buscar_hiperparametros(dados_trades, n_splits=5, n_candidatos=60, fator=3, n_jobs=-1, random_state=42):
+    """
+    Busca os hiperparâmetros da floresta e o limiar de probabilidade do filtro de sinais.
+
+    Os trades são ordenados por data de entrada e avaliados com TimeSeriesSplit, para
+    que nenhum fold treine com trades posteriores aos de teste. Os candidatos passam
+    por successive halving (HalvingRandomSearchCV) usando o número de árvores como
+    recurso: todos começam com MIN_ARVORES e só os melhores de cada rodada recebem
+    mais árvores, o que limita o tempo total. Folds e candidatos rodam em paralelo.
+    Com os melhores parâmetros, as probabilidades fora da amostra de cada fold
+    definem o limiar que maximiza o lucro dos sinais aceitos (ou a acurácia, se não
+    houver a coluna 'lucro').
+
+    O resultado é salvo com salvar_hiperparametros e usado por treinar_modelo e
+    pelo filtro de sinais.
+
+    Args:
+        dados_trades (pd.DataFrame): Trades com as características e o 'resultado'.
+        n_splits (int): Número de folds da validação temporal.
+        n_candidatos (int): Candidatos sorteados para a primeira rodada.
+        fator (int): Fração de candidatos mantida a cada rodada (1/fator).
+        n_jobs (int): Processos usados (-1 para todos os núcleos).
+        random_state (int): Semente do sorteio e das florestas.
+
+    Returns:
+        dict: Parâmetros, limiar, pontuações e duração da busca.
+    """
+    inicio = time.perf_counter()
+
+    if 'data_entrada' in dados_trades.columns:
+        ordem = np.argsort(pd.to_datetime(dados_trades['data_entrada']).to_numpy(), kind='stable')
+        dados_trades = dados_trades.iloc[ordem]
+    X = dados_trades[CARACTERISTICAS].to_numpy(dtype=float)
+    y = dados_trades['resultado'].to_numpy(dtype=int)
+    lucro = dados_trades['lucro'].to_numpy(dtype=float) if 'lucro' in dados_trades.columns else None
+
+    validacao = TimeSeriesSplit(n_splits=n_splits)
+    busca = HalvingRandomSearchCV(
+        RandomForestClassifier(random_state=random_state),
+        ESPACO_BUSCA,
+        n_candidates=n_candidatos,
+        factor=fator,
+        resource='n_estimators',
+        min_resources=MIN_ARVORES,
+        max_resources=MAX_ARVORES_BUSCA,
+        cv=validacao,
+        scoring='roc_auc',
+        n_jobs=n_jobs,
+        random_state=random_state,
+        refit=False,
+    )
+    busca.fit(X, y)
+
+    melhor = busca.best_index_
+    parametros = dict(busca.cv_results_['params'][melhor])
+    parametros['n_estimators'] = int(busca.cv_results_['n_resources'][melhor])
+
+    # Probabilidades fora da amostra com os melhores parâmetros, um fold por processo
+    folds = list(validacao.split(X))
+    probabilidades_folds = Parallel(n_jobs=n_jobs)(
+        delayed(prever_fold)(parametros, X, y, treino, teste, random_state) for treino, teste in folds
+    )
+    testados = np.concatenate([teste for _, teste in folds])
+    probabilidades = np.concatenate(probabilidades_folds)
+    limiar, pontuacoes_limiar = escolher_limiar(
+        probabilidades, y[testados], lucro[testados] if lucro is not None else None
+    )
+
+    resultado = {
+        'parametros': parametros,
+        'limiar': limiar,
+        'roc_auc_medio': float(busca.cv_results_['mean_test_score'][melhor]),
+        'roc_auc_desvio': float(busca.cv_results_['std_test_score'][melhor]),
+        'pontuacoes_limiar': pontuacoes_limiar,
+        'criterio_limiar': 'lucro' if lucro is not None else 'acuracia',
+        'candidatos_avaliados': len(busca.cv_results_['params']),
+        'rodadas': int(busca.n_iterations_),
+        'exemplos': len(X),
+        'duracao_segundos': time.perf_counter() - inicio,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+
+    salvar_hiperparametros(resultado)
+    print(f"Melhores parâmetros: {parametros} (ROC AUC {resultado['roc_auc_medio']:.3f}, limiar {limiar:.2f})")
+
+    return resultado
+
+if __name__ == "__main__":
+    from src.construtor_dataset import carregar_dataset
+
+    dataset, metadados = carregar_dataset()
+    if dataset is None:
+        print("Nenhum conjunto de treino encontrado. Gere um com: python -m src.construtor_dataset")
+    else:
+        print(f"Buscando hiperparâmetros com {len(dataset)} exemplos (dataset v{metadados['versao']})")
+        buscar_hiperparametros(dataset)
@@ -1,10 +1,17 @@
 # Configurações gerais do robô
+import os
 
 # Parâmetros da estratégia
 BB_PERIOD = 20
 BB_STDDEV = 2
 ADX_PERIOD = 14
 
+# Timeframes analisados pela estratégia. Com mais de um timeframe, o robô busca
+# apenas as barras de TIMEFRAME_FEED e monta os demais localmente (até D1)
+TIMEFRAMES = ["D1"]
+TIMEFRAME_FEED = "M1"
+BARRAS_ANALISE = 100  # Candles analisados por timeframe
+
 # Lista de ativos a serem monitorados
 ATIVOS = [
     "EURUSD", "GBPUSD", "USDJPY", "USDCAD", "USDCHF",
@@ -15,6 +22,12 @@ ATIVOS = [
 RISCO_POR_TRADE = 0.01  # 1% do saldo
 MAX_RISCO_DIARIO = 0.05 # 5% do saldo
 
+# Risco da carteira: sinais no mesmo sentido de posições correlacionadas somam risco
+JANELA_CORRELACAO = 100          # Barras usadas na correlação dos retornos entre os ativos
+LIMIAR_CORRELACAO = 0.7          # Correlação a partir da qual duas exposições somam risco
+MAX_RISCO_CORRELACIONADO = 0.02  # 2% do saldo entre exposições correlacionadas
+FATOR_MINIMO_RISCO = 0.25        # Sinais reduzidos abaixo desta fração do risco por trade são recusados
+
 # Configurações de Take Profit
 # 1 para linha central, 2 para banda oposta
 TP_OPTION = 2
@@ -23,6 +36,77 @@ TP_OPTION = 2
 # True para conta demo, False para conta real
 MODO_DEMO = True
 
+# Identificador (magic number) das ordens enviadas pelo robô
+MAGIC_NUMBER = 10032025
+
+# Estratégias ativas (ver src/estrategias.py), cada uma com o seu magic number e
+# risco por trade. Os indicadores de todas são calculados uma única vez por ativo
+ESTRATEGIAS = {
+    "bollinger": {"magic": MAGIC_NUMBER, "risco_por_trade": RISCO_POR_TRADE},
+    # "rsi": {"magic": MAGIC_NUMBER + 1, "risco_por_trade": 0.005},
+}
+
+# Tentativas de envio de uma ordem em caso de requote ou mudança de preço
+MAX_TENTATIVAS_ORDEM = 3
+
+# Gestão das posições abertas a partir dos ticks (trailing stop, breakeven e gaps)
+GESTAO_POSICOES_ATIVA = True
+TAMANHO_BUFFER_TICKS = 4096      # Ticks guardados por ativo (buffer circular)
+INTERVALO_TICKS = 0.1            # Segundos entre coletas de ticks
+BREAKEVEN_GATILHO_R = 1.0        # Lucro, em múltiplos do risco inicial, que leva o SL para a entrada
+TRAILING_GATILHO_R = 1.5         # Lucro, em múltiplos do risco inicial, que ativa o trailing stop
+TRAILING_DISTANCIA_R = 1.0       # Distância do trailing stop ao melhor preço, em múltiplos do risco inicial
+PASSO_MINIMO_SLTP_PONTOS = 20    # O SL só é modificado quando anda mais que este número de pontos
+INTERVALO_MODIFICACAO = 1.0      # Segundos mínimos entre modificações da mesma posição
+MAX_MODIFICACOES_POR_CICLO = 20  # Modificações enviadas ao terminal por ciclo, no máximo
+
+# Perfilador embutido no robô ao vivo (ver src/perfilador.py): a amostragem das pilhas e os
+# snapshots de memória são ligados com o robô rodando, por `python -m src.perfilador <comando>`
+# ou pelos sinais SIGUSR1/SIGUSR2, e gravados em data/perfil/
+PERFIL_ATIVO = True
+
+# Qualidade dos dados na ingestão (ver src/qualidade_dados.py): as barras recebidas do terminal
+# são verificadas (ordem, duplicadas, OHLC, picos isolados, lacunas) e os problemas são avisados.
+# Com REPARAR_DADOS, a estrutura é corrigida (ordem, duplicadas, máxima/mínima, barras sem preço)
+# antes de chegar aos indicadores e ao histórico; os picos isolados só são descartados com
+# REMOVER_OUTLIERS, já que um movimento real e brusco tem a mesma forma
+VALIDAR_DADOS = True
+REPARAR_DADOS = False
+REMOVER_OUTLIERS = False
+
 # Configurações do Aprendizado de Máquina
 RETRAIN_INTERVAL = 7  # Re-treinar a cada 7 dias
-MIN_TRADES_FOR_AI = 20 # Mínimo de trades para ativar a IA
\ No newline at end of file
+MIN_TRADES_FOR_AI = 20 # Mínimo de trades para ativar a IA
+
+# Re-treino incremental: árvores novas treinadas só com os trades desde o último treino
+TREINO_INCREMENTAL = True
+ARVORES_POR_ATUALIZACAO = 20  # Árvores adicionadas a cada atualização
+MAX_ARVORES = 300             # Árvores mais antigas são descartadas acima deste limite
+MIN_TRADES_VALIDACAO_INCREMENTAL = 10  # Trades novos fora do treino, no mínimo, para aceitar ou recusar a atualização
+
+# Servidor de inferência compartilhado entre instâncias do robô
+# (iniciar com: python -m src.servidor_inferencia)
+USAR_SERVIDOR_INFERENCIA = False
+ENDERECO_INFERENCIA = r"\\.\pipe\bollinger_inferencia" if os.name == "nt" else "data/inferencia.sock"
+# Chave de autenticação do servidor: da variável de ambiente (em hexadecimal) ou do
+# arquivo desta instalação, criado com: python -m src.servidor_inferencia --gerar-chave
+VARIAVEL_CHAVE_INFERENCIA = "BOLLINGER_CHAVE_INFERENCIA"
+ARQUIVO_CHAVE_INFERENCIA = "data/inferencia.chave"
+
+# Especificações de contrato por ativo
+# 'conversao': 'direta' quando o lucro já sai em USD (ex: EURUSD, XAUUSD),
+# 'inversa' quando sai na moeda cotada e precisa ser dividido pelo preço (ex: USDJPY)
+ESPECIFICACOES_CONTRATO = {
+    "EURUSD": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "direta"},
+    "GBPUSD": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "direta"},
+    "AUDUSD": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "direta"},
+    "NZDUSD": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "direta"},
+    "USDJPY": {"tamanho_contrato": 100000, "ponto": 0.001, "conversao": "inversa"},
+    "USDCAD": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "inversa"},
+    "USDCHF": {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "inversa"},
+    "XAUUSD": {"tamanho_contrato": 100, "ponto": 0.01, "conversao": "direta"},
+}
+
+# Custos simulados no backtest, em pontos do ativo
+SPREAD_PONTOS = 10   # Usado quando a barra não traz o spread
+SLIPPAGE_PONTOS = 0  # Aplicado contra o trade nas execuções a mercado (entrada e stop)
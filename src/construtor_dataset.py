@@ -0,0 +1,244 @@
+import os
+import glob
+import json
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from src.config import ATIVOS, TIMEFRAMES
+from src.historico import ler_barras, nome_timeframe
+from src.armazem_caracteristicas import atualizar_armazem, ler_caracteristicas, juntar_barras_caracteristicas
+from src.strategy import gerar_sinais
+from src.risk_management import calcular_niveis_vetorizado
+from src.ai_model import CARACTERISTICAS
+from src.execucao import ModeloExecucao
+
+# Diretório dos conjuntos de treino gerados a partir do histórico
+DATASET_DIR = "data/datasets"
+
+# Versão do formato do arquivo do conjunto de treino
+FORMATO_DATASET = 1
+
+# Colunas do conjunto de treino além das características
+COLUNAS_TRADE = ['ativo', 'data_entrada', 'tipo', 'preco_entrada', 'sl', 'tp', 'lucro', 'data_saida', 'resultado']
+
+def construir_dataset_ativo(ativo, timeframe, inicio=None, fim=None, modelo_execucao=None):
+    """
+    Gera os exemplos de treino de um ativo simulando todos os sinais do histórico local.
+
+    Indicadores e características são lidos do armazém de características (que é
+    atualizado antes), e os sinais e níveis de SL/TP são calculados de forma
+    vetorizada para o intervalo inteiro. Cada sinal é simulado até a saída pelo modelo de
+    execução, sem o filtro de IA, e rotulado com 1 se deu lucro e 0 caso contrário.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras gravadas.
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados
+            (padrão: ModeloExecucao com os custos de src/config.py).
+
+    Returns:
+        pd.DataFrame: Uma linha por sinal, com CARACTERISTICAS e COLUNAS_TRADE.
+    """
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+
+    barras = ler_barras(ativo, timeframe, inicio, fim)
+    if len(barras) < 25:
+        return pd.DataFrame(columns=CARACTERISTICAS + COLUNAS_TRADE)
+
+    atualizar_armazem(ativo, timeframe)
+    df = juntar_barras_caracteristicas(barras, ler_caracteristicas(ativo, timeframe, inicio, fim))
+    sinais = gerar_sinais(df)
+
+    # Mesmo intervalo do backtest, com características do candle do sinal (i-1)
+    indices = np.flatnonzero(sinais)
+    indices = indices[(indices >= 21) & (indices < len(df) - 1)]
+    tipos = np.where(sinais[indices] == 1, 'compra', 'venda')
+
+    sl, tp = calcular_niveis_vetorizado(df, indices, tipos)
+    caracteristicas = df[CARACTERISTICAS].iloc[indices - 1].reset_index(drop=True)
+
+    # Simular a saída de cada sinal a partir do candle seguinte à entrada
+    tempos = barras['time']
+    open_, high, low, close = barras['open'], barras['high'], barras['low'], barras['close']
+    spreads = barras['spread']
+    precos_entrada = np.empty(len(indices))
+    lucros = np.empty(len(indices))
+    saidas = np.empty(len(indices), dtype=np.int64)
+    for n, i in enumerate(indices):
+        precos_entrada[n] = modelo_execucao.preco_entrada(ativo, close[i], tipos[n], spreads[i])
+        preco_saida, i_saida = modelo_execucao.simular_saida(
+            ativo, tempos[i + 1:], open_[i + 1:], high[i + 1:], low[i + 1:], close[i + 1:], sl[n], tp[n], tipos[n],
+            spreads[i + 1:]
+        )
+        lucros[n] = modelo_execucao.calcular_lucro(ativo, precos_entrada[n], preco_saida, tipos[n])
+        saidas[n] = tempos[i + 1 + i_saida]
+
+    caracteristicas['ativo'] = ativo
+    caracteristicas['data_entrada'] = pd.to_datetime(tempos[indices], unit='s')
+    caracteristicas['tipo'] = tipos
+    caracteristicas['preco_entrada'] = precos_entrada
+    caracteristicas['sl'] = sl
+    caracteristicas['tp'] = tp
+    caracteristicas['lucro'] = lucros
+    caracteristicas['data_saida'] = pd.to_datetime(saidas, unit='s')
+    caracteristicas['resultado'] = (lucros > 0).astype(int)
+
+    return caracteristicas
+
+def construir_dataset(ativos=None, timeframe=None, inicio=None, fim=None, processos=None, modelo_execucao=None):
+    """
+    Gera o conjunto de treino de vários ativos em paralelo, um processo por ativo.
+
+    Args:
+        ativos (list): Símbolos dos ativos (padrão: ATIVOS).
+        timeframe: Timeframe das barras gravadas (padrão: primeiro de TIMEFRAMES).
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        processos (int): Número de processos (padrão: número de CPUs). Com 1, roda
+            no processo atual.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+
+    Returns:
+        pd.DataFrame: Exemplos de todos os ativos, ordenados por data de entrada.
+    """
+    if ativos is None:
+        ativos = ATIVOS
+    if timeframe is None:
+        timeframe = TIMEFRAMES[0]
+
+    if processos == 1:
+        partes = [construir_dataset_ativo(ativo, timeframe, inicio, fim, modelo_execucao) for ativo in ativos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            partes = list(executor.map(construir_dataset_ativo, ativos, repeat(timeframe), repeat(inicio),
+                                       repeat(fim), repeat(modelo_execucao)))
+
+    for ativo, parte in zip(ativos, partes):
+        print(f"Dataset {ativo}: {len(parte)} exemplos")
+
+    partes = [parte for parte in partes if len(parte) > 0]
+    if not partes:
+        return pd.DataFrame(columns=CARACTERISTICAS + COLUNAS_TRADE)
+
+    dataset = pd.concat(partes, ignore_index=True)
+    return dataset.sort_values('data_entrada', kind='stable', ignore_index=True)
+
+def salvar_dataset(dataset, timeframe, diretorio=None):
+    """
+    Salva o conjunto de treino em formato colunar, como uma nova versão.
+
+    Cada coluna vira um array do arquivo .npz, e os metadados (versão, formato,
+    timeframe, ativos e intervalo) ficam em JSON no próprio arquivo. As versões são
+    numeradas em sequência e nunca são sobrescritas.
+
+    Args:
+        dataset (pd.DataFrame): Conjunto gerado por construir_dataset.
+        timeframe: Timeframe das barras usadas.
+        diretorio (str): Diretório dos conjuntos (padrão: DATASET_DIR).
+
+    Returns:
+        str: Caminho do arquivo gravado.
+    """
+    if diretorio is None:
+        diretorio = DATASET_DIR
+    os.makedirs(diretorio, exist_ok=True)
+
+    timeframe = nome_timeframe(timeframe)
+    versoes = listar_versoes(timeframe, diretorio)
+    versao = versoes[-1][0] + 1 if versoes else 1
+    caminho = os.path.join(diretorio, f"dataset_{timeframe}_v{versao:03d}.npz")
+
+    colunas = {}
+    for nome in dataset.columns:
+        valores = dataset[nome].to_numpy()
+        if nome in ('data_entrada', 'data_saida'):
+            valores = valores.astype('datetime64[s]').astype(np.int64)
+        elif valores.dtype == object:
+            valores = valores.astype(str)
+        colunas[nome] = valores
+
+    metadados = {
+        'versao': versao,
+        'formato': FORMATO_DATASET,
+        'timeframe': timeframe,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        'ativos': sorted(dataset['ativo'].unique().tolist()) if len(dataset) > 0 else [],
+        'inicio': str(dataset['data_entrada'].min()) if len(dataset) > 0 else None,
+        'fim': str(dataset['data_entrada'].max()) if len(dataset) > 0 else None,
+        'exemplos': len(dataset),
+    }
+
+    # Gravar em arquivo temporário e renomear, para nunca deixar uma versão incompleta
+    caminho_temporario = caminho + ".tmp.npz"
+    np.savez(caminho_temporario, metadados=np.array(json.dumps(metadados)), **colunas)
+    os.replace(caminho_temporario, caminho)
+
+    return caminho
+
+def listar_versoes(timeframe, diretorio=None):
+    """
+    Lista as versões gravadas do conjunto de treino de um timeframe.
+
+    Args:
+        timeframe: Timeframe das barras usadas.
+        diretorio (str): Diretório dos conjuntos (padrão: DATASET_DIR).
+
+    Returns:
+        list: Tuplas (versão, caminho) em ordem crescente de versão.
+    """
+    if diretorio is None:
+        diretorio = DATASET_DIR
+    prefixo = os.path.join(diretorio, f"dataset_{nome_timeframe(timeframe)}_v")
+
+    versoes = []
+    for caminho in glob.glob(prefixo + "*.npz"):
+        numero = caminho[len(prefixo):-len(".npz")]
+        if numero.isdigit():
+            versoes.append((int(numero), caminho))
+
+    return sorted(versoes)
+
+def carregar_dataset(timeframe=None, versao=None, diretorio=None):
+    """
+    Carrega uma versão do conjunto de treino, no formato esperado por treinar_modelo.
+
+    Args:
+        timeframe: Timeframe das barras usadas (padrão: primeiro de TIMEFRAMES).
+        versao (int): Versão desejada (padrão: a mais recente).
+        diretorio (str): Diretório dos conjuntos (padrão: DATASET_DIR).
+
+    Returns:
+        tuple: (DataFrame, metadados), ou (None, None) se a versão não existir.
+    """
+    if timeframe is None:
+        timeframe = TIMEFRAMES[0]
+
+    versoes = dict(listar_versoes(timeframe, diretorio))
+    if not versoes:
+        return None, None
+    caminho = versoes.get(versao if versao is not None else max(versoes))
+    if caminho is None:
+        return None, None
+
+    with np.load(caminho) as arquivo:
+        metadados = json.loads(str(arquivo['metadados']))
+        dataset = pd.DataFrame({nome: arquivo[nome] for nome in arquivo.files if nome != 'metadados'})
+
+    for nome in ('data_entrada', 'data_saida'):
+        if nome in dataset.columns:
+            dataset[nome] = pd.to_datetime(dataset[nome], unit='s')
+
+    return dataset, metadados
+
+if __name__ == "__main__":
+    from src.ai_model import treinar_modelo
+
+    dataset = construir_dataset()
+    caminho = salvar_dataset(dataset, TIMEFRAMES[0])
+    print(f"Dataset com {len(dataset)} exemplos salvo em {caminho}")
+    treinar_modelo(dataset)
@@ -0,0 +1,99 @@
+# Estados possíveis de um ativo no ciclo do robô
+AGUARDANDO_CANDLE = 'aguardando_candle'  # Candle atual já processado
+EM_POSICAO = 'em_posicao'                # Há posição aberta do robô no ativo
+SINAL_PENDENTE = 'sinal_pendente'        # Ordem agendada e ainda não confirmada
+LIVRE = 'livre'                          # Candle novo, pronto para análise
+
+class EstadoAtivos:
+    """
+    Máquina de estados por ativo usada para evitar trabalho repetido no ciclo ao vivo.
+
+    Guarda, para cada ativo, o tempo do último candle processado, se há posição
+    aberta e se há um sinal com ordem pendente. Ativos sem candle novo ou já
+    posicionados não passam pelo pipeline de indicadores, IA e risco.
+    """
+
+    def __init__(self):
+        self.estados = {}
+
+    def estado(self, ativo):
+        """
+        Retorna o estado de um ativo, criando-o se necessário.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            dict: Estado com 'situacao', 'ultimo_candle' e 'sinal_pendente'.
+        """
+        if ativo not in self.estados:
+            self.estados[ativo] = {'situacao': LIVRE, 'ultimo_candle': None, 'sinal_pendente': None}
+        return self.estados[ativo]
+
+    def precisa_processar(self, ativo, tempo_candle, possui_posicao):
+        """
+        Decide se o ativo deve passar pelo pipeline completo neste ciclo.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempo_candle: Tempo de abertura do candle atual (None se indisponível).
+            possui_posicao (bool): Se há posição aberta do robô no ativo.
+
+        Returns:
+            bool: True se o ativo deve ser processado.
+        """
+        estado = self.estado(ativo)
+
+        if estado['sinal_pendente'] is not None:
+            estado['situacao'] = SINAL_PENDENTE
+        elif possui_posicao:
+            estado['situacao'] = EM_POSICAO
+        elif tempo_candle is None or tempo_candle == estado['ultimo_candle']:
+            estado['situacao'] = AGUARDANDO_CANDLE
+        else:
+            estado['situacao'] = LIVRE
+
+        return estado['situacao'] == LIVRE
+
+    def marcar_processado(self, ativo, tempo_candle):
+        """
+        Registra que o candle atual do ativo já foi analisado.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempo_candle: Tempo de abertura do candle analisado.
+        """
+        estado = self.estado(ativo)
+        estado['ultimo_candle'] = tempo_candle
+        estado['situacao'] = AGUARDANDO_CANDLE
+
+    def registrar_sinal_pendente(self, ativo, tipo_operacao):
+        """
+        Registra que uma ordem foi agendada para o ativo.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tipo_operacao (str): 'compra' ou 'venda'.
+        """
+        estado = self.estado(ativo)
+        estado['sinal_pendente'] = tipo_operacao
+        estado['situacao'] = SINAL_PENDENTE
+
+    def concluir_sinal(self, ativo, sucesso):
+        """
+        Encerra o sinal pendente de um ativo após o envio da ordem.
+
+        Se a ordem falhou, o candle volta a ser considerado não processado para que
+        o sinal seja reavaliado no próximo ciclo.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            sucesso (bool): Se a ordem foi executada.
+        """
+        estado = self.estado(ativo)
+        estado['sinal_pendente'] = None
+        if sucesso:
+            estado['situacao'] = EM_POSICAO
+        else:
+            estado['ultimo_candle'] = None
+            estado['situacao'] = LIVRE
@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+from src.config import ESTRATEGIAS, RISCO_POR_TRADE
+from src.strategy import gerar_sinais, filtrar_mercado_lateralizado, COLUNAS_ESTRATEGIA
+
+# Estratégias disponíveis, pelo nome usado em ESTRATEGIAS
+REGISTRO_ESTRATEGIAS = {}
+
+# Contadores mantidos para cada estratégia
+EVENTOS_ESTRATEGIA = ['sinais', 'ignorados_ia', 'ignorados_risco', 'ordens', 'executadas', 'falhas']
+
+def motivo_mercado_lateral(df, limiar_adx):
+    """
+    Motivo para não operar o último candle quando o mercado não está lateralizado.
+
+    Args:
+        df (pd.DataFrame): Dados de preços com a coluna 'adx'.
+        limiar_adx (float): ADX a partir do qual o mercado não é considerado lateralizado.
+
+    Returns:
+        tuple: (motivo, detalhes), ou None se o mercado está lateralizado.
+    """
+    if filtrar_mercado_lateralizado(df, limiar_adx):
+        return None
+    return (f"Mercado não lateralizado (ADX >= {limiar_adx})", f"ADX: {df['adx'].iloc[-1]:.2f}")
+
+def registrar_estrategia(nome):
+    """
+    Registra uma classe de estratégia com o nome usado na configuração.
+
+    Args:
+        nome (str): Nome da estratégia em ESTRATEGIAS.
+
+    Returns:
+        callable: Decorador que registra a classe.
+    """
+    def registrar(classe):
+        classe.nome = nome
+        REGISTRO_ESTRATEGIAS[nome] = classe
+        return classe
+    return registrar
+
+class Estrategia:
+    """
+    Interface das estratégias executadas pelo robô.
+
+    Cada estratégia declara as colunas de indicadores de que precisa e gera os sinais
+    de todos os candles de uma vez. O ciclo calcula os indicadores de todas as
+    estratégias ativas em uma única passada por ativo; as ordens de cada uma saem
+    com o seu magic number e o seu risco por trade.
+    """
+
+    nome = None
+    colunas = []             # Colunas de indicadores usadas pelos sinais
+    rotulo = "Bot"           # Usado no comentário das ordens
+
+    def __init__(self, magic, risco_por_trade=RISCO_POR_TRADE):
+        """
+        Args:
+            magic (int): Magic number das ordens e posições da estratégia.
+            risco_por_trade (float): Percentual do saldo arriscado em cada trade.
+        """
+        self.magic = magic
+        self.risco_por_trade = risco_por_trade
+        self.estatisticas = dict.fromkeys(EVENTOS_ESTRATEGIA, 0)
+
+    def gerar_sinais(self, df):
+        """
+        Calcula os sinais de todos os candles do DataFrame.
+
+        Args:
+            df (pd.DataFrame): Dados de preços com as colunas da estratégia.
+
+        Returns:
+            np.ndarray: 1 para compra, -1 para venda e 0 sem sinal, um valor por candle.
+        """
+        raise NotImplementedError
+
+    def motivo_filtro(self, df):
+        """
+        Indica se o último candle está fora das condições de mercado da estratégia.
+
+        Args:
+            df (pd.DataFrame): Dados de preços com as colunas da estratégia.
+
+        Returns:
+            tuple: (motivo, detalhes) para registrar a decisão, ou None se o mercado é operável.
+        """
+        return None
+
+    def comentario(self, tipo_operacao, timeframe):
+        """
+        Monta o comentário das ordens da estratégia.
+
+        Args:
+            tipo_operacao (str): 'compra' ou 'venda'.
+            timeframe (str): Nome do timeframe analisado.
+
+        Returns:
+            str: Comentário da ordem.
+        """
+        return f"{tipo_operacao.capitalize()} {self.rotulo} {timeframe}"
+
+    def contar(self, evento):
+        """
+        Soma um evento às estatísticas da estratégia.
+
+        Args:
+            evento (str): Um dos EVENTOS_ESTRATEGIA.
+        """
+        self.estatisticas[evento] += 1
+
+@registrar_estrategia('bollinger')
+class EstrategiaBollinger(Estrategia):
+    """
+    Reversão às Bandas de Bollinger em mercado lateralizado (ADX abaixo do limiar).
+    """
+
+    colunas = COLUNAS_ESTRATEGIA
+    rotulo = "Bollinger Bot"
+
+    def __init__(self, magic, risco_por_trade=RISCO_POR_TRADE, limiar_adx=25):
+        """
+        Args:
+            magic (int): Magic number das ordens e posições da estratégia.
+            risco_por_trade (float): Percentual do saldo arriscado em cada trade.
+            limiar_adx (float): ADX a partir do qual o mercado não é considerado lateralizado.
+        """
+        super().__init__(magic, risco_por_trade)
+        self.limiar_adx = limiar_adx
+
+    def gerar_sinais(self, df):
+        return gerar_sinais(df, self.limiar_adx)
+
+    def motivo_filtro(self, df):
+        return motivo_mercado_lateral(df, self.limiar_adx)
+
+@registrar_estrategia('rsi')
+class EstrategiaRSI(Estrategia):
+    """
+    Reversão do RSI: compra quando o RSI sai da sobrevenda e vende quando sai da
+    sobrecompra, em mercado lateralizado. O SL e o TP seguem a mesma gestão de risco
+    da estratégia de Bollinger.
+    """
+
+    colunas = ['rsi', 'adx']
+    rotulo = "RSI Bot"
+
+    def __init__(self, magic, risco_por_trade=RISCO_POR_TRADE, sobrevenda=30, sobrecompra=70, limiar_adx=25):
+        """
+        Args:
+            magic (int): Magic number das ordens e posições da estratégia.
+            risco_por_trade (float): Percentual do saldo arriscado em cada trade.
+            sobrevenda (float): RSI abaixo do qual o ativo está sobrevendido.
+            sobrecompra (float): RSI acima do qual o ativo está sobrecomprado.
+            limiar_adx (float): ADX a partir do qual o mercado não é considerado lateralizado.
+        """
+        super().__init__(magic, risco_por_trade)
+        self.sobrevenda = sobrevenda
+        self.sobrecompra = sobrecompra
+        self.limiar_adx = limiar_adx
+
+    def gerar_sinais(self, df):
+        rsi = df['rsi'].to_numpy()
+        adx = df['adx'].to_numpy()
+
+        sinais = np.zeros(len(df), dtype=np.int8)
+        if len(df) < 3:
+            return sinais
+
+        lateral = adx[1:] < self.limiar_adx
+        compra = (rsi[:-1] < self.sobrevenda) & (rsi[1:] > self.sobrevenda) & lateral
+        venda = (rsi[:-1] > self.sobrecompra) & (rsi[1:] < self.sobrecompra) & lateral
+
+        sinais[1:][venda] = -1
+        sinais[1:][compra] = 1
+
+        return sinais
+
+    def motivo_filtro(self, df):
+        return motivo_mercado_lateral(df, self.limiar_adx)
+
+def carregar_estrategias(configuracao=None):
+    """
+    Cria as estratégias ativas a partir da configuração.
+
+    Args:
+        configuracao (dict): {nome: parâmetros} (padrão: ESTRATEGIAS). Os parâmetros
+            são passados ao construtor da estratégia ('magic', 'risco_por_trade', ...).
+
+    Returns:
+        list: Estratégias, na ordem da configuração.
+    """
+    if configuracao is None:
+        configuracao = ESTRATEGIAS
+
+    estrategias = []
+    for nome, parametros in configuracao.items():
+        if nome not in REGISTRO_ESTRATEGIAS:
+            raise ValueError(f"Estratégia desconhecida: {nome}")
+        estrategias.append(REGISTRO_ESTRATEGIAS[nome](**parametros))
+
+    magics = [estrategia.magic for estrategia in estrategias]
+    if len(set(magics)) != len(magics):
+        raise ValueError("Cada estratégia precisa de um magic number próprio")
+
+    return estrategias
+
+def colunas_estrategias(estrategias):
+    """
+    Junta, sem repetições, as colunas de indicadores de várias estratégias.
+
+    Args:
+        estrategias (list): Estratégias ativas.
+
+    Returns:
+        list: Colunas de indicadores necessárias, na ordem em que aparecem.
+    """
+    return list(dict.fromkeys(coluna for estrategia in estrategias for coluna in estrategia.colunas))
+
+def resumo_estrategias(estrategias, posicoes=None):
+    """
+    Resume as estatísticas de cada estratégia.
+
+    Args:
+        estrategias (list): Estratégias ativas.
+        posicoes (dict): {ticket: posição} do GerenciadorOrdens, para contar as posições abertas.
+
+    Returns:
+        pd.DataFrame: Uma linha por estratégia, com magic, risco por trade e contadores.
+    """
+    posicoes = posicoes or {}
+    linhas = []
+    for estrategia in estrategias:
+        linha = {'estrategia': estrategia.nome, 'magic': estrategia.magic, 'risco_por_trade': estrategia.risco_por_trade}
+        linha.update(estrategia.estatisticas)
+        linha['posicoes_abertas'] = sum(posicao.get('magic') == estrategia.magic for posicao in posicoes.values())
+        linhas.append(linha)
+
+    return pd.DataFrame(linhas, columns=['estrategia', 'magic', 'risco_por_trade'] + EVENTOS_ESTRATEGIA
+                        + ['posicoes_abertas']).set_index('estrategia')
@@ -0,0 +1,357 @@
+import numpy as np
+from src.config import ESPECIFICACOES_CONTRATO, SPREAD_PONTOS, SLIPPAGE_PONTOS
+from src.historico import abrir_historico, converter_tempo, nome_timeframe, DURACAO_TIMEFRAME
+
+# Especificação usada para ativos fora de ESPECIFICACOES_CONTRATO
+ESPECIFICACAO_PADRAO = {"tamanho_contrato": 100000, "ponto": 0.00001, "conversao": "direta"}
+
+# Candles verificados na primeira janela da busca pela saída (a janela dobra a cada passo)
+JANELA_SAIDA = 64
+
+class ModeloExecucao:
+    """
+    Modelo de execução do backtest: preços de entrada e saída, custos e lucro.
+
+    Os preços das barras são de BID. Compras entram no ASK (BID + spread da barra) e
+    saem no BID; vendas entram no BID e saem no ASK. Stops são ordens a mercado e sofrem
+    slippage; alvos são ordens limitadas e saem no nível (ou na abertura, se o
+    mercado abrir além dele). Quando SL e TP cabem no mesmo candle, o SL é
+    assumido primeiro, de forma conservadora.
+    """
+
+    def __init__(self, spread_pontos=SPREAD_PONTOS, slippage_pontos=SLIPPAGE_PONTOS, especificacoes=None):
+        """
+        Args:
+            spread_pontos (int | dict): Spread em pontos, fixo ou por ativo, usado quando a
+                barra não traz o seu próprio spread.
+            slippage_pontos (int): Slippage em pontos contra o trade nas execuções a mercado.
+            especificacoes (dict): Especificações de contrato por ativo
+                (padrão: ESPECIFICACOES_CONTRATO).
+        """
+        self.spread_pontos = spread_pontos
+        self.slippage_pontos = slippage_pontos
+        self.especificacoes = especificacoes if especificacoes is not None else ESPECIFICACOES_CONTRATO
+
+    def parametros(self):
+        """
+        Retorna os custos e especificações do modelo, para identificar resultados calculados com ele.
+
+        Returns:
+            dict: Tipo do modelo, spread, slippage e especificações de contrato.
+        """
+        return {
+            'modelo': type(self).__name__,
+            'spread_pontos': self.spread_pontos,
+            'slippage_pontos': self.slippage_pontos,
+            'especificacoes': self.especificacoes,
+        }
+
+    def especificacao(self, ativo):
+        """
+        Retorna a especificação de contrato de um ativo.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            dict: Tamanho do contrato, ponto e tipo de conversão do lucro.
+        """
+        return self.especificacoes.get(ativo, ESPECIFICACAO_PADRAO)
+
+    def spread(self, ativo, pontos_barra=None):
+        """
+        Retorna o spread de um ativo em unidades de preço.
+
+        O spread registrado na barra (coluna 'spread' do MT5, em pontos) tem prioridade;
+        o spread configurado só é usado quando a barra não o traz (NaN ou zero).
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            pontos_barra (float | np.ndarray): Spread da barra, ou de várias barras, em pontos.
+
+        Returns:
+            float | np.ndarray: Spread em preço (um por barra, se `pontos_barra` for um array).
+        """
+        pontos = self.spread_pontos
+        if isinstance(pontos, dict):
+            pontos = pontos.get(ativo, SPREAD_PONTOS)
+        if pontos_barra is not None:
+            pontos_barra = np.asarray(pontos_barra, dtype=np.float64)
+            pontos = np.where(np.isfinite(pontos_barra) & (pontos_barra > 0), pontos_barra, pontos)
+            if pontos.ndim == 0:
+                pontos = float(pontos)
+        return pontos * self.especificacao(ativo)['ponto']
+
+    def slippage(self, ativo):
+        """
+        Retorna o slippage de um ativo em unidades de preço.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            float: Slippage em preço.
+        """
+        return self.slippage_pontos * self.especificacao(ativo)['ponto']
+
+    def preco_entrada(self, ativo, preco, tipo_operacao, pontos_spread=None):
+        """
+        Calcula o preço de entrada a mercado a partir do preço BID da barra.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            preco (float): Preço BID no momento da entrada.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            pontos_spread (float): Spread da barra de entrada em pontos (opcional).
+
+        Returns:
+            float: Preço de execução da entrada.
+        """
+        if tipo_operacao == 'compra':
+            return preco + self.spread(ativo, pontos_spread) + self.slippage(ativo)
+        return preco - self.slippage(ativo)
+
+    def resolver_saida(self, ativo, tempo, open_, high, low, sl, tp, tipo_operacao, pontos_spread=None):
+        """
+        Verifica se um candle atinge o SL ou o TP de uma posição.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempo: Tempo de abertura do candle.
+            open_ (float): Abertura do candle (BID).
+            high (float): Máxima do candle (BID).
+            low (float): Mínima do candle (BID).
+            sl (float): Nível do stop loss.
+            tp (float): Nível do take profit.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            pontos_spread (float): Spread do candle em pontos (opcional).
+
+        Returns:
+            float: Preço de saída, ou None se a posição continua aberta.
+        """
+        if tipo_operacao == 'compra':
+            # Compras saem no BID: o candle já está no lado da saída
+            atinge_sl = low <= sl
+            atinge_tp = high >= tp
+            abertura_alem_sl = open_ <= sl
+            abertura_alem_tp = open_ >= tp
+        elif tipo_operacao == 'venda':
+            # Vendas saem no ASK: deslocar o candle pelo spread
+            spread = self.spread(ativo, pontos_spread)
+            open_, high, low = open_ + spread, high + spread, low + spread
+            atinge_sl = high >= sl
+            atinge_tp = low <= tp
+            abertura_alem_sl = open_ >= sl
+            abertura_alem_tp = open_ <= tp
+        else:
+            raise ValueError("Tipo de operação inválido. Use 'compra' ou 'venda'.")
+
+        # Gaps: a ordem é executada na abertura, não no nível
+        if abertura_alem_sl:
+            return self.preco_stop(ativo, open_, tipo_operacao)
+        if abertura_alem_tp:
+            return open_
+
+        if atinge_sl and atinge_tp:
+            primeiro = self.resolver_intrabar(ativo, tempo, sl, tp, tipo_operacao, pontos_spread)
+            return self.preco_stop(ativo, sl, tipo_operacao) if primeiro == 'sl' else tp
+        if atinge_sl:
+            return self.preco_stop(ativo, sl, tipo_operacao)
+        if atinge_tp:
+            return tp
+
+        return None
+
+    def simular_saida(self, ativo, tempos, open_, high, low, close, sl, tp, tipo_operacao, spreads=None):
+        """
+        Encontra a saída de uma posição nos candles seguintes à entrada.
+
+        Os candles que podem encerrar a posição são localizados de forma vetorizada,
+        em janelas que dobram de tamanho, e só eles passam por resolver_saida. Se nem
+        SL nem TP forem atingidos, a posição sai no fechamento do último candle.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempos (array-like): Tempo de abertura de cada candle.
+            open_ (np.ndarray): Aberturas dos candles (BID).
+            high (np.ndarray): Máximas dos candles (BID).
+            low (np.ndarray): Mínimas dos candles (BID).
+            close (np.ndarray): Fechamentos dos candles (BID).
+            sl (float): Nível do stop loss.
+            tp (float): Nível do take profit.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            spreads (np.ndarray): Spread de cada candle em pontos (opcional).
+
+        Returns:
+            tuple: (preço de saída, índice do candle de saída).
+        """
+        # Vendas saem no ASK, então o candle é deslocado pelo spread (o de cada candle, se houver)
+        venda = tipo_operacao == 'venda'
+
+        inicio, janela = 0, JANELA_SAIDA
+        while inicio < len(high):
+            fim = min(inicio + janela, len(high))
+            deslocamento = 0.0
+            if venda:
+                deslocamento = self.spread(ativo, None if spreads is None else spreads[inicio:fim])
+            high_janela = high[inicio:fim] + deslocamento
+            low_janela = low[inicio:fim] + deslocamento
+            if tipo_operacao == 'compra':
+                candidatos = np.flatnonzero((low_janela <= sl) | (high_janela >= tp))
+            else:
+                candidatos = np.flatnonzero((high_janela >= sl) | (low_janela <= tp))
+
+            for i in candidatos + inicio:
+                preco_saida = self.resolver_saida(ativo, tempos[i], open_[i], high[i], low[i], sl, tp, tipo_operacao,
+                                                  None if spreads is None else spreads[i])
+                if preco_saida is not None:
+                    return preco_saida, i
+
+            inicio, janela = fim, janela * 2
+
+        deslocamento = 0.0
+        if venda:
+            deslocamento = self.spread(ativo, None if spreads is None else spreads[-1])
+        return close[-1] + deslocamento, len(close) - 1
+
+    def preco_stop(self, ativo, preco, tipo_operacao):
+        """
+        Aplica o slippage a uma execução de stop.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            preco (float): Preço em que o stop foi disparado.
+            tipo_operacao (str): 'compra' ou 'venda' (tipo da posição).
+
+        Returns:
+            float: Preço de execução do stop.
+        """
+        if tipo_operacao == 'compra':
+            return preco - self.slippage(ativo)
+        return preco + self.slippage(ativo)
+
+    def resolver_intrabar(self, ativo, tempo, sl, tp, tipo_operacao, pontos_spread=None):
+        """
+        Decide qual nível foi atingido primeiro quando SL e TP cabem no mesmo candle.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempo: Tempo de abertura do candle.
+            sl (float): Nível do stop loss.
+            tp (float): Nível do take profit.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            pontos_spread (float): Spread do candle em pontos (opcional).
+
+        Returns:
+            str: 'sl' ou 'tp'.
+        """
+        return 'sl'
+
+    def calcular_lucro(self, ativo, preco_entrada, preco_saida, tipo_operacao, volume=1.0):
+        """
+        Calcula o lucro em USD de um trade, usando a especificação do contrato.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            preco_entrada (float): Preço de entrada.
+            preco_saida (float): Preço de saída.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            volume (float): Volume em lotes.
+
+        Returns:
+            float: Lucro (negativo em caso de prejuízo).
+        """
+        especificacao = self.especificacao(ativo)
+        diferenca = preco_saida - preco_entrada if tipo_operacao == 'compra' else preco_entrada - preco_saida
+        lucro = diferenca * especificacao['tamanho_contrato'] * volume
+
+        # Pares com USD na base dão lucro na moeda cotada
+        if especificacao['conversao'] == 'inversa':
+            lucro = lucro / preco_saida
+
+        return lucro
+
+class ModeloExecucaoIntrabar(ModeloExecucao):
+    """
+    Modelo de execução que usa barras de timeframe menor do histórico local para
+    decidir a ordem de SL e TP dentro do candle.
+
+    As barras menores só são lidas para os candles em que SL e TP caem dentro do
+    range, então o histórico de M1 não precisa ser carregado para o período todo.
+    """
+
+    def __init__(self, timeframe_barras, timeframe_intrabar='M1', **kwargs):
+        """
+        Args:
+            timeframe_barras: Timeframe dos candles do backtest (ex: 'D1').
+            timeframe_intrabar: Timeframe das barras usadas dentro do candle.
+            **kwargs: Parâmetros de ModeloExecucao.
+        """
+        super().__init__(**kwargs)
+        self.duracao_barra = DURACAO_TIMEFRAME[nome_timeframe(timeframe_barras)]
+        self.timeframe_intrabar = timeframe_intrabar
+        self.historicos = {}
+        self.barras_consultadas = 0
+
+    def parametros(self):
+        """
+        Returns:
+            dict: Parâmetros de ModeloExecucao e o timeframe das barras menores.
+        """
+        parametros = super().parametros()
+        parametros['timeframe_intrabar'] = nome_timeframe(self.timeframe_intrabar)
+        return parametros
+
+    def resolver_intrabar(self, ativo, tempo, sl, tp, tipo_operacao, pontos_spread=None):
+        """
+        Percorre as barras menores do candle até encontrar o primeiro nível atingido.
+
+        Sem barras menores disponíveis, ou quando uma barra menor também atinge os
+        dois níveis, mantém a suposição conservadora de SL primeiro. Cada barra menor
+        usa o seu próprio spread, e na falta dele o do candle.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tempo: Tempo de abertura do candle.
+            sl (float): Nível do stop loss.
+            tp (float): Nível do take profit.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            pontos_spread (float): Spread do candle em pontos (opcional).
+
+        Returns:
+            str: 'sl' ou 'tp'.
+        """
+        # Abrir o histórico menor uma única vez por ativo (memmap, sem carregar)
+        if ativo not in self.historicos:
+            self.historicos[ativo] = abrir_historico(ativo, self.timeframe_intrabar)
+        historico = self.historicos[ativo]
+        if len(historico) == 0:
+            return 'sl'
+
+        inicio = converter_tempo(tempo)
+        tempos = historico['time']
+        i_inicio = np.searchsorted(tempos, inicio, side='left')
+        i_fim = np.searchsorted(tempos, inicio + self.duracao_barra, side='left')
+        barras = historico[i_inicio:i_fim]
+        self.barras_consultadas += len(barras)
+
+        spread = 0.0
+        if tipo_operacao == 'venda':
+            pontos = barras['spread'].astype(np.float64)
+            if pontos_spread is not None:
+                pontos[pontos <= 0] = pontos_spread
+            spread = self.spread(ativo, pontos)
+        high = barras['high'] + spread
+        low = barras['low'] + spread
+        if tipo_operacao == 'compra':
+            atinge_sl, atinge_tp = low <= sl, high >= tp
+        else:
+            atinge_sl, atinge_tp = high >= sl, low <= tp
+
+        # Primeira barra menor que atinge algum nível
+        atinge = atinge_sl | atinge_tp
+        if not atinge.any():
+            return 'sl'
+        primeira = np.argmax(atinge)
+
+        return 'sl' if atinge_sl[primeira] else 'tp'
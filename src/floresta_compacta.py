@@ -0,0 +1,204 @@
+import numpy as np
+
+# Numba é opcional: sem ele, as árvores são percorridas com operações vetorizadas do NumPy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def percorrer_arvores(X, feature, threshold, esquerda, direita, nan_esquerda, raizes):
+    """
+    Encontra a folha de cada amostra em cada árvore, uma amostra e uma árvore por vez.
+
+    Usada compilada pelo Numba quando ele está instalado.
+
+    Args:
+        X (np.ndarray): Características em float32, uma linha por amostra.
+        feature, threshold, esquerda, direita, nan_esquerda (np.ndarray): Nós de todas as árvores.
+        raizes (np.ndarray): Índice do nó raiz de cada árvore.
+
+    Returns:
+        np.ndarray: Índice da folha de cada amostra (linhas) em cada árvore (colunas).
+    """
+    folhas = np.empty((X.shape[0], len(raizes)), dtype=np.int64)
+    for i in range(X.shape[0]):
+        for arvore in range(len(raizes)):
+            no = raizes[arvore]
+            # Nas folhas, os dois filhos apontam para o próprio nó
+            while esquerda[no] != no:
+                valor = X[i, feature[no]]
+                if valor <= threshold[no] or (np.isnan(valor) and nan_esquerda[no]):
+                    no = esquerda[no]
+                else:
+                    no = direita[no]
+            folhas[i, arvore] = no
+    return folhas
+
+if njit is not None:
+    percorrer_arvores_compilado = njit(cache=True)(percorrer_arvores)
+else:
+    percorrer_arvores_compilado = None
+
+class FlorestaCompacta:
+    """
+    Floresta aleatória em arrays planos, avaliada sem importar o scikit-learn.
+
+    Os nós de todas as árvores ficam em arrays únicos (característica, limiar, filhos
+    e probabilidades de cada folha). A avaliação reproduz a do RandomForestClassifier:
+    as características são convertidas para float32, cada nó envia a amostra para a
+    esquerda quando o valor é <= limiar, e as probabilidades das árvores são somadas
+    na ordem das árvores e divididas pelo número de árvores.
+    """
+
+    def __init__(self, feature, threshold, esquerda, direita, nan_esquerda, valores, raizes, classes, profundidade):
+        """
+        Args:
+            feature (np.ndarray): Índice da característica testada em cada nó.
+            threshold (np.ndarray): Limiar de cada nó.
+            esquerda (np.ndarray): Filho da esquerda de cada nó (o próprio nó nas folhas).
+            direita (np.ndarray): Filho da direita de cada nó (o próprio nó nas folhas).
+            nan_esquerda (np.ndarray): Se valores ausentes seguem para a esquerda em cada nó.
+            valores (np.ndarray): Probabilidade de cada classe em cada nó.
+            raizes (np.ndarray): Índice do nó raiz de cada árvore.
+            classes (np.ndarray): Rótulos das classes.
+            profundidade (int): Profundidade máxima entre as árvores.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.esquerda = esquerda
+        self.direita = direita
+        self.nan_esquerda = nan_esquerda
+        self.valores = valores
+        self.raizes = raizes
+        self.classes_ = classes
+        self.profundidade = int(profundidade)
+
+    @classmethod
+    def de_floresta(cls, modelo):
+        """
+        Converte um RandomForestClassifier treinado.
+
+        Args:
+            modelo (RandomForestClassifier): Floresta treinada com uma única saída.
+
+        Returns:
+            FlorestaCompacta: Floresta em arrays planos.
+        """
+        if getattr(modelo, 'n_outputs_', 1) != 1:
+            raise ValueError("Apenas florestas com uma única saída podem ser exportadas")
+
+        features, thresholds, esquerdas, direitas, nan_esquerdas, valores, raizes = [], [], [], [], [], [], []
+        deslocamento = 0
+        profundidade = 0
+        for estimador in modelo.estimators_:
+            arvore = estimador.tree_
+            nos = np.arange(arvore.node_count)
+            folha = arvore.children_left == -1
+
+            features.append(np.where(folha, 0, arvore.feature))
+            thresholds.append(np.where(folha, 0.0, arvore.threshold))
+            esquerdas.append(np.where(folha, nos, arvore.children_left) + deslocamento)
+            direitas.append(np.where(folha, nos, arvore.children_right) + deslocamento)
+            missing = getattr(arvore, 'missing_go_to_left', None)
+            nan_esquerdas.append(np.zeros(arvore.node_count, dtype=bool) if missing is None else missing.astype(bool))
+
+            # Mesma normalização de DecisionTreeClassifier.predict_proba
+            valor = arvore.value[:, 0, :modelo.n_classes_]
+            normalizador = valor.sum(axis=1)
+            normalizador[normalizador == 0.0] = 1.0
+            valores.append(valor / normalizador[:, None])
+
+            raizes.append(deslocamento)
+            deslocamento += arvore.node_count
+            profundidade = max(profundidade, arvore.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int64),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            esquerda=np.concatenate(esquerdas).astype(np.int64),
+            direita=np.concatenate(direitas).astype(np.int64),
+            nan_esquerda=np.concatenate(nan_esquerdas),
+            valores=np.concatenate(valores).astype(np.float64),
+            raizes=np.array(raizes, dtype=np.int64),
+            classes=np.asarray(modelo.classes_),
+            profundidade=profundidade,
+        )
+
+    def salvar(self, caminho):
+        """
+        Salva a floresta em um arquivo .npz.
+
+        Args:
+            caminho (str): Caminho do arquivo.
+        """
+        np.savez(
+            caminho, feature=self.feature, threshold=self.threshold, esquerda=self.esquerda,
+            direita=self.direita, nan_esquerda=self.nan_esquerda, valores=self.valores,
+            raizes=self.raizes, classes=self.classes_, profundidade=self.profundidade
+        )
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Carrega uma floresta salva com `salvar`.
+
+        Args:
+            caminho (str): Caminho do arquivo .npz.
+
+        Returns:
+            FlorestaCompacta: Floresta carregada.
+        """
+        with np.load(caminho) as arquivo:
+            return cls(**{nome: arquivo[nome] for nome in arquivo.files})
+
+    def aplicar(self, X):
+        """
+        Encontra a folha de cada amostra em cada árvore.
+
+        Args:
+            X (array-like): Matriz de características.
+
+        Returns:
+            np.ndarray: Índice global da folha de cada amostra (linhas) em cada árvore (colunas).
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+
+        if percorrer_arvores_compilado is not None:
+            return percorrer_arvores_compilado(X, self.feature, self.threshold, self.esquerda,
+                                               self.direita, self.nan_esquerda, self.raizes)
+
+        # Todas as árvores descem um nível por iteração; folhas apontam para si mesmas
+        linhas = np.arange(len(X))[:, None]
+        nos = np.tile(self.raizes, (len(X), 1))
+        for _ in range(self.profundidade):
+            valores = X[linhas, self.feature[nos]]
+            para_esquerda = (valores <= self.threshold[nos]) | (np.isnan(valores) & self.nan_esquerda[nos])
+            nos = np.where(para_esquerda, self.esquerda[nos], self.direita[nos])
+        return nos
+
+    def predict_proba(self, X):
+        """
+        Retorna as probabilidades de cada classe.
+
+        Args:
+            X (array-like): Matriz de características.
+
+        Returns:
+            np.ndarray: Probabilidades, com colunas na ordem de `classes_`.
+        """
+        folhas = self.aplicar(X)
+        # Soma acumulada sequencial na ordem das árvores, como no RandomForestClassifier
+        soma = np.cumsum(self.valores[folhas], axis=1)[:, -1]
+        return soma / len(self.raizes)
+
+    def predict(self, X):
+        """
+        Retorna a classe prevista para cada amostra.
+
+        Args:
+            X (array-like): Matriz de características.
+
+        Returns:
+            np.ndarray: Classe prevista para cada linha de X.
+        """
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,197 @@
+import MetaTrader5 as mt5
+from src.config import RISCO_POR_TRADE, MAGIC_NUMBER, MAX_TENTATIVAS_ORDEM
+from src.mt5_connection import enviar_ordem, calcular_lote, TRAVA_MT5
+
+# Códigos de retorno em que a ordem é reenviada com o preço atualizado
+RETCODES_RETENTATIVA = {
+    mt5.TRADE_RETCODE_REQUOTE,
+    mt5.TRADE_RETCODE_PRICE_CHANGED,
+    mt5.TRADE_RETCODE_PRICE_OFF,
+}
+
+class GerenciadorOrdens:
+    """
+    Envia em lote as ordens decididas em um ciclo e mantém o livro de posições abertas.
+
+    Ticks, informações dos símbolos e da conta são consultados uma única vez por
+    ciclo, para todas as ordens. O livro de posições guarda apenas as posições com os
+    magic numbers do robô (um por estratégia) e é sincronizado com uma única chamada
+    a positions_get. Cada chamada ao terminal é feita com TRAVA_MT5.
+    """
+
+    def __init__(self, magic=MAGIC_NUMBER, estrategias=None):
+        """
+        Args:
+            magic (int): Magic number padrão das ordens e posições gerenciadas.
+            estrategias (list): Estratégias ativas, cujos magic numbers também são gerenciados.
+        """
+        self.magic = magic
+        self.magics = {magic} | {estrategia.magic for estrategia in estrategias or []}
+        self.ordens_pendentes = []
+        self.posicoes = {}
+
+    def adicionar_ordem(self, ativo, tipo_operacao, gestao, comentario=None, origem=None, magic=None, estrategia=None):
+        """
+        Adiciona uma ordem à fila do ciclo atual.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            gestao (dict): Dicionário com informações de gestão de risco.
+            comentario (str): Comentário da ordem (padrão: "<Tipo> Bollinger Bot").
+            origem: Identificador de quem gerou a ordem, devolvido no resultado (padrão: o ativo).
+            magic (int): Magic number da ordem (padrão: o do gerenciador).
+            estrategia (str): Nome da estratégia que gerou a ordem, devolvido no resultado.
+        """
+        if comentario is None:
+            comentario = f"{tipo_operacao.capitalize()} Bollinger Bot"
+
+        self.ordens_pendentes.append({
+            'ativo': ativo,
+            'tipo': tipo_operacao,
+            'gestao': gestao,
+            'comentario': comentario,
+            'origem': origem if origem is not None else ativo,
+            'magic': magic if magic is not None else self.magic,
+            'estrategia': estrategia,
+        })
+
+    def executar_ordens(self):
+        """
+        Envia todas as ordens pendentes e sincroniza o livro de posições.
+
+        Returns:
+            list: Lista de dicts com 'ativo', 'tipo', 'origem', 'estrategia' e 'resultado'
+                (retorno de order_send ou None).
+        """
+        if not self.ordens_pendentes:
+            return []
+
+        # Consultar o terminal uma vez por ciclo
+        ativos = {ordem['ativo'] for ordem in self.ordens_pendentes}
+        with TRAVA_MT5:
+            account_info = mt5.account_info()
+            ticks = {ativo: mt5.symbol_info_tick(ativo) for ativo in ativos}
+            infos = {ativo: mt5.symbol_info(ativo) for ativo in ativos}
+
+        resultados = []
+        for ordem in self.ordens_pendentes:
+            ativo = ordem['ativo']
+            if ticks[ativo] is None:
+                print(f"Não foi possível obter o preço atual para {ativo}")
+                resultados.append({'ativo': ativo, 'tipo': ordem['tipo'], 'origem': ordem['origem'],
+                                   'estrategia': ordem['estrategia'], 'resultado': None})
+                continue
+
+            # Cada estratégia tem o seu risco por trade; sinais reduzidos pelos limites da
+            # carteira arriscam apenas uma fração dele
+            risco = ordem['gestao'].get('risco_por_trade', RISCO_POR_TRADE) * ordem['gestao'].get('fator_risco', 1.0)
+            lote = calcular_lote(ativo, risco, ordem['gestao']['distancia_sl'],
+                                 symbol_info=infos[ativo], account_info=account_info)
+            resultado = self.enviar_com_retentativa(ativo, ordem, lote, ticks[ativo])
+            resultados.append({'ativo': ativo, 'tipo': ordem['tipo'], 'origem': ordem['origem'],
+                               'estrategia': ordem['estrategia'], 'resultado': resultado})
+
+        self.ordens_pendentes = []
+        self.sincronizar()
+
+        return resultados
+
+    def enviar_com_retentativa(self, ativo, ordem, lote, tick):
+        """
+        Envia uma ordem, reenviando com o preço atualizado em caso de requote.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            ordem (dict): Ordem pendente.
+            lote (float): Volume da ordem.
+            tick: Último tick conhecido do ativo.
+
+        Returns:
+            object: Resultado do último order_send, ou None.
+        """
+        resultado = None
+        for tentativa in range(MAX_TENTATIVAS_ORDEM):
+            if ordem['tipo'] == 'compra':
+                tipo, preco = mt5.ORDER_TYPE_BUY, tick.ask
+            else:
+                tipo, preco = mt5.ORDER_TYPE_SELL, tick.bid
+
+            resultado = enviar_ordem(
+                ativo=ativo,
+                tipo=tipo,
+                volume=lote,
+                price=preco,
+                sl=ordem['gestao']['stop_loss'],
+                tp=ordem['gestao']['take_profit'],
+                comment=ordem['comentario'],
+                magic=ordem['magic']
+            )
+
+            if resultado is None or resultado.retcode not in RETCODES_RETENTATIVA:
+                break
+
+            # Requote: atualizar o preço e tentar novamente
+            print(f"Requote em {ativo} (retcode {resultado.retcode}). Tentativa {tentativa + 1} de {MAX_TENTATIVAS_ORDEM}")
+            with TRAVA_MT5:
+                novo_tick = mt5.symbol_info_tick(ativo)
+            if novo_tick is not None:
+                tick = novo_tick
+
+        return resultado
+
+    def sincronizar(self):
+        """
+        Atualiza o livro de posições com uma única consulta ao terminal.
+
+        Returns:
+            bool: True se a sincronização foi feita, False caso contrário.
+        """
+        with TRAVA_MT5:
+            posicoes = mt5.positions_get()
+        if posicoes is None:
+            print("Não foi possível obter as posições abertas")
+            return False
+
+        self.posicoes = {
+            posicao.ticket: {
+                'ativo': posicao.symbol,
+                'tipo': 'compra' if posicao.type == mt5.POSITION_TYPE_BUY else 'venda',
+                'volume': posicao.volume,
+                'preco_abertura': posicao.price_open,
+                'sl': posicao.sl,
+                'tp': posicao.tp,
+                'magic': posicao.magic,
+                'tempo': posicao.time,
+            }
+            for posicao in posicoes if posicao.magic in self.magics
+        }
+
+        return True
+
+    def possui_posicao(self, ativo, magic=None):
+        """
+        Verifica se há posição aberta do robô para um ativo.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            magic (int): Considerar apenas as posições deste magic number (None para todas).
+
+        Returns:
+            bool: True se houver posição aberta.
+        """
+        return any(posicao['ativo'] == ativo and magic in (None, posicao['magic'])
+                   for posicao in self.posicoes.values())
+
+    def possui_ordem_pendente(self, ativo, magic=None):
+        """
+        Verifica se já há ordem agendada para um ativo no ciclo atual.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            magic (int): Considerar apenas as ordens deste magic number (None para todas).
+
+        Returns:
+            bool: True se houver ordem pendente.
+        """
+        return any(ordem['ativo'] == ativo and magic in (None, ordem['magic']) for ordem in self.ordens_pendentes)
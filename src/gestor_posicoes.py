@@ -0,0 +1,425 @@
+import threading
+import time
+import numpy as np
+import MetaTrader5 as mt5
+from src.config import (TAMANHO_BUFFER_TICKS, INTERVALO_TICKS, BREAKEVEN_GATILHO_R, TRAILING_GATILHO_R,
+                        TRAILING_DISTANCIA_R, PASSO_MINIMO_SLTP_PONTOS, INTERVALO_MODIFICACAO,
+                        MAX_MODIFICACOES_POR_CICLO, ESPECIFICACOES_CONTRATO, MAGIC_NUMBER)
+from src.mt5_connection import obter_ticks_desde, modificar_sltp, fechar_posicao_mercado, TRAVA_MT5
+from src.gerenciador_ordens import GerenciadorOrdens
+from src.execucao import ESPECIFICACAO_PADRAO
+
+# Layout dos ticks guardados no buffer de cada ativo
+DTYPE_TICK = np.dtype([('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+
+class BufferTicks:
+    """
+    Buffer circular de tamanho fixo com os ticks mais recentes de um ativo.
+
+    Os ticks são gravados em um array pré-alocado; quando o buffer enche, os mais
+    antigos são sobrescritos, sem realocar memória.
+    """
+
+    def __init__(self, capacidade=TAMANHO_BUFFER_TICKS):
+        """
+        Args:
+            capacidade (int): Número máximo de ticks guardados.
+        """
+        self.dados = np.zeros(capacidade, dtype=DTYPE_TICK)
+        self.posicao = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, len(self.dados))
+
+    def adicionar(self, ticks):
+        """
+        Acrescenta ticks ao buffer.
+
+        Args:
+            ticks (np.ndarray): Ticks com os campos 'time_msc', 'bid' e 'ask'.
+        """
+        capacidade = len(self.dados)
+        ticks = ticks[-capacidade:]
+        quantidade = len(ticks)
+        if quantidade == 0:
+            return
+
+        # Gravar em até dois trechos: até o fim do array e a partir do início
+        primeiro = min(quantidade, capacidade - self.posicao)
+        for campo in DTYPE_TICK.names:
+            self.dados[campo][self.posicao:self.posicao + primeiro] = ticks[campo][:primeiro]
+            self.dados[campo][:quantidade - primeiro] = ticks[campo][primeiro:]
+
+        self.posicao = (self.posicao + quantidade) % capacidade
+        self.total += quantidade
+
+    def ultimos(self, quantidade=None):
+        """
+        Retorna os ticks mais recentes em ordem cronológica.
+
+        Args:
+            quantidade (int): Número de ticks (None para todos os guardados).
+
+        Returns:
+            np.ndarray: Cópia dos ticks com dtype DTYPE_TICK.
+        """
+        disponiveis = len(self)
+        quantidade = disponiveis if quantidade is None else min(quantidade, disponiveis)
+        indices = (self.posicao - quantidade + np.arange(quantidade)) % len(self.dados)
+        return self.dados[indices]
+
+    def ultimo_tempo(self):
+        """
+        Returns:
+            int: Tempo do último tick em milissegundos, ou None se o buffer estiver vazio.
+        """
+        if self.total == 0:
+            return None
+        return int(self.dados['time_msc'][self.posicao - 1])
+
+class GestorPosicoes:
+    """
+    Acompanha as posições abertas do robô tick a tick e ajusta seus stops.
+
+    Os ticks de cada ativo com posição aberta passam por um BufferTicks e são
+    avaliados em bloco, sem laço por tick. Para cada posição, o risco inicial R é a
+    distância entre a entrada e o SL original. Com lucro de BREAKEVEN_GATILHO_R × R
+    o SL vai para a entrada; a partir de TRAILING_GATILHO_R × R ele segue o melhor
+    preço a TRAILING_DISTANCIA_R × R. Se o preço saltar além do SL sem que o
+    terminal encerre a posição (gap), ela é fechada a mercado.
+
+    As modificações só são pedidas quando o SL anda mais que PASSO_MINIMO_SLTP_PONTOS,
+    e pedidos da mesma posição feitos antes do envio são agrupados em um só (vale
+    o nível mais recente). Cada posição recebe no máximo uma modificação a cada
+    INTERVALO_MODIFICACAO segundos, e no máximo MAX_MODIFICACOES_POR_CICLO são
+    enviadas por ciclo.
+
+    Cada posição só é avaliada com os ticks posteriores à sua entrada. Cada chamada
+    ao terminal é feita com TRAVA_MT5, de modo que a thread de gestão nunca chama o
+    terminal ao mesmo tempo que o ciclo principal do robô, que também só segura a
+    trava durante as suas próprias chamadas.
+    """
+
+    def __init__(self, gerenciador=None, capacidade_buffer=TAMANHO_BUFFER_TICKS,
+                 breakeven_gatilho_r=BREAKEVEN_GATILHO_R, trailing_gatilho_r=TRAILING_GATILHO_R,
+                 trailing_distancia_r=TRAILING_DISTANCIA_R, passo_pontos=PASSO_MINIMO_SLTP_PONTOS,
+                 intervalo_modificacao=INTERVALO_MODIFICACAO, max_modificacoes=MAX_MODIFICACOES_POR_CICLO,
+                 relogio=time.monotonic):
+        """
+        Args:
+            gerenciador (GerenciadorOrdens): Livro de posições do robô (um novo é criado se None).
+            capacidade_buffer (int): Ticks guardados por ativo.
+            breakeven_gatilho_r (float): Lucro em R que leva o SL para a entrada.
+            trailing_gatilho_r (float): Lucro em R que ativa o trailing stop.
+            trailing_distancia_r (float): Distância do trailing stop ao melhor preço, em R.
+            passo_pontos (float): Movimento mínimo do SL, em pontos, para pedir uma modificação.
+            intervalo_modificacao (float): Segundos mínimos entre modificações da mesma posição.
+            max_modificacoes (int): Modificações enviadas por ciclo, no máximo.
+            relogio (callable): Fonte de tempo em segundos (padrão: time.monotonic).
+        """
+        self.gerenciador = gerenciador if gerenciador is not None else GerenciadorOrdens()
+        self.capacidade_buffer = capacidade_buffer
+        self.breakeven_gatilho_r = breakeven_gatilho_r
+        self.trailing_gatilho_r = trailing_gatilho_r
+        self.trailing_distancia_r = trailing_distancia_r
+        self.passo_pontos = passo_pontos
+        self.intervalo_modificacao = intervalo_modificacao
+        self.max_modificacoes = max_modificacoes
+        self.relogio = relogio
+
+        self.buffers = {}
+        self.pontos = {}
+        self.acompanhamento = {}
+        self.modificacoes_pendentes = {}
+        self.fechamentos_pendentes = {}
+        self.ultima_modificacao = {}
+
+        self.ativo = False
+        self.thread = None
+
+        self.num_ticks = 0
+        self.num_pedidos = 0
+        self.num_agrupados = 0
+        self.num_modificacoes = 0
+        self.num_fechamentos = 0
+
+    def buffer(self, ativo):
+        """
+        Retorna o buffer de ticks de um ativo, criando-o se necessário.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            BufferTicks: Buffer do ativo.
+        """
+        if ativo not in self.buffers:
+            self.buffers[ativo] = BufferTicks(self.capacidade_buffer)
+        return self.buffers[ativo]
+
+    def ponto(self, ativo):
+        """
+        Retorna o tamanho do ponto de um ativo, consultado uma única vez.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            float: Tamanho do ponto em preço.
+        """
+        if ativo not in self.pontos:
+            with TRAVA_MT5:
+                info = mt5.symbol_info(ativo)
+            if info is not None:
+                self.pontos[ativo] = info.point
+            else:
+                self.pontos[ativo] = ESPECIFICACOES_CONTRATO.get(ativo, ESPECIFICACAO_PADRAO)['ponto']
+        return self.pontos[ativo]
+
+    def sincronizar(self):
+        """
+        Atualiza o livro de posições e o acompanhamento de cada uma.
+
+        Posições novas começam a ser acompanhadas com o SL atual como referência do
+        risco inicial; posições encerradas deixam de ser acompanhadas. Quando um ativo
+        volta a ter posição, o seu buffer é descartado, para que os ticks da última
+        posição (e o tempo em que a busca parou) não sejam usados na nova.
+
+        Returns:
+            bool: True se a sincronização foi feita, False caso contrário.
+        """
+        if not self.gerenciador.sincronizar():
+            return False
+
+        posicoes = self.gerenciador.posicoes
+        for ticket in list(self.acompanhamento):
+            if ticket not in posicoes:
+                del self.acompanhamento[ticket]
+                self.modificacoes_pendentes.pop(ticket, None)
+                self.fechamentos_pendentes.pop(ticket, None)
+                self.ultima_modificacao.pop(ticket, None)
+
+        acompanhados = {posicoes[ticket]['ativo'] for ticket in self.acompanhamento}
+        for ticket, posicao in posicoes.items():
+            if ticket not in self.acompanhamento:
+                if posicao['ativo'] not in acompanhados:
+                    self.buffers.pop(posicao['ativo'], None)
+                    acompanhados.add(posicao['ativo'])
+                risco = abs(posicao['preco_abertura'] - posicao['sl']) if posicao['sl'] else 0.0
+                self.acompanhamento[ticket] = {
+                    'risco': risco,
+                    'melhor_preco': posicao['preco_abertura'],
+                    'sl': posicao['sl'],
+                }
+
+        return True
+
+    def processar_ticks(self, ativo, ticks):
+        """
+        Guarda os ticks novos de um ativo e reavalia os stops das suas posições.
+
+        Cada posição só vê os ticks a partir da sua entrada.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            ticks (np.ndarray): Ticks com os campos 'time_msc', 'bid' e 'ask', em ordem.
+
+        Returns:
+            int: Número de ticks processados.
+        """
+        if len(ticks) == 0:
+            return 0
+
+        self.buffer(ativo).adicionar(ticks)
+        self.num_ticks += len(ticks)
+
+        for ticket, posicao in self.gerenciador.posicoes.items():
+            if posicao['ativo'] == ativo and ticket in self.acompanhamento:
+                apos_entrada = ticks[ticks['time_msc'] >= posicao['tempo'] * 1000]
+                if len(apos_entrada) > 0:
+                    self.avaliar_posicao(ticket, posicao, apos_entrada['bid'], apos_entrada['ask'])
+
+        return len(ticks)
+
+    def avaliar_posicao(self, ticket, posicao, bid, ask):
+        """
+        Aplica as regras de gap, breakeven e trailing stop a uma posição.
+
+        Args:
+            ticket (int): Ticket da posição.
+            posicao (dict): Posição do livro do gerenciador de ordens.
+            bid (np.ndarray): Preços BID dos ticks novos.
+            ask (np.ndarray): Preços ASK dos ticks novos.
+        """
+        acompanhamento = self.acompanhamento[ticket]
+        entrada = posicao['preco_abertura']
+        sl = acompanhamento['sl']
+        risco = acompanhamento['risco']
+        passo = self.passo_pontos * self.ponto(posicao['ativo'])
+
+        if posicao['tipo'] == 'compra':
+            # Compras são avaliadas no BID
+            preco_atual = bid[-1]
+            acompanhamento['melhor_preco'] = max(acompanhamento['melhor_preco'], bid.max())
+            lucro = acompanhamento['melhor_preco'] - entrada
+
+            if sl and preco_atual <= sl:
+                self.fechamentos_pendentes[ticket] = posicao
+                return
+
+            novo_sl = sl
+            if risco > 0 and lucro >= self.breakeven_gatilho_r * risco:
+                novo_sl = max(novo_sl, entrada)
+            if risco > 0 and lucro >= self.trailing_gatilho_r * risco:
+                novo_sl = max(novo_sl, acompanhamento['melhor_preco'] - self.trailing_distancia_r * risco)
+            melhora = novo_sl - sl
+            valido = novo_sl < preco_atual
+        else:
+            # Vendas são avaliadas no ASK
+            preco_atual = ask[-1]
+            acompanhamento['melhor_preco'] = min(acompanhamento['melhor_preco'], ask.min())
+            lucro = entrada - acompanhamento['melhor_preco']
+
+            if sl and preco_atual >= sl:
+                self.fechamentos_pendentes[ticket] = posicao
+                return
+
+            novo_sl = sl
+            if risco > 0 and lucro >= self.breakeven_gatilho_r * risco:
+                novo_sl = min(novo_sl, entrada)
+            if risco > 0 and lucro >= self.trailing_gatilho_r * risco:
+                novo_sl = min(novo_sl, acompanhamento['melhor_preco'] + self.trailing_distancia_r * risco)
+            melhora = sl - novo_sl
+            valido = novo_sl > preco_atual
+
+        if melhora > passo and valido:
+            # Um pedido ainda não enviado é substituído pelo nível mais recente
+            if ticket in self.modificacoes_pendentes:
+                self.num_agrupados += 1
+            self.modificacoes_pendentes[ticket] = (posicao['ativo'], novo_sl, posicao['tp'])
+            self.num_pedidos += 1
+
+    def coletar_ticks(self):
+        """
+        Busca no terminal os ticks novos de cada ativo com posição aberta e os processa.
+
+        Sem ticks no buffer, a busca começa na entrada mais antiga do ativo, limitada
+        ao último segundo pelo relógio do servidor (o tempo do tick atual), e não pelo
+        relógio local.
+
+        Returns:
+            int: Número de ticks processados.
+        """
+        entradas = {}
+        for posicao in self.gerenciador.posicoes.values():
+            entradas[posicao['ativo']] = min(entradas.get(posicao['ativo'], posicao['tempo']), posicao['tempo'])
+
+        processados = 0
+        for ativo, entrada in entradas.items():
+            desde = self.buffer(ativo).ultimo_tempo()
+            if desde is None:
+                with TRAVA_MT5:
+                    tick = mt5.symbol_info_tick(ativo)
+                if tick is None:
+                    continue
+                desde = max(entrada * 1000 - 1, int(tick.time) * 1000 - 1000)
+            processados += self.processar_ticks(ativo, obter_ticks_desde(ativo, desde, self.capacidade_buffer))
+
+        return processados
+
+    def enviar_modificacoes(self):
+        """
+        Envia os fechamentos por gap e as modificações de SL pendentes.
+
+        Returns:
+            list: Lista de dicts com 'ticket', 'acao' ('fechar' ou 'modificar'), 'sl' e 'resultado'.
+        """
+        envios = []
+
+        for ticket, posicao in list(self.fechamentos_pendentes.items()):
+            resultado = fechar_posicao_mercado(ticket, posicao['ativo'], posicao['tipo'], posicao['volume'],
+                                               "Gap além do SL", posicao.get('magic', MAGIC_NUMBER))
+            del self.fechamentos_pendentes[ticket]
+            self.modificacoes_pendentes.pop(ticket, None)
+            self.num_fechamentos += 1
+            envios.append({'ticket': ticket, 'acao': 'fechar', 'sl': None, 'resultado': resultado})
+
+        agora = self.relogio()
+        for ticket, (ativo, sl, tp) in list(self.modificacoes_pendentes.items()):
+            if len(envios) >= self.max_modificacoes:
+                break
+            if agora - self.ultima_modificacao.get(ticket, -np.inf) < self.intervalo_modificacao:
+                continue
+
+            resultado = modificar_sltp(ticket, ativo, sl, tp)
+            del self.modificacoes_pendentes[ticket]
+            self.ultima_modificacao[ticket] = agora
+            self.num_modificacoes += 1
+            if resultado is not None and resultado.retcode == mt5.TRADE_RETCODE_DONE:
+                self.acompanhamento[ticket]['sl'] = sl
+            envios.append({'ticket': ticket, 'acao': 'modificar', 'sl': sl, 'resultado': resultado})
+
+        return envios
+
+    def ciclo(self):
+        """
+        Executa um ciclo completo: sincroniza as posições, processa os ticks novos e envia os pedidos.
+
+        Returns:
+            list: Envios feitos no ciclo (ver enviar_modificacoes).
+        """
+        if not self.sincronizar():
+            return []
+        self.coletar_ticks()
+        return self.enviar_modificacoes()
+
+    def executar(self, intervalo=INTERVALO_TICKS):
+        """
+        Repete o ciclo até `parar` ser chamado.
+
+        Args:
+            intervalo (float): Segundos entre ciclos.
+        """
+        while self.ativo:
+            inicio = time.perf_counter()
+            try:
+                self.ciclo()
+            except Exception as erro:
+                print(f"Erro na gestão das posições: {erro}")
+            time.sleep(max(0.0, intervalo - (time.perf_counter() - inicio)))
+
+    def iniciar(self, intervalo=INTERVALO_TICKS):
+        """
+        Inicia a gestão das posições em uma thread separada.
+
+        Args:
+            intervalo (float): Segundos entre ciclos.
+        """
+        self.ativo = True
+        self.thread = threading.Thread(target=self.executar, args=(intervalo,), daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        """
+        Interrompe a thread de gestão das posições.
+        """
+        self.ativo = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Posições acompanhadas, ticks processados, pedidos de modificação, pedidos
+                agrupados antes do envio, modificações enviadas e fechamentos por gap.
+        """
+        return {
+            'posicoes': len(self.acompanhamento),
+            'ticks': self.num_ticks,
+            'pedidos': self.num_pedidos,
+            'pedidos_agrupados': self.num_agrupados,
+            'modificacoes': self.num_modificacoes,
+            'fechamentos_gap': self.num_fechamentos,
+        }
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import os
+
+# Diretório onde ficam os arquivos de histórico (um por ativo/timeframe)
+HISTORICO_DIR = "data/historico"
+
+# Layout fixo de cada barra, igual ao array estruturado devolvido por mt5.copy_rates_*
+DTYPE_BARRAS = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+# Nomes dos timeframes a partir das constantes mt5.TIMEFRAME_*
+NOMES_TIMEFRAME_MT5 = {
+    1: 'M1', 5: 'M5', 15: 'M15', 30: 'M30',
+    16385: 'H1', 16388: 'H4', 16408: 'D1', 32769: 'W1',
+}
+
+# Duração de cada timeframe em segundos
+DURACAO_TIMEFRAME = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H4': 14400, 'D1': 86400, 'W1': 604800,
+}
+
+def nome_timeframe(timeframe):
+    """
+    Normaliza um timeframe para o nome usado nos arquivos (ex: 'M1', 'D1').
+
+    Args:
+        timeframe: Constante mt5.TIMEFRAME_* ou texto.
+
+    Returns:
+        str: Nome do timeframe.
+    """
+    if isinstance(timeframe, (int, np.integer)):
+        return NOMES_TIMEFRAME_MT5.get(int(timeframe), str(timeframe))
+    return str(timeframe)
+
+def caminho_historico(ativo, timeframe):
+    """
+    Retorna o caminho do arquivo de histórico de um ativo/timeframe.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe (constante MT5 ou texto, ex: 'M1').
+
+    Returns:
+        str: Caminho do arquivo binário.
+    """
+    return os.path.join(HISTORICO_DIR, f"{ativo}_{nome_timeframe(timeframe)}.bin")
+
+def converter_tempo(valor):
+    """
+    Converte uma data para segundos desde a época (mesma unidade do campo 'time').
+
+    Args:
+        valor: datetime, pd.Timestamp, texto ou inteiro em segundos.
+
+    Returns:
+        int: Tempo em segundos.
+    """
+    if isinstance(valor, (int, np.integer)):
+        return int(valor)
+    return int(pd.Timestamp(valor).value // 10**9)
+
+def converter_para_barras(dados):
+    """
+    Converte dados de preços para o array estruturado com o layout DTYPE_BARRAS.
+
+    Args:
+        dados: Array estruturado (ex: retorno de mt5.copy_rates_from_pos) ou pd.DataFrame.
+
+    Returns:
+        np.ndarray: Array estruturado com dtype DTYPE_BARRAS.
+    """
+    if isinstance(dados, np.ndarray) and dados.dtype == DTYPE_BARRAS:
+        return dados
+
+    barras = np.zeros(len(dados), dtype=DTYPE_BARRAS)
+    if len(dados) == 0:
+        return barras
+
+    for campo in DTYPE_BARRAS.names:
+        if isinstance(dados, pd.DataFrame):
+            if campo not in dados.columns:
+                continue
+            coluna = dados[campo]
+            if campo == 'time' and pd.api.types.is_datetime64_any_dtype(coluna):
+                coluna = coluna.astype('datetime64[s]').astype('int64')
+            barras[campo] = np.asarray(coluna)
+        elif campo in dados.dtype.names:
+            barras[campo] = dados[campo]
+
+    return barras
+
+def gravar_barras(ativo, timeframe, dados):
+    """
+    Acrescenta barras ao arquivo de histórico, ignorando as que já estão gravadas.
+
+    Barras com 'time' posterior à última barra do arquivo são acrescentadas ao final,
+    de modo que chamadas repetidas com janelas sobrepostas não duplicam dados. Barras
+    anteriores só entram se preencherem uma lacuna do arquivo; nesse caso ele é
+    regravado em ordem (o armazém de características recalcula a partir da primeira
+    barra inserida).
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+        dados: Array estruturado ou DataFrame com as barras.
+
+    Returns:
+        int: Número de barras gravadas.
+    """
+    barras = converter_para_barras(dados)
+    if len(barras) == 0:
+        return 0
+
+    # Ordenar e remover tempos duplicados antes de gravar
+    barras = np.sort(barras, order='time')
+    _, indices_unicos = np.unique(barras['time'], return_index=True)
+    barras = barras[indices_unicos]
+
+    caminho = caminho_historico(ativo, timeframe)
+    existentes = abrir_historico(ativo, timeframe)
+    lacunas = barras[:0]
+    if len(existentes) > 0:
+        antigas = barras[barras['time'] <= existentes['time'][-1]]
+        posicoes = np.searchsorted(existentes['time'], antigas['time'])
+        lacunas = antigas[existentes['time'][posicoes] != antigas['time']]
+        barras = barras[barras['time'] > existentes['time'][-1]]
+
+    if len(lacunas) > 0:
+        # Intercalar as barras das lacunas e regravar o arquivo inteiro (escrita atômica)
+        juntas = np.concatenate((np.asarray(existentes), lacunas, barras))
+        del existentes
+        juntas = juntas[np.argsort(juntas['time'], kind='stable')]
+        caminho_temporario = caminho + ".tmp"
+        with open(caminho_temporario, 'wb') as arquivo:
+            arquivo.write(juntas.tobytes())
+        os.replace(caminho_temporario, caminho)
+        return len(lacunas) + len(barras)
+    del existentes
+
+    if len(barras) == 0:
+        return 0
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'ab') as arquivo:
+        arquivo.write(barras.tobytes())
+
+    return len(barras)
+
+def abrir_historico(ativo, timeframe):
+    """
+    Abre o histórico de um ativo/timeframe como array mapeado em memória (somente leitura).
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+
+    Returns:
+        np.ndarray: np.memmap com dtype DTYPE_BARRAS, ou array vazio se não houver dados.
+    """
+    caminho = caminho_historico(ativo, timeframe)
+    if not os.path.exists(caminho):
+        return np.zeros(0, dtype=DTYPE_BARRAS)
+
+    num_barras = os.path.getsize(caminho) // DTYPE_BARRAS.itemsize
+    if num_barras == 0:
+        return np.zeros(0, dtype=DTYPE_BARRAS)
+
+    return np.memmap(caminho, dtype=DTYPE_BARRAS, mode='r', shape=(num_barras,))
+
+def ler_barras(ativo, timeframe, inicio=None, fim=None):
+    """
+    Lê as barras de um intervalo de datas sem carregar o arquivo inteiro.
+
+    O campo 'time' já está ordenado no arquivo e funciona como índice: a busca
+    binária toca apenas algumas páginas e o resultado é uma fatia (view) do
+    memmap, sem cópia.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe das barras.
+        inicio: Data inicial (inclusiva). None para o início do histórico.
+        fim: Data final (inclusiva). None para o fim do histórico.
+
+    Returns:
+        np.ndarray: Fatia do histórico com dtype DTYPE_BARRAS.
+    """
+    barras = abrir_historico(ativo, timeframe)
+    if len(barras) == 0:
+        return barras
+
+    tempos = barras['time']
+    i_inicio = 0 if inicio is None else np.searchsorted(tempos, converter_tempo(inicio), side='left')
+    i_fim = len(barras) if fim is None else np.searchsorted(tempos, converter_tempo(fim), side='right')
+
+    return barras[i_inicio:i_fim]
+
+def barras_para_dataframe(barras):
+    """
+    Converte uma fatia de barras para o formato de DataFrame usado pela estratégia.
+
+    Args:
+        barras (np.ndarray): Array estruturado com dtype DTYPE_BARRAS.
+
+    Returns:
+        pd.DataFrame: DataFrame com a coluna 'time' em datetime.
+    """
+    df = pd.DataFrame(barras)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+
+    return df
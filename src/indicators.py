@@ -1,6 +1,19 @@
 import pandas as pd
 import numpy as np
 import talib as ta
+from collections import namedtuple
+from src.config import BB_PERIOD, BB_STDDEV, ADX_PERIOD
+
+# Indicador registrado: colunas que produz, colunas de que depende e função de cálculo
+# (recebe um dict coluna -> array e retorna um dict coluna -> array)
+Indicador = namedtuple('Indicador', ['colunas', 'dependencias', 'calcular'])
+
+# Registro dos indicadores por nome. Colunas iniciadas por '_' são resultados
+# intermediários compartilhados, que não são gravados no DataFrame
+REGISTRO_INDICADORES = {}
+
+# Colunas de preço disponíveis para os indicadores
+COLUNAS_PRECO = ['open', 'high', 'low', 'close']
 
 def calcular_bandas_bollinger(df, periodo=20, desvio_padrao=2):
     """
@@ -15,9 +28,10 @@ def calcular_bandas_bollinger(df, periodo=20, desvio_padrao=2):
         pd.DataFrame: DataFrame com as colunas adicionais 'bb_upper', 'bb_middle', 'bb_lower'.
     """
     df = df.copy()
+    desvio = ta.STDDEV(df['close'], timeperiod=periodo)
     df['bb_middle'] = ta.SMA(df['close'], timeperiod=periodo)
-    df['bb_upper'] = df['bb_middle'] + (ta.STDDEV(df['close'], timeperiod=periodo) * desvio_padrao)
-    df['bb_lower'] = df['bb_middle'] - (ta.STDDEV(df['close'], timeperiod=periodo) * desvio_padrao)
+    df['bb_upper'] = df['bb_middle'] + (desvio * desvio_padrao)
+    df['bb_lower'] = df['bb_middle'] - (desvio * desvio_padrao)
     
     return df
 
@@ -108,4 +122,125 @@ def calcular_stochastic(df, fastk_period=14, slowk_period=3, slowd_period=3):
                                        slowd_period=slowd_period, 
                                        slowd_matype=0)
     
-    return df
\ No newline at end of file
+    return df
+
+def registrar_indicador(nome, colunas, dependencias):
+    """
+    Registra um indicador no grafo de dependências (usado como decorador).
+    
+    Args:
+        nome (str): Nome do indicador.
+        colunas (list): Colunas produzidas.
+        dependencias (list): Colunas de preço ou de outros indicadores usadas no cálculo.
+    """
+    def registrar(calcular):
+        REGISTRO_INDICADORES[nome] = Indicador(list(colunas), list(dependencias), calcular)
+        return calcular
+    return registrar
+
+@registrar_indicador('media_bollinger', ['bb_middle'], ['close'])
+def indicador_media_bollinger(valores):
+    return {'bb_middle': ta.SMA(valores['close'], timeperiod=BB_PERIOD)}
+
+@registrar_indicador('desvio_bollinger', ['_desvio_bollinger'], ['close'])
+def indicador_desvio_bollinger(valores):
+    return {'_desvio_bollinger': ta.STDDEV(valores['close'], timeperiod=BB_PERIOD)}
+
+@registrar_indicador('bandas_bollinger', ['bb_upper', 'bb_lower'], ['bb_middle', '_desvio_bollinger'])
+def indicador_bandas_bollinger(valores):
+    largura = valores['_desvio_bollinger'] * BB_STDDEV
+    return {'bb_upper': valores['bb_middle'] + largura, 'bb_lower': valores['bb_middle'] - largura}
+
+@registrar_indicador('adx', ['adx'], ['high', 'low', 'close'])
+def indicador_adx(valores):
+    return {'adx': ta.ADX(valores['high'], valores['low'], valores['close'], timeperiod=ADX_PERIOD)}
+
+@registrar_indicador('atr', ['atr'], ['high', 'low', 'close'])
+def indicador_atr(valores):
+    return {'atr': ta.ATR(valores['high'], valores['low'], valores['close'], timeperiod=14)}
+
+@registrar_indicador('rsi', ['rsi'], ['close'])
+def indicador_rsi(valores):
+    return {'rsi': ta.RSI(valores['close'], timeperiod=14)}
+
+@registrar_indicador('macd', ['macd', 'macd_signal'], ['close'])
+def indicador_macd(valores):
+    macd, macd_signal, _ = ta.MACD(valores['close'], fastperiod=12, slowperiod=26, signalperiod=9)
+    return {'macd': macd, 'macd_signal': macd_signal}
+
+@registrar_indicador('stochastic', ['slowk', 'slowd'], ['high', 'low', 'close'])
+def indicador_stochastic(valores):
+    slowk, slowd = ta.STOCH(valores['high'], valores['low'], valores['close'], fastk_period=14,
+                            slowk_period=3, slowk_matype=0, slowd_period=3, slowd_matype=0)
+    return {'slowk': slowk, 'slowd': slowd}
+
+def planejar_indicadores(colunas, disponiveis=()):
+    """
+    Resolve o grafo de dependências das colunas pedidas.
+    
+    Args:
+        colunas (list): Colunas de indicadores necessárias.
+        disponiveis (list): Colunas que já existem e não precisam ser calculadas.
+        
+    Returns:
+        list: Nomes dos indicadores a calcular, cada um uma única vez, em uma ordem
+            em que as dependências vêm antes.
+    """
+    produtor = {coluna: nome for nome, indicador in REGISTRO_INDICADORES.items() for coluna in indicador.colunas}
+    disponiveis = set(disponiveis) | set(COLUNAS_PRECO)
+    plano = []
+    visitando = set()
+    
+    def visitar(coluna):
+        if coluna in disponiveis:
+            return
+        if coluna not in produtor:
+            raise ValueError(f"Coluna sem indicador registrado: {coluna}")
+        nome = produtor[coluna]
+        if nome in plano:
+            return
+        if nome in visitando:
+            raise ValueError(f"Dependência circular no indicador: {nome}")
+        visitando.add(nome)
+        for dependencia in REGISTRO_INDICADORES[nome].dependencias:
+            visitar(dependencia)
+        visitando.discard(nome)
+        plano.append(nome)
+    
+    for coluna in colunas:
+        visitar(coluna)
+    
+    return plano
+
+def calcular_indicadores_necessarios(df, colunas):
+    """
+    Acrescenta ao DataFrame apenas as colunas de indicadores pedidas.
+    
+    Cada indicador do plano (ver planejar_indicadores) é calculado uma única vez, e
+    os cálculos intermediários (ex: desvio padrão das bandas) são compartilhados.
+    Colunas que já existem no DataFrame são reaproveitadas.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com colunas 'open', 'high', 'low', 'close'.
+        colunas (list): Colunas de indicadores necessárias.
+        
+    Returns:
+        pd.DataFrame: Cópia do DataFrame com as colunas pedidas.
+    """
+    df = df.copy()
+    plano = planejar_indicadores(colunas, df.columns)
+    
+    valores = {}
+    for nome in plano:
+        indicador = REGISTRO_INDICADORES[nome]
+        entradas = {
+            dependencia: valores[dependencia] if dependencia in valores else df[dependencia].to_numpy(dtype=float)
+            for dependencia in indicador.dependencias
+        }
+        valores.update(indicador.calcular(entradas))
+    
+    for coluna, valor in valores.items():
+        if not coluna.startswith('_'):
+            df[coluna] = valor
+    
+    return df
@@ -2,11 +2,21 @@ import pandas as pd
 import numpy as np
 import time
 from datetime import datetime
-from src.config import ATIVOS, RETRAIN_INTERVAL, RISCO_POR_TRADE
-from src.mt5_connection import conectar_mt5, obter_dados_historicos, enviar_ordem_compra, enviar_ordem_venda
-from src.strategy import preparar_dados_para_estrategia, verificar_sinal_compra, verificar_sinal_venda, filtrar_mercado_lateralizado
-from src.risk_management import aplicar_gestao_risco
-from src.ai_model import extrair_caracteristicas, prever_qualidade_sinal, carregar_modelo, treinar_modelo
+from src.config import ATIVOS, RETRAIN_INTERVAL, TIMEFRAMES, TIMEFRAME_FEED, BARRAS_ANALISE, USAR_SERVIDOR_INFERENCIA, TREINO_INCREMENTAL, GESTAO_POSICOES_ATIVA, PERFIL_ATIVO
+from src.mt5_connection import conectar_mt5, obter_dados_historicos, obter_tempo_ultimo_candle, obter_barras_desde, timeframe_mt5, sincronizar_historico
+from src.multitimeframe import AgregadorBarras
+from src.historico import gravar_barras, converter_para_barras, barras_para_dataframe
+from src.armazem_caracteristicas import atualizar_armazem, caracteristicas_candle
+from src.gerenciador_ordens import GerenciadorOrdens
+from src.gestor_posicoes import GestorPosicoes
+from src.perfilador import ControlePerfil
+from src.estado_ativos import EstadoAtivos
+from src.strategy import preparar_dados_para_estrategia
+from src.estrategias import carregar_estrategias, colunas_estrategias, resumo_estrategias
+from src.risk_management import aplicar_gestao_risco, COLUNAS_RISCO
+from src.risco_carteira import RiscoCarteira
+from src.ai_model import COLUNAS_CARACTERISTICAS, extrair_caracteristicas, prever_qualidade_sinal, carregar_modelo_compacto, treinar_modelo, treinar_modelo_incremental, carregar_limiar_sinal
+from src.servidor_inferencia import conectar_servidor_inferencia
 from src.backtest import registrar_trade
 import MetaTrader5 as mt5
 import os
@@ -33,137 +43,398 @@ def registrar_decisao(decision_info):
     else:
         df_decision.to_csv(DECISIONS_LOG_PATH, index=False)
 
-def verificar_e_executar_sinais():
+def caracteristicas_sinal(ativo, df, timeframe):
     """
-    Verifica sinais para todos os ativos e executa operações quando apropriado.
-    """
-    # Carregar modelo de IA
-    modelo = carregar_modelo()
+    Obtém as características do candle de sinal (penúltimo candle) para a IA.
     
-    # Obter data atual para verificar se é hora de re-treinar
-    hoje = datetime.now().date()
+    As características são lidas do armazém, que sincronizar_historicos mantém em dia
+    a cada ciclo. Só se o candle não estiver no armazém os indicadores das
+    características são calculados sobre o DataFrame.
     
-    # Verificar se é hora de re-treinar o modelo
-    if os.path.exists("data/trades_log.csv"):
-        df_trades = pd.read_csv("data/trades_log.csv")
-        if len(df_trades) > 0:
-            ultima_data = pd.to_datetime(df_trades['data_entrada']).max().date()
-            dias_desde_ultimo_treino = (hoje - ultima_data).days
-            
-            if dias_desde_ultimo_treino >= RETRAIN_INTERVAL:
-                print("Re-treinando modelo de IA...")
-                modelo = treinar_modelo(df_trades)
+    Args:
+        ativo (str): Símbolo do ativo.
+        df (pd.DataFrame): Dados de preços e indicadores da estratégia, terminando no
+            último candle fechado.
+        timeframe (str): Nome do timeframe analisado (ex: 'D1').
+        
+    Returns:
+        dict: Características do candle de sinal ou None se não houver dados suficientes.
+    """
+    caracteristicas = caracteristicas_candle(ativo, timeframe, df['time'].iloc[-2])
+    if caracteristicas is None:
+        df = preparar_dados_para_estrategia(df, COLUNAS_CARACTERISTICAS)
+        caracteristicas = extrair_caracteristicas(df, len(df) - 2)  # Penúltimo candle
     
-    # Processar cada ativo
+    return caracteristicas
+
+def sincronizar_historicos():
+    """
+    Grava no histórico local todas as barras fechadas desde o último ciclo, em todos
+    os ativos, e atualiza o armazém de características com elas.
+    
+    Roda a cada ciclo do modo de timeframe único, haja sinal ou não, para que o
+    histórico e o armazém não fiquem com lacunas entre um sinal e outro. No modo
+    multi-timeframe o histórico é gravado com as barras fechadas pelo AgregadorBarras
+    (ver processar_multitimeframe), sem buscas extras ao terminal.
+    """
+    timeframe = TIMEFRAMES[0]
     for ativo in ATIVOS:
-        print(f"Processando {ativo}...")
+        sincronizar_historico(ativo, timeframe_mt5(timeframe), BARRAS_ANALISE)
+        atualizar_armazem(ativo, timeframe)
+
+def gravar_barras_agregadas(ativo, agregador, novas_fechadas):
+    """
+    Grava no histórico local as barras que fecharam no agregador e atualiza o armazém
+    de características com elas.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        agregador (AgregadorBarras): Agregador de barras do ativo.
+        novas_fechadas (dict): Número de barras novas fechadas em cada timeframe.
+    """
+    for timeframe, novas in novas_fechadas.items():
+        if novas > 0:
+            gravar_barras(ativo, timeframe, agregador.barras(timeframe, incluir_em_formacao=False)[-novas:])
+            atualizar_armazem(ativo, timeframe)
+
+def analisar_sinais(ativo, df, modelo, gerenciador, estados, chave, timeframe, risco_carteira=None, estrategias=None,
+                    limiar=None, inclui_em_formacao=True):
+    """
+    Executa o pipeline de indicadores, IA e risco sobre os dados de um ativo/timeframe
+    e agenda as ordens das estratégias com sinal válido.
+    
+    O candle em formação, se houver, é descartado: os sinais, o SL/TP e as características da IA
+    usam o último candle fechado e o anterior a ele, como no backtest (que decide no
+    fechamento do candle do sinal), e a ordem sai na abertura do candle seguinte.
+    Os indicadores de todas as estratégias são calculados uma única vez; cada
+    estratégia gera os seus sinais sobre o mesmo DataFrame e só é avaliada se não
+    tiver posição ou ordem pendente no ativo.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        df (pd.DataFrame): Dados de preços, com o candle em formação no final se
+            `inclui_em_formacao` for True.
+        modelo (object): Modelo de IA (ou None).
+        gerenciador (GerenciadorOrdens): Gerenciador de ordens do ciclo.
+        estados (EstadoAtivos): Estado dos ativos entre ciclos.
+        chave (str): Chave do ativo/timeframe em `estados`.
+        timeframe (str): Nome do timeframe analisado (ex: 'D1').
+        risco_carteira (RiscoCarteira): Limites de risco da carteira (None para não aplicar).
+        estrategias (list): Estratégias ativas (padrão: as de ESTRATEGIAS).
+        limiar (float): Limiar de probabilidade do filtro de IA, carregado junto com o
+            modelo (None para usar a classe prevista pelo modelo).
+        inclui_em_formacao (bool): Se True, o último candle de df está em formação e é
+            descartado; se False, df já termina no último candle fechado.
+    """
+    if estrategias is None:
+        estrategias = carregar_estrategias()
+    
+    # Analisar só candles fechados
+    if inclui_em_formacao:
+        df = df.iloc[:-1]
+    
+    # Verificar se temos dados suficientes
+    if len(df) < 25:  # Precisamos de pelo menos 25 candles para indicadores e análise
+        print(f"Dados insuficientes para {ativo}")
+        return
         
-        # Obter dados históricos
-        df = obter_dados_historicos(ativo, mt5.TIMEFRAME_D1, 100)
-        if df.empty:
-            continue
-            
-        # Verificar se temos dados suficientes
-        if len(df) < 25:  # Precisamos de pelo menos 25 candles para indicadores e análise
-            print(f"Dados insuficientes para {ativo}")
+    # Preparar, em uma única passada, os indicadores de todas as estratégias e da gestão
+    # de risco (as características da IA vêm do armazém, ver caracteristicas_sinal)
+    colunas = colunas_estrategias(estrategias) + COLUNAS_RISCO
+    colunas = list(dict.fromkeys(colunas))
+    df = preparar_dados_para_estrategia(df, colunas)
+    
+    # Características do candle de sinal, obtidas uma vez para todas as estratégias
+    caracteristicas = None
+    
+    for estrategia in estrategias:
+        # Cada estratégia tem no máximo uma posição por ativo
+        if gerenciador.possui_posicao(ativo, estrategia.magic) or gerenciador.possui_ordem_pendente(ativo, estrategia.magic):
             continue
-            
-        # Preparar dados com indicadores
-        df = preparar_dados_para_estrategia(df)
         
-        # Verificar se mercado está lateralizado
-        if not filtrar_mercado_lateralizado(df):
+        # Verificar se o mercado está nas condições da estratégia (ex: lateralizado)
+        filtro = estrategia.motivo_filtro(df)
+        if filtro is not None:
+            motivo, detalhes = filtro
             decision_info = {
                 'ativo': ativo,
                 'data': datetime.now(),
                 'decisao': 'ignorado',
-                'motivo': 'Mercado não lateralizado (ADX >= 25)',
-                'detalhes': f"ADX: {df['adx'].iloc[-1]:.2f}"
+                'motivo': motivo,
+                'detalhes': f"{detalhes} [{estrategia.nome}]"
             }
             registrar_decisao(decision_info)
             continue
-            
-        # Verificar sinais de compra e venda
-        sinal_compra = verificar_sinal_compra(df)
-        sinal_venda = verificar_sinal_venda(df)
         
-        # Processar sinal de compra
-        if sinal_compra:
-            # Extrair características para IA
-            caracteristicas = extrair_caracteristicas(df, -2)  # -2 porque o sinal é no penúltimo candle
-            if caracteristicas:
-                # Verificar com IA se é um bom sinal
-                qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas)
-                
-                if qualidade_sinal == 0:
-                    decision_info = {
-                        'ativo': ativo,
-                        'data': datetime.now(),
-                        'decisao': 'ignorado',
-                        'motivo': 'IA classificou sinal como ruim',
-                        'detalhes': str(caracteristicas)
-                    }
-                    registrar_decisao(decision_info)
-                    continue  # Ignorar sinal classificado como ruim
-            
-            # Aplicar gestão de risco
-            gestao = aplicar_gestao_risco(ativo, df, 'compra')
-            
-            # Registrar decisão de compra
-            decision_info = {
-                'ativo': ativo,
-                'data': datetime.now(),
-                'decisao': 'compra',
-                'motivo': 'Sinal válido identificado',
-                'detalhes': f"SL: {gestao['stop_loss']:.5f}, TP: {gestao['take_profit']:.5f}"
-            }
-            registrar_decisao(decision_info)
-            
-            # Enviar ordem de compra
-            resultado = enviar_ordem_compra(ativo, gestao)
-            if resultado and resultado.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"Ordem de COMPRA enviada para {ativo}.")
-            else:
-                print(f"Falha ao enviar ordem de COMPRA para {ativo}. Erro: {resultado}")
+        # Sinal do último candle fechado
+        sinal = estrategia.gerar_sinais(df)[-1]
+        if sinal == 0:
+            continue
+        tipo_operacao = 'compra' if sinal > 0 else 'venda'
+        estrategia.contar('sinais')
         
-        # Processar sinal de venda
-        elif sinal_venda:
-            # Extrair características para IA
-            caracteristicas = extrair_caracteristicas(df, -2)  # -2 porque o sinal é no penúltimo candle
-            if caracteristicas:
-                # Verificar com IA se é um bom sinal
-                qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas)
-                
-                if qualidade_sinal == 0:
-                    decision_info = {
-                        'ativo': ativo,
-                        'data': datetime.now(),
-                        'decisao': 'ignorado',
-                        'motivo': 'IA classificou sinal como ruim',
-                        'detalhes': str(caracteristicas)
-                    }
-                    registrar_decisao(decision_info)
-                    continue  # Ignorar sinal classificado como ruim
+        # Verificar com IA se é um bom sinal (sem modelo, todo sinal é aceito)
+        if modelo is not None and caracteristicas is None:
+            caracteristicas = caracteristicas_sinal(ativo, df, timeframe)
+        if caracteristicas:
+            qualidade_sinal = prever_qualidade_sinal(modelo, caracteristicas, limiar)
             
-            # Aplicar gestão de risco
-            gestao = aplicar_gestao_risco(ativo, df, 'venda')
-            
-            # Registrar decisão de venda
-            decision_info = {
-                'ativo': ativo,
-                'data': datetime.now(),
-                'decisao': 'venda',
-                'motivo': 'Sinal válido identificado',
-                'detalhes': f"SL: {gestao['stop_loss']:.5f}, TP: {gestao['take_profit']:.5f}"
-            }
-            registrar_decisao(decision_info)
+            if qualidade_sinal == 0:
+                decision_info = {
+                    'ativo': ativo,
+                    'data': datetime.now(),
+                    'decisao': 'ignorado',
+                    'motivo': 'IA classificou sinal como ruim',
+                    'detalhes': f"{caracteristicas} [{estrategia.nome}]"
+                }
+                registrar_decisao(decision_info)
+                estrategia.contar('ignorados_ia')
+                continue  # Ignorar sinal classificado como ruim
+        
+        # Aplicar gestão de risco com o risco por trade da estratégia
+        gestao = aplicar_gestao_risco(ativo, df, tipo_operacao)
+        gestao['risco_por_trade'] = estrategia.risco_por_trade
+        
+        # Reduzir ou recusar o sinal pelos limites de risco correlacionado e diário
+        if risco_carteira is not None:
+            gestao['fator_risco'] = risco_carteira.avaliar_sinal(ativo, tipo_operacao, estrategia.risco_por_trade,
+                                                                 tempo=datetime.now())
+            if gestao['fator_risco'] == 0:
+                decision_info = {
+                    'ativo': ativo,
+                    'data': datetime.now(),
+                    'decisao': 'ignorado',
+                    'motivo': 'Limite de risco da carteira',
+                    'detalhes': f"Risco correlacionado: {risco_carteira.risco_correlacionado(ativo, tipo_operacao):.4f}, risco do dia: {risco_carteira.risco_dia:.4f} [{estrategia.nome}]"
+                }
+                registrar_decisao(decision_info)
+                estrategia.contar('ignorados_risco')
+                continue
+            risco_carteira.registrar_abertura((chave, estrategia.nome), ativo, tipo_operacao,
+                                              estrategia.risco_por_trade * gestao['fator_risco'], tempo=datetime.now())
+        
+        # Registrar decisão
+        decision_info = {
+            'ativo': ativo,
+            'data': datetime.now(),
+            'decisao': tipo_operacao,
+            'motivo': 'Sinal válido identificado',
+            'detalhes': f"SL: {gestao['stop_loss']:.5f}, TP: {gestao['take_profit']:.5f}, Risco: {gestao.get('fator_risco', 1.0):.2f}x [{estrategia.nome}]"
+        }
+        registrar_decisao(decision_info)
+        
+        # Agendar a ordem para o envio em lote, com o magic number da estratégia
+        gerenciador.adicionar_ordem(ativo, tipo_operacao, gestao, estrategia.comentario(tipo_operacao, timeframe),
+                                    origem=chave, magic=estrategia.magic, estrategia=estrategia.nome)
+        estados.registrar_sinal_pendente(chave, tipo_operacao)
+        estrategia.contar('ordens')
+
+def processar_timeframe_unico(ativo, modelo, gerenciador, estados, risco_carteira=None, estrategias=None, limiar=None):
+    """
+    Analisa um ativo no único timeframe configurado, buscando os dados no terminal.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        modelo (object): Modelo de IA (ou None).
+        gerenciador (GerenciadorOrdens): Gerenciador de ordens do ciclo.
+        estados (EstadoAtivos): Estado dos ativos entre ciclos.
+        risco_carteira (RiscoCarteira): Limites de risco da carteira (None para não aplicar).
+        estrategias (list): Estratégias ativas (padrão: as de ESTRATEGIAS).
+        limiar (float): Limiar de probabilidade do filtro de IA (None para usar a classe prevista).
+    """
+    if estrategias is None:
+        estrategias = carregar_estrategias()
+    timeframe = TIMEFRAMES[0]
+    
+    # Pular ativos sem candle novo, com ordem pendente ou com posição de todas as estratégias
+    tempo_candle = obter_tempo_ultimo_candle(ativo, timeframe_mt5(timeframe))
+    ocupado = all(gerenciador.possui_posicao(ativo, estrategia.magic) for estrategia in estrategias)
+    if not estados.precisa_processar(ativo, tempo_candle, ocupado):
+        return
+    
+    print(f"Processando {ativo}...")
+    
+    # Obter dados históricos
+    df = obter_dados_historicos(ativo, timeframe_mt5(timeframe), BARRAS_ANALISE)
+    if df.empty:
+        return
+    
+    # Cada candle fechado só é analisado uma vez, no primeiro ciclo depois do fechamento
+    estados.marcar_processado(ativo, tempo_candle)
+    
+    analisar_sinais(ativo, df, modelo, gerenciador, estados, ativo, timeframe, risco_carteira, estrategias, limiar)
+
+def processar_multitimeframe(ativo, modelo, gerenciador, estados, agregadores, risco_carteira=None, estrategias=None,
+                             limiar=None):
+    """
+    Analisa um ativo em todos os timeframes configurados a partir de um único feed.
+    
+    Na primeira vez, as barras fechadas de cada timeframe são buscadas uma única vez
+    no terminal. Depois disso, apenas as barras novas do feed (TIMEFRAME_FEED) são
+    buscadas e agregadas localmente em todos os timeframes. As barras que fecham em
+    cada timeframe são gravadas no histórico local e no armazém de características.
+    
+    Cada timeframe é analisado uma vez por barra fechada, só com as barras fechadas
+    do agregador, haja ou não barra do feed no candle seguinte (logo depois de
+    semear, o candle em formação ainda não tem barras).
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        modelo (object): Modelo de IA (ou None).
+        gerenciador (GerenciadorOrdens): Gerenciador de ordens do ciclo.
+        estados (EstadoAtivos): Estado dos ativos entre ciclos.
+        agregadores (dict): Agregador de barras de cada ativo, mantido entre ciclos.
+        risco_carteira (RiscoCarteira): Limites de risco da carteira (None para não aplicar).
+        estrategias (list): Estratégias ativas (padrão: as de ESTRATEGIAS).
+        limiar (float): Limiar de probabilidade do filtro de IA (None para usar a classe prevista).
+    """
+    if estrategias is None:
+        estrategias = carregar_estrategias()
+    semeadas = {}
+    if ativo not in agregadores:
+        agregador = AgregadorBarras(TIMEFRAMES)
+        for timeframe in TIMEFRAMES:
+            df_inicial = obter_dados_historicos(ativo, timeframe_mt5(timeframe), BARRAS_ANALISE)
+            if not df_inicial.empty:
+                agregador.semear(timeframe, converter_para_barras(df_inicial.iloc[:-1]))  # Sem o candle em formação
+                semeadas[timeframe] = len(df_inicial) - 1
+        agregadores[ativo] = agregador
+    agregador = agregadores[ativo]
+    
+    # Buscar apenas as barras novas do feed e agregá-las em todos os timeframes
+    barras_feed = obter_barras_desde(ativo, timeframe_mt5(TIMEFRAME_FEED), agregador.inicio_feed())
+    novas_fechadas = agregador.atualizar(barras_feed)
+    
+    # Histórico local e armazém com as barras semeadas e as que fecharam no ciclo
+    gravar_barras_agregadas(ativo, agregador, {timeframe: novas + semeadas.get(timeframe, 0)
+                                               for timeframe, novas in novas_fechadas.items()})
+    
+    for timeframe in TIMEFRAMES:
+        chave = f"{ativo}_{timeframe}"
+        
+        # Pular timeframes sem barra fechada nova e ativos em que todas as estratégias estão
+        # posicionadas ou com ordem pendente
+        ocupado = all(gerenciador.possui_posicao(ativo, estrategia.magic) or gerenciador.possui_ordem_pendente(ativo, estrategia.magic)
+                      for estrategia in estrategias)
+        tempo_candle = agregador.tempo_ultima_fechada(timeframe)
+        if not estados.precisa_processar(chave, tempo_candle, ocupado):
+            continue
+        
+        print(f"Processando {ativo} {timeframe}...")
+        estados.marcar_processado(chave, tempo_candle)
+        
+        df = barras_para_dataframe(agregador.barras(timeframe, incluir_em_formacao=False))
+        analisar_sinais(ativo, df, modelo, gerenciador, estados, chave, timeframe, risco_carteira, estrategias, limiar,
+                        inclui_em_formacao=False)
+
+def atualizar_correlacoes(risco_carteira):
+    """
+    Acrescenta à correlação da carteira as barras fechadas de todos os ativos desde o último ciclo.
+    
+    Args:
+        risco_carteira (RiscoCarteira): Limites de risco da carteira.
+    """
+    timeframe = timeframe_mt5(TIMEFRAMES[0])
+    barras = {
+        ativo: obter_barras_desde(ativo, timeframe, risco_carteira.ultimo_tempo, estimativa=risco_carteira.correlacao.janela + 1)
+        for ativo in ATIVOS
+    }
+    risco_carteira.adicionar_barras(barras)
+
+def verificar_e_executar_sinais(gerenciador=None, estados=None, agregadores=None, cliente_inferencia=None, risco_carteira=None,
+                                estrategias=None):
+    """
+    Verifica sinais para todos os ativos e executa operações quando apropriado.
+    
+    As ordens decididas no ciclo são enviadas juntas ao final, pelo gerenciador de ordens.
+    Ativos sem candle novo desde o último ciclo, com posição aberta ou com ordem
+    pendente não passam pelo pipeline de indicadores, IA e risco.
+    Só as chamadas ao terminal são feitas com TRAVA_MT5: a análise, o armazém de
+    características e o log de decisões rodam sem ela, e a gestão das posições
+    não espera o ciclo.
+    
+    Args:
+        gerenciador (GerenciadorOrdens): Gerenciador de ordens e posições (um novo é criado se None).
+        estados (EstadoAtivos): Estado de cada ativo entre ciclos (um novo é criado se None).
+        agregadores (dict): Agregadores de barras por ativo no modo multi-timeframe
+            (um novo dicionário é criado se None).
+        cliente_inferencia (ClienteInferencia): Cliente do servidor de inferência usado
+            no lugar do modelo local (o modelo é carregado do disco se None).
+        risco_carteira (RiscoCarteira): Correlação entre os ativos e risco aberto no dia,
+            mantidos entre ciclos (um novo é criado se None).
+        estrategias (list): Estratégias ativas, com as estatísticas mantidas entre ciclos
+            (criadas a partir de ESTRATEGIAS se None).
+    """
+    if estrategias is None:
+        estrategias = carregar_estrategias()
+    if gerenciador is None:
+        gerenciador = GerenciadorOrdens(estrategias=estrategias)
+    if estados is None:
+        estados = EstadoAtivos()
+    if agregadores is None:
+        agregadores = {}
+    if risco_carteira is None:
+        risco_carteira = RiscoCarteira(ATIVOS)
+    
+    # Atualizar as posições abertas com uma única consulta ao terminal
+    gerenciador.sincronizar()
+    
+    # Exposições abertas e correlação com as barras fechadas desde o último ciclo
+    risco_carteira.sincronizar_posicoes(gerenciador.posicoes)
+    atualizar_correlacoes(risco_carteira)
+    
+    # Histórico local e armazém de características com as barras fechadas desde o último
+    # ciclo (no modo multi-timeframe, gravados com as barras agregadas do feed)
+    if len(TIMEFRAMES) == 1:
+        sincronizar_historicos()
+    
+    # Usar o modelo do servidor de inferência ou carregar o modelo de IA localmente,
+    # junto com o limiar do filtro de sinais (lido uma vez por ciclo, não a cada sinal)
+    modelo = cliente_inferencia if cliente_inferencia is not None else carregar_modelo_compacto()
+    limiar = carregar_limiar_sinal()
+    
+    # Obter data atual para verificar se é hora de re-treinar
+    hoje = datetime.now().date()
+    
+    # Verificar se é hora de re-treinar o modelo
+    if os.path.exists("data/trades_log.csv"):
+        df_trades = pd.read_csv("data/trades_log.csv")
+        if len(df_trades) > 0:
+            ultima_data = pd.to_datetime(df_trades['data_entrada']).max().date()
+            dias_desde_ultimo_treino = (hoje - ultima_data).days
             
-            # Enviar ordem de venda
-            resultado = enviar_ordem_venda(ativo, gestao)
-            if resultado and resultado.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"Ordem de VENDA enviada para {ativo}.")
-            else:
-                print(f"Falha ao enviar ordem de VENDA para {ativo}. Erro: {resultado}")
+            if dias_desde_ultimo_treino >= RETRAIN_INTERVAL:
+                print("Re-treinando modelo de IA...")
+                if TREINO_INCREMENTAL:
+                    # Apenas os trades posteriores ao último treino
+                    modelo = treinar_modelo_incremental(df_trades)
+                else:
+                    modelo = treinar_modelo(df_trades)
+    
+    # Processar cada ativo
+    for ativo in ATIVOS:
+        if len(TIMEFRAMES) == 1:
+            processar_timeframe_unico(ativo, modelo, gerenciador, estados, risco_carteira, estrategias, limiar)
+        else:
+            processar_multitimeframe(ativo, modelo, gerenciador, estados, agregadores, risco_carteira, estrategias, limiar)
+
+    # Enviar todas as ordens do ciclo de uma vez
+    por_nome = {estrategia.nome: estrategia for estrategia in estrategias}
+    for envio in gerenciador.executar_ordens():
+        resultado = envio['resultado']
+        sucesso = bool(resultado) and resultado.retcode == mt5.TRADE_RETCODE_DONE
+        estados.concluir_sinal(envio['origem'], sucesso)
+        identificador = (envio['origem'], envio['estrategia'])
+        if sucesso:
+            risco_carteira.confirmar_abertura(identificador, resultado.order)
+        else:
+            risco_carteira.cancelar_abertura(identificador)
+        if envio['estrategia'] in por_nome:
+            por_nome[envio['estrategia']].contar('executadas' if sucesso else 'falhas')
+        if sucesso:
+            print(f"Ordem de {envio['tipo'].upper()} enviada para {envio['ativo']}.")
+        else:
+            print(f"Falha ao enviar ordem de {envio['tipo'].upper()} para {envio['ativo']}. Erro: {resultado}")
 
 def main():
     """
@@ -175,10 +446,33 @@ def main():
     
     print("Robô iniciado. Pressione Ctrl+C para interromper.")
     
+    # Estratégias, gerenciador de ordens, estado dos ativos, agregadores e risco da carteira mantidos entre os ciclos
+    estrategias = carregar_estrategias()
+    gerenciador = GerenciadorOrdens(estrategias=estrategias)
+    estados = EstadoAtivos()
+    agregadores = {}
+    risco_carteira = RiscoCarteira(ATIVOS)
+    
+    # Compartilhar o modelo com outras instâncias através do servidor de inferência
+    cliente_inferencia = conectar_servidor_inferencia() if USAR_SERVIDOR_INFERENCIA else None
+    
+    # Trailing stop, breakeven e proteção contra gaps das posições abertas, tick a tick
+    gestor_posicoes = None
+    if GESTAO_POSICOES_ATIVA:
+        gestor_posicoes = GestorPosicoes(GerenciadorOrdens(estrategias=estrategias))
+        gestor_posicoes.iniciar()
+    
+    # Perfilador ligado e desligado em tempo de execução, sem parar o robô
+    controle_perfil = None
+    if PERFIL_ATIVO:
+        controle_perfil = ControlePerfil()
+        controle_perfil.iniciar()
+    
     try:
         while True:
             # Verificar e executar sinais
-            verificar_e_executar_sinais()
+            verificar_e_executar_sinais(gerenciador, estados, agregadores, cliente_inferencia, risco_carteira, estrategias)
+            print(resumo_estrategias(estrategias, gerenciador.posicoes).to_string())
             
             # Aguardar até a próxima verificação (1 hora)
             # Em um ambiente de produção, você pode querer usar um agendador mais sofisticado
@@ -188,6 +482,12 @@ def main():
     except KeyboardInterrupt:
         print("\nRobô interrompido pelo usuário.")
     finally:
+        if controle_perfil is not None:
+            controle_perfil.parar()
+        if gestor_posicoes is not None:
+            gestor_posicoes.parar()
+        if cliente_inferencia is not None:
+            cliente_inferencia.fechar()
         # Finalizar conexão com MT5
         mt5.shutdown()
 
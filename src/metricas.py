@@ -0,0 +1,183 @@
+import numpy as np
+
+# Períodos (dias) por ano usados para anualizar Sharpe e Sortino
+PERIODOS_POR_ANO = 252
+
+def calcular_drawdown(saldo, saldo_inicial):
+    """
+    Calcula o drawdown de uma curva de saldo.
+
+    Args:
+        saldo (np.ndarray): Saldo após cada ponto da curva.
+        saldo_inicial (float): Saldo antes do primeiro ponto.
+
+    Returns:
+        tuple: (drawdown absoluto por ponto, drawdown percentual por ponto).
+    """
+    picos = np.maximum.accumulate(np.concatenate(([saldo_inicial], saldo)))[1:]
+    drawdown = picos - saldo
+
+    return drawdown, drawdown / picos
+
+def calcular_retornos_diarios(lucro, data_saida, saldo_inicial):
+    """
+    Agrupa o resultado dos trades por dia útil de saída e calcula os retornos diários.
+
+    Dias úteis sem trades entram com retorno zero, para que Sharpe e Sortino reflitam
+    o período inteiro e não só os dias com operações; fins de semana não entram, já
+    que PERIODOS_POR_ANO conta só dias de pregão (saídas no fim de semana contam na
+    sexta-feira). Se o saldo zerar, a série termina no dia da quebra, com retorno de
+    no máximo -100%.
+
+    Args:
+        lucro (np.ndarray): Lucro de cada trade.
+        data_saida (np.ndarray): Data de saída de cada trade (datetime64).
+        saldo_inicial (float): Saldo antes do primeiro trade.
+
+    Returns:
+        np.ndarray: Retorno de cada dia útil do período.
+    """
+    dias = np.busday_offset(data_saida.astype('datetime64[D]'), 0, roll='backward')
+    indices = np.busday_count(dias.min(), dias)
+    lucro_diario = np.bincount(indices, weights=lucro)
+
+    saldo_final_dia = saldo_inicial + np.cumsum(lucro_diario)
+    saldo_inicio_dia = np.concatenate(([saldo_inicial], saldo_final_dia[:-1]))
+
+    # Sem saldo não há base para o retorno: os dias depois da quebra são descartados
+    quebra = saldo_inicio_dia <= 0
+    if quebra.any():
+        ultimo = int(np.argmax(quebra))
+        lucro_diario, saldo_inicio_dia = lucro_diario[:ultimo], saldo_inicio_dia[:ultimo]
+
+    return np.maximum(lucro_diario / saldo_inicio_dia, -1.0)
+
+def calcular_curva_exposicao(data_entrada, data_saida):
+    """
+    Calcula o número de posições abertas ao longo do tempo.
+
+    Args:
+        data_entrada (np.ndarray): Data de entrada de cada trade (datetime64).
+        data_saida (np.ndarray): Data de saída de cada trade (datetime64).
+
+    Returns:
+        tuple: (tempos dos eventos, posições abertas a partir de cada tempo).
+    """
+    tempos = np.concatenate((data_entrada, data_saida)).astype('datetime64[s]')
+    variacoes = np.concatenate((np.ones(len(data_entrada), dtype=np.int64),
+                                -np.ones(len(data_saida), dtype=np.int64)))
+
+    # Em empate, fechamentos antes de aberturas
+    ordem = np.lexsort((variacoes, tempos))
+
+    return tempos[ordem], np.cumsum(variacoes[ordem])
+
+def calcular_metricas(lucro, data_entrada, data_saida, saldo_inicial=10000, incluir_curvas=False):
+    """
+    Calcula as métricas de desempenho de um conjunto de trades, de forma vetorizada.
+
+    Args:
+        lucro (np.ndarray): Lucro de cada trade.
+        data_entrada (np.ndarray): Data de entrada de cada trade (datetime64).
+        data_saida (np.ndarray): Data de saída de cada trade (datetime64).
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        incluir_curvas (bool): Se True, inclui as curvas de saldo, drawdown e exposição.
+
+    Returns:
+        dict: Métricas de desempenho.
+    """
+    lucro = np.asarray(lucro, dtype=np.float64)
+    num_trades = len(lucro)
+
+    metricas = {
+        'lucro_total': 0.0,
+        'num_trades': num_trades,
+        'taxa_acerto': 0.0,
+        'expectativa': 0.0,
+        'fator_lucro': 0.0,
+        'drawdown_maximo': 0.0,
+        'drawdown_maximo_pct': 0.0,
+        'sharpe': 0.0,
+        'sortino': 0.0,
+        'tempo_medio_horas': 0.0,
+        'exposicao': 0.0,
+    }
+    if num_trades == 0:
+        return metricas
+
+    data_entrada = np.asarray(data_entrada).astype('datetime64[s]')
+    data_saida = np.asarray(data_saida).astype('datetime64[s]')
+
+    # Curva de saldo na ordem de fechamento
+    ordem = np.argsort(data_saida, kind='stable')
+    saldo = saldo_inicial + np.cumsum(lucro[ordem])
+    drawdown, drawdown_pct = calcular_drawdown(saldo, saldo_inicial)
+
+    # Fator de lucro: ganhos brutos sobre perdas brutas
+    ganhos = lucro[lucro > 0].sum()
+    perdas = -lucro[lucro < 0].sum()
+    fator_lucro = ganhos / perdas if perdas > 0 else np.inf if ganhos > 0 else 0.0
+
+    # Sharpe e Sortino anualizados sobre os retornos diários
+    retornos = calcular_retornos_diarios(lucro, data_saida, saldo_inicial)
+    desvio = retornos.std()
+    desvio_negativo = np.sqrt(np.mean(np.minimum(retornos, 0) ** 2))
+    sharpe = retornos.mean() / desvio * np.sqrt(PERIODOS_POR_ANO) if desvio > 0 else 0.0
+    sortino = retornos.mean() / desvio_negativo * np.sqrt(PERIODOS_POR_ANO) if desvio_negativo > 0 else 0.0
+
+    # Exposição: fração do período com pelo menos uma posição aberta
+    tempos, posicoes = calcular_curva_exposicao(data_entrada, data_saida)
+    segundos = tempos.astype(np.int64)
+    duracoes = np.diff(segundos)
+    periodo_total = segundos[-1] - segundos[0]
+    exposicao = duracoes[posicoes[:-1] > 0].sum() / periodo_total if periodo_total > 0 else 1.0
+
+    duracao_trades = (data_saida - data_entrada).astype(np.int64)
+
+    metricas.update({
+        'lucro_total': float(lucro.sum()),
+        'taxa_acerto': float(np.count_nonzero(lucro > 0) / num_trades),
+        'expectativa': float(lucro.mean()),
+        'fator_lucro': float(fator_lucro),
+        'drawdown_maximo': float(drawdown.max()),
+        'drawdown_maximo_pct': float(drawdown_pct.max()),
+        'sharpe': float(sharpe),
+        'sortino': float(sortino),
+        'tempo_medio_horas': float(duracao_trades.mean() / 3600),
+        'exposicao': float(exposicao),
+    })
+
+    if incluir_curvas:
+        metricas['curva_saldo'] = saldo
+        metricas['curva_drawdown'] = drawdown
+        metricas['curva_exposicao'] = (tempos, posicoes)
+
+    return metricas
+
+def calcular_metricas_registro(registro, saldo_inicial=10000, incluir_curvas=False):
+    """
+    Calcula as métricas de um RegistroTrades, no agregado e por ativo.
+
+    Args:
+        registro (RegistroTrades): Registro com os trades.
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        incluir_curvas (bool): Se True, inclui as curvas de saldo, drawdown e exposição.
+
+    Returns:
+        dict: {'agregado': métricas de todos os trades, 'por_ativo': {ativo: métricas}}.
+    """
+    lucro = registro.coluna('lucro')
+    data_entrada = registro.coluna('data_entrada')
+    data_saida = registro.coluna('data_saida')
+    codigos = registro.coluna('ativo')
+
+    por_ativo = {}
+    for codigo, ativo in enumerate(registro.ativos):
+        mascara = codigos == codigo
+        por_ativo[ativo] = calcular_metricas(lucro[mascara], data_entrada[mascara], data_saida[mascara],
+                                             saldo_inicial, incluir_curvas)
+
+    return {
+        'agregado': calcular_metricas(lucro, data_entrada, data_saida, saldo_inicial, incluir_curvas),
+        'por_ativo': por_ativo,
+    }
@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from src.registro_trades import RegistroTrades
+
+# Métodos de reamostragem dos trades
+METODOS_MONTE_CARLO = ['bootstrap', 'embaralhar']
+
+# Percentis informados nas distribuições de retorno e drawdown
+PERCENTIS = [1, 5, 25, 50, 75, 95, 99]
+
+# Memória aproximada (bytes) usada por bloco de caminhos simulados de uma vez
+MEMORIA_BLOCO = 64 * 1024 * 1024
+
+def lucros_trades(trades):
+    """
+    Extrai o lucro de cada trade, na ordem em que foram registrados.
+
+    Args:
+        trades (RegistroTrades | pd.DataFrame | array): Trades do backtest.
+
+    Returns:
+        np.ndarray: Lucro de cada trade.
+    """
+    if isinstance(trades, RegistroTrades):
+        return np.asarray(trades.coluna('lucro'), dtype=float)
+    if isinstance(trades, pd.DataFrame):
+        return trades['lucro'].to_numpy(dtype=float)
+    return np.asarray(trades, dtype=float)
+
+def simular_bloco(lucros, num_caminhos, semente, metodo='bootstrap', prob_pular=0.0, slippage=0.0,
+                  saldo_inicial=10000, limite_ruina=0.5):
+    """
+    Simula um bloco de caminhos de uma vez, como operações sobre uma matriz caminho × trade.
+
+    Args:
+        lucros (np.ndarray): Lucro de cada trade do backtest.
+        num_caminhos (int): Número de caminhos do bloco.
+        semente: Semente (ou SeedSequence) do gerador do bloco.
+        metodo (str): 'bootstrap' (sorteio com reposição) ou 'embaralhar' (ordem aleatória).
+        prob_pular (float): Probabilidade de cada trade não ser executado.
+        slippage (float): Custo extra médio por trade, sorteado de uma exponencial (sempre contra o trade).
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        limite_ruina (float): Drawdown (fração do pico) considerado ruína.
+
+    Returns:
+        dict: Por caminho, 'retorno' final, 'drawdown' máximo (fração do pico) e 'ruina' (bool).
+    """
+    gerador = np.random.default_rng(semente)
+    num_trades = len(lucros)
+
+    if metodo == 'bootstrap':
+        caminhos = np.take(lucros, gerador.integers(0, num_trades, size=(num_caminhos, num_trades), dtype=np.int32))
+    elif metodo == 'embaralhar':
+        caminhos = gerador.permuted(np.broadcast_to(lucros, (num_caminhos, num_trades)), axis=1)
+    else:
+        raise ValueError(f"Método de Monte Carlo desconhecido: {metodo}")
+
+    if prob_pular > 0:
+        caminhos[gerador.random((num_caminhos, num_trades)) < prob_pular] = 0.0
+    if slippage > 0:
+        caminhos -= slippage * gerador.standard_exponential((num_caminhos, num_trades))
+
+    # Curva de saldo e drawdown de todos os caminhos, sem matrizes temporárias além dos picos
+    saldo = np.cumsum(caminhos, axis=1, out=caminhos)
+    saldo += saldo_inicial
+    picos = np.maximum(saldo, saldo_inicial)
+    np.maximum.accumulate(picos, axis=1, out=picos)
+    drawdown = 1 - np.min(np.divide(saldo, picos, out=picos), axis=1)
+
+    return {
+        'retorno': saldo[:, -1] / saldo_inicial - 1,
+        'drawdown': drawdown,
+        'ruina': drawdown >= limite_ruina,
+    }
+
+def distribuicao(valores):
+    """
+    Resume uma distribuição pela média, desvio padrão e PERCENTIS.
+
+    Args:
+        valores (np.ndarray): Valores simulados.
+
+    Returns:
+        dict: 'media', 'desvio' e 'p<percentil>' para cada percentil.
+    """
+    resumo = {'media': float(np.mean(valores)), 'desvio': float(np.std(valores))}
+    for percentil, valor in zip(PERCENTIS, np.percentile(valores, PERCENTIS)):
+        resumo[f'p{percentil}'] = float(valor)
+    return resumo
+
+def executar_monte_carlo(trades, num_caminhos=10000, metodo='bootstrap', prob_pular=0.0, slippage=0.0,
+                         saldo_inicial=10000, limite_ruina=0.5, semente=None, processos=None):
+    """
+    Mede a robustez de um backtest reamostrando os seus trades em muitos caminhos.
+
+    Os caminhos são divididos em blocos que cabem em MEMORIA_BLOCO e distribuídos
+    entre processos. Cada bloco tem a sua semente derivada de `semente`, então o
+    resultado é o mesmo com qualquer número de processos.
+
+    Args:
+        trades (RegistroTrades | pd.DataFrame | array): Trades do backtest (ou os lucros).
+        num_caminhos (int): Número de caminhos simulados.
+        metodo (str): 'bootstrap' (sorteio com reposição) ou 'embaralhar' (ordem aleatória).
+        prob_pular (float): Probabilidade de cada trade não ser executado.
+        slippage (float): Custo extra médio por trade, sorteado de uma exponencial (sempre contra o trade).
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        limite_ruina (float): Drawdown (fração do pico) considerado ruína.
+        semente (int): Semente para reproduzir a simulação (None para aleatória).
+        processos (int): Número de processos (padrão: número de CPUs). Com 1, roda
+            no processo atual.
+
+    Returns:
+        dict: Distribuições de 'retorno' e 'drawdown', 'prob_ruina', os valores de cada
+            caminho ('retornos', 'drawdowns') e o 'retorno_original' do backtest.
+    """
+    lucros = lucros_trades(trades)
+    if len(lucros) == 0:
+        raise ValueError("Nenhum trade para a simulação de Monte Carlo")
+    if metodo not in METODOS_MONTE_CARLO:
+        raise ValueError(f"Método de Monte Carlo desconhecido: {metodo}")
+
+    # Até três matrizes caminho × trade de 8 bytes vivas ao mesmo tempo em cada bloco
+    caminhos_bloco = max(1, MEMORIA_BLOCO // (24 * len(lucros)))
+    tamanhos = [min(caminhos_bloco, num_caminhos - inicio) for inicio in range(0, num_caminhos, caminhos_bloco)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+
+    argumentos = (repeat(lucros), tamanhos, sementes, repeat(metodo), repeat(prob_pular), repeat(slippage),
+                  repeat(saldo_inicial), repeat(limite_ruina))
+    if processos == 1 or len(tamanhos) == 1:
+        blocos = list(map(simular_bloco, *argumentos))
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            blocos = list(executor.map(simular_bloco, *argumentos))
+
+    retornos = np.concatenate([bloco['retorno'] for bloco in blocos])
+    drawdowns = np.concatenate([bloco['drawdown'] for bloco in blocos])
+    ruina = np.concatenate([bloco['ruina'] for bloco in blocos])
+
+    return {
+        'caminhos': num_caminhos,
+        'num_trades': len(lucros),
+        'metodo': metodo,
+        'retorno_original': float(lucros.sum() / saldo_inicial),
+        'retorno': distribuicao(retornos),
+        'drawdown': distribuicao(drawdowns),
+        'prob_ruina': float(ruina.mean()),
+        'prob_prejuizo': float(np.mean(retornos < 0)),
+        'retornos': retornos,
+        'drawdowns': drawdowns,
+    }
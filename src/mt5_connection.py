@@ -1,8 +1,41 @@
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
-from src.config import MODO_DEMO, RISCO_POR_TRADE
+from src.config import MODO_DEMO, RISCO_POR_TRADE, MAGIC_NUMBER, VALIDAR_DADOS, REPARAR_DADOS, REMOVER_OUTLIERS
+from src.historico import gravar_barras, abrir_historico, converter_para_barras
+from src.qualidade_dados import validar_barras, resumo_qualidade, MapaLacunas, DTYPE_LACUNA
+from src.risk_management import calcular_lote_vetorizado
+import threading
 import time
 
+# Serializa as chamadas ao terminal entre o ciclo principal e a gestão das posições:
+# a biblioteca do MetaTrader 5 não é segura entre threads. A trava envolve só as
+# chamadas ao terminal, nunca os cálculos feitos com os dados retornados
+TRAVA_MT5 = threading.RLock()
+
+def validar_ingestao(ativo, timeframe, rates):
+    """
+    Valida as barras recebidas do terminal e, com REPARAR_DADOS, corrige a sua estrutura.
+    
+    Args:
+        ativo (str): Símbolo do ativo, usado no aviso.
+        timeframe: Timeframe MT5 das barras.
+        rates (np.ndarray): Barras retornadas por mt5.copy_rates_from_pos.
+        
+    Returns:
+        tuple: (barras com dtype DTYPE_BARRAS, MapaLacunas das barras).
+    """
+    if not VALIDAR_DADOS:
+        return converter_para_barras(rates), MapaLacunas(np.zeros(0, dtype=DTYPE_LACUNA))
+    
+    barras, relatorio = validar_barras(rates, timeframe, reparar=REPARAR_DADOS,
+                                         remover_outliers=REMOVER_OUTLIERS)
+    resumo = resumo_qualidade(relatorio)
+    if resumo:
+        print(f"Qualidade dos dados de {ativo}: {resumo}")
+    
+    return barras, relatorio['mapa_lacunas']
+
 def conectar_mt5():
     """
     Estabelece conexão com o MetaTrader 5.
@@ -10,7 +43,9 @@ def conectar_mt5():
     Returns:
         bool: True se a conexão for bem-sucedida, False caso contrário.
     """
-    if not mt5.initialize():
+    with TRAVA_MT5:
+        inicializado = mt5.initialize()
+    if not inicializado:
         print("Falha ao inicializar o MetaTrader 5")
         return False
     
@@ -32,20 +67,112 @@ def obter_dados_historicos(ativo, timeframe, periodo):
         periodo (int): Número de candles para buscar.
         
     Returns:
-        pd.DataFrame: DataFrame com os dados históricos.
+        pd.DataFrame: DataFrame com os dados históricos. As lacunas ficam em
+            df.attrs['lacunas'] (MapaLacunas, indexado pela posição das barras).
     """
-    rates = mt5.copy_rates_from_pos(ativo, timeframe, 0, periodo)
+    with TRAVA_MT5:
+        rates = mt5.copy_rates_from_pos(ativo, timeframe, 0, periodo)
     
     if rates is None or len(rates) == 0:
         print(f"Não foi possível obter dados para {ativo}")
         return pd.DataFrame()
     
+    rates, lacunas = validar_ingestao(ativo, timeframe, rates)
     df = pd.DataFrame(rates)
     df['time'] = pd.to_datetime(df['time'], unit='s')
+    df.attrs['lacunas'] = lacunas
     
     return df
 
-def enviar_ordem(ativo, tipo, volume, price, sl, tp, comment=""):
+def timeframe_mt5(nome):
+    """
+    Converte o nome de um timeframe (ex: 'H4') para a constante mt5.TIMEFRAME_*.
+    
+    Args:
+        nome (str): Nome do timeframe.
+        
+    Returns:
+        int: Constante MT5 do timeframe.
+    """
+    return getattr(mt5, f"TIMEFRAME_{nome}")
+
+def obter_barras_desde(ativo, timeframe, desde, estimativa=64):
+    """
+    Obtém as barras fechadas posteriores a um tempo, sem buscar o histórico inteiro.
+    
+    Começa pedindo `estimativa` barras e aumenta o pedido até cobrir o tempo `desde`
+    (ou até o terminal não ter mais barras).
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe MT5 (ex: mt5.TIMEFRAME_M1).
+        desde (int): Tempo em segundos; apenas barras posteriores são retornadas.
+            None retorna as últimas `estimativa` barras.
+        estimativa (int): Número inicial de barras pedidas.
+        
+    Returns:
+        np.ndarray: Barras fechadas com dtype DTYPE_BARRAS.
+    """
+    quantidade = estimativa
+    while True:
+        # Posição 1: a barra da posição 0 ainda está em formação
+        with TRAVA_MT5:
+            rates = mt5.copy_rates_from_pos(ativo, timeframe, 1, quantidade)
+        if rates is None or len(rates) == 0:
+            return converter_para_barras([])
+        if desde is None or rates['time'][0] <= desde or len(rates) < quantidade or quantidade >= 100000:
+            break
+        quantidade *= 4
+    
+    barras, _ = validar_ingestao(ativo, timeframe, rates)
+    if desde is not None:
+        barras = barras[barras['time'] > desde]
+    
+    return barras
+
+def obter_tempo_ultimo_candle(ativo, timeframe):
+    """
+    Obtém apenas o tempo de abertura do candle atual, sem buscar o histórico.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe MT5 (ex: mt5.TIMEFRAME_D1).
+        
+    Returns:
+        int: Tempo de abertura do candle atual em segundos, ou None se indisponível.
+    """
+    with TRAVA_MT5:
+        rates = mt5.copy_rates_from_pos(ativo, timeframe, 0, 1)
+    
+    if rates is None or len(rates) == 0:
+        return None
+    
+    return int(rates['time'][-1])
+
+def sincronizar_historico(ativo, timeframe, periodo):
+    """
+    Busca no terminal as barras fechadas desde a última gravada e as acrescenta ao histórico local.
+    
+    Com histórico gravado, o primeiro pedido traz só a última barra gravada e a
+    seguinte, e cresce até cobrir a última barra gravada (ver obter_barras_desde),
+    de modo que o histórico não fica com lacunas mesmo depois de um tempo parado.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        timeframe: Timeframe MT5 (ex: mt5.TIMEFRAME_M1).
+        periodo (int): Número de candles da carga inicial, com o histórico vazio.
+        
+    Returns:
+        int: Número de barras novas gravadas.
+    """
+    existentes = abrir_historico(ativo, timeframe)
+    desde = int(existentes['time'][-1]) if len(existentes) > 0 else None
+    del existentes
+    
+    barras = obter_barras_desde(ativo, timeframe, desde, estimativa=periodo if desde is None else 2)
+    return gravar_barras(ativo, timeframe, barras)
+
+def enviar_ordem(ativo, tipo, volume, price, sl, tp, comment="", magic=MAGIC_NUMBER):
     """
     Envia uma ordem de compra ou venda.
     
@@ -57,6 +184,7 @@ def enviar_ordem(ativo, tipo, volume, price, sl, tp, comment=""):
         sl (float): Nível do Stop Loss.
         tp (float): Nível do Take Profit.
         comment (str): Comentário para a ordem.
+        magic (int): Magic number da estratégia que enviou a ordem.
         
     Returns:
         dict: Resultado da operação de envio da ordem.
@@ -71,18 +199,107 @@ def enviar_ordem(ativo, tipo, volume, price, sl, tp, comment=""):
         "sl": sl,
         "tp": tp,
         "deviation": 20,
-        "magic": 10032025,
+        "magic": magic,
         "comment": comment,
         "type_time": mt5.ORDER_TIME_GTC,
         "type_filling": mt5.ORDER_FILLING_IOC,
     }
     
     # Enviar ordem
-    result = mt5.order_send(request)
+    with TRAVA_MT5:
+        result = mt5.order_send(request)
     
     return result
 
-def calcular_lote(ativo, risco_por_trade, stop_loss_distancia):
+def obter_ticks_desde(ativo, desde_msc, quantidade=4096):
+    """
+    Obtém os ticks posteriores a um instante.
+    
+    Args:
+        ativo (str): Símbolo do ativo.
+        desde_msc (int): Tempo em milissegundos; apenas ticks posteriores são retornados.
+        quantidade (int): Número máximo de ticks pedidos.
+        
+    Returns:
+        np.ndarray: Ticks com os campos de mt5.copy_ticks_from (vazio se não houver ticks novos).
+    """
+    with TRAVA_MT5:
+        ticks = mt5.copy_ticks_from(ativo, desde_msc // 1000, quantidade, mt5.COPY_TICKS_INFO)
+    if ticks is None or len(ticks) == 0:
+        return np.zeros(0, dtype=[('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+    
+    return ticks[ticks['time_msc'] > desde_msc]
+
+def modificar_sltp(ticket, ativo, sl, tp):
+    """
+    Modifica o SL e o TP de uma posição aberta.
+    
+    Args:
+        ticket (int): Ticket da posição.
+        ativo (str): Símbolo do ativo.
+        sl (float): Novo nível do Stop Loss.
+        tp (float): Novo nível do Take Profit.
+        
+    Returns:
+        dict: Resultado da operação de envio da ordem.
+    """
+    request = {
+        "action": mt5.TRADE_ACTION_SLTP,
+        "symbol": ativo,
+        "position": ticket,
+        "sl": sl,
+        "tp": tp,
+        "magic": MAGIC_NUMBER,
+    }
+    
+    with TRAVA_MT5:
+        return mt5.order_send(request)
+
+def fechar_posicao_mercado(ticket, ativo, tipo_posicao, volume, comment="", magic=MAGIC_NUMBER):
+    """
+    Encerra uma posição aberta a mercado.
+    
+    Args:
+        ticket (int): Ticket da posição.
+        ativo (str): Símbolo do ativo.
+        tipo_posicao (str): 'compra' ou 'venda' (tipo da posição aberta).
+        volume (float): Volume da posição.
+        comment (str): Comentário para a ordem.
+        magic (int): Magic number da estratégia dona da posição.
+        
+    Returns:
+        dict: Resultado da operação de envio da ordem, ou None sem preço atual.
+    """
+    with TRAVA_MT5:
+        tick = mt5.symbol_info_tick(ativo)
+    if tick is None:
+        print(f"Não foi possível obter o preço atual para {ativo}")
+        return None
+    
+    # Compras são encerradas com uma venda no BID e vendas com uma compra no ASK
+    if tipo_posicao == 'compra':
+        tipo, price = mt5.ORDER_TYPE_SELL, tick.bid
+    else:
+        tipo, price = mt5.ORDER_TYPE_BUY, tick.ask
+    
+    request = {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": ativo,
+        "volume": volume,
+        "type": tipo,
+        "position": ticket,
+        "price": price,
+        "deviation": 20,
+        "magic": magic,
+        "comment": comment,
+        "type_time": mt5.ORDER_TIME_GTC,
+        "type_filling": mt5.ORDER_FILLING_IOC,
+    }
+    
+    with TRAVA_MT5:
+        return mt5.order_send(request)
+
+def calcular_lote(ativo, risco_por_trade, stop_loss_distancia, symbol_info=None, account_info=None):
     """
     Calcula o volume do lote com base no risco por trade e distância do stop loss.
     
@@ -90,60 +307,38 @@ def calcular_lote(ativo, risco_por_trade, stop_loss_distancia):
         ativo (str): Símbolo do ativo.
         risco_por_trade (float): Percentual do saldo a arriscar.
         stop_loss_distancia (float): Distância do stop loss em pontos.
+        symbol_info: Informações do símbolo já obtidas (None para consultar o terminal).
+        account_info: Informações da conta já obtidas (None para consultar o terminal).
         
     Returns:
         float: Volume calculado para a ordem.
     """
     # Obter informações do símbolo
-    symbol_info = mt5.symbol_info(ativo)
+    if symbol_info is None:
+        with TRAVA_MT5:
+            symbol_info = mt5.symbol_info(ativo)
     if symbol_info is None:
         print(f"Não foi possível obter informações para {ativo}")
         return 0.01
     
     # Obter saldo da conta
-    account_info = mt5.account_info()
+    if account_info is None:
+        with TRAVA_MT5:
+            account_info = mt5.account_info()
     if account_info is None:
         print("Não foi possível obter informações da conta")
         return 0.01
     
     saldo = account_info.balance
     
-    # Calcular risco em valor monetário
-    risco_valor = saldo * risco_por_trade
-    
-    # Converter distância do stop loss para valor monetário
-    # Esta é uma aproximação; pode ser necessário ajustar conforme o ativo
-    tick_value = symbol_info.trade_tick_value
-    tick_size = symbol_info.trade_tick_size
-    
-    # Calcular pontos por tick
-    pontos_por_tick = tick_value / tick_size if tick_size > 0 else 1
-    
-    # Converter distância em pontos para valor monetário
-    sl_valor = stop_loss_distancia * pontos_por_tick
-    
-    # Calcular lote
-    if sl_valor > 0:
-        lote = risco_valor / sl_valor
-    else:
-        lote = 0.01
-    
-    # Arredondar para o lote mínimo permitido
-    lote = round(lote, 2)
-    lote_min = symbol_info.volume_min
-    lote_max = symbol_info.volume_max
-    lote_step = symbol_info.volume_step
-    
-    # Ajustar o lote para estar dentro dos limites e incrementos permitidos
-    if lote < lote_min:
-        lote = lote_min
-    elif lote > lote_max:
-        lote = lote_max
-    else:
-        # Arredondar para o incremento mais próximo
-        lote = round(lote / lote_step) * lote_step
+    # Mesma regra do cálculo vetorizado usado para vários sinais de uma vez
+    lote = calcular_lote_vetorizado(
+        [stop_loss_distancia], saldo, risco_por_trade,
+        symbol_info.trade_tick_value, symbol_info.trade_tick_size,
+        symbol_info.volume_min, symbol_info.volume_max, symbol_info.volume_step
+    )
     
-    return lote
+    return float(lote[0])
 
 def enviar_ordem_compra(ativo, gestao):
     """
@@ -157,7 +352,8 @@ def enviar_ordem_compra(ativo, gestao):
         dict: Resultado da operação de envio da ordem.
     """
     # Obter preço atual de compra
-    tick = mt5.symbol_info_tick(ativo)
+    with TRAVA_MT5:
+        tick = mt5.symbol_info_tick(ativo)
     if tick is None:
         print(f"Não foi possível obter o preço atual para {ativo}")
         return None
@@ -192,7 +388,8 @@ def enviar_ordem_venda(ativo, gestao):
         dict: Resultado da operação de envio da ordem.
     """
     # Obter preço atual de venda
-    tick = mt5.symbol_info_tick(ativo)
+    with TRAVA_MT5:
+        tick = mt5.symbol_info_tick(ativo)
     if tick is None:
         print(f"Não foi possível obter o preço atual para {ativo}")
         return None
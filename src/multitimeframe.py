@@ -0,0 +1,187 @@
+import numpy as np
+from src.historico import DTYPE_BARRAS, DURACAO_TIMEFRAME, nome_timeframe
+
+# Número máximo de barras fechadas mantidas por timeframe
+MAX_BARRAS_AGREGADAS = 1000
+
+def agregar_barras(barras, duracao):
+    """
+    Agrega barras consecutivas em barras de `duracao` segundos.
+
+    O tempo de cada barra agregada é o início do seu intervalo. As barras de entrada
+    devem estar ordenadas por tempo.
+
+    Args:
+        barras (np.ndarray): Barras com dtype DTYPE_BARRAS.
+        duracao (int): Duração das barras agregadas em segundos.
+
+    Returns:
+        np.ndarray: Barras agregadas com dtype DTYPE_BARRAS.
+    """
+    if len(barras) == 0:
+        return np.zeros(0, dtype=DTYPE_BARRAS)
+
+    intervalos = barras['time'] // duracao * duracao
+    inicio = np.flatnonzero(np.concatenate(([True], intervalos[1:] != intervalos[:-1])))
+    fim = np.concatenate((inicio[1:], [len(barras)])) - 1
+
+    agregadas = np.zeros(len(inicio), dtype=DTYPE_BARRAS)
+    agregadas['time'] = intervalos[inicio]
+    agregadas['open'] = barras['open'][inicio]
+    agregadas['high'] = np.maximum.reduceat(barras['high'], inicio)
+    agregadas['low'] = np.minimum.reduceat(barras['low'], inicio)
+    agregadas['close'] = barras['close'][fim]
+    agregadas['tick_volume'] = np.add.reduceat(barras['tick_volume'], inicio)
+    agregadas['spread'] = np.minimum.reduceat(barras['spread'], inicio)
+    agregadas['real_volume'] = np.add.reduceat(barras['real_volume'], inicio)
+
+    return agregadas
+
+class AgregadorBarras:
+    """
+    Monta barras de vários timeframes a partir de um único feed de timeframe menor.
+
+    Cada chamada a `atualizar` recebe apenas as barras novas do feed (ex: M1) e
+    atualiza, para cada timeframe, as barras fechadas e a barra em formação. Assim
+    um único feed alimenta H1, H4 e D1 sem consultas extras ao terminal.
+    """
+
+    def __init__(self, timeframes, max_barras=MAX_BARRAS_AGREGADAS):
+        """
+        Args:
+            timeframes (list): Timeframes agregados (ex: ['H1', 'H4', 'D1']).
+            max_barras (int): Barras fechadas mantidas por timeframe.
+        """
+        self.timeframes = [nome_timeframe(timeframe) for timeframe in timeframes]
+        for timeframe in self.timeframes:
+            # Semanas não começam em múltiplos da duração a partir da época
+            if DURACAO_TIMEFRAME.get(timeframe, np.inf) > DURACAO_TIMEFRAME['D1']:
+                raise ValueError(f"Timeframe não suportado na agregação: {timeframe}")
+
+        self.max_barras = max_barras
+        self.fechadas = {timeframe: np.zeros(0, dtype=DTYPE_BARRAS) for timeframe in self.timeframes}
+        self.em_formacao = {timeframe: None for timeframe in self.timeframes}
+        self.ultimo_tempo = None
+
+    def semear(self, timeframe, barras):
+        """
+        Carrega barras fechadas de um timeframe (ex: buscadas uma única vez no início).
+
+        Args:
+            timeframe: Timeframe das barras.
+            barras (np.ndarray): Barras fechadas com dtype DTYPE_BARRAS.
+        """
+        timeframe = nome_timeframe(timeframe)
+        self.fechadas[timeframe] = np.array(barras[-self.max_barras:], dtype=DTYPE_BARRAS)
+        self.em_formacao[timeframe] = None
+
+    def inicio_feed(self):
+        """
+        Retorna a partir de quando o feed precisa de barras para completar os timeframes.
+
+        Returns:
+            int: Tempo em segundos (exclusivo) da última barra já consumida, ou None
+                se nenhum timeframe tem barras.
+        """
+        if self.ultimo_tempo is not None:
+            return self.ultimo_tempo
+
+        inicios = [int(self.fechadas[tf]['time'][-1]) + DURACAO_TIMEFRAME[tf] - 1
+                   for tf in self.timeframes if len(self.fechadas[tf]) > 0]
+        return min(inicios) if inicios else None
+
+    def atualizar(self, barras_feed):
+        """
+        Incorpora barras novas do feed a todos os timeframes.
+
+        Args:
+            barras_feed (np.ndarray): Barras fechadas do feed com dtype DTYPE_BARRAS,
+                ordenadas por tempo. Barras já consumidas são ignoradas.
+
+        Returns:
+            dict: Número de barras que fecharam em cada timeframe.
+        """
+        if self.ultimo_tempo is not None:
+            barras_feed = barras_feed[barras_feed['time'] > self.ultimo_tempo]
+        if len(barras_feed) == 0:
+            return {timeframe: 0 for timeframe in self.timeframes}
+
+        novas_fechadas = {}
+        for timeframe in self.timeframes:
+            duracao = DURACAO_TIMEFRAME[timeframe]
+
+            # Ignorar barras do feed que pertencem a barras já fechadas (semeadas)
+            barras = barras_feed
+            if len(self.fechadas[timeframe]) > 0:
+                barras = barras[barras['time'] // duracao * duracao > self.fechadas[timeframe]['time'][-1]]
+
+            # Continuar a barra em formação com as barras novas
+            if self.em_formacao[timeframe] is not None:
+                barras = np.concatenate((self.em_formacao[timeframe], barras))
+            agregadas = agregar_barras(barras, duracao)
+            if len(agregadas) == 0:
+                novas_fechadas[timeframe] = 0
+                continue
+
+            # A última barra agregada continua aberta até chegar barra do próximo intervalo
+            self.em_formacao[timeframe] = agregadas[-1:]
+            fechadas = agregadas[:-1]
+            novas_fechadas[timeframe] = len(fechadas)
+            if len(fechadas) > 0:
+                self.fechadas[timeframe] = np.concatenate((self.fechadas[timeframe], fechadas))[-self.max_barras:]
+
+        self.ultimo_tempo = int(barras_feed['time'][-1])
+
+        return novas_fechadas
+
+    def tempo_candle_atual(self, timeframe):
+        """
+        Retorna o tempo de abertura do candle atual (em formação) de um timeframe.
+
+        Args:
+            timeframe: Timeframe consultado.
+
+        Returns:
+            int: Tempo em segundos, ou None se ainda não há barras.
+        """
+        timeframe = nome_timeframe(timeframe)
+        if self.em_formacao[timeframe] is not None:
+            return int(self.em_formacao[timeframe]['time'][0])
+        if len(self.fechadas[timeframe]) > 0:
+            return int(self.fechadas[timeframe]['time'][-1])
+        return None
+
+    def tempo_ultima_fechada(self, timeframe):
+        """
+        Retorna o tempo de abertura da última barra fechada de um timeframe.
+
+        Ao contrário de tempo_candle_atual, não muda quando o feed entrega a primeira
+        barra do candle seguinte, só quando uma barra fecha.
+
+        Args:
+            timeframe: Timeframe consultado.
+
+        Returns:
+            int: Tempo em segundos, ou None se ainda não há barras fechadas.
+        """
+        timeframe = nome_timeframe(timeframe)
+        if len(self.fechadas[timeframe]) > 0:
+            return int(self.fechadas[timeframe]['time'][-1])
+        return None
+
+    def barras(self, timeframe, incluir_em_formacao=True):
+        """
+        Retorna as barras de um timeframe.
+
+        Args:
+            timeframe: Timeframe consultado.
+            incluir_em_formacao (bool): Se True, inclui a barra em formação no final,
+                como faz mt5.copy_rates_from_pos a partir da posição 0.
+
+        Returns:
+            np.ndarray: Barras com dtype DTYPE_BARRAS.
+        """
+        timeframe = nome_timeframe(timeframe)
+        if incluir_em_formacao and self.em_formacao[timeframe] is not None:
+            return np.concatenate((self.fechadas[timeframe], self.em_formacao[timeframe]))
+        return self.fechadas[timeframe]
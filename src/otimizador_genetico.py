@@ -0,0 +1,533 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from src.config import ATIVOS, TIMEFRAMES, MIN_TRADES_FOR_AI
+from src.historico import ler_barras, barras_para_dataframe
+from src.armazem_caracteristicas import atualizar_armazem, ler_caracteristicas
+from src.indicators import calcular_bandas_bollinger, calcular_adx
+from src.strategy import gerar_sinais
+from src.risk_management import calcular_niveis_vetorizado
+from src.ai_model import CARACTERISTICAS, PARAMETROS_PADRAO, carregar_hiperparametros
+from src.metricas import calcular_metricas
+from src.execucao import ModeloExecucao
+from src.construtor_dataset import construir_dataset_ativo
+
+# Diretório do cache de aptidão e do estado das otimizações
+OTIMIZACAO_DIR = "data/otimizacao"
+
+# Versão do formato da avaliação (muda a chave do cache quando a simulação muda)
+FORMATO_OTIMIZACAO = 2
+
+# Janelas de tempo das probabilidades walk-forward do filtro de IA (a primeira fica sem modelo)
+JANELAS_WALK_FORWARD = 5
+
+# Valores possíveis de cada parâmetro da estratégia (um gene por parâmetro).
+# multiplicador_atr_sl afasta o SL da entrada para pelo menos esse múltiplo do ATR
+# (0 mantém o SL no extremo do candle do sinal, como no robô); limiar_ia 0 desliga o filtro
+ESPACO_GENETICO = {
+    'bb_periodo': list(range(10, 41, 2)),
+    'bb_desvio': [1.5, 1.75, 2.0, 2.25, 2.5, 2.75, 3.0],
+    'adx_periodo': [7, 10, 14, 20, 28],
+    'limiar_adx': [15, 20, 25, 30, 35, 40],
+    'tp_opcao': [1, 2],
+    'multiplicador_atr_sl': [0.0, 0.5, 1.0, 1.5, 2.0, 3.0],
+    'limiar_ia': [0.0, 0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7],
+}
+GENES = list(ESPACO_GENETICO)
+
+# Métrica (de calcular_metricas) maximizada no período de treino
+METRICA_APTIDAO = 'sharpe'
+
+# Genomas com menos trades que isso no período recebem a pior aptidão
+MIN_TRADES_APTIDAO = 20
+
+def probabilidades_walk_forward(dados, exemplos):
+    """
+    Calcula a probabilidade de lucro de cada barra com modelos treinados só com o passado.
+
+    O intervalo é dividido em JANELAS_WALK_FORWARD janelas de tempo iguais. As barras de
+    cada janela são avaliadas por uma floresta treinada com os exemplos cuja saída é
+    anterior ao início da janela, de modo que o filtro de IA nunca conhece o resultado
+    dos trades que filtra. Sem exemplos suficientes (como na primeira janela), as
+    probabilidades ficam NaN e o filtro não recusa sinais.
+
+    Args:
+        dados (dict): {ativo: {'barras', 'caracteristicas'}} de cada ativo.
+        exemplos (pd.DataFrame): Exemplos de treino de todos os ativos (construir_dataset_ativo).
+
+    Returns:
+        dict: {ativo: probabilidade de lucro de cada barra}.
+    """
+    # O scikit-learn só é necessário aqui; a inferência do robô usa a floresta compacta
+    from sklearn.ensemble import RandomForestClassifier
+
+    probabilidades = {ativo: np.full(len(dados[ativo]['barras']), np.nan) for ativo in dados}
+    if len(exemplos) < MIN_TRADES_FOR_AI:
+        return probabilidades
+
+    tempos = np.concatenate([dados[ativo]['barras']['time'] for ativo in dados])
+    limites = np.linspace(tempos.min(), tempos.max() + 1, JANELAS_WALK_FORWARD + 1)
+    saidas = exemplos['data_saida'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    hiperparametros = carregar_hiperparametros()
+    parametros = hiperparametros['parametros'] if hiperparametros else PARAMETROS_PADRAO
+
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        treino = exemplos[saidas < inicio]
+        if len(treino) < MIN_TRADES_FOR_AI or treino['resultado'].nunique() < 2:
+            continue
+        modelo = RandomForestClassifier(random_state=42, **parametros)
+        modelo.fit(treino[CARACTERISTICAS].to_numpy(dtype=float), treino['resultado'].to_numpy(dtype=int))
+        classe = list(modelo.classes_).index(1)
+
+        for ativo in dados:
+            janela = (dados[ativo]['barras']['time'] >= inicio) & (dados[ativo]['barras']['time'] < fim)
+            if janela.any():
+                linhas = dados[ativo]['caracteristicas'][janela]
+                X = np.column_stack([linhas[nome] for nome in CARACTERISTICAS]).astype(float)
+                probabilidades[ativo][janela] = modelo.predict_proba(X)[:, classe]
+
+    return probabilidades
+
+def carregar_dados_otimizacao(ativos, timeframe, inicio=None, fim=None, modelo_execucao=None):
+    """
+    Lê do histórico local as barras, o ATR e a probabilidade do filtro de IA de cada ativo.
+
+    A probabilidade de lucro é calculada uma única vez para todas as barras, com as
+    características do armazém e modelos walk-forward treinados com os sinais da
+    estratégia atual (probabilidades_walk_forward); cada genoma só aplica o seu limiar.
+
+    Args:
+        ativos (list): Símbolos dos ativos.
+        timeframe: Timeframe das barras gravadas.
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        modelo_execucao (ModeloExecucao): Modelo de execução que rotula os exemplos de treino.
+
+    Returns:
+        dict: {ativo: {'barras', 'atr', 'probabilidades'}} (probabilidades NaN sem modelo).
+    """
+    dados = {}
+    partes = []
+    for ativo in ativos:
+        barras = ler_barras(ativo, timeframe, inicio, fim)
+        if len(barras) < 25:
+            continue
+
+        atualizar_armazem(ativo, timeframe)
+        dados[ativo] = {'barras': barras, 'caracteristicas': ler_caracteristicas(ativo, timeframe, inicio, fim)}
+        partes.append(construir_dataset_ativo(ativo, timeframe, inicio, fim, modelo_execucao))
+
+    if not dados:
+        return dados
+
+    exemplos = pd.concat([parte for parte in partes if len(parte) > 0] or partes, ignore_index=True)
+    probabilidades = probabilidades_walk_forward(dados, exemplos)
+    return {ativo: {'barras': dados[ativo]['barras'], 'atr': dados[ativo]['caracteristicas']['atr'].astype(float),
+                    'probabilidades': probabilidades[ativo]} for ativo in dados}
+
+def versao_dados(dados, modelo_execucao):
+    """
+    Identifica o conteúdo dos dados da otimização (barras e probabilidades do modelo)
+    e os custos com que os genomas são simulados.
+
+    Args:
+        dados (dict): Resultado de carregar_dados_otimizacao.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+
+    Returns:
+        str: Hash dos dados e do modelo de execução, usado na chave do cache de aptidão.
+    """
+    resumo = hashlib.sha1(str(FORMATO_OTIMIZACAO).encode())
+    resumo.update(json.dumps(modelo_execucao.parametros(), sort_keys=True).encode())
+    for ativo in sorted(dados):
+        resumo.update(ativo.encode())
+        resumo.update(dados[ativo]['barras'].tobytes())
+        resumo.update(dados[ativo]['probabilidades'].tobytes())
+    return resumo.hexdigest()[:16]
+
+def simular_genoma(ativo, dados_ativo, genoma, modelo_execucao, indicadores=None):
+    """
+    Simula todos os sinais de um ativo com os parâmetros de um genoma.
+
+    Args:
+        ativo (str): Símbolo do ativo.
+        dados_ativo (dict): Barras, ATR e probabilidades do ativo.
+        genoma (dict): Valor de cada parâmetro de ESPACO_GENETICO.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+        indicadores (dict): Cache dos indicadores já calculados para o ativo (opcional).
+
+    Returns:
+        tuple: (lucro, data de entrada, data de saída) de cada trade, como arrays.
+    """
+    if indicadores is None:
+        indicadores = {}
+    barras = dados_ativo['barras']
+    df = barras_para_dataframe(barras)
+
+    # Bandas e ADX são compartilhados pelos genomas com os mesmos períodos
+    chave_bb = ('bb', genoma['bb_periodo'], genoma['bb_desvio'])
+    if chave_bb not in indicadores:
+        bandas = calcular_bandas_bollinger(df, genoma['bb_periodo'], genoma['bb_desvio'])
+        indicadores[chave_bb] = bandas[['bb_upper', 'bb_middle', 'bb_lower']].to_numpy()
+    chave_adx = ('adx', genoma['adx_periodo'])
+    if chave_adx not in indicadores:
+        indicadores[chave_adx] = calcular_adx(df, genoma['adx_periodo'])['adx'].to_numpy()
+    df['bb_upper'], df['bb_middle'], df['bb_lower'] = indicadores[chave_bb].T
+    df['adx'] = indicadores[chave_adx]
+
+    # Mesmo intervalo do backtest; o filtro de IA usa o candle do sinal (i-1)
+    sinais = gerar_sinais(df, genoma['limiar_adx'])
+    indices = np.flatnonzero(sinais)
+    indices = indices[(indices >= 21) & (indices < len(df) - 1)]
+    if genoma['limiar_ia'] > 0:
+        indices = indices[~(dados_ativo['probabilidades'][indices - 1] < genoma['limiar_ia'])]
+    tipos = np.where(sinais[indices] == 1, 'compra', 'venda')
+    compra = tipos == 'compra'
+
+    sl, tp = calcular_niveis_vetorizado(df, indices, tipos, banda_oposta=genoma['tp_opcao'] == 2)
+    if genoma['multiplicador_atr_sl'] > 0:
+        distancia = genoma['multiplicador_atr_sl'] * dados_ativo['atr'][indices - 1]
+        close = barras['close'][indices]
+        sl = np.where(compra, np.fmin(sl, close - distancia), np.fmax(sl, close + distancia))
+
+    tempos = barras['time']
+    open_, high, low, close = barras['open'], barras['high'], barras['low'], barras['close']
+    spreads = barras['spread']
+    lucros = np.empty(len(indices))
+    saidas = np.empty(len(indices), dtype=np.int64)
+    for n, i in enumerate(indices):
+        preco_entrada = modelo_execucao.preco_entrada(ativo, close[i], tipos[n], spreads[i])
+        preco_saida, i_saida = modelo_execucao.simular_saida(
+            ativo, tempos[i + 1:], open_[i + 1:], high[i + 1:], low[i + 1:], close[i + 1:], sl[n], tp[n], tipos[n],
+            spreads[i + 1:]
+        )
+        lucros[n] = modelo_execucao.calcular_lucro(ativo, preco_entrada, preco_saida, tipos[n])
+        saidas[n] = tempos[i + 1 + i_saida]
+
+    return lucros, tempos[indices], saidas
+
+def avaliar_genomas(genomas, dados, corte, modelo_execucao=None):
+    """
+    Avalia vários genomas no mesmo processo, reaproveitando os indicadores entre eles.
+
+    Args:
+        genomas (list): Genomas a avaliar.
+        dados (dict): Resultado de carregar_dados_otimizacao.
+        corte (int): Tempo (segundos) que separa o treino (entradas antes) da validação.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+
+    Returns:
+        list: Para cada genoma, dict com as métricas de 'treino' e de 'validacao'.
+    """
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+
+    indicadores = {ativo: {} for ativo in dados}
+    resultados = []
+    for genoma in genomas:
+        partes = [simular_genoma(ativo, dados[ativo], genoma, modelo_execucao, indicadores[ativo]) for ativo in dados]
+        lucros = np.concatenate([parte[0] for parte in partes]) if partes else np.empty(0)
+        entradas = np.concatenate([parte[1] for parte in partes]) if partes else np.empty(0, dtype=np.int64)
+        saidas = np.concatenate([parte[2] for parte in partes]) if partes else np.empty(0, dtype=np.int64)
+
+        resultado = {}
+        for periodo, selecao in [('treino', entradas < corte), ('validacao', entradas >= corte)]:
+            metricas = calcular_metricas(lucros[selecao], entradas[selecao].astype('datetime64[s]'),
+                                         saidas[selecao].astype('datetime64[s]'))
+            resultado[periodo] = {nome: metricas[nome] for nome in
+                                  ['lucro_total', 'num_trades', 'taxa_acerto', 'fator_lucro', 'drawdown_maximo', 'sharpe']}
+        resultados.append(resultado)
+
+    return resultados
+
+def aptidao(metricas):
+    """
+    Args:
+        metricas (dict): Métricas de um período (treino ou validação).
+
+    Returns:
+        float: METRICA_APTIDAO, ou -inf com menos de MIN_TRADES_APTIDAO trades.
+    """
+    if metricas['num_trades'] < MIN_TRADES_APTIDAO:
+        return float('-inf')
+    return float(metricas[METRICA_APTIDAO])
+
+class CacheAptidao:
+    """
+    Resultado dos backtests já feitos, gravado em disco e compartilhado entre execuções.
+
+    A chave é a versão dos dados mais o valor de cada gene, de modo que um genoma
+    só é simulado de novo se o histórico, as probabilidades do filtro de IA ou os
+    custos do modelo de execução mudarem. O arquivo é um JSON por
+    linha, apenas acrescentado.
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo do cache.
+        """
+        self.caminho = caminho
+        self.resultados = {}
+        if os.path.exists(caminho):
+            with open(caminho) as arquivo:
+                for linha in arquivo:
+                    if not linha.strip():
+                        continue
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        continue  # Linha incompleta de uma execução interrompida
+                    self.resultados[self.chave(registro['versao'], registro['genoma'])] = registro['resultado']
+
+    @staticmethod
+    def chave(versao, genoma):
+        return json.dumps([versao] + [genoma[gene] for gene in GENES])
+
+    def __len__(self):
+        return len(self.resultados)
+
+    def obter(self, versao, genoma):
+        """
+        Returns:
+            dict: Resultado guardado do genoma, ou None se ele ainda não foi avaliado.
+        """
+        return self.resultados.get(self.chave(versao, genoma))
+
+    def adicionar(self, versao, genomas, resultados):
+        """
+        Guarda os resultados de vários genomas.
+
+        Args:
+            versao (str): Versão dos dados.
+            genomas (list): Genomas avaliados.
+            resultados (list): Resultado de cada genoma.
+        """
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        with open(self.caminho, 'a') as arquivo:
+            for genoma, resultado in zip(genomas, resultados):
+                self.resultados[self.chave(versao, genoma)] = resultado
+                arquivo.write(json.dumps({'versao': versao, 'genoma': genoma, 'resultado': resultado}) + "\n")
+
+def genoma_aleatorio(gerador):
+    """
+    Returns:
+        dict: Um valor sorteado para cada gene.
+    """
+    return {gene: ESPACO_GENETICO[gene][gerador.integers(len(ESPACO_GENETICO[gene]))] for gene in GENES}
+
+def proxima_geracao(populacao, aptidoes, gerador, elite=2, torneio=3, taxa_mutacao=0.15):
+    """
+    Gera a próxima população por elitismo, seleção por torneio, cruzamento uniforme e mutação.
+
+    Args:
+        populacao (list): Genomas da geração atual.
+        aptidoes (list): Aptidão de cada genoma.
+        gerador (np.random.Generator): Gerador de números aleatórios.
+        elite (int): Melhores genomas copiados sem alteração.
+        torneio (int): Genomas sorteados em cada torneio.
+        taxa_mutacao (float): Probabilidade de cada gene receber um valor sorteado.
+
+    Returns:
+        list: Genomas da próxima geração.
+    """
+    aptidoes = np.asarray(aptidoes, dtype=float)
+    ordem = np.argsort(-aptidoes, kind='stable')
+    nova = [dict(populacao[i]) for i in ordem[:elite]]
+
+    def selecionar():
+        participantes = gerador.integers(len(populacao), size=torneio)
+        return populacao[participantes[np.argmax(aptidoes[participantes])]]
+
+    while len(nova) < len(populacao):
+        pai, mae = selecionar(), selecionar()
+        filho = {gene: pai[gene] if gerador.random() < 0.5 else mae[gene] for gene in GENES}
+        for gene in GENES:
+            if gerador.random() < taxa_mutacao:
+                valores = ESPACO_GENETICO[gene]
+                filho[gene] = valores[gerador.integers(len(valores))]
+        nova.append(filho)
+
+    return nova
+
+def avaliar_populacao(populacao, dados, versao, corte, cache, processos=None, modelo_execucao=None):
+    """
+    Avalia uma população, simulando em paralelo apenas os genomas que não estão no cache.
+
+    Args:
+        populacao (list): Genomas da geração.
+        dados (dict): Resultado de carregar_dados_otimizacao.
+        versao (str): Versão dos dados.
+        corte (int): Tempo (segundos) que separa o treino da validação.
+        cache (CacheAptidao): Cache de aptidão.
+        processos (int): Número de processos (padrão: número de CPUs). Com 1, roda
+            no processo atual.
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+
+    Returns:
+        tuple: (resultado de cada genoma, número de genomas simulados).
+    """
+    novos = []
+    for genoma in populacao:
+        if cache.obter(versao, genoma) is None and genoma not in novos:
+            novos.append(genoma)
+
+    if novos:
+        # Genomas com os mesmos períodos no mesmo bloco reaproveitam os indicadores
+        novos.sort(key=lambda genoma: (genoma['bb_periodo'], genoma['bb_desvio'], genoma['adx_periodo']))
+        num_blocos = min(len(novos), processos or os.cpu_count() or 1)
+        blocos = [list(bloco) for bloco in np.array_split(np.array(novos, dtype=object), num_blocos)]
+        if num_blocos == 1:
+            resultados = avaliar_genomas(novos, dados, corte, modelo_execucao)
+        else:
+            with ProcessPoolExecutor(max_workers=num_blocos) as executor:
+                resultados = [resultado for parte in executor.map(avaliar_genomas, blocos, repeat(dados), repeat(corte),
+                                                                  repeat(modelo_execucao))
+                              for resultado in parte]
+        cache.adicionar(versao, novos, resultados)
+
+    return [cache.obter(versao, genoma) for genoma in populacao], len(novos)
+
+def salvar_estado(caminho, estado):
+    """
+    Grava o estado da otimização ao fim de uma geração (escrita atômica).
+    """
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    caminho_temporario = caminho + ".tmp"
+    with open(caminho_temporario, 'w') as arquivo:
+        json.dump(estado, arquivo, indent=2)
+    os.replace(caminho_temporario, caminho)
+
+def otimizar_parametros(ativos=None, timeframe=None, inicio=None, fim=None, fracao_treino=0.7, tamanho_populacao=40,
+                        geracoes=30, elite=2, torneio=3, taxa_mutacao=0.15, paciencia=5, semente=None,
+                        nome='otimizacao', diretorio=None, processos=None, modelo_execucao=None):
+    """
+    Otimiza os parâmetros da estratégia com um algoritmo genético.
+
+    Cada genoma é simulado no histórico local (sinais, SL/TP e saídas pelo modelo de
+    execução, como no construtor do conjunto de treino) e recebe como aptidão a
+    METRICA_APTIDAO dos trades com entrada no período de treino (a primeira
+    `fracao_treino` do intervalo). O melhor genoma de cada geração é medido também no
+    período de validação, e a busca para quando a melhor validação não melhora por
+    `paciencia` gerações.
+
+    Os resultados ficam no cache de aptidão (OTIMIZACAO_DIR/cache_aptidao.jsonl), de
+    modo que genomas repetidos, nesta ou em outras execuções, não são simulados de
+    novo. O estado é gravado a cada geração em OTIMIZACAO_DIR/<nome>.json; chamar de
+    novo com o mesmo nome continua a busca de onde parou, se os dados não mudaram.
+
+    Args:
+        ativos (list): Símbolos dos ativos (padrão: ATIVOS).
+        timeframe: Timeframe das barras gravadas (padrão: primeiro de TIMEFRAMES).
+        inicio: Data inicial do intervalo (None para o início do histórico).
+        fim: Data final do intervalo (None para o fim do histórico).
+        fracao_treino (float): Fração inicial do intervalo usada no treino.
+        tamanho_populacao (int): Genomas por geração.
+        geracoes (int): Número máximo de gerações (contando as já feitas).
+        elite (int): Melhores genomas copiados para a próxima geração.
+        torneio (int): Genomas sorteados em cada torneio.
+        taxa_mutacao (float): Probabilidade de cada gene receber um valor sorteado.
+        paciencia (int): Gerações sem melhora na validação até a parada antecipada.
+        semente (int): Semente da busca (None para aleatória).
+        nome (str): Nome da otimização (arquivo de estado).
+        diretorio (str): Diretório do cache e do estado (padrão: OTIMIZACAO_DIR).
+        processos (int): Número de processos (padrão: número de CPUs).
+        modelo_execucao (ModeloExecucao): Modelo de execução dos trades simulados.
+
+    Returns:
+        dict: Estado final, com o 'melhor' genoma (e suas métricas de treino e validação),
+            o 'historico' de cada geração e o número de 'simulacoes' feitas nesta chamada.
+    """
+    if ativos is None:
+        ativos = ATIVOS
+    if timeframe is None:
+        timeframe = TIMEFRAMES[0]
+    if diretorio is None:
+        diretorio = OTIMIZACAO_DIR
+    if modelo_execucao is None:
+        modelo_execucao = ModeloExecucao()
+
+    dados = carregar_dados_otimizacao(ativos, timeframe, inicio, fim, modelo_execucao)
+    if not dados:
+        raise ValueError("Sem histórico local suficiente para a otimização")
+    versao = versao_dados(dados, modelo_execucao)
+
+    tempos = np.concatenate([dados[ativo]['barras']['time'] for ativo in dados])
+    corte = int(tempos.min() + fracao_treino * (tempos.max() - tempos.min()))
+
+    cache = CacheAptidao(os.path.join(diretorio, 'cache_aptidao.jsonl'))
+    caminho_estado = os.path.join(diretorio, f"{nome}.json")
+
+    # Continuar a busca anterior se os dados e o corte forem os mesmos
+    estado = None
+    if os.path.exists(caminho_estado):
+        with open(caminho_estado) as arquivo:
+            estado = json.load(arquivo)
+        if estado['versao_dados'] != versao or estado['corte'] != corte:
+            print(f"Dados mudaram desde a otimização '{nome}'. Recomeçando.")
+            estado = None
+
+    gerador = np.random.default_rng(semente)
+    if estado is None:
+        estado = {
+            'versao_dados': versao,
+            'corte': corte,
+            'geracao': 0,
+            'populacao': [genoma_aleatorio(gerador) for _ in range(tamanho_populacao)],
+            'melhor': None,
+            'sem_melhora': 0,
+            'historico': [],
+        }
+    else:
+        gerador.bit_generator.state = estado['gerador']
+
+    simulacoes = 0
+    while estado['geracao'] < geracoes and estado['sem_melhora'] < paciencia:
+        resultados, novos = avaliar_populacao(estado['populacao'], dados, versao, corte, cache, processos, modelo_execucao)
+        simulacoes += novos
+        aptidoes = [aptidao(resultado['treino']) for resultado in resultados]
+
+        # O melhor do treino nesta geração só substitui o melhor geral se validar melhor
+        i_melhor = int(np.argmax(aptidoes))
+        aptidao_validacao = aptidao(resultados[i_melhor]['validacao'])
+        if estado['melhor'] is None or aptidao_validacao > estado['melhor']['aptidao_validacao']:
+            estado['melhor'] = {
+                'genoma': estado['populacao'][i_melhor],
+                'aptidao_treino': aptidoes[i_melhor],
+                'aptidao_validacao': aptidao_validacao,
+                'treino': resultados[i_melhor]['treino'],
+                'validacao': resultados[i_melhor]['validacao'],
+                'geracao': estado['geracao'],
+            }
+            estado['sem_melhora'] = 0
+        else:
+            estado['sem_melhora'] += 1
+
+        estado['historico'].append({
+            'geracao': estado['geracao'],
+            'melhor_treino': aptidoes[i_melhor],
+            'validacao_do_melhor': aptidao_validacao,
+            'media_treino': float(np.mean([a for a in aptidoes if np.isfinite(a)])) if np.isfinite(aptidoes).any() else None,
+            'simulacoes': novos,
+        })
+        print(f"Geração {estado['geracao']}: melhor treino {aptidoes[i_melhor]:.3f}, "
+              f"validação {aptidao_validacao:.3f}, {novos} simulações")
+
+        estado['geracao'] += 1
+        estado['populacao'] = proxima_geracao(estado['populacao'], aptidoes, gerador, elite, torneio, taxa_mutacao)
+        estado['gerador'] = gerador.bit_generator.state
+        salvar_estado(caminho_estado, estado)
+
+    estado['simulacoes'] = simulacoes
+    return estado
+
+if __name__ == "__main__":
+    resultado = otimizar_parametros()
+    if resultado['melhor'] is not None:
+        print(f"Melhores parâmetros: {resultado['melhor']['genoma']}")
+        print(f"Treino: {resultado['melhor']['treino']}")
+        print(f"Validação: {resultado['melhor']['validacao']}")
@@ -0,0 +1,447 @@
+import os
+import sys
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Diretório dos perfis gravados (pilhas e snapshots de memória)
+PERFIL_DIR = "data/perfil"
+
+# Arquivo de comandos lido pelo controle do perfilador (uma linha por comando)
+ARQUIVO_CONTROLE_PERFIL = os.path.join(PERFIL_DIR, "controle")
+
+# Comandos aceitos pelo arquivo de controle e pela linha de comando
+COMANDOS_PERFIL = ['iniciar', 'parar', 'alternar', 'memoria', 'parar_memoria']
+
+INTERVALO_AMOSTRAGEM = 0.01      # Segundos entre amostras das pilhas (100 Hz)
+INTERVALO_CONTROLE = 1.0         # Segundos entre leituras do arquivo de controle
+QUADROS_MEMORIA = 25             # Quadros guardados por alocação no tracemalloc
+TOP_ALOCACOES = 25               # Linhas de cada seção do relatório de memória
+
+# Threads do próprio perfilador, que não entram nas amostras
+PREFIXO_THREADS = "perfilador"
+
+def caminho_perfil(diretorio, prefixo, extensao="txt"):
+    """
+    Monta o caminho de um arquivo de perfil com a data e hora atuais.
+
+    Args:
+        diretorio (str): Diretório dos perfis.
+        prefixo (str): Início do nome do arquivo (ex: 'pilhas').
+        extensao (str): Extensão do arquivo.
+
+    Returns:
+        str: Caminho do arquivo (o diretório é criado se necessário).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    return os.path.join(diretorio, f"{prefixo}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{extensao}")
+
+class AmostradorPilhas:
+    """
+    Perfilador por amostragem das pilhas de todas as threads do processo.
+
+    Uma thread separada lê as pilhas com sys._current_frames() a cada `intervalo`
+    segundos, sem instrumentar as funções, e conta quantas vezes cada pilha foi
+    vista. O resultado é gravado no formato de pilhas colapsadas
+    ("thread;arquivo:funcao;... contagem"), aceito por flamegraph.pl e speedscope.
+    """
+
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM):
+        """
+        Args:
+            intervalo (float): Segundos entre amostras.
+        """
+        self.intervalo = intervalo
+        self.contagens = Counter()
+        self.amostras = 0
+        self.rotulos = {}
+        self.ativo = False
+        self.thread = None
+
+    def rotulo(self, codigo):
+        """
+        Nome de um quadro na pilha colapsada, guardado por objeto de código.
+
+        Args:
+            codigo: Objeto de código do quadro (frame.f_code).
+
+        Returns:
+            str: 'arquivo:funcao'.
+        """
+        rotulo = self.rotulos.get(codigo)
+        if rotulo is None:
+            rotulo = f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+            self.rotulos[codigo] = rotulo
+        return rotulo
+
+    def amostrar(self):
+        """
+        Registra a pilha atual de cada thread, exceto as do perfilador.
+        """
+        nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, quadro in sys._current_frames().items():
+            nome = nomes.get(ident, str(ident))
+            if nome.startswith(PREFIXO_THREADS):
+                continue
+
+            pilha = []
+            while quadro is not None:
+                pilha.append(self.rotulo(quadro.f_code))
+                quadro = quadro.f_back
+            pilha.append(nome)
+            self.contagens[';'.join(reversed(pilha))] += 1
+
+        self.amostras += 1
+
+    def executar(self):
+        """
+        Amostra as pilhas até `parar` ser chamado.
+        """
+        while self.ativo:
+            inicio = time.perf_counter()
+            self.amostrar()
+            time.sleep(max(0.0, self.intervalo - (time.perf_counter() - inicio)))
+
+    def iniciar(self):
+        """
+        Inicia a amostragem em uma thread separada, descartando as amostras anteriores.
+        """
+        if self.ativo:
+            return
+        self.contagens = Counter()
+        self.amostras = 0
+        self.ativo = True
+        self.thread = threading.Thread(target=self.executar, name=f"{PREFIXO_THREADS}-amostragem", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        """
+        Interrompe a amostragem (as amostras continuam disponíveis para `salvar`).
+        """
+        self.ativo = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def salvar(self, caminho):
+        """
+        Grava as pilhas colapsadas, da mais frequente para a menos frequente.
+
+        Args:
+            caminho (str): Caminho do arquivo.
+
+        Returns:
+            str: Caminho do arquivo gravado.
+        """
+        with open(caminho, 'w') as arquivo:
+            for pilha, contagem in self.contagens.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+        return caminho
+
+class MonitorMemoria:
+    """
+    Snapshots de memória com tracemalloc, comparados com o snapshot anterior.
+
+    O rastreamento começa no primeiro snapshot, então o primeiro relatório mostra
+    apenas o que foi alocado depois disso; os seguintes mostram as linhas que mais
+    cresceram desde o anterior.
+    """
+
+    def __init__(self, quadros=QUADROS_MEMORIA, top=TOP_ALOCACOES):
+        """
+        Args:
+            quadros (int): Quadros guardados por alocação.
+            top (int): Linhas de cada seção do relatório.
+        """
+        self.quadros = quadros
+        self.top = top
+        self.anterior = None
+
+    def snapshot(self):
+        """
+        Tira um snapshot das alocações rastreadas, iniciando o rastreamento se necessário.
+
+        Returns:
+            tracemalloc.Snapshot: Snapshot sem as alocações do próprio tracemalloc e do importlib.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.quadros)
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+
+    def salvar(self, caminho):
+        """
+        Tira um snapshot e grava as maiores alocações e as maiores diferenças desde o anterior.
+
+        Args:
+            caminho (str): Caminho do relatório.
+
+        Returns:
+            str: Caminho do relatório gravado.
+        """
+        snapshot = self.snapshot()
+        atual, pico = tracemalloc.get_traced_memory()
+
+        with open(caminho, 'w') as arquivo:
+            arquivo.write(f"# Snapshot de memória {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+            arquivo.write(f"# Memória rastreada: {atual / 2**20:.1f} MiB (pico {pico / 2**20:.1f} MiB)\n")
+
+            if self.anterior is not None:
+                arquivo.write("\n## Maiores diferenças desde o snapshot anterior\n")
+                for diferenca in snapshot.compare_to(self.anterior, 'lineno')[:self.top]:
+                    arquivo.write(f"{diferenca}\n")
+
+            arquivo.write("\n## Maiores alocações\n")
+            for estatistica in snapshot.statistics('lineno')[:self.top]:
+                arquivo.write(f"{estatistica}\n")
+
+            # Pilha completa da maior alocação, para achar quem a originou
+            por_pilha = snapshot.statistics('traceback')
+            if por_pilha:
+                arquivo.write("\n## Pilha da maior alocação\n")
+                arquivo.write('\n'.join(por_pilha[0].traceback.format()) + '\n')
+
+        self.anterior = snapshot
+        return caminho
+
+    def parar(self):
+        """
+        Interrompe o rastreamento das alocações.
+        """
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.anterior = None
+
+class ControlePerfil:
+    """
+    Liga e desliga o perfilador com o processo em execução, sem parar o robô.
+
+    Os comandos chegam pelo arquivo de controle (um comando por linha, o arquivo é
+    apagado depois de lido) ou, onde existem, pelos sinais SIGUSR1 (alterna a
+    amostragem das pilhas) e SIGUSR2 (snapshot de memória). Ao parar a amostragem,
+    as pilhas são gravadas em `diretorio`.
+    """
+
+    def __init__(self, diretorio=PERFIL_DIR, arquivo_controle=None, intervalo_controle=INTERVALO_CONTROLE,
+                 intervalo_amostragem=INTERVALO_AMOSTRAGEM):
+        """
+        Args:
+            diretorio (str): Diretório dos perfis gravados.
+            arquivo_controle (str): Arquivo de comandos (padrão: `controle` em `diretorio`).
+            intervalo_controle (float): Segundos entre leituras do arquivo de controle.
+            intervalo_amostragem (float): Segundos entre amostras das pilhas.
+        """
+        self.diretorio = diretorio
+        self.arquivo_controle = arquivo_controle or os.path.join(diretorio, "controle")
+        self.intervalo_controle = intervalo_controle
+        self.amostrador = AmostradorPilhas(intervalo_amostragem)
+        self.monitor = MonitorMemoria()
+        self.trava = threading.RLock()
+        self.ativo = False
+        self.thread = None
+        self.sinais_originais = {}
+
+    def iniciar_amostragem(self):
+        """
+        Começa a amostrar as pilhas.
+        """
+        with self.trava:
+            if not self.amostrador.ativo:
+                self.amostrador.iniciar()
+                print("Perfilador: amostragem das pilhas iniciada")
+
+    def parar_amostragem(self):
+        """
+        Para a amostragem e grava as pilhas colapsadas.
+
+        Returns:
+            str: Caminho das pilhas gravadas, ou None se a amostragem não estava ativa.
+        """
+        with self.trava:
+            if not self.amostrador.ativo:
+                return None
+            self.amostrador.parar()
+            caminho = self.amostrador.salvar(caminho_perfil(self.diretorio, "pilhas"))
+            print(f"Perfilador: {self.amostrador.amostras} amostras gravadas em {caminho}")
+            return caminho
+
+    def alternar_amostragem(self):
+        """
+        Inicia a amostragem se estiver parada, ou para e grava se estiver ativa.
+        """
+        with self.trava:
+            if self.amostrador.ativo:
+                return self.parar_amostragem()
+            self.iniciar_amostragem()
+            return None
+
+    def snapshot_memoria(self):
+        """
+        Grava um relatório de memória comparado com o snapshot anterior.
+
+        Returns:
+            str: Caminho do relatório.
+        """
+        with self.trava:
+            caminho = self.monitor.salvar(caminho_perfil(self.diretorio, "memoria"))
+            print(f"Perfilador: snapshot de memória gravado em {caminho}")
+            return caminho
+
+    def parar_memoria(self):
+        """
+        Desliga o tracemalloc, que deixa cada alocação mais lenta enquanto está ativo.
+
+        O próximo snapshot recomeça o rastreamento sem comparação com os anteriores.
+
+        Returns:
+            bool: True se o rastreamento estava ativo.
+        """
+        with self.trava:
+            ativo = tracemalloc.is_tracing()
+            self.monitor.parar()
+            if ativo:
+                print("Perfilador: rastreamento de memória desligado")
+            return ativo
+
+    def executar_comando(self, comando):
+        """
+        Executa um comando do perfilador.
+
+        Args:
+            comando (str): Um dos COMANDOS_PERFIL.
+        """
+        acoes = {
+            'iniciar': self.iniciar_amostragem,
+            'parar': self.parar_amostragem,
+            'alternar': self.alternar_amostragem,
+            'memoria': self.snapshot_memoria,
+            'parar_memoria': self.parar_memoria,
+        }
+        if comando not in acoes:
+            print(f"Perfilador: comando desconhecido '{comando}'")
+            return None
+        return acoes[comando]()
+
+    def verificar_controle(self):
+        """
+        Executa e consome os comandos do arquivo de controle, se houver.
+
+        Returns:
+            list: Comandos executados.
+        """
+        if not os.path.exists(self.arquivo_controle):
+            return []
+        try:
+            with open(self.arquivo_controle) as arquivo:
+                comandos = [linha.strip().lower() for linha in arquivo if linha.strip()]
+            os.remove(self.arquivo_controle)
+        except OSError as erro:
+            print(f"Perfilador: erro ao ler o arquivo de controle: {erro}")
+            return []
+
+        for comando in comandos:
+            self.executar_comando(comando)
+        return comandos
+
+    def executar(self):
+        """
+        Lê o arquivo de controle até `parar` ser chamado.
+        """
+        while self.ativo:
+            self.verificar_controle()
+            time.sleep(self.intervalo_controle)
+
+    def instalar_sinais(self):
+        """
+        Associa SIGUSR1 e SIGUSR2 ao perfilador (apenas na thread principal e em sistemas POSIX).
+
+        Returns:
+            bool: True se os sinais foram instalados.
+        """
+        if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+            return False
+        self.sinais_originais = {
+            signal.SIGUSR1: signal.signal(signal.SIGUSR1, lambda numero, quadro: self.alternar_amostragem()),
+            signal.SIGUSR2: signal.signal(signal.SIGUSR2, lambda numero, quadro: self.snapshot_memoria()),
+        }
+        return True
+
+    def iniciar(self):
+        """
+        Começa a escutar os comandos, sem amostrar até receber 'iniciar' ou 'alternar'.
+        """
+        self.instalar_sinais()
+        self.ativo = True
+        self.thread = threading.Thread(target=self.executar, name=f"{PREFIXO_THREADS}-controle", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        """
+        Para de escutar os comandos e grava a amostragem em andamento.
+        """
+        self.ativo = False
+        if self.thread is not None:
+            self.thread.join(timeout=self.intervalo_controle + 1)
+            self.thread = None
+        for numero, tratador in self.sinais_originais.items():
+            signal.signal(numero, tratador)
+        self.sinais_originais = {}
+        self.parar_amostragem()
+        self.monitor.parar()
+
+@contextmanager
+def perfilar(diretorio=PERFIL_DIR, memoria=False, intervalo=INTERVALO_AMOSTRAGEM):
+    """
+    Amostra as pilhas durante um bloco de código (ex: um backtest longo).
+
+    Exemplo:
+        with perfilar():
+            executar_backtest(ativo, df)
+
+    Args:
+        diretorio (str): Diretório dos perfis gravados.
+        memoria (bool): Se True, grava também snapshots de memória no início e no fim.
+        intervalo (float): Segundos entre amostras.
+
+    Yields:
+        ControlePerfil: Controle do perfilador, para snapshots intermediários.
+    """
+    controle = ControlePerfil(diretorio, intervalo_amostragem=intervalo)
+    if memoria:
+        controle.snapshot_memoria()
+    controle.iniciar_amostragem()
+    try:
+        yield controle
+    finally:
+        controle.parar_amostragem()
+        if memoria:
+            controle.snapshot_memoria()
+            controle.monitor.parar()
+
+def enviar_comando(comando, arquivo_controle=ARQUIVO_CONTROLE_PERFIL):
+    """
+    Pede um comando ao perfilador de um processo em execução, pelo arquivo de controle.
+
+    Args:
+        comando (str): Um dos COMANDOS_PERFIL.
+        arquivo_controle (str): Arquivo de comandos lido pelo processo.
+    """
+    if comando not in COMANDOS_PERFIL:
+        raise ValueError(f"Comando do perfilador desconhecido: {comando}")
+    os.makedirs(os.path.dirname(arquivo_controle) or '.', exist_ok=True)
+    with open(arquivo_controle, 'a') as arquivo:
+        arquivo.write(comando + '\n')
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in COMANDOS_PERFIL:
+        print(f"Uso: python -m src.perfilador {{{'|'.join(COMANDOS_PERFIL)}}}")
+        sys.exit(1)
+    enviar_comando(sys.argv[1])
+    print(f"Comando '{sys.argv[1]}' enviado ao perfilador ({ARQUIVO_CONTROLE_PERFIL})")
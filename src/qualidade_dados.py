@@ -0,0 +1,333 @@
+import numpy as np
+from src.historico import converter_para_barras, converter_tempo, nome_timeframe, DURACAO_TIMEFRAME
+
+# Marcações de cada barra (bits combináveis) devolvidas em relatorio['flags']
+FLAG_FORA_DE_ORDEM = 1    # Tempo anterior ao da barra anterior
+FLAG_DUPLICADA = 2        # Outra barra com o mesmo tempo vem logo depois
+FLAG_OHLC_INVALIDO = 4    # Máxima/mínima incoerentes com abertura e fechamento, preço nulo ou NaN
+FLAG_AMPLITUDE_ZERO = 8   # Máxima igual à mínima
+FLAG_OUTLIER = 16         # Pico isolado: salto muito grande seguido de retorno ao nível anterior
+FLAG_APOS_LACUNA = 32     # Primeira barra depois de barras faltantes
+FLAG_PREENCHIDA = 64      # Barra criada para preencher uma lacuna
+
+# Retornos acima deste múltiplo do desvio robusto (MAD) dos retornos contam como salto
+LIMIAR_OUTLIER = 12
+
+# Lacunas de fim de semana: da sexta (ou sábado) ao domingo (ou segunda), em até 3 dias
+DIAS_SEMANA_ANTES_FIM_DE_SEMANA = (4, 5)
+DIAS_SEMANA_DEPOIS_FIM_DE_SEMANA = (6, 0)
+DURACAO_MAXIMA_FIM_DE_SEMANA = 3 * 86400
+
+# Metadados de cada lacuna
+DTYPE_LACUNA = np.dtype([
+    ('indice', '<i8'),            # Posição da primeira barra real depois da lacuna
+    ('inicio', '<i8'),            # Tempo da última barra antes da lacuna
+    ('fim', '<i8'),               # Tempo da primeira barra real depois da lacuna
+    ('barras_faltantes', '<i8'),
+    ('fim_de_semana', '?'),
+    ('preenchida', '?'),
+    ('salto', '<f8'),             # Abertura depois da lacuna menos o fechamento antes dela
+])
+
+def dia_semana(tempos):
+    """
+    Dia da semana (segunda = 0) de tempos em segundos desde a época.
+
+    Args:
+        tempos (np.ndarray): Tempos em segundos.
+
+    Returns:
+        np.ndarray: Dia da semana de cada tempo.
+    """
+    # 01/01/1970 foi uma quinta-feira
+    return (tempos // 86400 + 3) % 7
+
+class MapaLacunas:
+    """
+    Lacunas de um conjunto de barras, consultáveis em O(1) pela posição ou pelo tempo.
+
+    Cada lacuna é indexada pela primeira barra real que vem depois dela, de modo que
+    o modelo de execução e a estratégia podem perguntar, para qualquer barra, se ela
+    abre depois de barras faltantes (e de quanto foi o salto de preço).
+    """
+
+    def __init__(self, lacunas):
+        """
+        Args:
+            lacunas (np.ndarray): Lacunas com dtype DTYPE_LACUNA, em ordem de tempo.
+        """
+        self.lacunas = lacunas
+        posicoes = range(len(lacunas))
+        self.por_indice = dict(zip(lacunas['indice'].tolist(), posicoes))
+        self.por_tempo = dict(zip(lacunas['fim'].tolist(), posicoes))
+
+    def __len__(self):
+        return len(self.lacunas)
+
+    def lacuna_antes(self, indice):
+        """
+        Retorna a lacuna que termina na barra `indice`.
+
+        Args:
+            indice (int): Posição da barra.
+
+        Returns:
+            np.void: Registro com os campos de DTYPE_LACUNA, ou None se a barra não vem depois de uma lacuna.
+        """
+        posicao = self.por_indice.get(int(indice))
+        return None if posicao is None else self.lacunas[posicao]
+
+    def lacuna_em(self, tempo):
+        """
+        Retorna a lacuna que termina na barra com o tempo dado.
+
+        Args:
+            tempo: Tempo de abertura da barra (datetime, texto ou segundos).
+
+        Returns:
+            np.void: Registro com os campos de DTYPE_LACUNA, ou None.
+        """
+        posicao = self.por_tempo.get(converter_tempo(tempo))
+        return None if posicao is None else self.lacunas[posicao]
+
+    def apos_lacuna(self, indice, incluir_fim_de_semana=False):
+        """
+        Verifica se a barra `indice` vem depois de barras faltantes.
+
+        Args:
+            indice (int): Posição da barra.
+            incluir_fim_de_semana (bool): Se False, lacunas de fim de semana são ignoradas.
+
+        Returns:
+            bool: True se a barra abre depois de uma lacuna.
+        """
+        lacuna = self.lacuna_antes(indice)
+        return lacuna is not None and (incluir_fim_de_semana or not lacuna['fim_de_semana'])
+
+def encontrar_lacunas(barras, duracao):
+    """
+    Localiza as lacunas entre barras ordenadas e sem tempos repetidos.
+
+    Args:
+        barras (np.ndarray): Barras com dtype DTYPE_BARRAS.
+        duracao (int): Duração do timeframe em segundos.
+
+    Returns:
+        np.ndarray: Lacunas com dtype DTYPE_LACUNA.
+    """
+    tempos = barras['time']
+    diferencas = np.diff(tempos)
+    indices = np.flatnonzero(diferencas > duracao) + 1
+
+    lacunas = np.zeros(len(indices), dtype=DTYPE_LACUNA)
+    lacunas['indice'] = indices
+    lacunas['inicio'] = tempos[indices - 1]
+    lacunas['fim'] = tempos[indices]
+    lacunas['barras_faltantes'] = diferencas[indices - 1] // duracao - 1
+    lacunas['fim_de_semana'] = (
+        np.isin(dia_semana(lacunas['inicio']), DIAS_SEMANA_ANTES_FIM_DE_SEMANA)
+        & np.isin(dia_semana(lacunas['fim']), DIAS_SEMANA_DEPOIS_FIM_DE_SEMANA)
+        & (diferencas[indices - 1] <= DURACAO_MAXIMA_FIM_DE_SEMANA + duracao)
+    )
+    lacunas['salto'] = barras['open'][indices] - barras['close'][indices - 1]
+
+    return lacunas
+
+def preencher_lacunas(barras, lacunas, duracao):
+    """
+    Insere barras planas (no fechamento anterior, sem volume) nas lacunas que não são de fim de semana.
+
+    Args:
+        barras (np.ndarray): Barras ordenadas com dtype DTYPE_BARRAS.
+        lacunas (np.ndarray): Lacunas de `barras` (DTYPE_LACUNA); as preenchidas são marcadas.
+        duracao (int): Duração do timeframe em segundos.
+
+    Returns:
+        tuple: (barras com as lacunas preenchidas, posições de inserção no array original, como em np.insert).
+    """
+    preencher = ~lacunas['fim_de_semana']
+    lacunas['preenchida'] = preencher
+    faltantes = lacunas['barras_faltantes'][preencher]
+    indices = lacunas['indice'][preencher]
+    total = int(faltantes.sum())
+    if total == 0:
+        return barras, np.zeros(0, dtype=np.int64)
+
+    # Deslocamento (1, 2, ...) de cada barra nova dentro da sua lacuna
+    anteriores = np.repeat(indices - 1, faltantes)
+    deslocamentos = np.arange(total) - np.repeat(np.cumsum(faltantes) - faltantes, faltantes) + 1
+
+    novas = np.zeros(total, dtype=barras.dtype)
+    novas['time'] = barras['time'][anteriores] + deslocamentos * duracao
+    for campo in ['open', 'high', 'low', 'close']:
+        novas[campo] = barras['close'][anteriores]
+    novas['spread'] = barras['spread'][anteriores]
+
+    # Cada lacuna preenchida empurra as barras seguintes
+    lacunas['indice'] += np.cumsum(np.where(preencher, lacunas['barras_faltantes'], 0))
+    insercoes = np.repeat(indices, faltantes)
+
+    return np.insert(barras, insercoes, novas), insercoes
+
+def validar_barras(dados, timeframe, reparar=False, preencher=False, remover_outliers=False,
+                   limiar_outlier=LIMIAR_OUTLIER):
+    """
+    Verifica a qualidade das barras recebidas e, opcionalmente, as repara.
+
+    Todas as verificações são vetorizadas sobre o array inteiro: tempos fora de
+    ordem, tempos duplicados, OHLC incoerente, barras sem amplitude, picos isolados
+    (retorno acima de `limiar_outlier` desvios robustos seguido de retorno no sentido
+    oposto) e lacunas (separando as de fim de semana).
+
+    Ao reparar, apenas a estrutura é corrigida: as barras são ordenadas, a última de
+    cada tempo repetido é mantida, máxima e mínima são corrigidas para conter abertura
+    e fechamento, e barras sem preço (NaN ou não positivo) são descartadas. Picos
+    isolados são apenas marcados, pois um movimento real e brusco tem a mesma forma;
+    só são removidos com `remover_outliers=True`. As lacunas só são preenchidas com
+    `preencher=True`.
+
+    Args:
+        dados: Array estruturado ou DataFrame com as barras.
+        timeframe: Timeframe das barras (constante MT5 ou texto).
+        reparar (bool): Se True, devolve as barras reparadas; se False, apenas marca os problemas.
+        preencher (bool): Com `reparar`, preenche as lacunas que não são de fim de semana.
+        remover_outliers (bool): Com `reparar`, descarta também as barras com pico isolado.
+        limiar_outlier (float): Múltiplo do desvio robusto dos retornos que caracteriza um pico.
+
+    Returns:
+        tuple: (barras com dtype DTYPE_BARRAS, relatório). O relatório traz a contagem de
+            cada problema, as marcações de cada barra devolvida ('flags', bits FLAG_*)
+            e o 'mapa_lacunas' (MapaLacunas).
+    """
+    barras = converter_para_barras(dados)
+    duracao = DURACAO_TIMEFRAME.get(nome_timeframe(timeframe))
+    num_entrada = len(barras)
+    flags = np.zeros(num_entrada, dtype=np.uint8)
+
+    lacunas = np.zeros(0, dtype=DTYPE_LACUNA)
+    if num_entrada == 0:
+        return barras, montar_relatorio(barras, flags, lacunas, contar_problemas(flags), num_entrada)
+
+    # Ordem e tempos repetidos (a última barra de cada tempo é a mais recente do terminal)
+    fora_de_ordem = np.diff(barras['time']) < 0
+    flags[1:][fora_de_ordem] |= FLAG_FORA_DE_ORDEM
+    if reparar and fora_de_ordem.any():
+        ordem = np.argsort(barras['time'], kind='stable')
+        barras, flags = barras[ordem], flags[ordem]
+
+    duplicadas = np.diff(barras['time']) == 0
+    flags[:-1][duplicadas] |= FLAG_DUPLICADA
+
+    # OHLC incoerente: máxima abaixo do corpo, mínima acima do corpo, preço nulo ou NaN
+    abertura, maxima, minima, fechamento = barras['open'], barras['high'], barras['low'], barras['close']
+    corpo_max = np.maximum(abertura, fechamento)
+    corpo_min = np.minimum(abertura, fechamento)
+    sem_preco = ~(np.isfinite(abertura) & np.isfinite(maxima) & np.isfinite(minima) & np.isfinite(fechamento)) \
+        | (minima <= 0) | (corpo_min <= 0)
+    ohlc_invalido = sem_preco | (maxima < corpo_max) | (minima > corpo_min)
+    flags[ohlc_invalido] |= FLAG_OHLC_INVALIDO
+    flags[maxima == minima] |= FLAG_AMPLITUDE_ZERO
+
+    # Picos isolados: saltos grandes e opostos na entrada e na saída da barra
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retornos = np.diff(np.log(fechamento))
+    validos = retornos[np.isfinite(retornos)]
+    if len(validos) > 2:
+        desvio = 1.4826 * np.median(np.abs(validos - np.median(validos)))
+        if desvio > 0:
+            grande = np.abs(retornos) > limiar_outlier * desvio
+            pico = grande[:-1] & grande[1:] & (np.sign(retornos[:-1]) != np.sign(retornos[1:]))
+            flags[1:-1][pico] |= FLAG_OUTLIER
+
+    # Contagens antes que as barras com problema sejam removidas
+    problemas = contar_problemas(flags)
+
+    if reparar:
+        outliers = (flags & FLAG_OUTLIER) != 0 if remover_outliers else np.zeros(len(barras), dtype=bool)
+        if duplicadas.any() or sem_preco.any() or outliers.any():
+            manter = ~sem_preco & ~outliers
+            manter[:-1] &= ~duplicadas
+            barras, flags = barras[manter], flags[manter]
+        if (flags & FLAG_OHLC_INVALIDO).any():
+            barras = barras.copy()
+            barras['high'] = np.maximum.reduce([barras['open'], barras['high'], barras['low'], barras['close']])
+            barras['low'] = np.minimum.reduce([barras['open'], barras['high'], barras['low'], barras['close']])
+
+    # Lacunas (só fazem sentido com as barras em ordem e sem repetições)
+    if duracao is not None and (reparar or not (fora_de_ordem.any() or duplicadas.any())):
+        lacunas = encontrar_lacunas(barras, duracao)
+        flags[lacunas['indice']] |= FLAG_APOS_LACUNA
+        if reparar and preencher and len(lacunas) > 0:
+            barras, insercoes = preencher_lacunas(barras, lacunas, duracao)
+            flags = np.insert(flags, insercoes, FLAG_PREENCHIDA)
+
+    return barras, montar_relatorio(barras, flags, lacunas, problemas, num_entrada)
+
+def contar_problemas(flags):
+    """
+    Conta as barras com cada problema marcado.
+
+    Args:
+        flags (np.ndarray): Marcações das barras (bits FLAG_*).
+
+    Returns:
+        dict: Número de barras fora de ordem, duplicadas, com OHLC inválido, sem amplitude e com pico.
+    """
+    nomes = {
+        'fora_de_ordem': FLAG_FORA_DE_ORDEM,
+        'duplicadas': FLAG_DUPLICADA,
+        'ohlc_invalido': FLAG_OHLC_INVALIDO,
+        'amplitude_zero': FLAG_AMPLITUDE_ZERO,
+        'outliers': FLAG_OUTLIER,
+    }
+    return {nome: int(np.count_nonzero(flags & flag)) for nome, flag in nomes.items()}
+
+def montar_relatorio(barras, flags, lacunas, problemas, num_entrada):
+    """
+    Monta o relatório de validar_barras.
+
+    Args:
+        barras (np.ndarray): Barras devolvidas.
+        flags (np.ndarray): Marcações das barras devolvidas.
+        lacunas (np.ndarray): Lacunas com dtype DTYPE_LACUNA.
+        problemas (dict): Contagens de contar_problemas, feitas antes dos reparos.
+        num_entrada (int): Número de barras recebidas.
+
+    Returns:
+        dict: Contagens, 'flags' das barras devolvidas e 'mapa_lacunas'.
+    """
+    fim_de_semana = lacunas['fim_de_semana']
+    relatorio = {'barras_recebidas': num_entrada, 'barras': len(barras)}
+    relatorio.update(problemas)
+    relatorio.update({
+        'lacunas': int(np.count_nonzero(~fim_de_semana)),
+        'lacunas_fim_de_semana': int(np.count_nonzero(fim_de_semana)),
+        'barras_faltantes': int(lacunas['barras_faltantes'][~fim_de_semana].sum()),
+        'barras_preenchidas': int(np.count_nonzero(flags & FLAG_PREENCHIDA)),
+        'flags': flags,
+        'mapa_lacunas': MapaLacunas(lacunas),
+    })
+    return relatorio
+
+def resumo_qualidade(relatorio):
+    """
+    Descreve em uma linha os problemas encontrados por validar_barras.
+
+    Lacunas de fim de semana e barras sem amplitude são normais e não entram no resumo.
+
+    Args:
+        relatorio (dict): Relatório de validar_barras.
+
+    Returns:
+        str: Problemas encontrados, ou string vazia se os dados estão íntegros.
+    """
+    problemas = [
+        (relatorio['fora_de_ordem'], "fora de ordem"),
+        (relatorio['duplicadas'], "duplicadas"),
+        (relatorio['ohlc_invalido'], "com OHLC inválido"),
+        (relatorio['outliers'], "com pico isolado"),
+    ]
+    partes = [f"{quantidade} barras {descricao}" for quantidade, descricao in problemas if quantidade]
+    if relatorio['lacunas']:
+        partes.append(f"{relatorio['lacunas']} lacunas ({relatorio['barras_faltantes']} barras faltantes)")
+    return ", ".join(partes)
@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+from src.metricas import calcular_drawdown
+
+# Códigos usados na coluna 'tipo'
+TIPOS_OPERACAO = ['compra', 'venda']
+
+# Colunas numéricas do registro e seus tipos
+COLUNAS_REGISTRO = {
+    'ativo': np.int16,               # Índice em RegistroTrades.ativos
+    'data_entrada': 'datetime64[s]',
+    'tipo': np.int8,                 # Índice em TIPOS_OPERACAO
+    'preco_entrada': np.float64,
+    'sl': np.float64,
+    'tp': np.float64,
+    'lucro': np.float64,
+    'data_saida': 'datetime64[s]',
+}
+
+class RegistroTrades:
+    """
+    Registro colunar de trades simulados, guardado em arrays NumPy pré-alocados.
+
+    Cada trade ocupa uma posição em cada coluna (cerca de 50 bytes por trade), em vez
+    de um dicionário com objetos Python. A capacidade dobra quando o registro enche.
+    """
+
+    def __init__(self, capacidade=1024):
+        """
+        Args:
+            capacidade (int): Número inicial de trades pré-alocados.
+        """
+        self.tamanho = 0
+        self.ativos = []
+        self.colunas = {nome: np.empty(capacidade, dtype=dtype) for nome, dtype in COLUNAS_REGISTRO.items()}
+
+    def __len__(self):
+        return self.tamanho
+
+    def codigo_ativo(self, ativo):
+        """
+        Retorna o código numérico de um ativo, registrando-o se necessário.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            int: Código do ativo.
+        """
+        if ativo not in self.ativos:
+            self.ativos.append(ativo)
+        return self.ativos.index(ativo)
+
+    def reservar(self, capacidade):
+        """
+        Garante espaço para pelo menos `capacidade` trades.
+
+        Args:
+            capacidade (int): Capacidade mínima desejada.
+        """
+        capacidade_atual = len(self.colunas['lucro'])
+        if capacidade <= capacidade_atual:
+            return
+
+        nova_capacidade = max(capacidade, capacidade_atual * 2)
+        for nome, coluna in self.colunas.items():
+            nova_coluna = np.empty(nova_capacidade, dtype=coluna.dtype)
+            nova_coluna[:self.tamanho] = coluna[:self.tamanho]
+            self.colunas[nome] = nova_coluna
+
+    def adicionar(self, ativo, data_entrada, tipo, preco_entrada, sl, tp, lucro, data_saida):
+        """
+        Acrescenta um trade ao registro.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            data_entrada: Data de entrada (pd.Timestamp ou datetime).
+            tipo (str): 'compra' ou 'venda'.
+            preco_entrada (float): Preço de entrada.
+            sl (float): Nível do stop loss.
+            tp (float): Nível do take profit.
+            lucro (float): Lucro do trade.
+            data_saida: Data de saída (pd.Timestamp ou datetime).
+        """
+        self.reservar(self.tamanho + 1)
+
+        i = self.tamanho
+        self.colunas['ativo'][i] = self.codigo_ativo(ativo)
+        self.colunas['data_entrada'][i] = np.datetime64(pd.Timestamp(data_entrada), 's')
+        self.colunas['tipo'][i] = TIPOS_OPERACAO.index(tipo)
+        self.colunas['preco_entrada'][i] = preco_entrada
+        self.colunas['sl'][i] = sl
+        self.colunas['tp'][i] = tp
+        self.colunas['lucro'][i] = lucro
+        self.colunas['data_saida'][i] = np.datetime64(pd.Timestamp(data_saida), 's')
+        self.tamanho += 1
+
+    def coluna(self, nome):
+        """
+        Retorna a parte preenchida de uma coluna (view, sem cópia).
+
+        Args:
+            nome (str): Nome da coluna.
+
+        Returns:
+            np.ndarray: Valores da coluna.
+        """
+        return self.colunas[nome][:self.tamanho]
+
+    def para_dataframe(self):
+        """
+        Converte o registro para um DataFrame com as colunas do log de trades.
+
+        Returns:
+            pd.DataFrame: Um trade por linha.
+        """
+        lucro = self.coluna('lucro')
+
+        return pd.DataFrame({
+            'ativo': np.array(self.ativos, dtype=object)[self.coluna('ativo')] if self.ativos else np.array([], dtype=object),
+            'data_entrada': pd.to_datetime(self.coluna('data_entrada')),
+            'tipo': np.array(TIPOS_OPERACAO, dtype=object)[self.coluna('tipo')],
+            'preco_entrada': self.coluna('preco_entrada'),
+            'sl': self.coluna('sl'),
+            'tp': self.coluna('tp'),
+            'resultado': np.where(lucro > 0, 'lucro', 'prejuizo'),
+            'lucro': lucro,
+            'data_saida': pd.to_datetime(self.coluna('data_saida')),
+        })
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """
+        Cria um registro a partir de um DataFrame de trades (ex: CSV do backtest em blocos).
+
+        Args:
+            df (pd.DataFrame): DataFrame com as colunas do log de trades.
+
+        Returns:
+            RegistroTrades: Registro com os trades do DataFrame.
+        """
+        registro = cls(capacidade=max(len(df), 1))
+        registro.tamanho = len(df)
+        if len(df) == 0:
+            return registro
+
+        ativos, codigos = np.unique(df['ativo'].to_numpy(), return_inverse=True)
+        registro.ativos = list(ativos)
+        registro.colunas['ativo'][:len(df)] = codigos
+        registro.colunas['tipo'][:len(df)] = (df['tipo'].to_numpy() == 'venda').astype(np.int8)
+        for nome in ['data_entrada', 'data_saida']:
+            registro.colunas[nome][:len(df)] = pd.to_datetime(df[nome]).to_numpy().astype('datetime64[s]')
+        for nome in ['preco_entrada', 'sl', 'tp', 'lucro']:
+            registro.colunas[nome][:len(df)] = df[nome].to_numpy(dtype=np.float64)
+
+        return registro
+
+    @classmethod
+    def concatenar(cls, registros):
+        """
+        Junta vários registros (ex: um por ativo) em um único registro.
+
+        Args:
+            registros (list): Lista de RegistroTrades.
+
+        Returns:
+            RegistroTrades: Registro com os trades de todos os registros.
+        """
+        total = sum(len(registro) for registro in registros)
+        combinado = cls(capacidade=max(total, 1))
+
+        inicio = 0
+        for registro in registros:
+            fim = inicio + len(registro)
+            for nome in COLUNAS_REGISTRO:
+                combinado.colunas[nome][inicio:fim] = registro.coluna(nome)
+            # Recodificar os ativos para a lista do registro combinado
+            codigos = np.array([combinado.codigo_ativo(ativo) for ativo in registro.ativos], dtype=np.int16)
+            if len(codigos) > 0:
+                combinado.colunas['ativo'][inicio:fim] = codigos[registro.coluna('ativo')]
+            inicio = fim
+        combinado.tamanho = total
+
+        return combinado
+
+    def curva_saldo(self, saldo_inicial=10000):
+        """
+        Calcula a curva de saldo na ordem de fechamento dos trades.
+
+        Args:
+            saldo_inicial (float): Saldo antes do primeiro trade.
+
+        Returns:
+            np.ndarray: Saldo após cada trade.
+        """
+        ordem = np.argsort(self.coluna('data_saida'), kind='stable')
+        return saldo_inicial + np.cumsum(self.coluna('lucro')[ordem])
+
+    def resumo(self, saldo_inicial=10000):
+        """
+        Calcula as métricas básicas do registro de forma vetorizada.
+
+        Args:
+            saldo_inicial (float): Saldo antes do primeiro trade.
+
+        Returns:
+            dict: Lucro total, número de trades, taxa de acerto, expectativa e drawdown máximo.
+        """
+        lucro = self.coluna('lucro')
+        if len(lucro) == 0:
+            return {'lucro_total': 0.0, 'num_trades': 0, 'taxa_acerto': 0,
+                    'expectativa': 0.0, 'drawdown_maximo': 0.0}
+
+        drawdown, _ = calcular_drawdown(self.curva_saldo(saldo_inicial), saldo_inicial)
+
+        return {
+            'lucro_total': float(lucro.sum()),
+            'num_trades': len(lucro),
+            'taxa_acerto': float(np.count_nonzero(lucro > 0) / len(lucro)),
+            'expectativa': float(lucro.mean()),
+            'drawdown_maximo': float(drawdown.max()),
+        }
@@ -0,0 +1,368 @@
+import os
+import sys
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.image import imread
+from src.registro_trades import RegistroTrades
+from src.metricas import calcular_drawdown, calcular_metricas_registro
+
+# Diretório dos relatórios e do cache das seções já desenhadas
+RELATORIOS_DIR = "data/relatorios"
+CACHE_RELATORIOS_DIR = os.path.join(RELATORIOS_DIR, "cache")
+
+# Versão do desenho das seções: mudar invalida o cache
+VERSAO_RELATORIO = 1
+
+PONTOS_GRAFICO = 2000      # Pontos de cada curva depois da redução (a tela não mostra mais que isso)
+FAIXAS_HISTOGRAMA = 50     # Faixas do histograma do resultado dos trades de cada ativo
+TAMANHO_PAGINA = (11.69, 8.27)  # Paisagem A4, em polegadas
+DPI_RELATORIO = 100
+
+# Métricas mostradas na tabela de resumo: (chave em calcular_metricas, título, formato)
+METRICAS_RESUMO = [
+    ('num_trades', 'Trades', '{:.0f}'),
+    ('lucro_total', 'Lucro', '{:.2f}'),
+    ('taxa_acerto', 'Acerto', '{:.1%}'),
+    ('fator_lucro', 'Fator de lucro', '{:.2f}'),
+    ('drawdown_maximo_pct', 'Drawdown máx.', '{:.1%}'),
+    ('sharpe', 'Sharpe', '{:.2f}'),
+    ('sortino', 'Sortino', '{:.2f}'),
+    ('exposicao', 'Exposição', '{:.1%}'),
+]
+
+def indices_lttb(x, y, num_pontos):
+    """
+    Escolhe os pontos de uma curva pelo Largest-Triangle-Three-Buckets.
+
+    O primeiro e o último ponto são mantidos; os demais são divididos em
+    `num_pontos - 2` faixas e, em cada uma, fica o ponto que forma o maior
+    triângulo com o ponto escolhido na faixa anterior e a média da faixa seguinte.
+    Picos e vales sobrevivem à redução, ao contrário de pegar um ponto a cada N.
+
+    Args:
+        x (np.ndarray): Abscissas crescentes.
+        y (np.ndarray): Ordenadas.
+        num_pontos (int): Número de pontos desejado.
+
+    Returns:
+        np.ndarray: Índices dos pontos mantidos, em ordem crescente.
+    """
+    num = len(x)
+    if num <= num_pontos or num_pontos < 3:
+        return np.arange(num)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    limites = np.linspace(1, num - 1, num_pontos - 1).astype(np.int64)
+
+    # Médias de cada faixa a partir das somas acumuladas
+    soma_x = np.concatenate(([0.0], np.cumsum(x)))
+    soma_y = np.concatenate(([0.0], np.cumsum(y)))
+    tamanhos = np.diff(limites)
+    media_x = np.append((soma_x[limites[1:]] - soma_x[limites[:-1]]) / tamanhos, x[-1])
+    media_y = np.append((soma_y[limites[1:]] - soma_y[limites[:-1]]) / tamanhos, y[-1])
+
+    indices = np.empty(num_pontos, dtype=np.int64)
+    indices[0], indices[-1] = 0, num - 1
+    anterior = 0
+    for faixa in range(num_pontos - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        # O dobro da área do triângulo (anterior, candidato, média da faixa seguinte)
+        areas = np.abs((x[anterior] - media_x[faixa + 1]) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y[faixa + 1] - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[faixa + 1] = anterior
+
+    return indices
+
+def indices_min_max(y, num_pontos):
+    """
+    Escolhe, em cada faixa da curva, o ponto mínimo e o máximo.
+
+    Mais barato que o LTTB e preserva exatamente os extremos, o que importa no
+    drawdown: o drawdown máximo desenhado é o drawdown máximo real.
+
+    Args:
+        y (np.ndarray): Ordenadas.
+        num_pontos (int): Número máximo de pontos desejado.
+
+    Returns:
+        np.ndarray: Índices dos pontos mantidos, em ordem crescente.
+    """
+    num = len(y)
+    if num <= num_pontos or num_pontos < 4:
+        return np.arange(num)
+
+    faixas = (num_pontos - 2) // 2
+    tamanho = -(-num // faixas)
+    blocos = np.pad(np.asarray(y, dtype=np.float64), (0, faixas * tamanho - num), mode='edge').reshape(faixas, tamanho)
+    inicios = np.arange(faixas) * tamanho
+    minimos = np.minimum(inicios + blocos.argmin(axis=1), num - 1)
+    maximos = np.minimum(inicios + blocos.argmax(axis=1), num - 1)
+
+    return np.unique(np.concatenate(([0, num - 1], minimos, maximos)))
+
+def registro_de_trades(trades):
+    """
+    Aceita os trades como RegistroTrades, DataFrame ou resultados de um backtest.
+
+    Returns:
+        RegistroTrades: Registro com os trades.
+    """
+    if isinstance(trades, dict):
+        trades = trades['trades']
+    if isinstance(trades, pd.DataFrame):
+        trades = RegistroTrades.de_dataframe(trades)
+    return trades
+
+def secoes_relatorio(trades, saldo_inicial=10000, num_pontos=PONTOS_GRAFICO):
+    """
+    Prepara os dados de cada seção do relatório, já reduzidos para desenhar.
+
+    As seções são o resumo das métricas, a curva de saldo, o drawdown e uma
+    seção por ativo (resultado acumulado e distribuição dos trades). Os dados
+    de cada seção são pequenos (no máximo `num_pontos` pontos por curva) e
+    servem também como chave do cache.
+
+    Args:
+        trades: RegistroTrades, DataFrame de trades ou resultados do backtest.
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        num_pontos (int): Pontos de cada curva depois da redução.
+
+    Returns:
+        list: Seções como dicionários com 'nome', 'tipo' e 'dados'.
+    """
+    registro = registro_de_trades(trades)
+    metricas = calcular_metricas_registro(registro, saldo_inicial)
+
+    linhas = [('Carteira', metricas['agregado'])] + list(metricas['por_ativo'].items())
+    secoes = [{
+        'nome': 'resumo',
+        'tipo': 'resumo',
+        'dados': {
+            'colunas': [titulo for _, titulo, _ in METRICAS_RESUMO],
+            'linhas': [nome for nome, _ in linhas],
+            'celulas': [[formato.format(valores[chave]) for chave, _, formato in METRICAS_RESUMO]
+                        for _, valores in linhas],
+        },
+    }]
+    if len(registro) == 0:
+        return secoes
+
+    # Curvas na ordem de fechamento dos trades
+    data_saida = registro.coluna('data_saida')
+    ordem = np.argsort(data_saida, kind='stable')
+    tempos = data_saida[ordem]
+    lucro = registro.coluna('lucro')[ordem]
+    codigos = registro.coluna('ativo')[ordem]
+    saldo = saldo_inicial + np.cumsum(lucro)
+    _, drawdown_pct = calcular_drawdown(saldo, saldo_inicial)
+    segundos = tempos.astype(np.int64)
+
+    indices = indices_lttb(segundos, saldo, num_pontos)
+    secoes.append({'nome': 'saldo', 'tipo': 'saldo',
+                   'dados': {'tempos': tempos[indices], 'valores': saldo[indices], 'saldo_inicial': saldo_inicial}})
+
+    indices = indices_min_max(drawdown_pct, num_pontos)
+    secoes.append({'nome': 'drawdown', 'tipo': 'drawdown',
+                   'dados': {'tempos': tempos[indices], 'valores': -100 * drawdown_pct[indices]}})
+
+    for codigo, ativo in enumerate(registro.ativos):
+        mascara = codigos == codigo
+        lucro_ativo = lucro[mascara]
+        acumulado = np.cumsum(lucro_ativo)
+        indices = indices_lttb(segundos[mascara], acumulado, num_pontos)
+        contagens, bordas = np.histogram(lucro_ativo, bins=FAIXAS_HISTOGRAMA)
+        secoes.append({'nome': f'ativo_{ativo}', 'tipo': 'ativo',
+                       'dados': {'ativo': ativo, 'tempos': tempos[mascara][indices], 'valores': acumulado[indices],
+                                 'contagens': contagens, 'bordas': bordas}})
+
+    return secoes
+
+def chave_secao(secao, tamanho, dpi):
+    """
+    Calcula a chave de cache de uma seção a partir dos dados que ela desenha.
+
+    Returns:
+        str: Hash SHA-256 (hexadecimal) da versão, do tipo, do tamanho e dos dados.
+    """
+    resumo = hashlib.sha256(f"{VERSAO_RELATORIO}|{secao['tipo']}|{tamanho}|{dpi}".encode())
+    for nome in sorted(secao['dados']):
+        valor = secao['dados'][nome]
+        resumo.update(nome.encode())
+        if isinstance(valor, np.ndarray):
+            resumo.update(str(valor.dtype).encode())
+            resumo.update(np.ascontiguousarray(valor).tobytes())
+        else:
+            resumo.update(repr(valor).encode())
+    return resumo.hexdigest()
+
+def desenhar_resumo(figura, dados):
+    """
+    Desenha a tabela de métricas da carteira e de cada ativo.
+    """
+    eixo = figura.add_subplot()
+    eixo.axis('off')
+    eixo.set_title("Resumo do backtest")
+    tabela = eixo.table(cellText=dados['celulas'], rowLabels=dados['linhas'], colLabels=dados['colunas'],
+                        loc='upper center')
+    tabela.scale(1, 1.5)
+
+def desenhar_saldo(figura, dados):
+    """
+    Desenha a curva de saldo.
+    """
+    eixo = figura.add_subplot()
+    eixo.plot(dados['tempos'], dados['valores'], linewidth=1)
+    eixo.axhline(dados['saldo_inicial'], color='gray', linewidth=0.5)
+    eixo.set_title("Curva de saldo")
+    eixo.set_ylabel("Saldo")
+    eixo.grid(alpha=0.3)
+
+def desenhar_drawdown(figura, dados):
+    """
+    Desenha o drawdown percentual.
+    """
+    eixo = figura.add_subplot()
+    eixo.fill_between(dados['tempos'], dados['valores'], 0, color='tab:red', alpha=0.4, step='post')
+    eixo.set_title("Drawdown")
+    eixo.set_ylabel("% do pico")
+    eixo.grid(alpha=0.3)
+
+def desenhar_ativo(figura, dados):
+    """
+    Desenha o resultado acumulado de um ativo e o histograma dos seus trades.
+    """
+    curva, histograma = figura.subplots(2, 1, height_ratios=[2, 1])
+    curva.plot(dados['tempos'], dados['valores'], linewidth=1)
+    curva.set_title(f"{dados['ativo']}: resultado acumulado")
+    curva.grid(alpha=0.3)
+    histograma.stairs(dados['contagens'], dados['bordas'], fill=True, alpha=0.6)
+    histograma.axvline(0, color='gray', linewidth=0.5)
+    histograma.set_title("Resultado dos trades")
+    figura.tight_layout()
+
+# Função que desenha cada tipo de seção
+DESENHOS = {
+    'resumo': desenhar_resumo,
+    'saldo': desenhar_saldo,
+    'drawdown': desenhar_drawdown,
+    'ativo': desenhar_ativo,
+}
+
+def desenhar_secao(secao, caminho, tamanho=TAMANHO_PAGINA, dpi=DPI_RELATORIO):
+    """
+    Desenha uma seção em PNG com o backend Agg (sem janela e sem o estado global do pyplot).
+
+    O arquivo é escrito com outro nome e renomeado no fim, para que um relatório
+    interrompido não deixe uma imagem pela metade no cache.
+
+    Args:
+        secao (dict): Seção de secoes_relatorio.
+        caminho (str): Arquivo PNG de saída.
+        tamanho (tuple): Largura e altura em polegadas.
+        dpi (int): Resolução da imagem.
+    """
+    figura = Figure(figsize=tamanho, dpi=dpi)
+    FigureCanvasAgg(figura)
+    DESENHOS[secao['tipo']](figura, secao['dados'])
+
+    temporario = caminho + ".tmp"
+    figura.savefig(temporario, format='png')
+    os.replace(temporario, caminho)
+
+def montar_pdf(imagens, caminho, tamanho=TAMANHO_PAGINA, dpi=DPI_RELATORIO):
+    """
+    Junta as imagens das seções em um PDF, uma seção por página.
+
+    Args:
+        imagens (list): Arquivos PNG das seções, na ordem das páginas.
+        caminho (str): Arquivo PDF de saída.
+    """
+    temporario = caminho + ".tmp"
+    with PdfPages(temporario) as pdf:
+        for imagem in imagens:
+            figura = Figure(figsize=tamanho, dpi=dpi)
+            figura.figimage(imread(imagem))
+            pdf.savefig(figura)
+    os.replace(temporario, caminho)
+
+def gerar_relatorio(trades, caminho=None, saldo_inicial=10000, num_pontos=PONTOS_GRAFICO,
+                    diretorio_cache=CACHE_RELATORIOS_DIR, tamanho=TAMANHO_PAGINA, dpi=DPI_RELATORIO):
+    """
+    Gera o relatório do backtest em PDF: resumo, saldo, drawdown e uma página por ativo.
+
+    As curvas são reduzidas antes de desenhar (LTTB no saldo, mínimo/máximo no
+    drawdown), então o tempo e o tamanho do arquivo não crescem com o número de
+    trades. Cada seção desenhada fica no cache com o hash dos seus dados; ao gerar
+    o relatório de novo, só as seções que mudaram são desenhadas.
+
+    Args:
+        trades: RegistroTrades, DataFrame de trades ou resultados do backtest.
+        caminho (str): Arquivo PDF de saída (padrão: data/relatorios/relatorio_<data>.pdf).
+        saldo_inicial (float): Saldo antes do primeiro trade.
+        num_pontos (int): Pontos de cada curva depois da redução.
+        diretorio_cache (str): Diretório das imagens das seções.
+        tamanho (tuple): Tamanho da página em polegadas.
+        dpi (int): Resolução das imagens.
+
+    Returns:
+        dict: 'caminho' do PDF, 'imagens' das seções, número de seções 'desenhadas'
+            e 'em_cache', e o tempo total em 'segundos'.
+    """
+    inicio = time.perf_counter()
+    if caminho is None:
+        caminho = os.path.join(RELATORIOS_DIR, f"relatorio_{time.strftime('%Y%m%d_%H%M%S')}.pdf")
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    os.makedirs(diretorio_cache, exist_ok=True)
+
+    imagens = []
+    desenhadas = 0
+    for secao in secoes_relatorio(trades, saldo_inicial, num_pontos):
+        imagem = os.path.join(diretorio_cache, f"{secao['nome']}_{chave_secao(secao, tamanho, dpi)[:20]}.png")
+        if not os.path.exists(imagem):
+            desenhar_secao(secao, imagem, tamanho, dpi)
+            desenhadas += 1
+        imagens.append(imagem)
+
+    montar_pdf(imagens, caminho, tamanho, dpi)
+
+    return {
+        'caminho': caminho,
+        'imagens': imagens,
+        'desenhadas': desenhadas,
+        'em_cache': len(imagens) - desenhadas,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+def gerar_relatorio_em_segundo_plano(trades, caminho=None, **opcoes):
+    """
+    Gera o relatório em outro processo, sem segurar o backtest ou o robô.
+
+    Args:
+        trades: RegistroTrades, DataFrame de trades ou resultados do backtest.
+        caminho (str): Arquivo PDF de saída.
+        **opcoes: Demais argumentos de gerar_relatorio.
+
+    Returns:
+        concurrent.futures.Future: Resultado de gerar_relatorio quando o processo terminar.
+    """
+    executor = ProcessPoolExecutor(max_workers=1)
+    futuro = executor.submit(gerar_relatorio, registro_de_trades(trades), caminho, **opcoes)
+    # O processo encerra sozinho quando o relatório termina
+    executor.shutdown(wait=False)
+    return futuro
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python -m src.relatorios <trades.csv> [relatorio.pdf]")
+        sys.exit(1)
+    resultado = gerar_relatorio(pd.read_csv(sys.argv[1]), sys.argv[2] if len(sys.argv) == 3 else None)
+    print(f"Relatório gravado em {resultado['caminho']} ({resultado['desenhadas']} seções desenhadas, "
+          f"{resultado['em_cache']} do cache, {resultado['segundos']:.1f}s)")
@@ -0,0 +1,553 @@
+import os
+import sys
+import time
+from collections import namedtuple, defaultdict
+from contextlib import contextmanager, redirect_stdout
+import numpy as np
+import pandas as pd
+import src.main as main
+import src.mt5_connection as mt5_connection
+import src.gerenciador_ordens as gerenciador_ordens
+import src.gestor_posicoes as gestor_posicoes
+from src.config import ATIVOS, TIMEFRAMES, TIMEFRAME_FEED, MAGIC_NUMBER
+from src.historico import abrir_historico, converter_tempo, nome_timeframe, NOMES_TIMEFRAME_MT5
+from src.execucao import ModeloExecucao
+from src.registro_trades import RegistroTrades
+from src.gerenciador_ordens import GerenciadorOrdens
+from src.estrategias import carregar_estrategias
+from src.estado_ativos import EstadoAtivos
+from src.risco_carteira import RiscoCarteira
+from src.backtest import executar_backtest_historico
+
+# Diretório dos logs gravados pelo ciclo durante o replay
+REPLAY_DIR = "data/replay"
+
+# Módulos do ciclo ao vivo que acessam o terminal pelo atributo `mt5`
+MODULOS_MT5 = [main, mt5_connection, gerenciador_ordens, gestor_posicoes]
+
+# Funções do ciclo ao vivo cronometradas em cada etapa
+ETAPAS_REPLAY = {
+    'dados': ['obter_tempo_ultimo_candle', 'obter_dados_historicos', 'obter_barras_desde'],
+    'indicadores': ['preparar_dados_para_estrategia'],
+    'ia': ['caracteristicas_sinal', 'prever_qualidade_sinal'],
+    'risco': ['aplicar_gestao_risco'],
+    'registro': ['registrar_decisao'],
+}
+
+# Objetos devolvidos pelo gateway simulado, com os campos usados do MetaTrader5
+TickSimulado = namedtuple('TickSimulado', ['time', 'bid', 'ask'])
+InfoSimboloSimulado = namedtuple('InfoSimboloSimulado', ['name', 'point', 'trade_tick_value', 'trade_tick_size',
+                                                         'volume_min', 'volume_max', 'volume_step'])
+InfoContaSimulada = namedtuple('InfoContaSimulada', ['balance', 'equity'])
+PosicaoSimulada = namedtuple('PosicaoSimulada', ['ticket', 'symbol', 'type', 'volume', 'price_open',
+                                                 'sl', 'tp', 'magic', 'time'])
+ResultadoOrdemSimulada = namedtuple('ResultadoOrdemSimulada', ['retcode', 'order', 'price', 'volume', 'comment'])
+
+class GatewaySimulado:
+    """
+    Substituto do módulo MetaTrader5 que serve barras gravadas com um relógio virtual.
+
+    Cada passo do relógio corresponde à abertura de um candle de `timeframe`: as
+    barras com abertura até o tempo atual são visíveis, e a última delas é o candle
+    em formação, que acabou de abrir e só mostra a abertura (máxima, mínima e
+    fechamento iguais a ela). O ciclo avalia o candle que acabou de fechar, como
+    executar_backtest, e os ticks e as execuções são na abertura do candle em
+    formação. Ordens a mercado viram posições simuladas, encerradas pelo
+    ModeloExecucao quando um candle a partir da entrada atinge o SL ou o TP.
+    """
+
+    # Constantes do MetaTrader5 usadas pelo robô
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_PRICE_CHANGED = 10020
+    TRADE_RETCODE_PRICE_OFF = 10021
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_SLTP = 6
+    COPY_TICKS_INFO = 1
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_IOC = 1
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+
+    def __init__(self, ativos, timeframe, inicio=None, fim=None, modelo_execucao=None, saldo_inicial=10000):
+        """
+        Args:
+            ativos (list): Símbolos servidos pelo gateway.
+            timeframe: Timeframe que define os passos do relógio virtual.
+            inicio: Data do primeiro passo (None para o início do histórico).
+            fim: Data do último passo (None para o fim do histórico).
+            modelo_execucao (ModeloExecucao): Preços de execução e lucro
+                (padrão: ModeloExecucao com os custos de src/config.py).
+            saldo_inicial (float): Saldo da conta simulada.
+        """
+        for codigo, nome in NOMES_TIMEFRAME_MT5.items():
+            setattr(self, f"TIMEFRAME_{nome}", codigo)
+
+        self.ativos = list(ativos)
+        self.timeframe = nome_timeframe(timeframe)
+        self.modelo_execucao = modelo_execucao if modelo_execucao is not None else ModeloExecucao()
+        self.saldo = saldo_inicial
+        self.cache_barras = {}
+
+        # Passos do relógio: tempos de abertura de todos os candles do intervalo
+        tempos = [self.barras(ativo, self.timeframe)['time'] for ativo in self.ativos]
+        tempos = np.unique(np.concatenate(tempos)) if tempos else np.zeros(0, dtype=np.int64)
+        i_inicio = 0 if inicio is None else np.searchsorted(tempos, converter_tempo(inicio), side='left')
+        i_fim = len(tempos) if fim is None else np.searchsorted(tempos, converter_tempo(fim), side='right')
+        self.passos = tempos[i_inicio:i_fim]
+        self.agora = int(self.passos[0]) if len(self.passos) > 0 else 0
+
+        self.posicoes = {}
+        self.proximo_ticket = 1
+        self.ordens = []
+        self.trades = RegistroTrades()
+
+    def barras(self, ativo, timeframe):
+        """
+        Retorna o histórico local de um ativo/timeframe, aberto uma única vez.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            timeframe: Timeframe das barras.
+
+        Returns:
+            np.ndarray: Barras com dtype DTYPE_BARRAS (mapeadas em memória).
+        """
+        chave = (ativo, nome_timeframe(timeframe))
+        if chave not in self.cache_barras:
+            self.cache_barras[chave] = abrir_historico(ativo, timeframe)
+        return self.cache_barras[chave]
+
+    def indice_atual(self, ativo, timeframe):
+        """
+        Retorna a posição do fim das barras visíveis no tempo virtual.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            timeframe: Timeframe das barras.
+
+        Returns:
+            int: Número de barras com abertura até o tempo atual.
+        """
+        return int(np.searchsorted(self.barras(ativo, timeframe)['time'], self.agora, side='right'))
+
+    @staticmethod
+    def apenas_abertura(barras):
+        """
+        Reduz o último candle de uma cópia das barras à sua abertura, como um candle que acabou de abrir.
+
+        Args:
+            barras (np.ndarray): Cópia das barras visíveis, com o candle em formação no final.
+
+        Returns:
+            np.ndarray: As mesmas barras, com o último candle alterado.
+        """
+        for campo in ['high', 'low', 'close']:
+            barras[campo][-1] = barras['open'][-1]
+        barras['tick_volume'][-1] = 0
+        barras['real_volume'][-1] = 0
+        return barras
+
+    def barra_atual(self, ativo):
+        """
+        Retorna o candle em formação de um ativo no timeframe do relógio, só com a abertura.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+
+        Returns:
+            np.void: Barra atual, ou None se não houver barras visíveis.
+        """
+        i = self.indice_atual(ativo, self.timeframe)
+        if i == 0:
+            return None
+        return self.apenas_abertura(np.array(self.barras(ativo, self.timeframe)[i - 1:i]))[0]
+
+    def avancar(self, tempo):
+        """
+        Move o relógio para o próximo passo e encerra as posições atingidas nos candles
+        que fecharam desde o passo anterior (a partir do candle da entrada).
+
+        Args:
+            tempo (int): Novo tempo virtual, em segundos.
+        """
+        anterior, self.agora = self.agora, int(tempo)
+
+        for ticket, posicao in list(self.posicoes.items()):
+            barras = self.barras(posicao.symbol, self.timeframe)
+            tempos = barras['time']
+            i_inicio = np.searchsorted(tempos, max(anterior, posicao.time), side='left')
+            i_fim = np.searchsorted(tempos, self.agora, side='left')
+            tipo = 'compra' if posicao.type == self.POSITION_TYPE_BUY else 'venda'
+            for i in range(i_inicio, i_fim):
+                preco_saida = self.modelo_execucao.resolver_saida(
+                    posicao.symbol, tempos[i], barras['open'][i], barras['high'][i], barras['low'][i],
+                    posicao.sl, posicao.tp, tipo, barras['spread'][i]
+                )
+                if preco_saida is not None:
+                    self.fechar_posicao(ticket, preco_saida, tempos[i])
+                    break
+
+    def fechar_posicao(self, ticket, preco_saida, tempo):
+        """
+        Encerra uma posição simulada e registra o trade.
+
+        Args:
+            ticket (int): Ticket da posição.
+            preco_saida (float): Preço de saída.
+            tempo (int): Tempo de abertura do candle de saída, em segundos.
+        """
+        posicao = self.posicoes.pop(ticket)
+        tipo = 'compra' if posicao.type == self.POSITION_TYPE_BUY else 'venda'
+        lucro = self.modelo_execucao.calcular_lucro(posicao.symbol, posicao.price_open, preco_saida, tipo, posicao.volume)
+        self.saldo += lucro
+        self.trades.adicionar(posicao.symbol, pd.Timestamp(posicao.time, unit='s'), tipo, posicao.price_open,
+                              posicao.sl, posicao.tp, lucro, pd.Timestamp(int(tempo), unit='s'))
+
+    def fechar_posicoes_abertas(self):
+        """
+        Encerra as posições ainda abertas na abertura do último candle visível.
+        """
+        for ticket, posicao in list(self.posicoes.items()):
+            barra = self.barra_atual(posicao.symbol)
+            deslocamento = 0.0
+            if posicao.type == self.POSITION_TYPE_SELL:
+                deslocamento = self.modelo_execucao.spread(posicao.symbol, barra['spread'])
+            self.fechar_posicao(ticket, barra['close'] + deslocamento, barra['time'])
+
+    def copy_rates_from_pos(self, ativo, timeframe, posicao_inicial, quantidade):
+        """
+        Retorna as barras visíveis no tempo virtual, contando a partir do candle atual
+        (que só mostra a abertura).
+
+        Returns:
+            np.ndarray: Barras com dtype DTYPE_BARRAS, ou None se não houver dados.
+        """
+        i_atual = self.indice_atual(ativo, timeframe)
+        i_fim = i_atual - posicao_inicial
+        if i_fim <= 0 or quantidade <= 0:
+            return None
+        barras = np.array(self.barras(ativo, timeframe)[max(0, i_fim - quantidade):i_fim])
+        return self.apenas_abertura(barras) if i_fim == i_atual else barras
+
+    def symbol_info_tick(self, ativo):
+        """
+        Retorna o tick atual: BID na abertura do candle em formação.
+        """
+        barra = self.barra_atual(ativo)
+        if barra is None:
+            return None
+        bid = float(barra['close'])
+        return TickSimulado(self.agora, bid, bid + self.modelo_execucao.spread(ativo, barra['spread']))
+
+    def symbol_info(self, ativo):
+        """
+        Retorna as informações do símbolo a partir da especificação de contrato.
+        """
+        especificacao = self.modelo_execucao.especificacao(ativo)
+        ponto = especificacao['ponto']
+        return InfoSimboloSimulado(ativo, ponto, especificacao['tamanho_contrato'] * ponto, ponto, 0.01, 100.0, 0.01)
+
+    def account_info(self):
+        """
+        Retorna o saldo da conta simulada.
+        """
+        return InfoContaSimulada(self.saldo, self.saldo)
+
+    def positions_get(self):
+        """
+        Retorna as posições simuladas abertas.
+        """
+        return tuple(self.posicoes.values())
+
+    def order_send(self, request):
+        """
+        Executa uma ordem a mercado na abertura do candle atual, com os custos do modelo de execução.
+
+        Também aceita a modificação de SL/TP (TRADE_ACTION_SLTP) e o encerramento de
+        uma posição (TRADE_ACTION_DEAL com 'position').
+        """
+        barra = self.barra_atual(request['symbol'])
+        comentario = request.get('comment', '')
+        ticket = request.get('position')
+        if barra is None or request['action'] not in (self.TRADE_ACTION_DEAL, self.TRADE_ACTION_SLTP) \
+                or (ticket is not None and ticket not in self.posicoes):
+            return ResultadoOrdemSimulada(self.TRADE_RETCODE_INVALID, 0, 0.0, 0.0, comentario)
+
+        if request['action'] == self.TRADE_ACTION_SLTP:
+            self.posicoes[ticket] = self.posicoes[ticket]._replace(sl=request['sl'], tp=request['tp'])
+            return ResultadoOrdemSimulada(self.TRADE_RETCODE_DONE, ticket, 0.0, 0.0, comentario)
+
+        if ticket is not None:
+            # Encerramento a mercado: compras saem no BID e vendas no ASK
+            posicao = self.posicoes[ticket]
+            preco = float(barra['close'])
+            if posicao.type == self.POSITION_TYPE_SELL:
+                preco += self.modelo_execucao.spread(posicao.symbol, barra['spread'])
+            self.fechar_posicao(ticket, preco, barra['time'])
+            return ResultadoOrdemSimulada(self.TRADE_RETCODE_DONE, ticket, preco, posicao.volume, comentario)
+
+        tipo = 'compra' if request['type'] == self.ORDER_TYPE_BUY else 'venda'
+        preco = self.modelo_execucao.preco_entrada(request['symbol'], float(barra['close']), tipo, barra['spread'])
+
+        ticket = self.proximo_ticket
+        self.proximo_ticket += 1
+        self.posicoes[ticket] = PosicaoSimulada(
+            ticket, request['symbol'], request['type'], request['volume'], preco,
+            request['sl'], request['tp'], request['magic'], self.agora
+        )
+        self.ordens.append({
+            'ativo': request['symbol'],
+            'data_entrada': pd.Timestamp(self.agora, unit='s'),
+            'tipo': tipo,
+            'preco_entrada': preco,
+            'sl': request['sl'],
+            'tp': request['tp'],
+            'volume': request['volume'],
+        })
+
+        return ResultadoOrdemSimulada(self.TRADE_RETCODE_DONE, ticket, preco, request['volume'], comentario)
+
+    def initialize(self):
+        return True
+
+    def shutdown(self):
+        pass
+
+class RelogioVirtual:
+    """
+    Substituto de `datetime` no ciclo ao vivo, com a data do relógio do gateway.
+    """
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def now(self):
+        return pd.Timestamp(self.gateway.agora, unit='s').to_pydatetime()
+
+class CronometroEtapas:
+    """
+    Mede a latência de cada chamada das funções do ciclo, agrupadas por etapa.
+    """
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+
+    def medir(self, etapa, funcao):
+        """
+        Envolve uma função para registrar a duração de cada chamada.
+
+        Args:
+            etapa (str): Nome da etapa.
+            funcao (callable): Função medida.
+
+        Returns:
+            callable: Função com a mesma assinatura.
+        """
+        latencias = self.latencias[etapa]
+
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                latencias.append(time.perf_counter() - inicio)
+
+        return medida
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Para cada etapa, chamadas, tempo total (s) e latência média, p50 e p99 (ms).
+        """
+        resultado = {}
+        for etapa, latencias in self.latencias.items():
+            latencias = np.array(latencias) * 1000
+            resultado[etapa] = {
+                'chamadas': len(latencias),
+                'total_s': float(latencias.sum() / 1000),
+                'media_ms': float(latencias.mean()) if len(latencias) > 0 else 0.0,
+                'p50_ms': float(np.percentile(latencias, 50)) if len(latencias) > 0 else 0.0,
+                'p99_ms': float(np.percentile(latencias, 99)) if len(latencias) > 0 else 0.0,
+            }
+        return resultado
+
+@contextmanager
+def atributos_substituidos(substituicoes):
+    """
+    Substitui atributos de objetos/módulos e restaura os originais ao sair.
+
+    Args:
+        substituicoes (list): Tuplas (objeto, nome do atributo, novo valor).
+    """
+    originais = [(objeto, nome, getattr(objeto, nome)) for objeto, nome, _ in substituicoes]
+    try:
+        for objeto, nome, valor in substituicoes:
+            setattr(objeto, nome, valor)
+        yield
+    finally:
+        for objeto, nome, valor in reversed(originais):
+            setattr(objeto, nome, valor)
+
+def executar_replay(ativos=None, timeframes=None, inicio=None, fim=None, modelo_execucao=None,
+                    saldo_inicial=10000, diretorio=REPLAY_DIR, silencioso=True):
+    """
+    Executa o ciclo ao vivo (verificar_e_executar_sinais) sobre o histórico local, em tempo virtual.
+
+    O módulo MetaTrader5 é trocado por um GatewaySimulado nos módulos do ciclo e
+    `datetime.now()` passa a devolver o tempo virtual. Cada passo do relógio roda
+    um ciclo completo (busca de dados, indicadores, IA, risco e envio de ordens)
+    sem esperas, o mais rápido que a CPU permitir. O re-treino do modelo é
+    desligado e as decisões são gravadas em `diretorio`.
+
+    Args:
+        ativos (list): Símbolos do replay (padrão: ATIVOS).
+        timeframes (list): Timeframes analisados (padrão: TIMEFRAMES). O relógio anda
+            pelo único timeframe, ou por TIMEFRAME_FEED quando há vários.
+        inicio: Data do primeiro ciclo (None para o início do histórico).
+        fim: Data do último ciclo (None para o fim do histórico).
+        modelo_execucao (ModeloExecucao): Preços de execução e lucro das posições simuladas.
+        saldo_inicial (float): Saldo da conta simulada.
+        diretorio (str): Diretório do log de decisões do replay.
+        silencioso (bool): Se True, descarta as mensagens impressas pelo ciclo.
+
+    Returns:
+        dict: Ordens enviadas, trades encerrados (RegistroTrades), vazão e latência por etapa.
+    """
+    ativos = list(ativos) if ativos is not None else list(ATIVOS)
+    timeframes = list(timeframes) if timeframes is not None else list(TIMEFRAMES)
+    timeframe_relogio = timeframes[0] if len(timeframes) == 1 else TIMEFRAME_FEED
+
+    gateway = GatewaySimulado(ativos, timeframe_relogio, inicio, fim, modelo_execucao, saldo_inicial)
+    cronometro = CronometroEtapas()
+    os.makedirs(diretorio, exist_ok=True)
+
+    substituicoes = [(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]
+    substituicoes += [
+        (main, 'datetime', RelogioVirtual(gateway)),
+        (main, 'ATIVOS', ativos),
+        (main, 'TIMEFRAMES', timeframes),
+        (main, 'RETRAIN_INTERVAL', float('inf')),
+        (main, 'DECISIONS_LOG_PATH', os.path.join(diretorio, 'decisions_log.csv')),
+    ]
+    for etapa, funcoes in ETAPAS_REPLAY.items():
+        substituicoes += [(main, nome, cronometro.medir(etapa, getattr(main, nome))) for nome in funcoes]
+
+    estrategias = carregar_estrategias()
+    gerenciador = GerenciadorOrdens(MAGIC_NUMBER, estrategias)
+    gerenciador.executar_ordens = cronometro.medir('ordens', gerenciador.executar_ordens)
+    estados = EstadoAtivos()
+    agregadores = {}
+    risco_carteira = RiscoCarteira(ativos)
+    ciclo = cronometro.medir('ciclo', main.verificar_e_executar_sinais)
+
+    saida = open(os.devnull, 'w') if silencioso else sys.stdout
+    inicio_execucao = time.perf_counter()
+    try:
+        with atributos_substituidos(substituicoes), redirect_stdout(saida):
+            for passo in gateway.passos:
+                gateway.avancar(passo)
+                ciclo(gerenciador, estados, agregadores, risco_carteira=risco_carteira, estrategias=estrategias)
+            gateway.fechar_posicoes_abertas()
+    finally:
+        if silencioso:
+            saida.close()
+    duracao = time.perf_counter() - inicio_execucao
+
+    # Candles analisados: barras novas do relógio em cada ativo
+    barras = sum(
+        int(np.count_nonzero((gateway.barras(ativo, timeframe_relogio)['time'] >= gateway.passos[0])
+                             & (gateway.barras(ativo, timeframe_relogio)['time'] <= gateway.passos[-1])))
+        for ativo in ativos
+    ) if len(gateway.passos) > 0 else 0
+
+    return {
+        'ativos': ativos,
+        'timeframe': nome_timeframe(timeframe_relogio),
+        'ciclos': len(gateway.passos),
+        'barras': barras,
+        'duracao_segundos': duracao,
+        'ciclos_por_segundo': len(gateway.passos) / duracao if duracao > 0 else 0.0,
+        'barras_por_segundo': barras / duracao if duracao > 0 else 0.0,
+        'latencias': cronometro.estatisticas(),
+        'ordens': pd.DataFrame(gateway.ordens, columns=['ativo', 'data_entrada', 'tipo', 'preco_entrada',
+                                                        'sl', 'tp', 'volume']),
+        'trades': gateway.trades,
+        'saldo_final': gateway.saldo,
+    }
+
+def comparar_com_backtest(resultado_replay, inicio=None, fim=None):
+    """
+    Compara as entradas do replay com os trades de executar_backtest no mesmo histórico.
+
+    O backtest entra no fechamento do candle do sinal, e o ciclo ao vivo na abertura
+    do candle seguinte; as entradas do backtest são comparadas pelo tempo desse
+    candle seguinte. O ciclo ao vivo não entra em ativos já posicionados, enquanto
+    o backtest aceita trades sobrepostos; sinais do backtest durante uma posição do
+    replay são contados à parte. Como o replay enxerga as barras anteriores a `inicio`, o
+    backtest roda desde o início do histórico e só as entradas a partir de
+    `inicio` são comparadas.
+
+    Args:
+        resultado_replay (dict): Retorno de executar_replay (com um único timeframe).
+        inicio: Data inicial do backtest (a mesma do replay).
+        fim: Data final do backtest (a mesma do replay).
+
+    Returns:
+        dict: Entradas coincidentes, só no replay, só no backtest, bloqueadas por
+            posição aberta e a concordância (coincidentes / total comparado).
+    """
+    ordens = resultado_replay['ordens']
+    trades_replay = resultado_replay['trades'].para_dataframe()
+
+    entradas_backtest = []
+    for ativo in resultado_replay['ativos']:
+        resultados = executar_backtest_historico(ativo, resultado_replay['timeframe'], None, fim)
+        if resultados:
+            entradas = resultados['trades'].para_dataframe()[['ativo', 'data_entrada', 'tipo']]
+            tempos = abrir_historico(ativo, resultado_replay['timeframe'])['time']
+            segundos = pd.to_datetime(entradas['data_entrada']).to_numpy().astype('datetime64[s]').astype(np.int64)
+            seguintes = np.searchsorted(tempos, segundos, side='right')
+            entradas = entradas[seguintes < len(tempos)].copy()
+            entradas['data_entrada'] = pd.to_datetime(tempos[seguintes[seguintes < len(tempos)]], unit='s')
+            entradas_backtest.append(entradas)
+    backtest = pd.concat(entradas_backtest) if entradas_backtest else pd.DataFrame(columns=['ativo', 'data_entrada', 'tipo'])
+    if inicio is not None:
+        backtest = backtest[pd.to_datetime(backtest['data_entrada']) >= pd.Timestamp(converter_tempo(inicio), unit='s')]
+
+    chaves_replay = set(zip(ordens['ativo'], pd.to_datetime(ordens['data_entrada']), ordens['tipo']))
+    chaves_backtest = set(zip(backtest['ativo'], pd.to_datetime(backtest['data_entrada']), backtest['tipo']))
+
+    def em_posicao(ativo, data):
+        trades = trades_replay[trades_replay['ativo'] == ativo]
+        return bool(((trades['data_entrada'] < data) & (trades['data_saida'] > data)).any())
+
+    apenas_backtest = chaves_backtest - chaves_replay
+    bloqueados = {chave for chave in apenas_backtest if em_posicao(chave[0], chave[1])}
+    apenas_backtest -= bloqueados
+    coincidentes = chaves_replay & chaves_backtest
+    apenas_replay = chaves_replay - chaves_backtest
+
+    comparados = len(coincidentes) + len(apenas_replay) + len(apenas_backtest)
+    return {
+        'coincidentes': sorted(coincidentes),
+        'apenas_replay': sorted(apenas_replay),
+        'apenas_backtest': sorted(apenas_backtest),
+        'bloqueados_por_posicao': sorted(bloqueados),
+        'concordancia': len(coincidentes) / comparados if comparados > 0 else 1.0,
+    }
+
+if __name__ == "__main__":
+    resultado = executar_replay()
+    print(f"{resultado['ciclos']} ciclos e {resultado['barras']} candles em {resultado['duracao_segundos']:.1f} s "
+          f"({resultado['barras_por_segundo']:.0f} candles/s)")
+    for etapa, estatisticas in resultado['latencias'].items():
+        print(f"{etapa:12s} {estatisticas['chamadas']:8d} chamadas  média {estatisticas['media_ms']:.3f} ms  "
+              f"p99 {estatisticas['p99_ms']:.3f} ms")
+    print(f"Ordens: {len(resultado['ordens'])}  Trades: {len(resultado['trades'])}  Saldo final: {resultado['saldo_final']:.2f}")
+    if len(resultado['ordens']) > 0 or len(resultado['trades']) > 0:
+        comparacao = comparar_com_backtest(resultado)
+        print(f"Concordância com o backtest: {comparacao['concordancia']:.1%}")
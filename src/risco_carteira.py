@@ -0,0 +1,325 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from src.config import (ATIVOS, RISCO_POR_TRADE, MAX_RISCO_DIARIO, JANELA_CORRELACAO, LIMIAR_CORRELACAO,
+                        MAX_RISCO_CORRELACIONADO, FATOR_MINIMO_RISCO)
+
+class CorrelacaoMovel:
+    """
+    Matriz de correlação dos retornos de vários ativos em uma janela móvel.
+
+    Guarda as somas dos retornos e dos produtos cruzados da janela: cada barra nova
+    entra e a mais antiga sai em O(n²), sem recalcular a janela inteira. A cada
+    `janela` atualizações as somas são refeitas a partir dos retornos guardados,
+    para não acumular erro de arredondamento.
+    """
+
+    def __init__(self, num_ativos, janela=JANELA_CORRELACAO):
+        """
+        Args:
+            num_ativos (int): Número de ativos.
+            janela (int): Número de retornos na janela.
+        """
+        self.janela = janela
+        self.retornos = np.zeros((janela, num_ativos))
+        self.posicao = 0
+        self.quantidade = 0
+        self.atualizacoes = 0
+        self.soma = np.zeros(num_ativos)
+        self.produtos = np.zeros((num_ativos, num_ativos))
+
+    def atualizar(self, retornos):
+        """
+        Acrescenta os retornos de uma barra, retirando os da barra mais antiga da janela.
+
+        Args:
+            retornos (np.ndarray): Retorno de cada ativo na barra (NaN conta como zero).
+        """
+        retornos = np.nan_to_num(np.asarray(retornos, dtype=float))
+
+        if self.quantidade == self.janela:
+            antigo = self.retornos[self.posicao]
+            self.soma -= antigo
+            self.produtos -= np.outer(antigo, antigo)
+        else:
+            self.quantidade += 1
+
+        self.retornos[self.posicao] = retornos
+        self.soma += retornos
+        self.produtos += np.outer(retornos, retornos)
+        self.posicao = (self.posicao + 1) % self.janela
+
+        self.atualizacoes += 1
+        if self.atualizacoes % self.janela == 0:
+            guardados = self.retornos[:self.quantidade]
+            self.soma = guardados.sum(axis=0)
+            self.produtos = guardados.T @ guardados
+
+    def matriz(self):
+        """
+        Returns:
+            np.ndarray: Matriz de correlação (identidade enquanto houver menos de 2 retornos;
+                ativos sem variação têm correlação zero com os demais).
+        """
+        num_ativos = len(self.soma)
+        if self.quantidade < 2:
+            return np.eye(num_ativos)
+
+        media = self.soma / self.quantidade
+        covariancia = self.produtos / self.quantidade - np.outer(media, media)
+        desvio = np.sqrt(np.clip(np.diag(covariancia), 0, None))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlacao = covariancia / np.outer(desvio, desvio)
+        correlacao[~np.isfinite(correlacao)] = 0.0
+        correlacao = np.clip(correlacao, -1.0, 1.0)
+        np.fill_diagonal(correlacao, 1.0)
+
+        return correlacao
+
+class RiscoCarteira:
+    """
+    Limites de risco da carteira aplicados a cada novo sinal.
+
+    A correlação dos retornos entre os ativos observados é mantida por uma
+    CorrelacaoMovel. Um sinal soma o seu risco ao das exposições abertas que andam
+    no mesmo sentido (direção × direção × correlação >= LIMIAR_CORRELACAO); se o
+    total passar de MAX_RISCO_CORRELACIONADO, ou se o risco aberto no dia passar de
+    MAX_RISCO_DIARIO, o sinal é reduzido ao risco que ainda cabe, ou recusado se
+    sobrar menos que FATOR_MINIMO_RISCO do risco pedido. Riscos são frações do saldo.
+    """
+
+    def __init__(self, ativos=None, janela=JANELA_CORRELACAO, limiar_correlacao=LIMIAR_CORRELACAO,
+                 max_risco_correlacionado=MAX_RISCO_CORRELACIONADO, max_risco_diario=MAX_RISCO_DIARIO,
+                 fator_minimo=FATOR_MINIMO_RISCO):
+        """
+        Args:
+            ativos (list): Ativos observados (padrão: ATIVOS).
+            janela (int): Barras usadas na correlação.
+            limiar_correlacao (float): Correlação a partir da qual duas exposições somam risco.
+            max_risco_correlacionado (float): Risco máximo entre exposições correlacionadas.
+            max_risco_diario (float): Risco máximo aberto em um mesmo dia.
+            fator_minimo (float): Fração mínima do risco pedido para aceitar um sinal reduzido.
+        """
+        self.ativos = list(ativos) if ativos is not None else list(ATIVOS)
+        self.indices = {ativo: i for i, ativo in enumerate(self.ativos)}
+        self.limiar_correlacao = limiar_correlacao
+        self.max_risco_correlacionado = max_risco_correlacionado
+        self.max_risco_diario = max_risco_diario
+        self.fator_minimo = fator_minimo
+
+        self.correlacao = CorrelacaoMovel(len(self.ativos), janela)
+        self.matriz_correlacao = np.eye(len(self.ativos))
+        self.ultimos_precos = np.full(len(self.ativos), np.nan)
+        self.ultimo_tempo = None
+
+        self.exposicoes = {}
+        self.dia = None
+        self.risco_dia = 0.0
+
+    def parametros(self):
+        """
+        Returns:
+            dict: Ativos observados, janela da correlação e limites de risco.
+        """
+        return {
+            'ativos': self.ativos,
+            'janela': self.correlacao.janela,
+            'limiar_correlacao': self.limiar_correlacao,
+            'max_risco_correlacionado': self.max_risco_correlacionado,
+            'max_risco_diario': self.max_risco_diario,
+            'fator_minimo': self.fator_minimo,
+        }
+
+    def adicionar_barras(self, barras_por_ativo):
+        """
+        Atualiza a correlação com as barras novas dos ativos observados.
+
+        As barras de todos os ativos são alinhadas pelo tempo; um ativo sem barra em
+        um tempo repete o último preço (retorno zero).
+
+        Args:
+            barras_por_ativo (dict): {ativo: barras com 'time' e 'close'}. Barras com tempo
+                até o último já processado são ignoradas.
+
+        Returns:
+            int: Número de barras (tempos) acrescentadas.
+        """
+        tempos = [np.asarray(barras['time']) for barras in barras_por_ativo.values() if len(barras) > 0]
+        if not tempos:
+            return 0
+        tempos = np.unique(np.concatenate(tempos))
+        if self.ultimo_tempo is not None:
+            tempos = tempos[tempos > self.ultimo_tempo]
+        if len(tempos) == 0:
+            return 0
+
+        # Preços alinhados (tempo × ativo), repetindo o último preço conhecido
+        precos = np.full((len(tempos) + 1, len(self.ativos)), np.nan)
+        precos[0] = self.ultimos_precos
+        for ativo, barras in barras_por_ativo.items():
+            if ativo not in self.indices or len(barras) == 0:
+                continue
+            tempos_ativo = np.asarray(barras['time'])
+            novas = np.isin(tempos_ativo, tempos)
+            precos[1 + np.searchsorted(tempos, tempos_ativo[novas]), self.indices[ativo]] = np.asarray(barras['close'])[novas]
+        precos = pd.DataFrame(precos).ffill().to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            retornos = np.diff(np.log(precos), axis=0)
+        for linha in retornos:
+            self.correlacao.atualizar(linha)
+
+        self.ultimos_precos = precos[-1]
+        self.ultimo_tempo = int(tempos[-1])
+        self.matriz_correlacao = self.correlacao.matriz()
+
+        return len(tempos)
+
+    def correlacao_entre(self, ativo_a, ativo_b):
+        """
+        Returns:
+            float: Correlação atual entre dois ativos (1 para o mesmo ativo, 0 se não observado).
+        """
+        if ativo_a == ativo_b:
+            return 1.0
+        if ativo_a not in self.indices or ativo_b not in self.indices:
+            return 0.0
+        return float(self.matriz_correlacao[self.indices[ativo_a], self.indices[ativo_b]])
+
+    def atualizar_tempo(self, tempo=None):
+        """
+        Encerra as exposições com fim conhecido já passado e reinicia o risco do dia na virada.
+
+        Args:
+            tempo: Tempo atual (None para agora).
+        """
+        tempo = pd.Timestamp(tempo) if tempo is not None else pd.Timestamp(datetime.now())
+
+        for identificador, exposicao in list(self.exposicoes.items()):
+            if exposicao['fim'] is not None and exposicao['fim'] <= tempo:
+                del self.exposicoes[identificador]
+
+        if tempo.date() != self.dia:
+            self.dia = tempo.date()
+            self.risco_dia = 0.0
+
+    def risco_correlacionado(self, ativo, tipo_operacao):
+        """
+        Soma o risco das exposições abertas que andam no mesmo sentido de um novo sinal.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tipo_operacao (str): 'compra' ou 'venda'.
+
+        Returns:
+            float: Risco correlacionado já aberto.
+        """
+        direcao = 1 if tipo_operacao == 'compra' else -1
+        risco = 0.0
+        for exposicao in self.exposicoes.values():
+            if direcao * exposicao['direcao'] * self.correlacao_entre(ativo, exposicao['ativo']) >= self.limiar_correlacao:
+                risco += exposicao['risco']
+        return risco
+
+    def avaliar_sinal(self, ativo, tipo_operacao, risco=RISCO_POR_TRADE, tempo=None):
+        """
+        Decide quanto do risco pedido por um sinal cabe nos limites da carteira.
+
+        Args:
+            ativo (str): Símbolo do ativo.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            risco (float): Risco pedido, como fração do saldo.
+            tempo: Tempo do sinal (None para agora).
+
+        Returns:
+            float: Fator aplicado ao risco (1 aceita inteiro, entre FATOR_MINIMO_RISCO e 1
+                reduz, 0 recusa).
+        """
+        self.atualizar_tempo(tempo)
+
+        disponivel = min(
+            risco,
+            self.max_risco_correlacionado - self.risco_correlacionado(ativo, tipo_operacao),
+            self.max_risco_diario - self.risco_dia,
+        )
+        fator = max(0.0, disponivel) / risco if risco > 0 else 0.0
+
+        return fator if fator >= self.fator_minimo else 0.0
+
+    def registrar_abertura(self, identificador, ativo, tipo_operacao, risco=RISCO_POR_TRADE, tempo=None, fim=None):
+        """
+        Registra uma exposição aberta e soma o seu risco ao do dia.
+
+        Args:
+            identificador: Identificador da exposição (ex: ticket ou origem da ordem pendente).
+            ativo (str): Símbolo do ativo.
+            tipo_operacao (str): 'compra' ou 'venda'.
+            risco (float): Risco da posição, como fração do saldo.
+            tempo: Tempo da abertura (None para agora).
+            fim: Tempo de encerramento, se já conhecido (ex: no backtest).
+        """
+        self.atualizar_tempo(tempo)
+        self.exposicoes[identificador] = {
+            'ativo': ativo,
+            'direcao': 1 if tipo_operacao == 'compra' else -1,
+            'risco': risco,
+            'fim': pd.Timestamp(fim) if fim is not None else None,
+        }
+        self.risco_dia += risco
+
+    def confirmar_abertura(self, identificador, ticket):
+        """
+        Troca o identificador provisório de uma ordem pelo ticket da posição aberta.
+
+        Args:
+            identificador: Identificador usado em registrar_abertura.
+            ticket (int): Ticket da posição.
+        """
+        if identificador in self.exposicoes:
+            self.exposicoes[ticket] = self.exposicoes.pop(identificador)
+
+    def registrar_fechamento(self, identificador):
+        """
+        Encerra uma exposição aberta sem fim conhecido (ex: no backtest em blocos).
+
+        O risco já somado ao dia continua contando.
+
+        Args:
+            identificador: Identificador usado em registrar_abertura.
+        """
+        self.exposicoes.pop(identificador, None)
+
+    def cancelar_abertura(self, identificador):
+        """
+        Desfaz o registro de uma ordem que não foi executada.
+
+        Args:
+            identificador: Identificador usado em registrar_abertura.
+        """
+        exposicao = self.exposicoes.pop(identificador, None)
+        if exposicao is not None:
+            self.risco_dia = max(0.0, self.risco_dia - exposicao['risco'])
+
+    def sincronizar_posicoes(self, posicoes):
+        """
+        Alinha as exposições ao livro de posições abertas do terminal.
+
+        Posições encerradas deixam de contar; posições abertas desconhecidas (ex:
+        abertas antes de o robô reiniciar) contam com RISCO_POR_TRADE.
+
+        Args:
+            posicoes (dict): {ticket: posição} do GerenciadorOrdens.
+        """
+        for identificador, exposicao in list(self.exposicoes.items()):
+            if exposicao['fim'] is None and isinstance(identificador, (int, np.integer)) and identificador not in posicoes:
+                del self.exposicoes[identificador]
+
+        for ticket, posicao in posicoes.items():
+            if ticket not in self.exposicoes:
+                self.exposicoes[ticket] = {
+                    'ativo': posicao['ativo'],
+                    'direcao': 1 if posicao['tipo'] == 'compra' else -1,
+                    'risco': RISCO_POR_TRADE,
+                    'fim': None,
+                }
@@ -3,6 +3,12 @@ import numpy as np
 from src.config import RISCO_POR_TRADE, TP_OPTION
 from src.indicators import calcular_atr
 
+# Distância do stop loss usada no cálculo do lote, em múltiplos do ATR
+MULTIPLICADOR_ATR_SL = 1.5
+
+# Colunas de indicadores usadas pelo SL, pelo TP e pela distância do stop
+COLUNAS_RISCO = ['bb_upper', 'bb_middle', 'bb_lower', 'atr']
+
 def calcular_nivel_stop_loss(ativo, df, tipo_operacao):
     """
     Calcula o nível do stop loss com base na estratégia.
@@ -74,13 +80,14 @@ def calcular_distancia_stop_loss(ativo, df, tipo_operacao):
     # Índice do candle de sinal (penúltimo candle)
     i_sinal = -2
     
-    # Calcular ATR para estimar a volatilidade
-    df = calcular_atr(df)
+    # Calcular ATR para estimar a volatilidade (reaproveitando a coluna, se já existir)
+    if 'atr' not in df.columns:
+        df = calcular_atr(df)
     atr = df['atr'].iloc[i_sinal]
     
     # Usar ATR como base para a distância do stop loss
     # Este é um exemplo; você pode ajustar conforme sua estratégia
-    distancia_sl = atr * 1.5  # 1.5 vezes o ATR
+    distancia_sl = atr * MULTIPLICADOR_ATR_SL
     
     return distancia_sl
 
@@ -115,4 +122,124 @@ def aplicar_gestao_risco(ativo, df, tipo_operacao):
         'stop_loss': sl,
         'take_profit': tp,
         'distancia_sl': distancia_sl
-    }
\ No newline at end of file
+    }
+
+def calcular_niveis_vetorizado(df, indices, tipos_operacao, banda_oposta=None):
+    """
+    Calcula os níveis de SL e TP de vários sinais de uma vez.
+    
+    Cada sinal recebe os mesmos níveis que aplicar_gestao_risco daria com os dados
+    até o candle do sinal.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com dados de preços e indicadores.
+        indices (np.ndarray): Posição do candle atual de cada sinal.
+        tipos_operacao (np.ndarray): 'compra' ou 'venda' para cada sinal.
+        banda_oposta (bool): Se True, TP na banda oposta; se False, na linha central
+            (padrão: TP_OPTION).
+        
+    Returns:
+        tuple: (stop loss, take profit) como arrays.
+    """
+    if banda_oposta is None:
+        banda_oposta = TP_OPTION == 2
+    
+    indices = np.asarray(indices)
+    compra = np.asarray(tipos_operacao) == 'compra'
+    
+    # Stop além do candle que fechou fora da banda, com a mesma margem de segurança
+    sl = np.where(compra, df['low'].to_numpy()[indices - 1] - 0.0001, df['high'].to_numpy()[indices - 1] + 0.0001)
+    
+    if banda_oposta:
+        tp = np.where(compra, df['bb_upper'].to_numpy()[indices], df['bb_lower'].to_numpy()[indices])
+    else:
+        tp = df['bb_middle'].to_numpy()[indices]
+    
+    return sl, tp
+
+def calcular_lote_vetorizado(distancia_sl, saldo, risco_por_trade, tick_value, tick_size,
+                             lote_min=0.01, lote_max=100.0, lote_step=0.01):
+    """
+    Calcula o volume de vários trades pelo risco por trade e pela distância do stop loss.
+    
+    Usa a mesma regra de calcular_lote (src/mt5_connection.py), com as informações
+    do símbolo e da conta passadas diretamente.
+    
+    Args:
+        distancia_sl (np.ndarray): Distância do stop loss de cada trade.
+        saldo (float): Saldo da conta.
+        risco_por_trade (float): Percentual do saldo a arriscar.
+        tick_value (float): Valor de um tick (symbol_info.trade_tick_value).
+        tick_size (float): Tamanho de um tick (symbol_info.trade_tick_size).
+        lote_min (float): Lote mínimo do símbolo.
+        lote_max (float): Lote máximo do símbolo.
+        lote_step (float): Incremento de lote do símbolo.
+        
+    Returns:
+        np.ndarray: Volume de cada trade.
+    """
+    distancia_sl = np.asarray(distancia_sl, dtype=float)
+    
+    # Converter a distância do stop loss para valor monetário
+    pontos_por_tick = tick_value / tick_size if tick_size > 0 else 1
+    sl_valor = distancia_sl * pontos_por_tick
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lote = np.where(sl_valor > 0, saldo * risco_por_trade / sl_valor, 0.01)
+    lote = np.round(lote, 2)
+    
+    # Limites do símbolo; dentro deles, arredondar para o incremento mais próximo
+    return np.where(lote < lote_min, lote_min,
+                    np.where(lote > lote_max, lote_max, np.round(lote / lote_step) * lote_step))
+
+def aplicar_gestao_risco_vetorizado(df, sinais, banda_oposta=None, saldo=None, symbol_info=None,
+                                    risco_por_trade=RISCO_POR_TRADE):
+    """
+    Aplica a gestão de risco a todos os sinais de um DataFrame de uma vez.
+    
+    Cada sinal recebe o mesmo SL, TP e distância do stop que aplicar_gestao_risco
+    daria com os dados até o candle do sinal. O ATR é lido da coluna 'atr' quando
+    ela já existe (ex: DataFrame do armazém de características) ou calculado uma
+    única vez para o DataFrame inteiro.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com dados de preços e indicadores.
+        sinais (np.ndarray): 1 para compra, -1 para venda e 0 sem sinal, um valor por
+            candle (ver gerar_sinais).
+        banda_oposta (bool): Se True, TP na banda oposta; se False, na linha central
+            (padrão: TP_OPTION).
+        saldo (float): Saldo da conta, para o cálculo do lote.
+        symbol_info: Informações do símbolo (trade_tick_value, trade_tick_size e
+            limites de volume), para o cálculo do lote.
+        risco_por_trade (float): Percentual do saldo a arriscar.
+        
+    Returns:
+        dict: Arrays 'indices', 'tipos', 'stop_loss', 'take_profit', 'distancia_sl' e
+            'lote' (0.01 quando saldo ou symbol_info não são informados), um valor por sinal.
+    """
+    sinais = np.asarray(sinais)
+    indices = np.flatnonzero(sinais)
+    indices = indices[indices >= 1]  # O sinal depende do candle anterior
+    tipos = np.where(sinais[indices] == 1, 'compra', 'venda')
+    
+    sl, tp = calcular_niveis_vetorizado(df, indices, tipos, banda_oposta)
+    
+    atr = df['atr'] if 'atr' in df.columns else calcular_atr(df)['atr']
+    distancia_sl = atr.to_numpy()[indices - 1] * MULTIPLICADOR_ATR_SL
+    
+    if saldo is not None and symbol_info is not None:
+        lote = calcular_lote_vetorizado(
+            distancia_sl, saldo, risco_por_trade, symbol_info.trade_tick_value, symbol_info.trade_tick_size,
+            symbol_info.volume_min, symbol_info.volume_max, symbol_info.volume_step
+        )
+    else:
+        lote = np.full(len(indices), 0.01)
+    
+    return {
+        'indices': indices,
+        'tipos': tipos,
+        'stop_loss': sl,
+        'take_profit': tp,
+        'distancia_sl': distancia_sl,
+        'lote': lote,
+    }
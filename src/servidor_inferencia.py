@@ -0,0 +1,503 @@
+import os
+import sys
+import secrets
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from multiprocessing.connection import Listener, Client, AuthenticationError
+import numpy as np
+import joblib
+from src.config import ENDERECO_INFERENCIA, VARIAVEL_CHAVE_INFERENCIA, ARQUIVO_CHAVE_INFERENCIA
+from src.ai_model import MODEL_PATH
+from src.floresta_compacta import FlorestaCompacta
+
+# Tempo máximo (em segundos) que uma requisição espera por outras para formar um lote
+JANELA_LOTE = 0.005
+# Número máximo de requisições previstas em uma única chamada a predict_proba
+MAX_LOTE = 256
+# Número de latências recentes usadas nas estatísticas
+AMOSTRAS_LATENCIA = 1000
+# Tamanho em bytes das chaves geradas, e mínimo aceito
+TAMANHO_CHAVE = 32
+TAMANHO_MINIMO_CHAVE = 16
+
+def gerar_chave_inferencia(caminho=None):
+    """
+    Cria o arquivo com a chave de autenticação desta instalação.
+
+    A chave tem TAMANHO_CHAVE bytes aleatórios e o arquivo só pode ser lido pelo
+    usuário que o criou. Um arquivo existente nunca é sobrescrito.
+
+    Args:
+        caminho (str): Caminho do arquivo (padrão: ARQUIVO_CHAVE_INFERENCIA).
+
+    Returns:
+        str: Caminho do arquivo criado.
+    """
+    if caminho is None:
+        caminho = ARQUIVO_CHAVE_INFERENCIA
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+    descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+    with os.fdopen(descritor, 'wb') as arquivo:
+        arquivo.write(secrets.token_bytes(TAMANHO_CHAVE))
+
+    return caminho
+
+def carregar_chave_inferencia(caminho=None):
+    """
+    Carrega a chave de autenticação compartilhada entre o servidor e os clientes.
+
+    A chave vem da variável de ambiente VARIAVEL_CHAVE_INFERENCIA (em hexadecimal) ou,
+    sem ela, do arquivo criado por gerar_chave_inferencia. As mensagens do servidor são
+    desserializadas com pickle, por isso não há chave padrão: sem uma chave válida, ou
+    com o arquivo legível por outros usuários, o servidor e o cliente não iniciam.
+
+    Args:
+        caminho (str): Caminho do arquivo (padrão: ARQUIVO_CHAVE_INFERENCIA).
+
+    Returns:
+        bytes: Chave de autenticação.
+    """
+    if caminho is None:
+        caminho = ARQUIVO_CHAVE_INFERENCIA
+
+    valor = os.environ.get(VARIAVEL_CHAVE_INFERENCIA)
+    if valor:
+        try:
+            chave = bytes.fromhex(valor)
+        except ValueError:
+            raise RuntimeError(f"{VARIAVEL_CHAVE_INFERENCIA} precisa estar em hexadecimal") from None
+    elif os.path.exists(caminho):
+        if os.name != 'nt' and os.stat(caminho).st_mode & 0o077:
+            raise RuntimeError(f"O arquivo de chave {caminho} pode ser lido por outros usuários. Use: chmod 600 {caminho}")
+        with open(caminho, 'rb') as arquivo:
+            chave = arquivo.read()
+    else:
+        raise RuntimeError(f"Chave do servidor de inferência não encontrada. Defina {VARIAVEL_CHAVE_INFERENCIA} "
+                           f"ou crie {caminho} com: python -m src.servidor_inferencia --gerar-chave")
+
+    if len(chave) < TAMANHO_MINIMO_CHAVE:
+        raise RuntimeError(f"Chave do servidor de inferência com menos de {TAMANHO_MINIMO_CHAVE} bytes")
+
+    return chave
+
+class ServidorInferencia:
+    """
+    Processo único que mantém o modelo de IA em memória e atende várias instâncias do robô.
+
+    Cada conexão é atendida por uma thread que apenas enfileira as requisições. Uma
+    thread de lote junta as requisições que chegam dentro de `janela_lote` e faz uma
+    única chamada a predict_proba para todas elas. O modelo é recarregado quando o
+    arquivo em disco muda (ex: após um re-treino), e a versão devolvida em cada
+    resposta é a data de modificação do arquivo.
+    """
+
+    def __init__(self, endereco=ENDERECO_INFERENCIA, caminho_modelo=MODEL_PATH, chave=None,
+                 janela_lote=JANELA_LOTE, max_lote=MAX_LOTE):
+        """
+        Args:
+            endereco (str): Caminho do socket Unix (ou nome do pipe no Windows).
+            caminho_modelo (str): Caminho do modelo salvo por treinar_modelo (.pkl) ou
+                da floresta compacta (.npz).
+            chave (bytes): Chave de autenticação compartilhada com os clientes
+                (padrão: carregar_chave_inferencia()).
+            janela_lote (float): Espera máxima em segundos para formar um lote.
+            max_lote (int): Número máximo de requisições por lote.
+        """
+        self.endereco = endereco
+        self.caminho_modelo = caminho_modelo
+        self.chave = chave if chave is not None else carregar_chave_inferencia()
+        self.janela_lote = janela_lote
+        self.max_lote = max_lote
+
+        self.modelo = None
+        self.versao = None
+        self.mtime_modelo = None
+
+        self.fila = queue.Queue()
+        self.listener = None
+        self.ativo = False
+        self.threads = []
+
+        self.trava_estatisticas = threading.Lock()
+        self.latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+        self.num_requisicoes = 0
+        self.num_lotes = 0
+        self.num_clientes = 0
+
+    def atualizar_modelo(self):
+        """
+        Carrega o modelo se o arquivo foi criado ou modificado desde a última carga.
+
+        Se a leitura falhar (ex: arquivo sendo gravado), o modelo atual é mantido.
+        """
+        if not os.path.exists(self.caminho_modelo):
+            return
+
+        mtime = os.path.getmtime(self.caminho_modelo)
+        if mtime == self.mtime_modelo:
+            return
+
+        try:
+            if self.caminho_modelo.endswith('.npz'):
+                modelo = FlorestaCompacta.carregar(self.caminho_modelo)
+            else:
+                modelo = joblib.load(self.caminho_modelo)
+        except Exception as erro:
+            print(f"Falha ao carregar o modelo {self.caminho_modelo}: {erro}")
+            return
+
+        self.modelo = modelo
+        self.mtime_modelo = mtime
+        self.versao = datetime.fromtimestamp(mtime).isoformat(timespec='seconds')
+        print(f"Modelo carregado (versão {self.versao})")
+
+    def iniciar(self):
+        """
+        Abre o endereço de escuta e inicia as threads de conexão e de lote.
+        """
+        self.atualizar_modelo()
+
+        if os.name != 'nt':
+            # Remover socket deixado por uma execução anterior
+            diretorio = os.path.dirname(self.endereco)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            if os.path.exists(self.endereco):
+                os.remove(self.endereco)
+
+        self.listener = Listener(self.endereco, authkey=self.chave)
+        self.ativo = True
+        self.threads = [
+            threading.Thread(target=self.aceitar_conexoes, daemon=True),
+            threading.Thread(target=self.processar_lotes, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def parar(self):
+        """
+        Encerra o servidor, respondendo antes as requisições já enfileiradas.
+        """
+        if not self.ativo:
+            return
+
+        self.ativo = False
+        self.fila.put(None)
+        self.listener.close()
+        for thread in self.threads:
+            thread.join(timeout=1)
+
+        if os.name != 'nt' and os.path.exists(self.endereco):
+            os.remove(self.endereco)
+
+    def servir(self):
+        """
+        Inicia o servidor e o mantém ativo até Ctrl+C.
+        """
+        self.iniciar()
+        print(f"Servidor de inferência ouvindo em {self.endereco}. Pressione Ctrl+C para interromper.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nServidor de inferência interrompido pelo usuário.")
+        finally:
+            self.parar()
+
+    def aceitar_conexoes(self):
+        """
+        Aceita conexões de clientes, cada uma atendida em sua própria thread.
+        """
+        while self.ativo:
+            try:
+                conexao = self.listener.accept()
+            except AuthenticationError:
+                print("Conexão recusada: chave de autenticação inválida")
+                continue
+            except (OSError, EOFError):
+                if not self.ativo:
+                    break
+                continue
+
+            threading.Thread(target=self.atender_conexao, args=(conexao,), daemon=True).start()
+
+    def atender_conexao(self, conexao):
+        """
+        Lê as requisições de um cliente até a conexão ser fechada.
+
+        Requisições de previsão vão para a fila de lote; as de estatísticas são
+        respondidas diretamente.
+
+        Args:
+            conexao (Connection): Conexão com o cliente.
+        """
+        with self.trava_estatisticas:
+            self.num_clientes += 1
+
+        try:
+            while True:
+                mensagem = conexao.recv()
+                if mensagem[0] == 'prever':
+                    self.fila.put((conexao, mensagem[1], time.perf_counter()))
+                elif mensagem[0] == 'estatisticas':
+                    conexao.send(self.estatisticas())
+                else:
+                    conexao.send({'erro': f"Requisição desconhecida: {mensagem[0]}"})
+        except (EOFError, OSError):
+            pass
+        finally:
+            conexao.close()
+            with self.trava_estatisticas:
+                self.num_clientes -= 1
+
+    def processar_lotes(self):
+        """
+        Junta as requisições enfileiradas em lotes e responde cada uma.
+        """
+        encerrar = False
+        while not encerrar:
+            requisicao = self.fila.get()
+            if requisicao is None:
+                break
+
+            # Esperar um pouco por requisições de outros robôs
+            lote = [requisicao]
+            limite = time.perf_counter() + self.janela_lote
+            while len(lote) < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    requisicao = self.fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if requisicao is None:
+                    encerrar = True
+                    break
+                lote.append(requisicao)
+
+            self.responder_lote(lote)
+
+    def responder_lote(self, lote):
+        """
+        Faz uma única previsão para todas as requisições do lote e envia as respostas.
+
+        Args:
+            lote (list): Tuplas (conexao, caracteristicas, instante de chegada).
+        """
+        self.atualizar_modelo()
+
+        matrizes = [np.atleast_2d(np.asarray(caracteristicas, dtype=float)) for _, caracteristicas, _ in lote]
+        limites = np.cumsum([0] + [len(matriz) for matriz in matrizes])
+
+        respostas = None
+        if self.modelo is None:
+            respostas = [{'versao': None, 'classes': None, 'probabilidades': None}] * len(lote)
+        else:
+            try:
+                probabilidades = self.modelo.predict_proba(np.concatenate(matrizes))
+                classes = self.modelo.classes_.tolist()
+                respostas = [
+                    {'versao': self.versao, 'classes': classes, 'probabilidades': probabilidades[inicio:fim]}
+                    for inicio, fim in zip(limites[:-1], limites[1:])
+                ]
+            except Exception as erro:
+                respostas = [{'erro': str(erro)}] * len(lote)
+
+        agora = time.perf_counter()
+        for (conexao, _, chegada), resposta in zip(lote, respostas):
+            try:
+                conexao.send(resposta)
+            except OSError:
+                continue  # Cliente desconectou antes da resposta
+
+            with self.trava_estatisticas:
+                self.latencias.append(agora - chegada)
+
+        with self.trava_estatisticas:
+            self.num_requisicoes += len(lote)
+            self.num_lotes += 1
+
+    def estatisticas(self):
+        """
+        Retorna a versão do modelo e as estatísticas de uso e latência.
+
+        Returns:
+            dict: Versão do modelo, clientes conectados, requisições, lotes, tamanho
+                médio do lote e latências (média, p50 e p99, em ms) das requisições recentes.
+        """
+        with self.trava_estatisticas:
+            latencias = np.array(self.latencias) * 1000
+            num_requisicoes = self.num_requisicoes
+            num_lotes = self.num_lotes
+            num_clientes = self.num_clientes
+
+        return {
+            'versao': self.versao,
+            'clientes': num_clientes,
+            'requisicoes': num_requisicoes,
+            'lotes': num_lotes,
+            'tamanho_medio_lote': num_requisicoes / num_lotes if num_lotes > 0 else 0.0,
+            'latencia_media_ms': float(latencias.mean()) if len(latencias) > 0 else 0.0,
+            'latencia_p50_ms': float(np.percentile(latencias, 50)) if len(latencias) > 0 else 0.0,
+            'latencia_p99_ms': float(np.percentile(latencias, 99)) if len(latencias) > 0 else 0.0,
+        }
+
+class ClienteInferencia:
+    """
+    Cliente do servidor de inferência com a mesma interface de previsão do modelo.
+
+    Pode ser passado como `modelo` para prever_qualidade_sinal no lugar do
+    RandomForest carregado localmente.
+    """
+
+    def __init__(self, endereco=ENDERECO_INFERENCIA, chave=None):
+        """
+        Args:
+            endereco (str): Caminho do socket Unix (ou nome do pipe no Windows).
+            chave (bytes): Chave de autenticação compartilhada com o servidor
+                (padrão: carregar_chave_inferencia()).
+        """
+        self.endereco = endereco
+        self.chave = chave if chave is not None else carregar_chave_inferencia()
+        self.trava = threading.Lock()
+        self.conexao = Client(endereco, authkey=self.chave)
+        self.versao = None
+        self.classes_ = None
+
+    def requisitar(self, mensagem):
+        """
+        Envia uma requisição e aguarda a resposta, reconectando uma vez se a conexão caiu.
+
+        Se o servidor continuar fora do ar, a conexão é descartada e a próxima
+        requisição tenta conectar de novo, de modo que o cliente volta a usar o
+        servidor assim que ele for reiniciado.
+
+        Args:
+            mensagem (tuple): Requisição no formato (tipo, dados).
+
+        Returns:
+            dict: Resposta do servidor.
+
+        Raises:
+            OSError, EOFError: Se o servidor não responder nem após a reconexão.
+        """
+        with self.trava:
+            try:
+                if self.conexao is None:
+                    self.conexao = Client(self.endereco, authkey=self.chave)
+                self.conexao.send(mensagem)
+                resposta = self.conexao.recv()
+            except (EOFError, OSError):
+                # Servidor reiniciado: reconectar e reenviar
+                self.descartar_conexao()
+                try:
+                    self.conexao = Client(self.endereco, authkey=self.chave)
+                    self.conexao.send(mensagem)
+                    resposta = self.conexao.recv()
+                except (EOFError, OSError):
+                    self.descartar_conexao()
+                    raise
+
+        if 'erro' in resposta:
+            raise RuntimeError(f"Erro no servidor de inferência: {resposta['erro']}")
+        return resposta
+
+    def descartar_conexao(self):
+        """
+        Fecha a conexão atual, ignorando erros de uma conexão já quebrada.
+        """
+        if self.conexao is not None:
+            try:
+                self.conexao.close()
+            except OSError:
+                pass
+            self.conexao = None
+
+    def predict_proba(self, X):
+        """
+        Retorna as probabilidades de cada classe.
+
+        Args:
+            X (array-like): Matriz de características.
+
+        Returns:
+            np.ndarray: Probabilidades, com colunas na ordem de `classes_`.
+        """
+        resposta = self.requisitar(('prever', np.asarray(X, dtype=float)))
+        if resposta['probabilidades'] is None:
+            raise RuntimeError("Servidor de inferência sem modelo carregado")
+
+        self.versao = resposta['versao']
+        self.classes_ = np.array(resposta['classes'])
+        return resposta['probabilidades']
+
+    def predict(self, X):
+        """
+        Retorna a classe prevista para cada linha.
+
+        Sem modelo no servidor, todos os sinais são considerados bons, como em
+        prever_qualidade_sinal.
+
+        Args:
+            X (array-like): Matriz de características.
+
+        Returns:
+            np.ndarray: Classe prevista para cada linha de X.
+        """
+        resposta = self.requisitar(('prever', np.asarray(X, dtype=float)))
+        if resposta['probabilidades'] is None:
+            return np.ones(len(np.atleast_2d(X)), dtype=int)
+
+        self.versao = resposta['versao']
+        self.classes_ = np.array(resposta['classes'])
+        return self.classes_[np.argmax(resposta['probabilidades'], axis=1)]
+
+    def estatisticas(self):
+        """
+        Consulta a versão do modelo e as estatísticas de latência do servidor.
+
+        Returns:
+            dict: Estatísticas retornadas por ServidorInferencia.estatisticas.
+        """
+        return self.requisitar(('estatisticas',))
+
+    def fechar(self):
+        """
+        Fecha a conexão com o servidor.
+        """
+        with self.trava:
+            self.descartar_conexao()
+
+def conectar_servidor_inferencia(endereco=ENDERECO_INFERENCIA, chave=None):
+    """
+    Conecta ao servidor de inferência.
+
+    Sem chave de autenticação configurada, o erro de carregar_chave_inferencia é
+    propagado e o robô não inicia.
+
+    Args:
+        endereco (str): Caminho do socket Unix (ou nome do pipe no Windows).
+        chave (bytes): Chave de autenticação compartilhada com o servidor
+            (padrão: carregar_chave_inferencia()).
+
+    Returns:
+        ClienteInferencia: Cliente conectado ou None se o servidor não estiver disponível.
+    """
+    try:
+        return ClienteInferencia(endereco, chave)
+    except (OSError, EOFError, AuthenticationError) as erro:
+        print(f"Servidor de inferência indisponível em {endereco}: {erro}")
+        return None
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--gerar-chave']:
+        print(f"Chave de autenticação criada em {gerar_chave_inferencia()}")
+    else:
+        ServidorInferencia().servir()
@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
-from src.indicators import calcular_bandas_bollinger, calcular_adx, calcular_rsi, calcular_macd, calcular_stochastic
+from src.indicators import calcular_indicadores_necessarios
+from src.ai_model import COLUNAS_CARACTERISTICAS
+
+# Colunas de indicadores usadas pelos sinais e pelo filtro de mercado lateralizado
+COLUNAS_ESTRATEGIA = ['bb_upper', 'bb_middle', 'bb_lower', 'adx']
 
 def verificar_sinal_compra(df):
     """
@@ -54,23 +58,25 @@ def verificar_sinal_venda(df):
         
     return False
 
-def preparar_dados_para_estrategia(df):
+def preparar_dados_para_estrategia(df, colunas=None):
     """
     Prepara os dados calculando os indicadores necessários.
     
+    Apenas os indicadores das colunas pedidas são calculados (ver
+    calcular_indicadores_necessarios); colunas que já existem são reaproveitadas.
+    
     Args:
         df (pd.DataFrame): DataFrame com dados de preços.
+        colunas (list): Colunas de indicadores necessárias (padrão: as da estratégia e
+            as das características do modelo de IA).
         
     Returns:
         pd.DataFrame: DataFrame com indicadores calculados.
     """
-    df = calcular_bandas_bollinger(df)
-    df = calcular_adx(df)
-    df = calcular_rsi(df)
-    df = calcular_macd(df)
-    df = calcular_stochastic(df)
+    if colunas is None:
+        colunas = COLUNAS_ESTRATEGIA + COLUNAS_CARACTERISTICAS
     
-    return df
+    return calcular_indicadores_necessarios(df, colunas)
 
 def filtrar_mercado_lateralizado(df, limiar_adx=25):
     """
@@ -86,4 +92,38 @@ def filtrar_mercado_lateralizado(df, limiar_adx=25):
     if len(df) < 1 or pd.isna(df['adx'].iloc[-1]):
         return False
         
-    return df['adx'].iloc[-1] < limiar_adx
\ No newline at end of file
+    return df['adx'].iloc[-1] < limiar_adx
+
+def gerar_sinais(df, limiar_adx=25):
+    """
+    Calcula de forma vetorizada os sinais de todos os candles do DataFrame.
+    
+    O sinal do candle i é o mesmo que verificar_sinal_compra/verificar_sinal_venda e
+    filtrar_mercado_lateralizado dariam com os dados até o candle i (compra tem
+    prioridade sobre venda, como no backtest).
+    
+    Args:
+        df (pd.DataFrame): DataFrame com dados de preços e indicadores.
+        limiar_adx (int): Valor limite do ADX para considerar mercado lateralizado.
+        
+    Returns:
+        np.ndarray: 1 para compra, -1 para venda e 0 sem sinal, um valor por candle.
+    """
+    close = df['close'].to_numpy()
+    bb_lower = df['bb_lower'].to_numpy()
+    bb_upper = df['bb_upper'].to_numpy()
+    adx = df['adx'].to_numpy()
+    
+    sinais = np.zeros(len(df), dtype=np.int8)
+    if len(df) < 3:
+        return sinais
+    
+    # Comparações com NaN são falsas, como nas verificações candle a candle
+    lateral = adx[1:] < limiar_adx
+    compra = (close[:-1] < bb_lower[:-1]) & (close[1:] > bb_lower[1:]) & lateral
+    venda = (close[:-1] > bb_upper[:-1]) & (close[1:] < bb_upper[1:]) & lateral
+    
+    sinais[1:][venda] = -1
+    sinais[1:][compra] = 1
+    
+    return sinais
@@ -3,8 +3,12 @@ import pandas as pd
 import numpy as np
 import os
 import joblib
+import tempfile
+import shutil
 from sklearn.ensemble import RandomForestClassifier
-from src.ai_model import extrair_caracteristicas, treinar_modelo, carregar_modelo, prever_qualidade_sinal
+import src.ai_model as ai_model
+from src.ai_model import (extrair_caracteristicas, treinar_modelo, carregar_modelo, prever_qualidade_sinal,
+                          treinar_modelo_incremental, carregar_marca_treino)
 
 class TestAIModel(unittest.TestCase):
     
@@ -12,6 +16,13 @@ class TestAIModel(unittest.TestCase):
         """
         Configuração inicial para os testes.
         """
+        # Modelos gravados em um diretório temporário, sem tocar em models/
+        self.diretorio = tempfile.mkdtemp()
+        self.caminhos_originais = (ai_model.MODEL_PATH, ai_model.MODEL_COMPACTO_PATH, ai_model.MARCA_TREINO_PATH)
+        ai_model.MODEL_PATH = os.path.join(self.diretorio, 'bollinger_ai.pkl')
+        ai_model.MODEL_COMPACTO_PATH = os.path.join(self.diretorio, 'bollinger_ai_compacto.npz')
+        ai_model.MARCA_TREINO_PATH = os.path.join(self.diretorio, 'marca_treino.json')
+        
         # Criar dados de exemplo para treinamento
         self.dados_trades_exemplo = pd.DataFrame({
             'bb_position': np.random.rand(50),
@@ -37,6 +48,10 @@ class TestAIModel(unittest.TestCase):
             'hour': 10
         }
 
+    def tearDown(self):
+        ai_model.MODEL_PATH, ai_model.MODEL_COMPACTO_PATH, ai_model.MARCA_TREINO_PATH = self.caminhos_originais
+        shutil.rmtree(self.diretorio)
+
     def test_extrair_caracteristicas(self):
         """
         Testa se a função extrair_caracteristicas extrai as características corretamente.
@@ -77,14 +92,14 @@ class TestAIModel(unittest.TestCase):
         self.assertIsInstance(modelo, RandomForestClassifier)
         
         # Verificar se o modelo foi salvo
-        self.assertTrue(os.path.exists("models/bollinger_ai.pkl"))
+        self.assertTrue(os.path.exists(ai_model.MODEL_PATH))
 
     def test_carregar_modelo(self):
         """
         Testa se a função carregar_modelo carrega um modelo salvo.
         """
         # Primeiro, garantir que há um modelo salvo
-        if not os.path.exists("models/bollinger_ai.pkl"):
+        if not os.path.exists(ai_model.MODEL_PATH):
             treinar_modelo(self.dados_trades_exemplo)
         
         # Carregar o modelo
@@ -107,6 +122,68 @@ class TestAIModel(unittest.TestCase):
         # Verificar se a previsão é válida (0 ou 1)
         self.assertIn(previsao, [0, 1])
 
+    def criar_trades_regra(self, inicio, quantidade, invertida=False, seed=0):
+        """
+        Cria trades cujo resultado segue uma regra clara na posição nas bandas:
+        lucro acima do meio das bandas (ou abaixo, com `invertida`).
+        """
+        rng = np.random.RandomState(seed)
+        posicao = np.where(rng.rand(quantidade) < 0.5, rng.uniform(0.0, 0.4, quantidade), rng.uniform(0.6, 1.0, quantidade))
+        trades = pd.DataFrame({
+            'bb_position': posicao,
+            'adx': rng.rand(quantidade) * 50,
+            'volatility': rng.rand(quantidade) * 0.1,
+            'rsi': rng.rand(quantidade) * 100,
+            'macd_position': rng.rand(quantidade) * 2 - 1,
+            'stochastic_position': rng.rand(quantidade) * 2 - 1,
+            'day_of_week': rng.randint(0, 7, quantidade),
+            'hour': rng.randint(0, 24, quantidade),
+            'resultado': ((posicao > 0.5) != invertida).astype(int),
+        })
+        trades['data_entrada'] = pd.Timestamp('2023-01-01') + pd.to_timedelta(inicio + np.arange(quantidade), unit='D')
+        return trades
+
+    def test_treinar_modelo_incremental(self):
+        """
+        Testa se a atualização incremental usa apenas os trades após a marca d'água, se a
+        marca só avança com a atualização aceita e se os trades recusados se acumulam.
+        """
+        def treinar(dados):
+            return treinar_modelo_incremental(dados, arvores_por_atualizacao=300, max_arvores=350)
+
+        # Sem modelo salvo: treino completo com os primeiros trades
+        dados = self.criar_trades_regra(0, 60, seed=1)
+        modelo = treinar(dados)
+        self.assertEqual(len(modelo.estimators_), 100)
+        self.assertEqual(carregar_marca_treino()['data_entrada'], str(dados['data_entrada'].iloc[-1]))
+
+        # Poucos trades novos, ou poucos para avaliar a atualização: o modelo e a marca não mudam
+        for quantidade in [15, 40]:
+            novos = self.criar_trades_regra(60, quantidade, seed=2)
+            self.assertEqual(len(treinar(pd.concat([dados, novos], ignore_index=True)).estimators_), 100)
+            self.assertEqual(carregar_marca_treino()['tipo'], 'completo')
+
+        # Árvores novas com a regra invertida e avaliação com a regra do modelo: recusada,
+        # sem avançar a marca d'água
+        invertidos = self.criar_trades_regra(60, 40, invertida=True, seed=3)
+        avaliacao = self.criar_trades_regra(100, 10, seed=4)
+        dados = pd.concat([dados, invertidos, avaliacao], ignore_index=True)
+        self.assertEqual(len(treinar(dados).estimators_), 100)
+        marca = carregar_marca_treino()
+        self.assertEqual(marca['tipo'], 'completo')
+        self.assertEqual(marca['data_entrada'], str(dados['data_entrada'].iloc[59]))
+        self.assertEqual(len(carregar_modelo().estimators_), 100)
+
+        # A regra mudou de vez: os trades recusados entram na tentativa seguinte, que é aceita
+        dados = pd.concat([dados, self.criar_trades_regra(110, 100, invertida=True, seed=5)], ignore_index=True)
+        modelo = treinar(dados)
+        marca = carregar_marca_treino()
+        self.assertEqual(marca['tipo'], 'incremental')
+        self.assertEqual(marca['data_entrada'], str(dados['data_entrada'].iloc[-1]))
+        self.assertEqual(marca['trades'], 150)
+        self.assertEqual(len(modelo.estimators_), 350)
+        self.assertEqual(len(carregar_modelo().estimators_), 350)
+
 if __name__ == '__main__':
     # Criar diretórios necessários para os testes
     os.makedirs("models", exist_ok=True)
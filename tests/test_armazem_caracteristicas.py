@@ -0,0 +1,135 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+import src.main as main
+from src.historico import gravar_barras, ler_barras, barras_para_dataframe
+from src.ai_model import extrair_caracteristicas, CARACTERISTICAS, COLUNAS_CARACTERISTICAS
+from src.strategy import preparar_dados_para_estrategia
+from src.risk_management import COLUNAS_RISCO
+from src.replay import atributos_substituidos
+from src.armazem_caracteristicas import (atualizar_armazem, calcular_linhas, ler_caracteristicas,
+                                         caracteristicas_candle, juntar_barras_caracteristicas)
+
+class TestArmazemCaracteristicas(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorios_originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR)
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(self.diretorio, 'caracteristicas')
+
+        np.random.seed(3)
+        num_barras = 2000
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.001)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        self.dados = pd.DataFrame({
+            'time': 1672531200 + 3600 * np.arange(num_barras),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.0005,
+            'low': np.minimum(open_, close) - 0.0005,
+            'close': close,
+        })
+
+    def tearDown(self):
+        historico.HISTORICO_DIR, armazem.ARMAZEM_DIR = self.diretorios_originais
+        shutil.rmtree(self.diretorio)
+
+    def test_atualizacao_incremental(self):
+        """
+        Testa se atualizar em partes dá as mesmas características do cálculo completo.
+        """
+        gravar_barras('EURUSD', 'H1', self.dados.iloc[:1000])
+        self.assertEqual(atualizar_armazem('EURUSD', 'H1'), 1000)
+        self.assertEqual(atualizar_armazem('EURUSD', 'H1'), 0)
+
+        for fim in [1001, 1500, 2000]:
+            gravar_barras('EURUSD', 'H1', self.dados.iloc[:fim])
+            atualizar_armazem('EURUSD', 'H1')
+
+        linhas = ler_caracteristicas('EURUSD', 'H1')
+        completo = calcular_linhas(ler_barras('EURUSD', 'H1'))
+        np.testing.assert_array_equal(linhas['time'], completo['time'])
+        for nome in completo.dtype.names:
+            np.testing.assert_allclose(linhas[nome], completo[nome], rtol=1e-9, atol=1e-12)
+
+    def test_recalculo_apos_lacuna_preenchida(self):
+        """
+        Testa se o armazém é recalculado a partir da barra inserida no meio do histórico.
+        """
+        gravar_barras('EURUSD', 'H1', self.dados.iloc[:800])
+        gravar_barras('EURUSD', 'H1', self.dados.iloc[900:1500])
+        self.assertEqual(atualizar_armazem('EURUSD', 'H1'), 1400)
+
+        # A lacuna é preenchida: recalcula da barra 800 em diante
+        self.assertEqual(gravar_barras('EURUSD', 'H1', self.dados.iloc[700:1000]), 100)
+        self.assertEqual(atualizar_armazem('EURUSD', 'H1'), 700)
+
+        barras = ler_barras('EURUSD', 'H1')
+        linhas = ler_caracteristicas('EURUSD', 'H1')
+        df = juntar_barras_caracteristicas(barras, linhas)
+        self.assertEqual(len(df), 1500)
+        completo = calcular_linhas(barras)
+        for nome in completo.dtype.names:
+            np.testing.assert_allclose(linhas[nome], completo[nome], rtol=1e-9, atol=1e-12)
+
+    def test_consultas(self):
+        """
+        Testa a leitura por intervalo e as características de um candle.
+        """
+        gravar_barras('EURUSD', 'H1', self.dados)
+        atualizar_armazem('EURUSD', 'H1')
+
+        inicio, fim = pd.Timestamp('2023-01-10'), pd.Timestamp('2023-01-20')
+        linhas = ler_caracteristicas('EURUSD', 'H1', inicio, fim)
+        barras = ler_barras('EURUSD', 'H1', inicio, fim)
+        self.assertEqual(len(linhas), 10 * 24 + 1)
+
+        # As características do armazém são as mesmas de extrair_caracteristicas
+        df = juntar_barras_caracteristicas(barras, linhas)
+        tempo = df['time'].iloc[50]
+        armazenadas = caracteristicas_candle('EURUSD', 'H1', tempo)
+        calculadas = extrair_caracteristicas(df.drop(columns=['bb_position']), 50)
+        for nome in CARACTERISTICAS:
+            self.assertAlmostEqual(armazenadas[nome], calculadas[nome])
+
+        self.assertIsNone(caracteristicas_candle('EURUSD', 'H1', pd.Timestamp('2030-01-01')))
+        with self.assertRaises(ValueError):
+            juntar_barras_caracteristicas(barras[1:], linhas)
+
+    def test_caracteristicas_do_sinal_no_ciclo(self):
+        """
+        Testa se o ciclo ao vivo lê as características do armazém e só calcula os
+        indicadores delas quando o candle não está no armazém.
+        """
+        gravar_barras('EURUSD', 'H1', self.dados.iloc[:500])
+        gravar_barras('GBPUSD', 'H1', self.dados.iloc[:500])
+        atualizar_armazem('EURUSD', 'H1')
+
+        passadas = []
+        def preparar_contando(df, colunas=None):
+            passadas.append(colunas)
+            return preparar_dados_para_estrategia(df, colunas)
+
+        df = preparar_dados_para_estrategia(barras_para_dataframe(ler_barras('EURUSD', 'H1')), COLUNAS_RISCO)
+        with atributos_substituidos([(main, 'preparar_dados_para_estrategia', preparar_contando)]):
+            armazenadas = main.caracteristicas_sinal('EURUSD', df, 'H1')
+            self.assertEqual(passadas, [])
+            self.assertEqual(armazenadas, caracteristicas_candle('EURUSD', 'H1', df['time'].iloc[-2]))
+
+            # Sem o armazém do ativo, só as colunas das características são calculadas
+            calculadas = main.caracteristicas_sinal('GBPUSD', df, 'H1')
+            self.assertEqual(passadas, [COLUNAS_CARACTERISTICAS])
+
+        for nome in CARACTERISTICAS:
+            self.assertAlmostEqual(calculadas[nome], armazenadas[nome])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+import src.backtest as backtest
+from src.historico import gravar_barras, ler_barras
+from src.execucao import ModeloExecucao
+
+class Interrupcao(Exception):
+    """
+    Simula a queda do processo no meio do backtest.
+    """
+
+class TestBacktestEmBlocos(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR, backtest.CHECKPOINT_DIR)
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(self.diretorio, 'caracteristicas')
+        backtest.CHECKPOINT_DIR = os.path.join(self.diretorio, 'checkpoints')
+
+        # Passeio aleatório com reversões frequentes para gerar sinais
+        np.random.seed(21)
+        num_barras = 1500
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        gravar_barras('EURUSD', 'H1', pd.DataFrame({
+            'time': 1672531200 + 3600 * np.arange(num_barras),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.001,
+            'low': np.minimum(open_, close) - 0.001,
+            'close': close,
+        }))
+
+    def tearDown(self):
+        historico.HISTORICO_DIR, armazem.ARMAZEM_DIR, backtest.CHECKPOINT_DIR = self.originais
+        shutil.rmtree(self.diretorio)
+
+    def executar_interrompido(self, blocos, **kwargs):
+        """
+        Executa o backtest em blocos e interrompe o processo depois de `blocos` checkpoints.
+        """
+        salvar_original = backtest.salvar_checkpoint
+        salvos = []
+
+        def salvar_e_interromper(caminho, estado):
+            salvar_original(caminho, estado)
+            salvos.append(estado['proxima_barra'])
+            if len(salvos) == blocos:
+                raise Interrupcao()
+
+        backtest.salvar_checkpoint = salvar_e_interromper
+        try:
+            with self.assertRaises(Interrupcao):
+                backtest.executar_backtest_em_blocos('EURUSD', 'H1', tamanho_bloco=200, **kwargs)
+        finally:
+            backtest.salvar_checkpoint = salvar_original
+        return salvos
+
+    def test_retomada_igual_ao_backtest_completo(self):
+        """
+        Testa se uma execução interrompida e retomada dá os mesmos trades de executar_backtest.
+        """
+        self.assertEqual(self.executar_interrompido(3, retomar=False), [200, 400, 600])
+
+        # Trades de um bloco não salvo ficam no CSV e são descartados na retomada
+        _, caminho_trades = backtest.caminhos_backtest_em_blocos('EURUSD', 'H1')
+        with open(caminho_trades, 'a') as arquivo:
+            arquivo.write("EURUSD,parcial\n")
+
+        retomado = backtest.executar_backtest_em_blocos('EURUSD', 'H1', tamanho_bloco=200)
+        completo = backtest.executar_backtest('EURUSD', ler_barras('EURUSD', 'H1'))
+
+        trades = retomado['trades'].para_dataframe().sort_values('data_entrada', kind='stable')
+        esperados = completo['trades'].para_dataframe()
+        self.assertGreater(len(esperados), 5)
+        self.assertEqual(list(pd.to_datetime(trades['data_entrada'])), list(pd.to_datetime(esperados['data_entrada'])))
+        self.assertEqual(list(trades['tipo']), list(esperados['tipo']))
+        np.testing.assert_allclose(trades['lucro'].to_numpy(), esperados['lucro'].to_numpy())
+
+    def test_checkpoint_com_outros_parametros(self):
+        """
+        Testa se o checkpoint só é retomado com o mesmo intervalo, bloco, custos e dados.
+        """
+        caminho_checkpoint, caminho_trades = backtest.caminhos_backtest_em_blocos('EURUSD', 'H1')
+        barras = ler_barras('EURUSD', 'H1')
+        armazem.atualizar_armazem('EURUSD', 'H1')
+        linhas = armazem.ler_caracteristicas('EURUSD', 'H1')
+        parametros = backtest.parametros_backtest_em_blocos(barras, linhas, 200, ModeloExecucao(), 0.5)
+
+        diferentes = [
+            backtest.parametros_backtest_em_blocos(barras[:-1], linhas[:-1], 200, ModeloExecucao(), 0.5),
+            backtest.parametros_backtest_em_blocos(barras, linhas, 300, ModeloExecucao(), 0.5),
+            backtest.parametros_backtest_em_blocos(barras, linhas, 200, ModeloExecucao(spread_pontos=25), 0.5),
+            backtest.parametros_backtest_em_blocos(barras, linhas, 200, ModeloExecucao(), 0.6),
+        ]
+        corrigidas = barras.copy()
+        corrigidas['close'][700] += 0.0001
+        diferentes.append(backtest.parametros_backtest_em_blocos(corrigidas, linhas, 200, ModeloExecucao(), 0.5))
+
+        os.makedirs(backtest.CHECKPOINT_DIR)
+        for outros in diferentes:
+            self.assertNotEqual(outros, parametros)
+            estado = backtest.carregar_checkpoint(caminho_checkpoint, caminho_trades, parametros)
+            estado['proxima_barra'] = 400
+            backtest.salvar_checkpoint(caminho_checkpoint, estado)
+            open(caminho_trades, 'w').close()
+
+            self.assertEqual(backtest.carregar_checkpoint(caminho_checkpoint, caminho_trades, outros)['proxima_barra'], 0)
+            self.assertFalse(os.path.exists(caminho_trades))
+
+        # Com os mesmos parâmetros o checkpoint é retomado
+        estado = backtest.carregar_checkpoint(caminho_checkpoint, caminho_trades, parametros)
+        estado['proxima_barra'] = 400
+        backtest.salvar_checkpoint(caminho_checkpoint, estado)
+        self.assertEqual(backtest.carregar_checkpoint(caminho_checkpoint, caminho_trades, parametros)['proxima_barra'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
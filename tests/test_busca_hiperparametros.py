@@ -0,0 +1,70 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.ai_model as ai_model
+from src.ai_model import carregar_hiperparametros, carregar_limiar_sinal, prever_qualidade_sinal, CARACTERISTICAS
+from src.busca_hiperparametros import buscar_hiperparametros, escolher_limiar
+
+class TestBuscaHiperparametros(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.caminho_original = ai_model.HIPERPARAMETROS_PATH
+        ai_model.HIPERPARAMETROS_PATH = os.path.join(self.diretorio, 'hiperparametros.json')
+
+        # Resultado depende de bb_position, com ruído
+        np.random.seed(42)
+        num_trades = 300
+        self.dados = pd.DataFrame(np.random.rand(num_trades, len(CARACTERISTICAS)), columns=CARACTERISTICAS)
+        self.dados['data_entrada'] = pd.date_range(start='2023-01-01', periods=num_trades, freq='h')
+        self.dados['resultado'] = ((self.dados['bb_position'] < 0.5) ^ (np.random.rand(num_trades) < 0.2)).astype(int)
+        self.dados['lucro'] = np.where(self.dados['resultado'] == 1, 100.0, -100.0)
+
+    def tearDown(self):
+        ai_model.HIPERPARAMETROS_PATH = self.caminho_original
+        shutil.rmtree(self.diretorio)
+
+    def test_buscar_hiperparametros(self):
+        """
+        Testa se a busca encontra uma configuração útil e a salva para o treino.
+        """
+        resultado = buscar_hiperparametros(self.dados, n_splits=3, n_candidatos=9, n_jobs=2)
+
+        self.assertGreater(resultado['roc_auc_medio'], 0.6)
+        self.assertGreater(resultado['rodadas'], 1)
+        self.assertEqual(set(resultado['parametros']),
+                         {'max_depth', 'min_samples_leaf', 'max_features', 'class_weight', 'n_estimators'})
+        self.assertEqual(resultado['criterio_limiar'], 'lucro')
+
+        # A configuração fica salva para treinar_modelo e o filtro de sinais
+        self.assertEqual(carregar_hiperparametros()['parametros'], resultado['parametros'])
+        self.assertEqual(carregar_limiar_sinal(), resultado['limiar'])
+
+    def test_escolher_limiar_e_prever(self):
+        """
+        Testa a escolha do limiar pelo lucro e o filtro de sinais com limiar.
+        """
+        probabilidades = np.array([0.9, 0.7, 0.45, 0.35])
+        lucro = np.array([100.0, 50.0, -80.0, 30.0])
+        limiar, _ = escolher_limiar(probabilidades, (lucro > 0).astype(int), lucro)
+        self.assertGreater(limiar, 0.45)
+        self.assertLessEqual(limiar, 0.7)
+
+        class ModeloFixo:
+            classes_ = np.array([0, 1])
+
+            def predict_proba(self, X):
+                return np.array([[0.4, 0.6]])
+
+        caracteristicas = dict(zip(CARACTERISTICAS, np.zeros(len(CARACTERISTICAS))))
+        self.assertEqual(prever_qualidade_sinal(ModeloFixo(), caracteristicas, 0.55), 1)
+        self.assertEqual(prever_qualidade_sinal(ModeloFixo(), caracteristicas, 0.65), 0)
+
+if __name__ == '__main__':
+    unittest.main()
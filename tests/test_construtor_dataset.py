@@ -0,0 +1,104 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+from src.historico import gravar_barras, barras_para_dataframe, ler_barras
+from src.strategy import (preparar_dados_para_estrategia, gerar_sinais, verificar_sinal_compra,
+                          verificar_sinal_venda, filtrar_mercado_lateralizado)
+from src.ai_model import extrair_caracteristicas, extrair_caracteristicas_vetorizado, CARACTERISTICAS
+from src.risk_management import aplicar_gestao_risco, calcular_niveis_vetorizado
+from src.construtor_dataset import construir_dataset, salvar_dataset, carregar_dataset
+
+class TestConstrutorDataset(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorios_originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR)
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(self.diretorio, 'caracteristicas')
+
+        # Passeio aleatório com reversões frequentes para gerar sinais
+        np.random.seed(7)
+        num_barras = 600
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        for ativo in ['EURUSD', 'GBPUSD']:
+            gravar_barras(ativo, 'H1', pd.DataFrame({
+                'time': 1672531200 + 3600 * np.arange(num_barras),
+                'open': open_,
+                'high': np.maximum(open_, close) + 0.001,
+                'low': np.minimum(open_, close) - 0.001,
+                'close': close,
+            }))
+
+        self.df = preparar_dados_para_estrategia(barras_para_dataframe(ler_barras('EURUSD', 'H1')))
+
+    def tearDown(self):
+        historico.HISTORICO_DIR, armazem.ARMAZEM_DIR = self.diretorios_originais
+        shutil.rmtree(self.diretorio)
+
+    def test_sinais_vetorizados(self):
+        """
+        Testa se os sinais, níveis e características vetorizados coincidem com o cálculo candle a candle.
+        """
+        sinais = gerar_sinais(self.df)
+        self.assertTrue((sinais != 0).any())
+
+        for i in range(20, len(self.df) - 1):
+            janela = self.df.iloc[:i+1]
+            esperado = 0
+            if filtrar_mercado_lateralizado(janela):
+                if verificar_sinal_compra(janela):
+                    esperado = 1
+                elif verificar_sinal_venda(janela):
+                    esperado = -1
+            self.assertEqual(sinais[i], esperado)
+
+        indices = np.flatnonzero(sinais[21:-1]) + 21
+        tipos = np.where(sinais[indices] == 1, 'compra', 'venda')
+        sl, tp = calcular_niveis_vetorizado(self.df, indices, tipos)
+        caracteristicas = extrair_caracteristicas_vetorizado(self.df, indices - 1)
+
+        for n, i in enumerate(indices):
+            gestao = aplicar_gestao_risco('EURUSD', self.df.iloc[:i+1], tipos[n])
+            self.assertAlmostEqual(sl[n], gestao['stop_loss'])
+            self.assertAlmostEqual(tp[n], gestao['take_profit'])
+
+            esperado = extrair_caracteristicas(self.df, i - 1)
+            for nome in CARACTERISTICAS:
+                self.assertAlmostEqual(caracteristicas[nome].iloc[n], esperado[nome])
+
+    def test_construir_salvar_e_carregar(self):
+        """
+        Testa a geração em paralelo e as versões gravadas do conjunto de treino.
+        """
+        dataset = construir_dataset(['EURUSD', 'GBPUSD'], 'H1', processos=2)
+
+        self.assertGreater(len(dataset), 0)
+        self.assertEqual(set(dataset['ativo']), {'EURUSD', 'GBPUSD'})
+        np.testing.assert_array_equal(dataset['resultado'], (dataset['lucro'] > 0).astype(int))
+        self.assertTrue((dataset['data_saida'] > dataset['data_entrada']).all())
+
+        caminho_v1 = salvar_dataset(dataset, 'H1', self.diretorio)
+        caminho_v2 = salvar_dataset(dataset.iloc[:5], 'H1', self.diretorio)
+        self.assertTrue(caminho_v1.endswith('dataset_H1_v001.npz'))
+        self.assertTrue(caminho_v2.endswith('dataset_H1_v002.npz'))
+
+        # A versão mais recente é carregada por padrão
+        carregado, metadados = carregar_dataset('H1', diretorio=self.diretorio)
+        self.assertEqual(metadados['versao'], 2)
+        self.assertEqual(len(carregado), 5)
+
+        carregado, metadados = carregar_dataset('H1', versao=1, diretorio=self.diretorio)
+        self.assertEqual(metadados['exemplos'], len(dataset))
+        pd.testing.assert_frame_equal(carregado, dataset, check_dtype=False)
+
+if __name__ == '__main__':
+    unittest.main()
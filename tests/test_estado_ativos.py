@@ -0,0 +1,62 @@
+import unittest
+from src.estado_ativos import EstadoAtivos, AGUARDANDO_CANDLE, EM_POSICAO, SINAL_PENDENTE, LIVRE
+
+class TestEstadoAtivos(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.estados = EstadoAtivos()
+        self.candle = 1672531200
+
+    def test_cada_candle_processado_uma_vez(self):
+        """
+        Testa se o mesmo candle não é processado de novo e se um candle novo libera o ativo.
+        """
+        self.assertTrue(self.estados.precisa_processar('EURUSD', self.candle, False))
+        self.estados.marcar_processado('EURUSD', self.candle)
+
+        self.assertFalse(self.estados.precisa_processar('EURUSD', self.candle, False))
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], AGUARDANDO_CANDLE)
+        self.assertTrue(self.estados.precisa_processar('EURUSD', self.candle + 3600, False))
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], LIVRE)
+
+        # Sem o tempo do candle (terminal sem dados) o ativo não é processado
+        self.assertFalse(self.estados.precisa_processar('GBPUSD', None, False))
+
+        # Cada ativo tem o seu próprio estado
+        self.assertTrue(self.estados.precisa_processar('GBPUSD', self.candle, False))
+
+    def test_posicao_e_sinal_pendente(self):
+        """
+        Testa se ativos posicionados ou com ordem pendente são pulados, mesmo com candle novo.
+        """
+        self.assertFalse(self.estados.precisa_processar('EURUSD', self.candle, True))
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], EM_POSICAO)
+
+        self.estados.marcar_processado('EURUSD', self.candle)
+        self.estados.registrar_sinal_pendente('EURUSD', 'compra')
+        self.assertFalse(self.estados.precisa_processar('EURUSD', self.candle + 3600, False))
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], SINAL_PENDENTE)
+
+        # Ordem executada: o ativo fica em posição
+        self.estados.concluir_sinal('EURUSD', True)
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], EM_POSICAO)
+        self.assertIsNone(self.estados.estado('EURUSD')['sinal_pendente'])
+        self.assertFalse(self.estados.precisa_processar('EURUSD', self.candle + 3600, True))
+
+    def test_ordem_recusada_reavalia_o_candle(self):
+        """
+        Testa se, depois de uma ordem que falhou, o mesmo candle volta a ser analisado.
+        """
+        self.assertTrue(self.estados.precisa_processar('EURUSD', self.candle, False))
+        self.estados.marcar_processado('EURUSD', self.candle)
+        self.estados.registrar_sinal_pendente('EURUSD', 'venda')
+
+        self.estados.concluir_sinal('EURUSD', False)
+        self.assertEqual(self.estados.estado('EURUSD')['situacao'], LIVRE)
+        self.assertTrue(self.estados.precisa_processar('EURUSD', self.candle, False))
+
+if __name__ == '__main__':
+    unittest.main()
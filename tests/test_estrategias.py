@@ -0,0 +1,187 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.main as main
+import src.historico as historico
+from src.historico import gravar_barras
+from src.config import MAGIC_NUMBER, RISCO_POR_TRADE
+from src.execucao import ModeloExecucao
+from src.replay import GatewaySimulado, atributos_substituidos, MODULOS_MT5
+from src.gerenciador_ordens import GerenciadorOrdens
+from src.estado_ativos import EstadoAtivos
+from src.strategy import preparar_dados_para_estrategia, gerar_sinais
+from src.risk_management import COLUNAS_RISCO
+from src.estrategias import (Estrategia, EstrategiaBollinger, EstrategiaRSI, carregar_estrategias,
+                             colunas_estrategias, resumo_estrategias)
+
+class EstrategiaCompra(Estrategia):
+    """
+    Estratégia de teste que compra em todos os candles.
+    """
+    nome = 'compra'
+    colunas = ['bb_upper', 'bb_middle', 'bb_lower']
+
+    def gerar_sinais(self, df):
+        return np.ones(len(df), dtype=np.int8)
+
+class EstrategiaVenda(Estrategia):
+    """
+    Estratégia de teste que vende em todos os candles.
+    """
+    nome = 'venda'
+    colunas = ['bb_middle', 'rsi']
+
+    def gerar_sinais(self, df):
+        return np.full(len(df), -1, dtype=np.int8)
+
+class TestEstrategias(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorio_original = historico.HISTORICO_DIR
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+
+        np.random.seed(8)
+        num_barras = 300
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        self.df = pd.DataFrame({
+            'time': 1672531200 + 3600 * np.arange(num_barras),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.001,
+            'low': np.minimum(open_, close) - 0.001,
+            'close': close,
+        })
+
+    def tearDown(self):
+        historico.HISTORICO_DIR = self.diretorio_original
+        shutil.rmtree(self.diretorio)
+
+    def test_carregar_estrategias(self):
+        """
+        Testa a criação das estratégias a partir da configuração.
+        """
+        estrategias = carregar_estrategias()
+        self.assertEqual([estrategia.nome for estrategia in estrategias], ['bollinger'])
+        self.assertEqual(estrategias[0].magic, MAGIC_NUMBER)
+        self.assertEqual(estrategias[0].risco_por_trade, RISCO_POR_TRADE)
+
+        estrategias = carregar_estrategias({'bollinger': {'magic': 1}, 'rsi': {'magic': 2, 'risco_por_trade': 0.005}})
+        self.assertIsInstance(estrategias[1], EstrategiaRSI)
+        self.assertEqual(colunas_estrategias(estrategias), ['bb_upper', 'bb_middle', 'bb_lower', 'adx', 'rsi'])
+
+        with self.assertRaises(ValueError):
+            carregar_estrategias({'inexistente': {'magic': 1}})
+        with self.assertRaises(ValueError):
+            carregar_estrategias({'bollinger': {'magic': 1}, 'rsi': {'magic': 1}})
+
+    def test_sinais_vetorizados(self):
+        """
+        Testa os sinais das estratégias registradas.
+        """
+        df = preparar_dados_para_estrategia(self.df)
+        bollinger = EstrategiaBollinger(MAGIC_NUMBER, limiar_adx=30)
+        np.testing.assert_array_equal(bollinger.gerar_sinais(df), gerar_sinais(df, 30))
+
+        # Compra quando o RSI sai da sobrevenda, venda quando sai da sobrecompra
+        rsi = EstrategiaRSI(MAGIC_NUMBER + 1, limiar_adx=100)
+        sinais = rsi.gerar_sinais(df)
+        valores = df['rsi'].to_numpy()
+        compras = np.flatnonzero(sinais == 1)
+        vendas = np.flatnonzero(sinais == -1)
+        self.assertGreater(len(compras) + len(vendas), 0)
+        np.testing.assert_array_less(valores[compras - 1], 30)
+        np.testing.assert_array_less(30, valores[compras])
+        np.testing.assert_array_less(70, valores[vendas - 1])
+        np.testing.assert_array_less(valores[vendas], 70)
+
+    def test_ciclo_com_varias_estrategias(self):
+        """
+        Testa se o ciclo calcula os indicadores uma vez e envia as ordens de cada
+        estratégia com o seu magic number e risco.
+        """
+        gravar_barras('EURUSD', 'H1', self.df)
+        gateway = GatewaySimulado(['EURUSD'], 'H1', modelo_execucao=ModeloExecucao(spread_pontos=0, slippage_pontos=0))
+        gateway.avancar(gateway.passos[-1])
+
+        estrategias = [EstrategiaCompra(111, 0.01), EstrategiaVenda(222, 0.005)]
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER, estrategias)
+        estados = EstadoAtivos()
+
+        passadas = []
+        def preparar_contando(df, colunas=None):
+            passadas.append(list(colunas))
+            return preparar_dados_para_estrategia(df, colunas)
+
+        substituicoes = [(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]
+        substituicoes += [
+            (main, 'preparar_dados_para_estrategia', preparar_contando),
+            (main, 'DECISIONS_LOG_PATH', os.path.join(self.diretorio, 'decisions_log.csv')),
+        ]
+        with atributos_substituidos(substituicoes):
+            df = main.obter_dados_historicos('EURUSD', gateway.TIMEFRAME_H1, 100)
+            main.analisar_sinais('EURUSD', df, None, gerenciador, estados, 'EURUSD', 'H1', estrategias=estrategias)
+
+            self.assertEqual(passadas, [list(dict.fromkeys(colunas_estrategias(estrategias) + COLUNAS_RISCO))])
+            ordens = gerenciador.ordens_pendentes
+            self.assertEqual([(ordem['tipo'], ordem['magic'], ordem['estrategia']) for ordem in ordens],
+                             [('compra', 111, 'compra'), ('venda', 222, 'venda')])
+            self.assertEqual(ordens[1]['gestao']['risco_por_trade'], 0.005)
+            self.assertEqual(ordens[1]['comentario'], 'Venda Bot H1')
+
+            envios = gerenciador.executar_ordens()
+            self.assertEqual([envio['estrategia'] for envio in envios], ['compra', 'venda'])
+            self.assertEqual(sorted(posicao['magic'] for posicao in gerenciador.posicoes.values()), [111, 222])
+
+            # Posições de outros robôs não entram no livro
+            gateway.order_send({'action': gateway.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1,
+                                'type': gateway.ORDER_TYPE_BUY, 'price': 1.1, 'sl': 1.0, 'tp': 1.2, 'magic': 999})
+            gerenciador.sincronizar()
+            self.assertEqual(len(gerenciador.posicoes), 2)
+
+            # Com as duas estratégias posicionadas, nenhuma ordem nova é agendada
+            main.analisar_sinais('EURUSD', df, None, gerenciador, estados, 'EURUSD', 'H1', estrategias=estrategias)
+            self.assertEqual(gerenciador.ordens_pendentes, [])
+            self.assertTrue(gerenciador.possui_posicao('EURUSD', 111))
+            self.assertFalse(gerenciador.possui_posicao('EURUSD', MAGIC_NUMBER))
+
+        resumo = resumo_estrategias(estrategias, gerenciador.posicoes)
+        self.assertEqual(resumo.loc['venda', 'sinais'], 1)
+        self.assertEqual(resumo.loc['venda', 'ordens'], 1)
+        self.assertEqual(resumo.loc['compra', 'posicoes_abertas'], 1)
+
+    def test_estrategia_rsi_sem_modelo(self):
+        """
+        Testa o ciclo só com a estratégia do RSI e sem modelo de IA: os indicadores da
+        gestão de risco (Bollinger e ATR) são calculados mesmo sem serem pedidos pela estratégia.
+        """
+        rsi = EstrategiaRSI(333, limiar_adx=100)
+        sinais = rsi.gerar_sinais(preparar_dados_para_estrategia(self.df))
+        fim = int(np.flatnonzero(sinais != 0)[-1]) + 1
+        # O candle do sinal já fechou: o gateway está na abertura do candle seguinte
+        gravar_barras('EURUSD', 'H1', self.df.iloc[:fim + 1])
+        gateway = GatewaySimulado(['EURUSD'], 'H1', modelo_execucao=ModeloExecucao(spread_pontos=0, slippage_pontos=0))
+        gateway.avancar(gateway.passos[-1])
+
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER, [rsi])
+        substituicoes = [(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]
+        substituicoes += [(main, 'DECISIONS_LOG_PATH', os.path.join(self.diretorio, 'decisions_log.csv'))]
+        with atributos_substituidos(substituicoes):
+            df = main.obter_dados_historicos('EURUSD', gateway.TIMEFRAME_H1, 100)
+            main.analisar_sinais('EURUSD', df, None, gerenciador, EstadoAtivos(), 'EURUSD', 'H1', estrategias=[rsi])
+
+        ordens = gerenciador.ordens_pendentes
+        self.assertEqual(len(ordens), 1)
+        self.assertEqual(ordens[0]['tipo'], 'compra' if sinais[fim - 1] > 0 else 'venda')
+        self.assertEqual((ordens[0]['magic'], ordens[0]['estrategia']), (333, 'rsi'))
+        self.assertTrue(np.isfinite(ordens[0]['gestao']['stop_loss']))
+        self.assertGreater(ordens[0]['gestao']['distancia_sl'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
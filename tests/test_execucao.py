@@ -0,0 +1,96 @@
+import unittest
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+import src.historico as historico
+from src.historico import gravar_barras
+from src.execucao import ModeloExecucao, ModeloExecucaoIntrabar
+
+class TestExecucao(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorio_original = historico.HISTORICO_DIR
+        historico.HISTORICO_DIR = self.diretorio
+
+        # Modelo sem custos para comparar com os níveis exatos
+        self.modelo = ModeloExecucao(spread_pontos=0, slippage_pontos=0)
+
+    def tearDown(self):
+        historico.HISTORICO_DIR = self.diretorio_original
+        shutil.rmtree(self.diretorio)
+
+    def test_calcular_lucro_por_contrato(self):
+        """
+        Testa o lucro com contratos e conversões diferentes por ativo.
+        """
+        self.assertAlmostEqual(self.modelo.calcular_lucro('EURUSD', 1.1000, 1.1010, 'compra'), 100.0)
+        self.assertAlmostEqual(self.modelo.calcular_lucro('XAUUSD', 2000.0, 2010.0, 'compra'), 1000.0)
+        # USDJPY: 1 iene por 100000 dólares, convertido pelo preço de saída
+        self.assertAlmostEqual(self.modelo.calcular_lucro('USDJPY', 151.0, 150.0, 'venda'), 100000 / 150.0)
+
+    def test_resolver_saida(self):
+        """
+        Testa as saídas por nível, por gap e com custos.
+        """
+        # Candle atinge apenas o TP de uma compra
+        self.assertEqual(self.modelo.resolver_saida('EURUSD', 0, 1.10, 1.12, 1.095, 1.09, 1.11, 'compra'), 1.11)
+        # Candle não atinge nenhum nível
+        self.assertIsNone(self.modelo.resolver_saida('EURUSD', 0, 1.10, 1.105, 1.095, 1.09, 1.11, 'compra'))
+        # Abertura além do SL: executa na abertura
+        self.assertEqual(self.modelo.resolver_saida('EURUSD', 0, 1.08, 1.085, 1.07, 1.09, 1.11, 'compra'), 1.08)
+        # SL e TP no mesmo candle: SL primeiro
+        self.assertEqual(self.modelo.resolver_saida('EURUSD', 0, 1.10, 1.12, 1.08, 1.09, 1.11, 'compra'), 1.09)
+
+        # Venda sai no ASK: o spread faz o SL ser atingido antes da máxima BID chegar nele
+        com_spread = ModeloExecucao(spread_pontos=20, slippage_pontos=0)
+        self.assertIsNone(self.modelo.resolver_saida('EURUSD', 0, 1.10, 1.1099, 1.095, 1.11, 1.09, 'venda'))
+        self.assertEqual(com_spread.resolver_saida('EURUSD', 0, 1.10, 1.1099, 1.095, 1.11, 1.09, 'venda'), 1.11)
+
+    def test_spread_da_barra(self):
+        """
+        Testa se o spread registrado na barra tem prioridade sobre o configurado.
+        """
+        modelo = ModeloExecucao(spread_pontos=10, slippage_pontos=0)
+        self.assertAlmostEqual(modelo.spread('EURUSD'), 0.0001)
+        self.assertAlmostEqual(modelo.spread('EURUSD', 30), 0.0003)
+        # Barras sem spread registrado (zero ou NaN) usam o configurado
+        np.testing.assert_allclose(modelo.spread('EURUSD', np.array([30, 0, np.nan])), [0.0003, 0.0001, 0.0001])
+        self.assertAlmostEqual(modelo.preco_entrada('EURUSD', 1.1, 'compra', 30), 1.1003)
+
+        # Spread alargado só no segundo candle: é nele que o SL da venda é atingido
+        high = np.array([1.1095, 1.1095, 1.1095])
+        low = np.array([1.1000, 1.1000, 1.1000])
+        close = np.full(3, 1.105)
+        spreads = np.array([10, 60, 10])
+        saida, indice = modelo.simular_saida('EURUSD', np.arange(3), close, high, low, close, 1.11, 1.09, 'venda', spreads)
+        self.assertEqual((saida, indice), (1.11, 1))
+        self.assertEqual(modelo.simular_saida('EURUSD', np.arange(3), close, high, low, close, 1.11, 1.09, 'venda')[1], 2)
+
+    def test_resolver_intrabar(self):
+        """
+        Testa se as barras de M1 decidem a ordem de SL e TP dentro do candle.
+        """
+        inicio = int(pd.Timestamp('2023-01-02').value // 10**9)
+        # O preço sobe até o TP antes de cair até o SL
+        precos = np.concatenate((np.linspace(1.10, 1.12, 720), np.linspace(1.12, 1.08, 720)))
+        gravar_barras('EURUSD', 'M1', pd.DataFrame({
+            'time': inicio + 60 * np.arange(1440),
+            'open': precos, 'high': precos, 'low': precos, 'close': precos
+        }))
+
+        modelo = ModeloExecucaoIntrabar('D1', spread_pontos=0, slippage_pontos=0)
+        saida = modelo.resolver_saida('EURUSD', pd.Timestamp('2023-01-02'), 1.10, 1.12, 1.08, 1.09, 1.11, 'compra')
+        self.assertEqual(saida, 1.11)
+        self.assertEqual(modelo.barras_consultadas, 1440)
+
+        # Candle sem barras de M1 mantém a suposição conservadora
+        saida = modelo.resolver_saida('EURUSD', pd.Timestamp('2023-01-03'), 1.10, 1.12, 1.08, 1.09, 1.11, 'compra')
+        self.assertEqual(saida, 1.09)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from src.floresta_compacta import FlorestaCompacta
+from src.ai_model import exportar_modelo_compacto
+
+class TestFlorestaCompacta(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+
+        # Dados com ruído para gerar árvores profundas
+        np.random.seed(42)
+        self.X = np.random.rand(500, 8) * [1, 50, 0.1, 100, 2, 2, 7, 24]
+        y = ((self.X[:, 0] > 0.5) ^ (np.random.rand(500) < 0.2)).astype(int)
+        self.modelo = RandomForestClassifier(n_estimators=50, random_state=42).fit(self.X, y)
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def test_previsoes_identicas(self):
+        """
+        Testa se a floresta compacta prevê exatamente o mesmo que o modelo original.
+        """
+        floresta = FlorestaCompacta.de_floresta(self.modelo)
+        X_novo = np.random.rand(1000, 8) * [1, 50, 0.1, 100, 2, 2, 7, 24]
+
+        np.testing.assert_array_equal(floresta.predict_proba(X_novo), self.modelo.predict_proba(X_novo))
+        np.testing.assert_array_equal(floresta.predict(X_novo), self.modelo.predict(X_novo))
+        # Valores iguais aos limiares do treino
+        np.testing.assert_array_equal(floresta.predict(self.X), self.modelo.predict(self.X))
+
+    def test_exportar_e_carregar(self):
+        """
+        Testa se a floresta exportada e carregada do disco mantém as previsões.
+        """
+        caminho = os.path.join(self.diretorio, 'modelo.npz')
+        exportar_modelo_compacto(self.modelo, caminho)
+        floresta = FlorestaCompacta.carregar(caminho)
+
+        np.testing.assert_array_equal(floresta.predict(self.X[:1]), self.modelo.predict(self.X[:1]))
+        np.testing.assert_array_equal(floresta.classes_, self.modelo.classes_)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+from src.historico import gravar_barras
+from src.config import MAGIC_NUMBER, MAX_TENTATIVAS_ORDEM
+from src.execucao import ModeloExecucao
+from src.replay import GatewaySimulado, PosicaoSimulada, ResultadoOrdemSimulada, atributos_substituidos, MODULOS_MT5
+from src.gerenciador_ordens import GerenciadorOrdens
+
+class GatewayComRequote(GatewaySimulado):
+    """
+    Gateway simulado que recusa as primeiras ordens com requote e move o preço a cada consulta.
+    """
+
+    def __init__(self, *args, requotes=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requotes = requotes
+        self.consultas_tick = 0
+        self.pedidos = []
+
+    def symbol_info_tick(self, ativo):
+        tick = super().symbol_info_tick(ativo)
+        self.consultas_tick += 1
+        deslocamento = 0.0001 * self.consultas_tick
+        return tick._replace(bid=tick.bid + deslocamento, ask=tick.ask + deslocamento)
+
+    def order_send(self, request):
+        self.pedidos.append(request)
+        if self.requotes > 0:
+            self.requotes -= 1
+            return ResultadoOrdemSimulada(self.TRADE_RETCODE_REQUOTE, 0, 0.0, 0.0, request['comment'])
+        return super().order_send(request)
+
+class TestGerenciadorOrdens(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorio_original = historico.HISTORICO_DIR
+        historico.HISTORICO_DIR = self.diretorio
+
+        np.random.seed(4)
+        num_barras = 50
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.001)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        gravar_barras('EURUSD', 'H1', pd.DataFrame({
+            'time': 1672531200 + 3600 * np.arange(num_barras),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.001,
+            'low': np.minimum(open_, close) - 0.001,
+            'close': close,
+        }))
+        self.close = close[-1]
+        self.gestao = {'stop_loss': self.close - 0.01, 'take_profit': self.close + 0.01, 'distancia_sl': 0.01}
+
+    def tearDown(self):
+        historico.HISTORICO_DIR = self.diretorio_original
+        shutil.rmtree(self.diretorio)
+
+    def criar_gateway(self, **kwargs):
+        """
+        Cria o gateway no último candle gravado, sem custos de execução.
+        """
+        gateway = GatewayComRequote(['EURUSD'], 'H1', modelo_execucao=ModeloExecucao(spread_pontos=0, slippage_pontos=0),
+                                    **kwargs)
+        gateway.avancar(gateway.passos[-1])
+        return gateway
+
+    def test_retentativa_apos_requote(self):
+        """
+        Testa se a ordem recusada com requote é reenviada com o preço do tick seguinte.
+        """
+        gateway = self.criar_gateway(requotes=1)
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER)
+        gerenciador.adicionar_ordem('EURUSD', 'compra', self.gestao)
+
+        with atributos_substituidos([(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]):
+            resultados = gerenciador.executar_ordens()
+
+        self.assertEqual(len(gateway.pedidos), 2)
+        self.assertGreater(gateway.pedidos[1]['price'], gateway.pedidos[0]['price'])
+        self.assertEqual(resultados[0]['resultado'].retcode, gateway.TRADE_RETCODE_DONE)
+        self.assertTrue(gerenciador.possui_posicao('EURUSD', MAGIC_NUMBER))
+        self.assertEqual(gerenciador.ordens_pendentes, [])
+
+    def test_desiste_apos_maximo_de_tentativas(self):
+        """
+        Testa se requotes seguidos param no número máximo de tentativas.
+        """
+        gateway = self.criar_gateway(requotes=MAX_TENTATIVAS_ORDEM + 1)
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER)
+        gerenciador.adicionar_ordem('EURUSD', 'venda', self.gestao)
+
+        with atributos_substituidos([(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]):
+            resultados = gerenciador.executar_ordens()
+
+        self.assertEqual(len(gateway.pedidos), MAX_TENTATIVAS_ORDEM)
+        self.assertEqual(resultados[0]['resultado'].retcode, gateway.TRADE_RETCODE_REQUOTE)
+        self.assertFalse(gerenciador.possui_posicao('EURUSD'))
+
+    def test_sincronizar_ignora_magic_externo(self):
+        """
+        Testa se posições de outros robôs ou manuais ficam fora do livro de posições.
+        """
+        gateway = self.criar_gateway(requotes=0)
+        gateway.posicoes[100] = PosicaoSimulada(100, 'EURUSD', gateway.POSITION_TYPE_BUY, 0.1, self.close,
+                                                0.0, 0.0, 0, gateway.agora)
+        gateway.posicoes[101] = PosicaoSimulada(101, 'GBPUSD', gateway.POSITION_TYPE_SELL, 0.1, 1.25,
+                                                0.0, 0.0, MAGIC_NUMBER + 50, gateway.agora)
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER)
+
+        with atributos_substituidos([(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]):
+            self.assertTrue(gerenciador.sincronizar())
+            self.assertEqual(gerenciador.posicoes, {})
+            self.assertFalse(gerenciador.possui_posicao('EURUSD'))
+
+            # A posição do próprio robô entra no livro, ao lado das externas
+            gerenciador.adicionar_ordem('EURUSD', 'compra', self.gestao)
+            gerenciador.executar_ordens()
+
+        self.assertEqual(len(gateway.posicoes), 3)
+        self.assertEqual([posicao['magic'] for posicao in gerenciador.posicoes.values()], [MAGIC_NUMBER])
+
+        # Os magic numbers das estratégias ativas também são do robô
+        class Estrategia:
+            magic = MAGIC_NUMBER + 50
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER, [Estrategia()])
+        with atributos_substituidos([(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]):
+            gerenciador.sincronizar()
+        self.assertTrue(gerenciador.possui_posicao('GBPUSD', MAGIC_NUMBER + 50))
+        self.assertFalse(gerenciador.possui_posicao('EURUSD', 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import os
+import tempfile
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import src.historico as historico
+from src.historico import gravar_barras
+from src.config import MAGIC_NUMBER
+from src.execucao import ModeloExecucao
+from src.replay import GatewaySimulado, atributos_substituidos, MODULOS_MT5
+from src.mt5_connection import TRAVA_MT5
+from src.gestor_posicoes import BufferTicks, GestorPosicoes, DTYPE_TICK
+
+def criar_ticks(tempo_inicial, bids, spread=0.0):
+    """
+    Cria ticks consecutivos (um por milissegundo) com os preços BID informados.
+    """
+    ticks = np.zeros(len(bids), dtype=DTYPE_TICK)
+    ticks['time_msc'] = tempo_inicial + np.arange(len(bids))
+    ticks['bid'] = bids
+    ticks['ask'] = np.asarray(bids) + spread
+    return ticks
+
+class GatewayComTicks(GatewaySimulado):
+    """
+    Gateway simulado que devolve os ticks de uma lista fixa em copy_ticks_from.
+    """
+
+    COPY_TICKS_INFO = 1
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ticks = np.zeros(0, dtype=DTYPE_TICK)
+
+    def copy_ticks_from(self, ativo, desde, quantidade, flags):
+        return self.ticks[self.ticks['time_msc'] >= desde * 1000][:quantidade]
+
+class TestGestorPosicoes(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorio_original = historico.HISTORICO_DIR
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+
+        gravar_barras('EURUSD', 'H1', pd.DataFrame({
+            'time': 1672531200 + 3600 * np.arange(10),
+            'open': np.full(10, 1.1000),
+            'high': np.full(10, 1.1010),
+            'low': np.full(10, 1.0990),
+            'close': np.full(10, 1.1000),
+        }))
+        self.gateway = GatewayComTicks(['EURUSD'], 'H1', modelo_execucao=ModeloExecucao(spread_pontos=0, slippage_pontos=0))
+        self.entrada = self.gateway.agora * 1000
+        self.substituicoes = atributos_substituidos([(modulo, 'mt5', self.gateway) for modulo in MODULOS_MT5])
+        self.substituicoes.__enter__()
+
+        self.agora = 0.0
+        self.gestor = GestorPosicoes(passo_pontos=20, intervalo_modificacao=1.0, relogio=lambda: self.agora)
+
+    def tearDown(self):
+        self.substituicoes.__exit__(None, None, None)
+        historico.HISTORICO_DIR = self.diretorio_original
+        shutil.rmtree(self.diretorio)
+
+    def abrir_compra(self, sl, tp):
+        resultado = self.gateway.order_send({
+            'action': self.gateway.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1,
+            'type': self.gateway.ORDER_TYPE_BUY, 'price': 1.1000, 'sl': sl, 'tp': tp, 'magic': MAGIC_NUMBER,
+        })
+        return resultado.order
+
+    def test_buffer_circular(self):
+        """
+        Testa a ordem dos ticks guardados depois que o buffer dá a volta.
+        """
+        buffer = BufferTicks(capacidade=8)
+        self.assertIsNone(buffer.ultimo_tempo())
+
+        buffer.adicionar(criar_ticks(0, np.arange(5)))
+        buffer.adicionar(criar_ticks(5, np.arange(5, 11)))
+        self.assertEqual(len(buffer), 8)
+        np.testing.assert_array_equal(buffer.ultimos()['time_msc'], np.arange(3, 11))
+        np.testing.assert_array_equal(buffer.ultimos(3)['bid'], [8, 9, 10])
+
+        buffer.adicionar(criar_ticks(11, np.arange(11, 31)))
+        np.testing.assert_array_equal(buffer.ultimos()['time_msc'], np.arange(23, 31))
+        self.assertEqual(buffer.ultimo_tempo(), 30)
+
+    def test_breakeven_trailing_e_agrupamento(self):
+        """
+        Testa o breakeven, o trailing stop, o passo mínimo e o agrupamento das modificações.
+        """
+        ticket = self.abrir_compra(sl=1.0950, tp=1.1200)
+        self.gestor.sincronizar()
+        self.assertAlmostEqual(self.gestor.acompanhamento[ticket]['risco'], 0.0050)
+
+        # Lucro acima de 1R: SL para a entrada
+        self.gestor.processar_ticks('EURUSD', criar_ticks(self.entrada + 1000, np.linspace(1.1000, 1.1060, 500)))
+        # Lucro de 2R antes do envio: o pedido é substituído pelo trailing (melhor preço - 1R)
+        self.gestor.processar_ticks('EURUSD', criar_ticks(self.entrada + 2000, np.linspace(1.1060, 1.1100, 500)))
+        self.assertEqual(len(self.gestor.modificacoes_pendentes), 1)
+
+        envios = self.gestor.enviar_modificacoes()
+        self.assertEqual(len(envios), 1)
+        self.assertAlmostEqual(self.gateway.posicoes[ticket].sl, 1.1050)
+
+        # Novo máximo dentro do intervalo mínimo: o pedido espera o próximo envio
+        self.gestor.processar_ticks('EURUSD', criar_ticks(self.entrada + 3000, [1.1130]))
+        self.assertEqual(self.gestor.enviar_modificacoes(), [])
+        self.agora = 2.0
+        self.gestor.enviar_modificacoes()
+        self.assertAlmostEqual(self.gateway.posicoes[ticket].sl, 1.1080)
+
+        # Movimento menor que o passo mínimo (20 pontos) não gera pedido
+        self.gestor.processar_ticks('EURUSD', criar_ticks(self.entrada + 4000, [1.1131]))
+        self.assertEqual(len(self.gestor.modificacoes_pendentes), 0)
+
+        estatisticas = self.gestor.estatisticas()
+        self.assertEqual(estatisticas['ticks'], 1002)
+        self.assertEqual(estatisticas['modificacoes'], 2)
+        self.assertGreater(estatisticas['pedidos_agrupados'], 0)
+
+    def test_fechamento_por_gap(self):
+        """
+        Testa o fechamento a mercado quando o preço salta além do SL.
+        """
+        ticket = self.abrir_compra(sl=1.0950, tp=1.1200)
+        self.gestor.sincronizar()
+
+        self.gestor.processar_ticks('EURUSD', criar_ticks(self.entrada + 1000, [1.0990, 1.0930]))
+        envios = self.gestor.enviar_modificacoes()
+
+        self.assertEqual(envios[0]['acao'], 'fechar')
+        self.assertNotIn(ticket, self.gateway.posicoes)
+        self.assertEqual(len(self.gateway.trades), 1)
+
+        self.gestor.sincronizar()
+        self.assertEqual(self.gestor.acompanhamento, {})
+
+    def test_ticks_anteriores_a_entrada(self):
+        """
+        Testa se ticks anteriores à entrada, no buffer ou no terminal, não afetam a posição.
+        """
+        # Buffer parado desde uma posição antiga do mesmo ativo
+        self.gestor.buffer('EURUSD').adicionar(criar_ticks(self.entrada - 3600000, [1.0900]))
+
+        ticket = self.abrir_compra(sl=1.0950, tp=1.1200)
+        self.gestor.sincronizar()
+        self.assertIsNone(self.gestor.buffer('EURUSD').ultimo_tempo())
+
+        # O terminal ainda tem ticks de antes da entrada, um deles abaixo do SL
+        self.gateway.ticks = np.concatenate((criar_ticks(self.entrada - 500, [1.0940, 1.1150]),
+                                             criar_ticks(self.entrada, [1.1000, 1.1020])))
+        self.assertEqual(self.gestor.coletar_ticks(), 2)
+        self.assertEqual(self.gestor.fechamentos_pendentes, {})
+        self.assertAlmostEqual(self.gestor.acompanhamento[ticket]['melhor_preco'], 1.1020)
+        self.assertTrue(np.all(self.gestor.buffer('EURUSD').ultimos()['time_msc'] >= self.entrada))
+
+        # A busca seguinte continua do último tick do buffer
+        self.gateway.ticks = np.concatenate((self.gateway.ticks, criar_ticks(self.entrada + 5, [1.1030])))
+        self.assertEqual(self.gestor.coletar_ticks(), 1)
+        self.assertAlmostEqual(self.gestor.acompanhamento[ticket]['melhor_preco'], 1.1030)
+
+    def test_ciclo_espera_a_trava_do_terminal(self):
+        """
+        Testa se a thread de gestão não chama o terminal enquanto o ciclo principal usa a trava.
+        """
+        ticket = self.abrir_compra(sl=1.0950, tp=1.1200)
+        with TRAVA_MT5:
+            self.gestor.iniciar(intervalo=0.01)
+            time.sleep(0.1)
+            self.assertNotIn(ticket, self.gestor.acompanhamento)
+
+        limite = time.time() + 5
+        while ticket not in self.gestor.acompanhamento and time.time() < limite:
+            time.sleep(0.01)
+        self.gestor.parar()
+        self.assertIn(ticket, self.gestor.acompanhamento)
+
+if __name__ == '__main__':
+    unittest.main()
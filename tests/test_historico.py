@@ -0,0 +1,88 @@
+import unittest
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+import src.historico as historico
+from src.historico import DTYPE_BARRAS, gravar_barras, abrir_historico, ler_barras, barras_para_dataframe
+
+class TestHistorico(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Usar um diretório temporário para não tocar no histórico real
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorio_original = historico.HISTORICO_DIR
+        historico.HISTORICO_DIR = self.diretorio
+
+        # Criar barras diárias de exemplo
+        self.df_exemplo = pd.DataFrame({
+            'time': pd.date_range(start='2023-01-01', periods=100, freq='D'),
+            'open': np.random.rand(100) * 100,
+            'high': np.random.rand(100) * 100 + 10,
+            'low': np.random.rand(100) * 100 - 10,
+            'close': np.random.rand(100) * 100,
+            'tick_volume': np.random.randint(1000, 10000, 100)
+        })
+
+    def tearDown(self):
+        historico.HISTORICO_DIR = self.diretorio_original
+        shutil.rmtree(self.diretorio)
+
+    def test_gravar_barras_sem_duplicar(self):
+        """
+        Testa se gravações sobrepostas só acrescentam barras novas.
+        """
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[:60]), 60)
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[40:]), 40)
+
+        barras = abrir_historico("EURUSD", "D1")
+        self.assertEqual(len(barras), 100)
+        self.assertEqual(barras.dtype, DTYPE_BARRAS)
+        self.assertTrue(np.all(np.diff(barras['time']) > 0))
+
+    def test_gravar_barras_preenche_lacunas(self):
+        """
+        Testa se barras anteriores à última gravada só entram quando preenchem uma lacuna.
+        """
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[:30]), 30)
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[50:60]), 10)
+
+        # A janela cobre a lacuna, barras já gravadas e barras novas
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[20:70]), 30)
+        self.assertEqual(gravar_barras("EURUSD", "D1", self.df_exemplo.iloc[20:70]), 0)
+
+        barras = abrir_historico("EURUSD", "D1")
+        self.assertEqual(len(barras), 70)
+        np.testing.assert_array_equal(barras['time'], self.df_exemplo['time'].iloc[:70].values.astype('datetime64[s]').astype(np.int64))
+        np.testing.assert_allclose(barras['close'], self.df_exemplo['close'].iloc[:70])
+
+    def test_ler_barras_por_intervalo(self):
+        """
+        Testa se a leitura por intervalo retorna a fatia correta sem cópia.
+        """
+        gravar_barras("EURUSD", "D1", self.df_exemplo)
+
+        barras = ler_barras("EURUSD", "D1", "2023-01-11", "2023-01-20")
+        self.assertEqual(len(barras), 10)
+        self.assertIsInstance(barras, np.memmap)
+        np.testing.assert_allclose(barras['close'], self.df_exemplo['close'].iloc[10:20])
+
+        # Intervalo sem dados
+        self.assertEqual(len(ler_barras("EURUSD", "D1", "2024-01-01")), 0)
+        self.assertEqual(len(ler_barras("GBPUSD", "D1")), 0)
+
+    def test_barras_para_dataframe(self):
+        """
+        Testa se a conversão para DataFrame preserva as datas.
+        """
+        gravar_barras("EURUSD", "D1", self.df_exemplo)
+
+        df = barras_para_dataframe(ler_barras("EURUSD", "D1"))
+        self.assertTrue((df['time'].values == self.df_exemplo['time'].values).all())
+        self.assertIn('close', df.columns)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+import pandas as pd
+import src.indicators as indicators
+from src.indicators import (calcular_bandas_bollinger, calcular_adx, calcular_atr, calcular_rsi, calcular_macd,
+                            calcular_stochastic, planejar_indicadores, calcular_indicadores_necessarios)
+from src.strategy import preparar_dados_para_estrategia, COLUNAS_ESTRATEGIA
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        np.random.seed(4)
+        num_barras = 300
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        self.df = pd.DataFrame({
+            'time': pd.date_range(start='2023-01-01', periods=num_barras, freq='h'),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.001,
+            'low': np.minimum(open_, close) - 0.001,
+            'close': close,
+        })
+
+    def test_plano_resolve_dependencias(self):
+        """
+        Testa a ordem do plano, a deduplicação e o reaproveitamento de colunas existentes.
+        """
+        plano = planejar_indicadores(['bb_lower', 'bb_upper', 'bb_middle', 'adx'])
+        self.assertEqual(plano, ['media_bollinger', 'desvio_bollinger', 'bandas_bollinger', 'adx'])
+
+        # Com a média já calculada, só o desvio e as bandas entram no plano
+        self.assertEqual(planejar_indicadores(['bb_upper'], disponiveis=['bb_middle']),
+                         ['desvio_bollinger', 'bandas_bollinger'])
+        self.assertEqual(planejar_indicadores(['close', 'adx'], disponiveis=['adx']), [])
+
+        with self.assertRaises(ValueError):
+            planejar_indicadores(['inexistente'])
+
+    def test_valores_iguais_as_funcoes(self):
+        """
+        Testa se os indicadores do grafo são iguais aos das funções de cada indicador.
+        """
+        esperado = calcular_stochastic(calcular_macd(calcular_rsi(calcular_atr(
+            calcular_adx(calcular_bandas_bollinger(self.df))))))
+        df = preparar_dados_para_estrategia(self.df, COLUNAS_ESTRATEGIA + ['rsi', 'macd', 'macd_signal',
+                                                                          'slowk', 'slowd', 'atr'])
+
+        self.assertEqual(sorted(df.columns), sorted(esperado.columns))
+        for coluna in esperado.columns:
+            np.testing.assert_array_equal(df[coluna].to_numpy(), esperado[coluna].to_numpy())
+
+    def test_cada_indicador_uma_vez(self):
+        """
+        Testa se cada indicador é calculado uma única vez e só quando é necessário.
+        """
+        chamadas = {}
+        registro_original = dict(indicators.REGISTRO_INDICADORES)
+
+        def contar(nome, calcular):
+            def calcular_contando(valores):
+                chamadas[nome] = chamadas.get(nome, 0) + 1
+                return calcular(valores)
+            return calcular_contando
+
+        for nome, indicador in registro_original.items():
+            indicators.REGISTRO_INDICADORES[nome] = indicador._replace(calcular=contar(nome, indicador.calcular))
+        try:
+            df = preparar_dados_para_estrategia(self.df, COLUNAS_ESTRATEGIA)
+            self.assertEqual(chamadas, {'media_bollinger': 1, 'desvio_bollinger': 1, 'bandas_bollinger': 1, 'adx': 1})
+            self.assertNotIn('rsi', df.columns)
+            self.assertNotIn('_desvio_bollinger', df.columns)
+
+            # As colunas da estratégia são reaproveitadas ao pedir também as do modelo
+            chamadas.clear()
+            df = calcular_indicadores_necessarios(df, COLUNAS_ESTRATEGIA + ['rsi', 'macd', 'slowk', 'atr'])
+            self.assertEqual(chamadas, {'rsi': 1, 'macd': 1, 'stochastic': 1, 'atr': 1})
+        finally:
+            indicators.REGISTRO_INDICADORES.clear()
+            indicators.REGISTRO_INDICADORES.update(registro_original)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from src.metricas import calcular_metricas, calcular_curva_exposicao, calcular_retornos_diarios
+
+class TestMetricas(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Quatro trades diários sem sobreposição, com um dia parado no meio
+        self.lucro = np.array([100.0, -50.0, 200.0, -100.0])
+        self.data_entrada = np.array(['2023-01-02', '2023-01-03', '2023-01-05', '2023-01-06'], dtype='datetime64[s]')
+        self.data_saida = self.data_entrada + np.timedelta64(12, 'h')
+
+    def test_calcular_metricas(self):
+        """
+        Testa as métricas calculadas a partir dos arrays de trades.
+        """
+        metricas = calcular_metricas(self.lucro, self.data_entrada, self.data_saida, saldo_inicial=1000)
+
+        self.assertEqual(metricas['num_trades'], 4)
+        self.assertAlmostEqual(metricas['lucro_total'], 150.0)
+        self.assertAlmostEqual(metricas['taxa_acerto'], 0.5)
+        self.assertAlmostEqual(metricas['fator_lucro'], 2.0)
+        self.assertAlmostEqual(metricas['drawdown_maximo'], 100.0)
+        self.assertAlmostEqual(metricas['tempo_medio_horas'], 12.0)
+        self.assertGreater(metricas['sharpe'], 0)
+        self.assertGreater(metricas['sortino'], metricas['sharpe'])
+        self.assertTrue(0 < metricas['exposicao'] < 1)
+
+    def test_retornos_por_dia_util(self):
+        """
+        Testa o agrupamento por dia útil, sem fins de semana e sem dividir por saldo zerado.
+        """
+        # Sexta 23:00, sábado (conta na sexta) e segunda 01:00: dois dias úteis, sem o fim de semana
+        saidas = np.array(['2023-01-06T23:00', '2023-01-07T10:00', '2023-01-09T01:00'], dtype='datetime64[s]')
+        retornos = calcular_retornos_diarios(np.array([100.0, 100.0, 60.0]), saidas, 1000)
+        np.testing.assert_allclose(retornos, [0.2, 0.05])
+
+        # Dia útil sem trades entra com retorno zero
+        saidas = np.array(['2023-01-02', '2023-01-04'], dtype='datetime64[s]')
+        np.testing.assert_allclose(calcular_retornos_diarios(np.array([10.0, 10.0]), saidas, 1000), [0.01, 0, 10 / 1010])
+
+        # A conta quebra no segundo dia: a série termina nele, em -100%
+        saidas = np.array(['2023-01-02', '2023-01-03', '2023-01-04'], dtype='datetime64[s]')
+        retornos = calcular_retornos_diarios(np.array([-500.0, -700.0, 50.0]), saidas, 1000)
+        np.testing.assert_allclose(retornos, [-0.5, -1.0])
+
+    def test_curva_exposicao(self):
+        """
+        Testa a contagem de posições abertas com trades sobrepostos.
+        """
+        entrada = np.array(['2023-01-01', '2023-01-02'], dtype='datetime64[s]')
+        saida = np.array(['2023-01-03', '2023-01-04'], dtype='datetime64[s]')
+
+        _, posicoes = calcular_curva_exposicao(entrada, saida)
+        self.assertEqual(list(posicoes), [1, 2, 1, 0])
+
+    def test_sem_trades(self):
+        """
+        Testa as métricas de um conjunto vazio de trades.
+        """
+        vazio = np.array([], dtype='datetime64[s]')
+        metricas = calcular_metricas(np.array([]), vazio, vazio)
+        self.assertEqual(metricas['num_trades'], 0)
+        self.assertEqual(metricas['lucro_total'], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
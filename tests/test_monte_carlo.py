@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+import src.monte_carlo as monte_carlo
+from src.monte_carlo import executar_monte_carlo, simular_bloco
+from src.metricas import calcular_drawdown
+from src.registro_trades import RegistroTrades
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        np.random.seed(2)
+        self.lucros = np.random.randn(300) * 100 + 10
+
+    def test_resultado_independe_dos_processos(self):
+        """
+        Testa se blocos pequenos em vários processos dão o mesmo resultado que um só processo.
+        """
+        memoria_original = monte_carlo.MEMORIA_BLOCO
+        monte_carlo.MEMORIA_BLOCO = 24 * len(self.lucros) * 700  # Blocos de 700 caminhos
+        try:
+            sequencial = executar_monte_carlo(self.lucros, 5000, slippage=2.0, prob_pular=0.1, semente=42, processos=1)
+            paralelo = executar_monte_carlo(self.lucros, 5000, slippage=2.0, prob_pular=0.1, semente=42, processos=2)
+        finally:
+            monte_carlo.MEMORIA_BLOCO = memoria_original
+
+        self.assertEqual(len(sequencial['retornos']), 5000)
+        np.testing.assert_array_equal(sequencial['retornos'], paralelo['retornos'])
+        np.testing.assert_array_equal(sequencial['drawdowns'], paralelo['drawdowns'])
+        self.assertEqual(sequencial['prob_ruina'], paralelo['prob_ruina'])
+
+    def test_embaralhar_mantem_retorno(self):
+        """
+        Testa se trocar a ordem dos trades mantém o retorno e só muda o drawdown.
+        """
+        resultado = executar_monte_carlo(self.lucros, 2000, metodo='embaralhar', semente=1, processos=1)
+        np.testing.assert_allclose(resultado['retornos'], resultado['retorno_original'])
+
+        # O drawdown do caminho original fica dentro da distribuição
+        saldo = 10000 + np.cumsum(self.lucros)
+        drawdown_original = calcular_drawdown(saldo, 10000)[1].max()
+        self.assertLess(resultado['drawdown']['p1'], drawdown_original)
+        self.assertGreater(resultado['drawdown']['p99'], drawdown_original)
+        self.assertLessEqual(resultado['drawdown']['p1'], resultado['drawdown']['p50'])
+
+    def test_perturbacoes(self):
+        """
+        Testa os trades pulados, o slippage e a probabilidade de ruína.
+        """
+        pulados = simular_bloco(self.lucros, 100, 0, prob_pular=1.0)
+        np.testing.assert_array_equal(pulados['retorno'], 0.0)
+        np.testing.assert_array_equal(pulados['drawdown'], 0.0)
+
+        # Slippage médio de 5 por trade: 300 trades custam em média 1500
+        base = simular_bloco(self.lucros, 20000, 7)
+        com_slippage = simular_bloco(self.lucros, 20000, 7, slippage=5.0)
+        self.assertAlmostEqual((base['retorno'] - com_slippage['retorno']).mean() * 10000, 1500, delta=20)
+
+        # Perdas constantes de 100 com saldo de 10000: 50% de drawdown no trade 50
+        ruina = executar_monte_carlo(np.full(60, -100.0), 100, limite_ruina=0.5, processos=1)
+        self.assertEqual(ruina['prob_ruina'], 1.0)
+        self.assertEqual(ruina['prob_prejuizo'], 1.0)
+        sem_ruina = executar_monte_carlo(np.full(40, -100.0), 100, limite_ruina=0.5, processos=1)
+        self.assertEqual(sem_ruina['prob_ruina'], 0.0)
+        self.assertAlmostEqual(sem_ruina['drawdown']['media'], 0.4)
+
+    def test_entradas(self):
+        """
+        Testa as entradas aceitas e os erros.
+        """
+        registro = RegistroTrades.de_dataframe(pd.DataFrame({
+            'ativo': 'EURUSD', 'data_entrada': pd.date_range('2023-01-01', periods=3, freq='D'),
+            'tipo': 'compra', 'preco_entrada': 1.1, 'sl': 1.09, 'tp': 1.12,
+            'lucro': [100.0, -50.0, 20.0], 'data_saida': pd.date_range('2023-01-02', periods=3, freq='D'),
+        }))
+        self.assertAlmostEqual(executar_monte_carlo(registro, 10, processos=1)['retorno_original'], 0.007)
+
+        with self.assertRaises(ValueError):
+            executar_monte_carlo([], 10)
+        with self.assertRaises(ValueError):
+            executar_monte_carlo(self.lucros, 10, metodo='outro')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from src.historico import DTYPE_BARRAS
+from src.multitimeframe import agregar_barras, AgregadorBarras
+
+class TestMultitimeframe(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Três dias de barras de M1 com preços aleatórios
+        num_barras = 3 * 1440
+        precos = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.0001)
+        self.barras_m1 = np.zeros(num_barras, dtype=DTYPE_BARRAS)
+        self.barras_m1['time'] = 1672531200 + 60 * np.arange(num_barras)  # 2023-01-01 00:00
+        self.barras_m1['open'] = precos
+        self.barras_m1['high'] = precos + 0.0002
+        self.barras_m1['low'] = precos - 0.0002
+        self.barras_m1['close'] = precos
+        self.barras_m1['tick_volume'] = 10
+
+    def test_agregar_barras(self):
+        """
+        Testa a agregação de M1 em H1.
+        """
+        h1 = agregar_barras(self.barras_m1, 3600)
+
+        self.assertEqual(len(h1), 72)
+        self.assertEqual(h1['open'][0], self.barras_m1['open'][0])
+        self.assertEqual(h1['close'][0], self.barras_m1['close'][59])
+        self.assertEqual(h1['high'][1], self.barras_m1['high'][60:120].max())
+        self.assertEqual(h1['tick_volume'][0], 600)
+
+    def test_atualizacao_incremental(self):
+        """
+        Testa se a agregação em pedaços dá o mesmo resultado da agregação completa.
+        """
+        agregador = AgregadorBarras(['H1', 'H4', 'D1'])
+        for inicio in range(0, len(self.barras_m1), 97):
+            agregador.atualizar(self.barras_m1[inicio:inicio + 97])
+
+        for timeframe, duracao in [('H1', 3600), ('H4', 14400), ('D1', 86400)]:
+            completo = agregar_barras(self.barras_m1, duracao)
+            np.testing.assert_array_equal(agregador.barras(timeframe), completo)
+            # A última barra continua em formação
+            self.assertEqual(len(agregador.barras(timeframe, incluir_em_formacao=False)), len(completo) - 1)
+            self.assertEqual(agregador.tempo_candle_atual(timeframe), completo['time'][-1])
+
+    def test_semear_e_continuar(self):
+        """
+        Testa a continuação a partir de barras fechadas semeadas.
+        """
+        d1 = agregar_barras(self.barras_m1, 86400)
+        agregador = AgregadorBarras(['D1'])
+        agregador.semear('D1', d1[:1])
+
+        # O feed precisa começar logo após o primeiro dia
+        self.assertEqual(agregador.inicio_feed(), d1['time'][0] + 86400 - 1)
+        self.assertEqual(agregador.tempo_ultima_fechada('D1'), d1['time'][0])
+
+        # A primeira barra do feed no dia seguinte abre um candle, mas não fecha nenhum
+        agregador.atualizar(self.barras_m1[1440:1441])
+        self.assertEqual(agregador.tempo_candle_atual('D1'), d1['time'][1])
+        self.assertEqual(agregador.tempo_ultima_fechada('D1'), d1['time'][0])
+
+        # Barras do dia já semeado são ignoradas
+        novas = agregador.atualizar(self.barras_m1)
+        self.assertEqual(novas['D1'], 1)
+        np.testing.assert_array_equal(agregador.barras('D1'), d1)
+
+    def test_timeframe_nao_suportado(self):
+        """
+        Testa a rejeição de timeframes maiores que D1.
+        """
+        with self.assertRaises(ValueError):
+            AgregadorBarras(['W1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import os
+import json
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+from src.historico import gravar_barras
+from src.construtor_dataset import construir_dataset_ativo
+from src.otimizador_genetico import (otimizar_parametros, carregar_dados_otimizacao, simular_genoma, proxima_geracao,
+                                     genoma_aleatorio, probabilidades_walk_forward, versao_dados, ESPACO_GENETICO,
+                                     GENES, JANELAS_WALK_FORWARD)
+from src.execucao import ModeloExecucao
+
+class TestOtimizadorGenetico(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorios_originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR)
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(self.diretorio, 'caracteristicas')
+
+        # Passeio aleatório com reversões frequentes para gerar sinais
+        np.random.seed(21)
+        num_barras = 1500
+        for ativo in ['EURUSD', 'GBPUSD']:
+            close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+            open_ = np.concatenate(([close[0]], close[:-1]))
+            gravar_barras(ativo, 'H1', pd.DataFrame({
+                'time': 1672531200 + 3600 * np.arange(num_barras),
+                'open': open_,
+                'high': np.maximum(open_, close) + 0.001,
+                'low': np.minimum(open_, close) - 0.001,
+                'close': close,
+            }))
+
+    def tearDown(self):
+        historico.HISTORICO_DIR, armazem.ARMAZEM_DIR = self.diretorios_originais
+        shutil.rmtree(self.diretorio)
+
+    def otimizar(self, geracoes, nome='teste', diretorio='otimizacao', processos=1):
+        return otimizar_parametros(['EURUSD', 'GBPUSD'], 'H1', tamanho_populacao=8, geracoes=geracoes,
+                                   paciencia=100, semente=5, nome=nome, processos=processos,
+                                   diretorio=os.path.join(self.diretorio, diretorio))
+
+    def test_genoma_padrao_igual_ao_dataset(self):
+        """
+        Testa se os parâmetros atuais da estratégia dão os mesmos trades que o construtor do dataset.
+        """
+        dados = carregar_dados_otimizacao(['EURUSD'], 'H1')
+        genoma = {'bb_periodo': 20, 'bb_desvio': 2.0, 'adx_periodo': 14, 'limiar_adx': 25,
+                  'tp_opcao': 2, 'multiplicador_atr_sl': 0.0, 'limiar_ia': 0.0}
+        lucros, entradas, _ = simular_genoma('EURUSD', dados['EURUSD'], genoma, ModeloExecucao())
+
+        dataset = construir_dataset_ativo('EURUSD', 'H1')
+        self.assertGreater(len(lucros), 0)
+        np.testing.assert_allclose(lucros, dataset['lucro'].to_numpy())
+        np.testing.assert_array_equal(pd.to_datetime(entradas, unit='s'), dataset['data_entrada'])
+
+        # Um SL mais distante muda os resultados
+        genoma['multiplicador_atr_sl'] = 3.0
+        lucros_atr, _, _ = simular_genoma('EURUSD', dados['EURUSD'], genoma, ModeloExecucao())
+        self.assertEqual(len(lucros_atr), len(lucros))
+        self.assertFalse(np.allclose(lucros_atr, lucros))
+
+    def test_proxima_geracao(self):
+        """
+        Testa o elitismo e se os filhos ficam dentro do espaço de busca.
+        """
+        gerador = np.random.default_rng(0)
+        populacao = [genoma_aleatorio(gerador) for _ in range(10)]
+        aptidoes = list(range(10))
+        aptidoes[4] = float('-inf')
+
+        nova = proxima_geracao(populacao, aptidoes, gerador, elite=2)
+        self.assertEqual(len(nova), 10)
+        self.assertEqual(nova[:2], [populacao[9], populacao[8]])
+        for genoma in nova:
+            for gene in GENES:
+                self.assertIn(genoma[gene], ESPACO_GENETICO[gene])
+
+    def test_retomada_e_cache(self):
+        """
+        Testa se a busca retomada é igual à contínua e se o cache evita novas simulações.
+        """
+        continua = self.otimizar(4, diretorio='continua')
+        paralela = self.otimizar(4, diretorio='paralela', processos=2)
+        self.assertEqual(paralela['historico'], continua['historico'])
+
+        parcial = self.otimizar(2)
+        self.assertEqual(parcial['geracao'], 2)
+        retomada = self.otimizar(4)
+        self.assertEqual(retomada['historico'], continua['historico'])
+        self.assertEqual(retomada['melhor'], continua['melhor'])
+        self.assertEqual(retomada['simulacoes'], continua['simulacoes'] - parcial['simulacoes'])
+
+        # Outra busca com a mesma semente só usa o cache
+        repetida = self.otimizar(4, nome='repetida')
+        self.assertEqual(repetida['simulacoes'], 0)
+        self.assertEqual(repetida['historico'][-1]['melhor_treino'], continua['historico'][-1]['melhor_treino'])
+
+        with open(os.path.join(self.diretorio, 'otimizacao', 'teste.json')) as arquivo:
+            estado = json.load(arquivo)
+        self.assertEqual(estado['geracao'], 4)
+        self.assertEqual(len(estado['populacao']), 8)
+
+    def test_probabilidades_sem_look_ahead(self):
+        """
+        Testa se a probabilidade de cada barra só depende de trades encerrados antes da sua janela.
+        """
+        dados = carregar_dados_otimizacao(['EURUSD', 'GBPUSD'], 'H1')
+        probabilidades = dados['EURUSD']['probabilidades']
+        tempos = dados['EURUSD']['barras']['time']
+        limites = np.linspace(tempos.min(), tempos.max() + 1, JANELAS_WALK_FORWARD + 1)
+
+        # Sem passado, a primeira janela fica sem modelo; as seguintes têm probabilidade
+        self.assertTrue(np.isnan(probabilidades[tempos < limites[1]]).all())
+        self.assertFalse(np.isnan(probabilidades[tempos >= limites[2]]).any())
+
+        # Inverter o resultado dos trades que saem depois do início da última janela não muda as anteriores
+        entradas = {ativo: {'barras': dados[ativo]['barras'], 'caracteristicas': armazem.ler_caracteristicas(ativo, 'H1')}
+                    for ativo in dados}
+        exemplos = pd.concat([construir_dataset_ativo(ativo, 'H1') for ativo in dados], ignore_index=True)
+        futuros = pd.to_datetime(exemplos['data_saida']) >= pd.to_datetime(limites[-2], unit='s')
+        self.assertTrue(futuros.any())
+        exemplos.loc[futuros, 'resultado'] = 1 - exemplos.loc[futuros, 'resultado']
+        alteradas = probabilidades_walk_forward(entradas, exemplos)['EURUSD']
+
+        passado = tempos < limites[-2]
+        np.testing.assert_array_equal(alteradas[passado], probabilidades[passado])
+
+    def test_versao_inclui_custos(self):
+        """
+        Testa se os custos do modelo de execução mudam a chave do cache de aptidão.
+        """
+        dados = carregar_dados_otimizacao(['EURUSD'], 'H1')
+        self.assertEqual(versao_dados(dados, ModeloExecucao()), versao_dados(dados, ModeloExecucao()))
+        self.assertNotEqual(versao_dados(dados, ModeloExecucao()), versao_dados(dados, ModeloExecucao(spread_pontos=25)))
+
+        primeira = self.otimizar(1)
+        self.assertGreater(primeira['simulacoes'], 0)
+        outra = otimizar_parametros(['EURUSD', 'GBPUSD'], 'H1', tamanho_populacao=8, geracoes=1, paciencia=100,
+                                    semente=5, nome='custos', processos=1,
+                                    diretorio=os.path.join(self.diretorio, 'otimizacao'),
+                                    modelo_execucao=ModeloExecucao(spread_pontos=25))
+        self.assertEqual(outra['simulacoes'], primeira['simulacoes'])
+
+    def test_parada_antecipada(self):
+        """
+        Testa a parada quando a validação não melhora.
+        """
+        resultado = otimizar_parametros(['EURUSD', 'GBPUSD'], 'H1', tamanho_populacao=6, geracoes=50, paciencia=2,
+                                        semente=3, processos=1, diretorio=os.path.join(self.diretorio, 'otimizacao'))
+        self.assertLess(resultado['geracao'], 50)
+        self.assertEqual(resultado['sem_melhora'], 2)
+        self.assertIsNotNone(resultado['melhor'])
+
+if __name__ == '__main__':
+    unittest.main()
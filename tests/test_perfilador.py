@@ -0,0 +1,143 @@
+import unittest
+import os
+import signal
+import tempfile
+import shutil
+import time
+import tracemalloc
+from src.perfilador import AmostradorPilhas, ControlePerfil, perfilar, enviar_comando
+
+def funcao_ocupada(segundos):
+    """
+    Mantém a thread ocupada pelo tempo pedido.
+    """
+    fim = time.perf_counter() + segundos
+    total = 0
+    while time.perf_counter() < fim:
+        total += sum(range(100))
+    return total
+
+def ler_pilhas(caminho):
+    """
+    Lê um arquivo de pilhas colapsadas como {pilha: contagem}.
+    """
+    pilhas = {}
+    with open(caminho) as arquivo:
+        for linha in arquivo:
+            pilha, contagem = linha.rsplit(' ', 1)
+            pilhas[pilha] = int(contagem)
+    return pilhas
+
+class TestPerfilador(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        shutil.rmtree(self.diretorio)
+
+    def test_pilhas_colapsadas(self):
+        """
+        Testa se as amostras trazem a pilha da thread principal no formato colapsado.
+        """
+        amostrador = AmostradorPilhas(intervalo=0.002)
+        amostrador.iniciar()
+        funcao_ocupada(0.3)
+        amostrador.parar()
+
+        self.assertGreater(amostrador.amostras, 10)
+        pilhas = ler_pilhas(amostrador.salvar(os.path.join(self.diretorio, 'pilhas.txt')))
+        ocupadas = {pilha: contagem for pilha, contagem in pilhas.items() if pilha.endswith('funcao_ocupada')}
+        self.assertTrue(ocupadas)
+        for pilha in ocupadas:
+            self.assertTrue(pilha.startswith('MainThread;'))
+            self.assertIn('test_perfilador.py:test_pilhas_colapsadas;test_perfilador.py:funcao_ocupada', pilha)
+        principal = sum(contagem for pilha, contagem in pilhas.items() if pilha.startswith('MainThread;'))
+        self.assertGreater(sum(ocupadas.values()), principal / 2)
+
+        # As threads do perfilador não aparecem nas amostras
+        self.assertFalse(any('AmostradorPilhas' in pilha or 'amostrar' in pilha for pilha in pilhas))
+
+    def test_arquivo_de_controle(self):
+        """
+        Testa os comandos pelo arquivo de controle, com o processo rodando.
+        """
+        controle = ControlePerfil(self.diretorio, intervalo_amostragem=0.002)
+        arquivo_controle = os.path.join(self.diretorio, 'controle')
+
+        enviar_comando('iniciar', arquivo_controle)
+        enviar_comando('memoria', arquivo_controle)
+        self.assertEqual(controle.verificar_controle(), ['iniciar', 'memoria'])
+        self.assertFalse(os.path.exists(arquivo_controle))
+        self.assertTrue(controle.amostrador.ativo)
+
+        lista = [bytearray(1024) for _ in range(2000)]
+        funcao_ocupada(0.1)
+
+        enviar_comando('parar', arquivo_controle)
+        enviar_comando('memoria', arquivo_controle)
+        controle.verificar_controle()
+        self.assertFalse(controle.amostrador.ativo)
+        self.assertEqual(controle.verificar_controle(), [])
+
+        arquivos = sorted(os.listdir(self.diretorio))
+        self.assertEqual([nome.split('_')[0] for nome in arquivos], ['memoria', 'memoria', 'pilhas'])
+
+        # O segundo snapshot mostra a lista alocada entre os dois
+        with open(os.path.join(self.diretorio, arquivos[1])) as arquivo:
+            relatorio = arquivo.read()
+        self.assertIn('Maiores diferenças desde o snapshot anterior', relatorio)
+        self.assertIn('test_perfilador.py', relatorio.split('## Maiores alocações')[0])
+        del lista
+
+        # O rastreamento de memória continua até ser desligado
+        self.assertTrue(tracemalloc.is_tracing())
+        enviar_comando('parar_memoria', arquivo_controle)
+        self.assertEqual(controle.verificar_controle(), ['parar_memoria'])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(controle.monitor.anterior)
+
+        with self.assertRaises(ValueError):
+            enviar_comando('outro', arquivo_controle)
+
+    @unittest.skipUnless(hasattr(signal, 'SIGUSR1'), "Sinais POSIX indisponíveis")
+    def test_sinais(self):
+        """
+        Testa o controle pelos sinais SIGUSR1 e SIGUSR2.
+        """
+        tratador_original = signal.getsignal(signal.SIGUSR1)
+        controle = ControlePerfil(self.diretorio, intervalo_controle=0.05, intervalo_amostragem=0.002)
+        controle.iniciar()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            funcao_ocupada(0.1)
+            self.assertTrue(controle.amostrador.ativo)
+            os.kill(os.getpid(), signal.SIGUSR2)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            funcao_ocupada(0.05)
+            self.assertFalse(controle.amostrador.ativo)
+        finally:
+            controle.parar()
+
+        self.assertEqual(sorted(nome.split('_')[0] for nome in os.listdir(self.diretorio)), ['memoria', 'pilhas'])
+        self.assertIs(signal.getsignal(signal.SIGUSR1), tratador_original)
+
+    def test_perfilar_bloco(self):
+        """
+        Testa o gerenciador de contexto usado em execuções longas, como o backtest.
+        """
+        with perfilar(self.diretorio, intervalo=0.002):
+            funcao_ocupada(0.1)
+
+        arquivos = os.listdir(self.diretorio)
+        self.assertEqual(len(arquivos), 1)
+        pilhas = ler_pilhas(os.path.join(self.diretorio, arquivos[0]))
+        self.assertTrue(any(pilha.endswith('funcao_ocupada') for pilha in pilhas))
+
+if __name__ == '__main__':
+    unittest.main()
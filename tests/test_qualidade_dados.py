@@ -0,0 +1,154 @@
+import unittest
+import numpy as np
+from src.historico import DTYPE_BARRAS
+from src.qualidade_dados import (validar_barras, resumo_qualidade, dia_semana, FLAG_FORA_DE_ORDEM,
+                                 FLAG_DUPLICADA, FLAG_OHLC_INVALIDO, FLAG_OUTLIER, FLAG_APOS_LACUNA,
+                                 FLAG_PREENCHIDA)
+
+HORA = 3600
+
+def criar_barras(tempos, seed=3):
+    """
+    Cria barras H1 coerentes nos tempos dados.
+    """
+    np.random.seed(seed)
+    barras = np.zeros(len(tempos), dtype=DTYPE_BARRAS)
+    fechamento = 1.1 + np.cumsum(np.random.randn(len(tempos)) * 0.001)
+    abertura = np.concatenate(([fechamento[0]], fechamento[:-1]))
+    barras['time'] = tempos
+    barras['open'] = abertura
+    barras['close'] = fechamento
+    barras['high'] = np.maximum(abertura, fechamento) + 0.0005
+    barras['low'] = np.minimum(abertura, fechamento) - 0.0005
+    barras['tick_volume'] = 100
+    barras['spread'] = 10
+    return barras
+
+class TestQualidadeDados(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Segunda-feira 02/01/2023 00:00 até sexta 21:00, e a semana seguinte a partir de domingo 22:00
+        segunda = 1672617600
+        self.assertEqual(dia_semana(np.array([segunda]))[0], 0)
+        semana = segunda + HORA * np.arange(4 * 24 + 22)
+        seguinte = segunda + 6 * 86400 + 22 * HORA + HORA * np.arange(30)
+        tempos = np.concatenate((semana, seguinte))
+
+        # Lacuna de 3 barras no meio da terça-feira
+        self.tempos = np.delete(tempos, [30, 31, 32])
+        self.limpas = criar_barras(self.tempos)
+
+    def test_dados_integros(self):
+        """
+        Testa se barras íntegras passam sem alterações, com as lacunas mapeadas.
+        """
+        barras, relatorio = validar_barras(self.limpas, 'H1', reparar=True)
+        self.assertIs(barras, self.limpas)
+        self.assertEqual(relatorio['lacunas_fim_de_semana'], 1)
+        self.assertEqual((relatorio['lacunas'], relatorio['barras_faltantes']), (1, 3))
+        for chave in ['fora_de_ordem', 'duplicadas', 'ohlc_invalido', 'outliers', 'barras_preenchidas']:
+            self.assertEqual(relatorio[chave], 0)
+        self.assertIn("1 lacunas (3 barras faltantes)", resumo_qualidade(relatorio))
+
+        mapa = relatorio['mapa_lacunas']
+        self.assertEqual(len(mapa), 2)
+        self.assertTrue(mapa.apos_lacuna(30))
+        self.assertFalse(mapa.apos_lacuna(29))
+        lacuna = mapa.lacuna_em(int(self.tempos[30]))
+        self.assertEqual(lacuna['barras_faltantes'], 3)
+        self.assertAlmostEqual(lacuna['salto'], self.limpas['open'][30] - self.limpas['close'][29])
+
+        # A abertura de domingo vem depois de uma lacuna de fim de semana
+        indice_domingo = int(np.flatnonzero(np.diff(self.tempos) > 24 * HORA)[0]) + 1
+        self.assertFalse(mapa.apos_lacuna(indice_domingo))
+        self.assertTrue(mapa.apos_lacuna(indice_domingo, incluir_fim_de_semana=True))
+        self.assertEqual(relatorio['flags'][indice_domingo], FLAG_APOS_LACUNA)
+
+    def test_problemas_marcados_e_reparados(self):
+        """
+        Testa a detecção e o reparo de duplicadas, barras fora de ordem, OHLC inválido e picos.
+        """
+        barras = self.limpas.copy()
+        barras['high'][10] = barras['close'][10] - 0.002
+        barras['close'][50] *= 1.05
+        barras['high'][50] = barras['close'][50]
+        barras['open'][51] = barras['close'][50]
+        barras['high'][51] = barras['close'][50]
+        barras['close'][70] = np.nan
+        barras[[20, 21]] = barras[[21, 20]]
+        repetida = barras[40].copy()
+        repetida['close'] += 0.0001
+        repetida['high'] += 0.0001
+        barras = np.insert(barras, 41, repetida)
+
+        marcadas, relatorio = validar_barras(barras, 'H1')
+        self.assertIs(marcadas, barras)
+        self.assertEqual(relatorio['fora_de_ordem'], 1)
+        self.assertEqual(relatorio['duplicadas'], 1)
+        self.assertEqual(relatorio['ohlc_invalido'], 2)
+        self.assertEqual(relatorio['outliers'], 1)
+        flags = relatorio['flags']
+        self.assertTrue(flags[21] & FLAG_FORA_DE_ORDEM)
+        self.assertTrue(flags[40] & FLAG_DUPLICADA)
+        self.assertTrue(flags[10] & FLAG_OHLC_INVALIDO)
+        self.assertTrue(flags[51] & FLAG_OUTLIER)
+        # Fora de ordem, as lacunas não são procuradas
+        self.assertEqual(len(relatorio['mapa_lacunas']), 0)
+
+        # O reparo corrige só a estrutura: o pico fica, marcado, e a barra sem preço sai
+        reparadas, relatorio = validar_barras(barras, 'H1', reparar=True)
+        self.assertEqual(relatorio['barras_recebidas'], len(barras))
+        self.assertEqual(relatorio['barras'], len(self.limpas) - 1)
+        self.assertTrue(np.all(np.diff(reparadas['time']) > 0))
+        self.assertEqual(reparadas['time'][50], self.tempos[50])
+        self.assertTrue(relatorio['flags'][50] & FLAG_OUTLIER)
+        self.assertNotIn(self.tempos[70], reparadas['time'])
+        self.assertTrue(np.all(reparadas['high'] >= np.maximum(reparadas['open'], reparadas['close'])))
+        self.assertTrue(np.all(reparadas['low'] <= np.minimum(reparadas['open'], reparadas['close'])))
+        self.assertEqual(relatorio['lacunas'], 2)
+
+        # Os picos só são descartados quando pedido
+        reparadas, relatorio = validar_barras(barras, 'H1', reparar=True, remover_outliers=True)
+        self.assertEqual(relatorio['barras'], len(self.limpas) - 2)
+        self.assertNotIn(self.tempos[50], reparadas['time'])
+        self.assertNotIn(self.tempos[70], reparadas['time'])
+        self.assertTrue(np.all(reparadas['high'] >= np.maximum(reparadas['open'], reparadas['close'])))
+        self.assertTrue(np.all(reparadas['low'] <= np.minimum(reparadas['open'], reparadas['close'])))
+
+        # A barra mais recente de cada tempo repetido é a mantida
+        indice = np.flatnonzero(reparadas['time'] == self.tempos[40])[0]
+        self.assertEqual(reparadas['close'][indice], repetida['close'])
+
+        # Barras removidas abrem lacunas, que continuam consultáveis
+        self.assertEqual(relatorio['lacunas'], 3)
+        self.assertTrue(relatorio['mapa_lacunas'].lacuna_em(int(self.tempos[71])) is not None)
+        self.assertIn("com pico isolado", resumo_qualidade(relatorio))
+
+    def test_preencher_lacunas(self):
+        """
+        Testa o preenchimento das lacunas que não são de fim de semana.
+        """
+        barras, relatorio = validar_barras(self.limpas, 'H1', reparar=True, preencher=True)
+        self.assertEqual(len(barras), len(self.limpas) + 3)
+        self.assertEqual(relatorio['barras_preenchidas'], 3)
+
+        preenchidas = np.flatnonzero(relatorio['flags'] & FLAG_PREENCHIDA)
+        np.testing.assert_array_equal(preenchidas, [30, 31, 32])
+        np.testing.assert_array_equal(barras['time'][preenchidas], self.limpas['time'][29] + HORA * np.arange(1, 4))
+        np.testing.assert_array_equal(barras['open'][preenchidas], self.limpas['close'][29])
+        np.testing.assert_array_equal(barras['tick_volume'][preenchidas], 0)
+
+        # O mapa aponta para a primeira barra real depois da lacuna, já deslocada
+        mapa = relatorio['mapa_lacunas']
+        self.assertTrue(mapa.apos_lacuna(33))
+        self.assertTrue(mapa.lacuna_antes(33)['preenchida'])
+        self.assertEqual(barras['time'][33], self.tempos[30])
+        indice_domingo = int(np.flatnonzero(np.diff(barras['time']) > 24 * HORA)[0]) + 1
+        self.assertTrue(mapa.apos_lacuna(indice_domingo, incluir_fim_de_semana=True))
+        self.assertFalse(mapa.lacuna_antes(indice_domingo)['preenchida'])
+
+if __name__ == '__main__':
+    unittest.main()
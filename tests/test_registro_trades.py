@@ -0,0 +1,59 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.registro_trades import RegistroTrades
+
+class TestRegistroTrades(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Registro pequeno para forçar o crescimento das colunas
+        self.registro = RegistroTrades(capacidade=2)
+        self.lucros = [100.0, -50.0, -80.0, 200.0, -30.0]
+        datas = pd.date_range(start='2023-01-01', periods=len(self.lucros), freq='D')
+        for i, lucro in enumerate(self.lucros):
+            self.registro.adicionar('EURUSD' if i % 2 == 0 else 'GBPUSD', datas[i],
+                                    'compra' if lucro > 0 else 'venda',
+                                    1.1, 1.09, 1.12, lucro, datas[i] + pd.Timedelta(days=1))
+
+    def test_adicionar_e_converter(self):
+        """
+        Testa se os trades são acumulados e convertidos para DataFrame corretamente.
+        """
+        self.assertEqual(len(self.registro), 5)
+
+        df = self.registro.para_dataframe()
+        self.assertEqual(len(df), 5)
+        self.assertEqual(list(df['ativo'][:2]), ['EURUSD', 'GBPUSD'])
+        self.assertEqual(list(df['resultado'][:2]), ['lucro', 'prejuizo'])
+        np.testing.assert_allclose(df['lucro'], self.lucros)
+
+        # Ida e volta pelo DataFrame preserva os dados
+        copia = RegistroTrades.de_dataframe(df)
+        pd.testing.assert_frame_equal(copia.para_dataframe(), df)
+
+    def test_resumo(self):
+        """
+        Testa as métricas vetorizadas do registro.
+        """
+        resumo = self.registro.resumo(saldo_inicial=1000)
+
+        self.assertEqual(resumo['num_trades'], 5)
+        self.assertAlmostEqual(resumo['lucro_total'], 140.0)
+        self.assertAlmostEqual(resumo['taxa_acerto'], 0.4)
+        self.assertAlmostEqual(resumo['expectativa'], 28.0)
+        # Pico de 1100 seguido de vale de 970
+        self.assertAlmostEqual(resumo['drawdown_maximo'], 130.0)
+
+    def test_registro_vazio(self):
+        """
+        Testa o resumo de um registro sem trades.
+        """
+        registro = RegistroTrades()
+        self.assertEqual(registro.resumo()['num_trades'], 0)
+        self.assertEqual(len(registro.para_dataframe()), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+from src.registro_trades import RegistroTrades
+from src.relatorios import (indices_lttb, indices_min_max, secoes_relatorio, gerar_relatorio,
+                            gerar_relatorio_em_segundo_plano)
+
+def criar_trades(num_trades, ativos, seed=5):
+    """
+    Cria um DataFrame de trades com o formato do log do backtest.
+    """
+    np.random.seed(seed)
+    saida = np.datetime64('2020-01-01T00:00:00') + np.sort(np.random.randint(0, 3 * 365 * 86400, num_trades)).astype('timedelta64[s]')
+    return pd.DataFrame({
+        'ativo': np.random.choice(ativos, num_trades),
+        'data_entrada': saida - np.timedelta64(3600, 's'),
+        'tipo': 'compra',
+        'preco_entrada': 1.1,
+        'sl': 1.09,
+        'tp': 1.12,
+        'lucro': np.random.randn(num_trades) * 10 + 0.5,
+        'data_saida': saida,
+    })
+
+class TestRelatorios(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.cache = os.path.join(self.diretorio, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def test_reducao_preserva_forma(self):
+        """
+        Testa se as reduções mantêm as pontas, os picos e os extremos da curva.
+        """
+        x = np.arange(100000, dtype=np.float64)
+        y = np.sin(x / 5000) + np.random.RandomState(1).randn(len(x)) * 0.01
+        y[31337] = 5.0
+
+        indices = indices_lttb(x, y, 500)
+        self.assertEqual(len(indices), 500)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertEqual((indices[0], indices[-1]), (0, len(x) - 1))
+        self.assertIn(31337, indices)
+
+        indices = indices_min_max(y, 500)
+        self.assertLessEqual(len(indices), 500)
+        self.assertEqual(y[indices].max(), y.max())
+        self.assertEqual(y[indices].min(), y.min())
+
+        # Curvas curtas não são reduzidas
+        np.testing.assert_array_equal(indices_lttb(x[:10], y[:10], 500), np.arange(10))
+
+    def test_secoes_reduzidas(self):
+        """
+        Testa se cada seção traz no máximo o número de pontos pedido.
+        """
+        trades = criar_trades(50000, ['EURUSD', 'GBPUSD'])
+        secoes = secoes_relatorio(RegistroTrades.de_dataframe(trades), num_pontos=300)
+        self.assertEqual([secao['nome'] for secao in secoes],
+                         ['resumo', 'saldo', 'drawdown', 'ativo_EURUSD', 'ativo_GBPUSD'])
+        for secao in secoes[1:]:
+            self.assertLessEqual(len(secao['dados']['valores']), 300)
+        saldo = 10000 + trades['lucro'].cumsum().to_numpy()
+        self.assertAlmostEqual(secoes[1]['dados']['valores'][-1], saldo[-1])
+        self.assertEqual(secoes[0]['dados']['linhas'], ['Carteira', 'EURUSD', 'GBPUSD'])
+
+    def test_cache_das_secoes(self):
+        """
+        Testa se só as seções que mudaram são desenhadas de novo.
+        """
+        trades = criar_trades(5000, ['EURUSD', 'GBPUSD', 'USDJPY'])
+        caminho = os.path.join(self.diretorio, 'relatorio.pdf')
+
+        resultado = gerar_relatorio(trades, caminho, diretorio_cache=self.cache)
+        self.assertEqual((resultado['desenhadas'], resultado['em_cache']), (6, 0))
+        with open(caminho, 'rb') as arquivo:
+            self.assertEqual(arquivo.read(5), b'%PDF-')
+
+        resultado = gerar_relatorio(trades, caminho, diretorio_cache=self.cache)
+        self.assertEqual((resultado['desenhadas'], resultado['em_cache']), (0, 6))
+
+        # Um trade do USDJPY mudou: resumo, saldo, drawdown e a página do USDJPY são refeitos
+        alterados = trades.copy()
+        indice = alterados.index[alterados['ativo'] == 'USDJPY'][-1]
+        alterados.loc[indice, 'lucro'] += 1000
+        resultado = gerar_relatorio(alterados, caminho, diretorio_cache=self.cache)
+        self.assertEqual((resultado['desenhadas'], resultado['em_cache']), (4, 2))
+
+    def test_relatorio_em_segundo_plano(self):
+        """
+        Testa a geração do relatório em outro processo.
+        """
+        trades = RegistroTrades.de_dataframe(criar_trades(1000, ['EURUSD']))
+        caminho = os.path.join(self.diretorio, 'relatorio.pdf')
+        futuro = gerar_relatorio_em_segundo_plano(trades, caminho, diretorio_cache=self.cache)
+        resultado = futuro.result(timeout=120)
+        self.assertEqual(resultado['caminho'], caminho)
+        self.assertTrue(os.path.getsize(caminho) > 0)
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+import src.main as main
+import src.mt5_connection as mt5_connection
+from src.mt5_connection import TRAVA_MT5
+from src.historico import gravar_barras, ler_barras, DTYPE_BARRAS
+from src.multitimeframe import agregar_barras
+from src.config import MAGIC_NUMBER
+from src.estado_ativos import EstadoAtivos
+from src.estrategias import carregar_estrategias
+from src.gerenciador_ordens import GerenciadorOrdens
+from src.strategy import preparar_dados_para_estrategia
+from src.replay import executar_replay, comparar_com_backtest, GatewaySimulado, atributos_substituidos, MODULOS_MT5
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.diretorios_originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR)
+        historico.HISTORICO_DIR = os.path.join(self.diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(self.diretorio, 'caracteristicas')
+
+        # Passeio aleatório com reversões frequentes para gerar sinais
+        np.random.seed(11)
+        num_barras = 500
+        for ativo in ['EURUSD', 'GBPUSD']:
+            close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+            open_ = np.concatenate(([close[0]], close[:-1]))
+            gravar_barras(ativo, 'H1', pd.DataFrame({
+                'time': 1672531200 + 3600 * np.arange(num_barras),
+                'open': open_,
+                'high': np.maximum(open_, close) + 0.001,
+                'low': np.minimum(open_, close) - 0.001,
+                'close': close,
+            }))
+
+    def tearDown(self):
+        historico.HISTORICO_DIR, armazem.ARMAZEM_DIR = self.diretorios_originais
+        shutil.rmtree(self.diretorio)
+
+    def test_gateway_tempo_virtual(self):
+        """
+        Testa se o gateway só mostra as barras até o tempo virtual.
+        """
+        gateway = GatewaySimulado(['EURUSD'], 'H1', inicio=pd.Timestamp('2023-01-02'))
+        self.assertEqual(gateway.agora, 1672531200 + 24 * 3600)
+
+        barras = gateway.copy_rates_from_pos('EURUSD', gateway.TIMEFRAME_H1, 0, 100)
+        self.assertEqual(len(barras), 25)
+        self.assertEqual(barras['time'][-1], gateway.agora)
+        self.assertEqual(len(gateway.copy_rates_from_pos('EURUSD', gateway.TIMEFRAME_H1, 1, 100)), 24)
+
+        # O candle em formação acabou de abrir: só a abertura é conhecida, e o tick está nela
+        gravadas = historico.ler_barras('EURUSD', 'H1')
+        self.assertEqual(barras['open'][-1], gravadas['open'][24])
+        for campo in ['high', 'low', 'close']:
+            self.assertEqual(barras[campo][-1], barras['open'][-1])
+        np.testing.assert_array_equal(barras[:-1], gravadas[:24])
+        self.assertEqual(gateway.symbol_info_tick('EURUSD').bid, barras['open'][-1])
+
+    def test_replay_ciclo_ao_vivo(self):
+        """
+        Testa o ciclo ao vivo em tempo virtual e a comparação com o backtest.
+        """
+        resultado = executar_replay(['EURUSD', 'GBPUSD'], ['H1'], inicio=pd.Timestamp('2023-01-03'),
+                                    diretorio=os.path.join(self.diretorio, 'replay'))
+
+        self.assertEqual(resultado['ciclos'], 500 - 48)
+        self.assertEqual(resultado['barras'], 2 * (500 - 48))
+        self.assertGreater(resultado['barras_por_segundo'], 0)
+        for etapa in ['ciclo', 'dados', 'indicadores', 'risco']:
+            self.assertGreater(resultado['latencias'][etapa]['chamadas'], 0)
+
+        # Todas as ordens viram trades, encerrados até o fim do replay
+        self.assertGreater(len(resultado['ordens']), 0)
+        self.assertEqual(len(resultado['trades']), len(resultado['ordens']))
+
+        # As decisões são registradas com o tempo virtual
+        decisoes = pd.read_csv(os.path.join(self.diretorio, 'replay', 'decisions_log.csv'))
+        self.assertTrue((pd.to_datetime(decisoes['data'], format='ISO8601') < pd.Timestamp('2023-03-01')).all())
+
+        # O gateway é removido ao final
+        self.assertNotIsInstance(main.mt5, GatewaySimulado)
+        self.assertNotIsInstance(mt5_connection.mt5, GatewaySimulado)
+
+        comparacao = comparar_com_backtest(resultado, inicio=pd.Timestamp('2023-01-03'))
+        self.assertGreater(len(comparacao['coincidentes']), 0)
+        self.assertGreater(comparacao['concordancia'], 0.8)
+
+    def test_trava_livre_durante_a_analise(self):
+        """
+        Testa se o ciclo só segura TRAVA_MT5 nas chamadas ao terminal, e não durante a
+        análise dos sinais ou a atualização do armazém.
+        """
+        livre = []
+
+        def trava_livre():
+            # Outra thread (como a da gestão das posições) consegue a trava?
+            obtida = []
+            def tentar():
+                obtida.append(TRAVA_MT5.acquire(timeout=1))
+                if obtida[-1]:
+                    TRAVA_MT5.release()
+            thread = threading.Thread(target=tentar)
+            thread.start()
+            thread.join()
+            return obtida[0]
+
+        def espiar(funcao):
+            def espiada(*args, **kwargs):
+                livre.append(trava_livre())
+                return funcao(*args, **kwargs)
+            return espiada
+
+        with atributos_substituidos([(main, 'analisar_sinais', espiar(main.analisar_sinais)),
+                                     (main, 'atualizar_armazem', espiar(main.atualizar_armazem))]):
+            executar_replay(['EURUSD'], ['H1'], inicio=pd.Timestamp('2023-01-20'), fim=pd.Timestamp('2023-01-21'),
+                            diretorio=os.path.join(self.diretorio, 'replay'))
+
+        self.assertGreater(len(livre), 0)
+        self.assertTrue(all(livre))
+
+    def gravar_feed_m1(self, ativo):
+        """
+        Grava seis dias de barras M1 e, em H1 e H4, só as barras até o início do sexto dia.
+
+        Returns:
+            tuple: (tempo do início do sexto dia, barras H1 e H4 completas agregadas do M1).
+        """
+        np.random.seed(12)
+        num_barras = 6 * 1440
+        precos = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.0003)
+        m1 = np.zeros(num_barras, dtype=DTYPE_BARRAS)
+        m1['time'] = 1675209600 + 60 * np.arange(num_barras)  # 2023-02-01 00:00
+        m1['open'] = np.concatenate(([precos[0]], precos[:-1]))
+        m1['close'] = precos
+        m1['high'] = np.maximum(m1['open'], m1['close']) + 0.0001
+        m1['low'] = np.minimum(m1['open'], m1['close']) - 0.0001
+        m1['tick_volume'] = 10
+        gravar_barras(ativo, 'M1', m1)
+
+        inicio = int(m1['time'][5 * 1440])
+        completos = {timeframe: agregar_barras(m1, duracao) for timeframe, duracao in [('H1', 3600), ('H4', 14400)]}
+        for timeframe, barras in completos.items():
+            gravar_barras(ativo, timeframe, barras[barras['time'] <= inicio])
+        return inicio, completos
+
+    def test_replay_multitimeframe_grava_barras_agregadas(self):
+        """
+        Testa se, no modo multi-timeframe, o histórico e o armazém de cada timeframe são
+        gravados com as barras agregadas do feed, sem buscas por timeframe a cada ciclo.
+        """
+        # No terminal simulado, H1 e H4 só têm as barras até o início do replay
+        inicio, completos = self.gravar_feed_m1('AUDUSD')
+
+        chamadas = {'sincronizar_historico': 0, 'obter_dados_historicos': 0}
+        def contar(nome):
+            funcao = getattr(main, nome)
+            def contada(*args, **kwargs):
+                chamadas[nome] += 1
+                return funcao(*args, **kwargs)
+            return contada
+
+        with atributos_substituidos([(main, nome, contar(nome)) for nome in chamadas]):
+            resultado = executar_replay(['AUDUSD'], ['H1', 'H4'], inicio=pd.Timestamp(inicio, unit='s'),
+                                        fim=pd.Timestamp(inicio + 10 * 3600, unit='s'),
+                                        diretorio=os.path.join(self.diretorio, 'replay'))
+        self.assertEqual(resultado['ciclos'], 10 * 60 + 1)
+
+        # Cada timeframe foi buscado uma única vez, para semear o agregador
+        self.assertEqual(chamadas, {'sincronizar_historico': 0, 'obter_dados_historicos': 2})
+
+        # O histórico segue com as barras fechadas pelo agregador, e o armazém com ele (no
+        # último passo, a barra que termina nele ainda espera a primeira barra do feed seguinte)
+        fim = inicio + 10 * 3600
+        for timeframe, barras in completos.items():
+            esperadas = barras[barras['time'] + (3600 if timeframe == 'H1' else 14400) < fim]
+            gravadas = ler_barras('AUDUSD', timeframe)
+            np.testing.assert_array_equal(gravadas['time'], esperadas['time'])
+            np.testing.assert_allclose(gravadas['close'], esperadas['close'])
+            self.assertEqual(armazem.ler_caracteristicas('AUDUSD', timeframe)['time'][-1], esperadas['time'][-1])
+
+    def test_multitimeframe_semeado_sem_barra_do_feed(self):
+        """
+        Testa se, logo depois de semear e sem barra do feed no candle seguinte, cada
+        timeframe é analisado até a última barra fechada, e só de novo quando outra fecha.
+        """
+        inicio, _ = self.gravar_feed_m1('AUDUSD')
+        gateway = GatewaySimulado(['AUDUSD'], 'M1', inicio=pd.Timestamp(inicio, unit='s'))
+
+        avaliadas = []
+        def preparar_registrando(df, colunas=None):
+            avaliadas.append(int(df['time'].iloc[-1].timestamp()))
+            return preparar_dados_para_estrategia(df, colunas)
+
+        estrategias = carregar_estrategias()
+        gerenciador = GerenciadorOrdens(MAGIC_NUMBER, estrategias)
+        estados = EstadoAtivos()
+        agregadores = {}
+        substituicoes = [(modulo, 'mt5', gateway) for modulo in MODULOS_MT5]
+        substituicoes += [
+            (main, 'TIMEFRAMES', ['H1', 'H4']),
+            (main, 'preparar_dados_para_estrategia', preparar_registrando),
+            (main, 'DECISIONS_LOG_PATH', os.path.join(self.diretorio, 'decisions_log.csv')),
+        ]
+        with atributos_substituidos(substituicoes):
+            def ciclo(passo):
+                gateway.avancar(gateway.passos[passo])
+                main.processar_multitimeframe('AUDUSD', None, gerenciador, estados, agregadores, estrategias=estrategias)
+
+            # Semeado na abertura do candle: o feed ainda não tem barra dele
+            ciclo(0)
+            self.assertIsNone(agregadores['AUDUSD'].em_formacao['H1'])
+            self.assertEqual(avaliadas, [inicio - 3600, inicio - 14400])
+
+            # A primeira barra do feed no candle novo não fecha nenhuma barra
+            ciclo(1)
+            self.assertEqual(avaliadas, [inicio - 3600, inicio - 14400])
+
+            # Com o fechamento do candle H1, só ele é analisado, até a barra que fechou
+            ciclo(61)
+            self.assertEqual(avaliadas, [inicio - 3600, inicio - 14400, inicio])
+
+if __name__ == '__main__':
+    unittest.main()
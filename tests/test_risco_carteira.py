@@ -0,0 +1,178 @@
+import unittest
+import os
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import src.historico as historico
+import src.armazem_caracteristicas as armazem
+import src.backtest as backtest
+from src.historico import gravar_barras, ler_barras
+from src.risco_carteira import CorrelacaoMovel, RiscoCarteira
+
+def criar_barras(tempos, retornos, preco_inicial=1.1):
+    """
+    Cria barras com 'time' e 'close' a partir dos retornos logarítmicos.
+    """
+    return pd.DataFrame({'time': tempos, 'close': preco_inicial * np.exp(np.cumsum(retornos))})
+
+class TestRiscoCarteira(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # EURUSD e GBPUSD andam juntos; USDCHF anda ao contrário; XAUUSD é independente
+        np.random.seed(3)
+        num_barras = 300
+        comum = np.random.randn(num_barras) * 0.002
+        self.tempos = 1672531200 + 3600 * np.arange(num_barras)
+        self.barras = {
+            'EURUSD': criar_barras(self.tempos, comum + np.random.randn(num_barras) * 0.0005),
+            'GBPUSD': criar_barras(self.tempos, comum + np.random.randn(num_barras) * 0.0005),
+            'USDCHF': criar_barras(self.tempos, -comum + np.random.randn(num_barras) * 0.0005),
+            'XAUUSD': criar_barras(self.tempos, np.random.randn(num_barras) * 0.002),
+        }
+        self.risco = RiscoCarteira(list(self.barras), janela=50, limiar_correlacao=0.7,
+                                   max_risco_correlacionado=0.015, max_risco_diario=0.05, fator_minimo=0.25)
+
+    def test_correlacao_incremental(self):
+        """
+        Testa se a correlação incremental é igual à calculada sobre a janela inteira.
+        """
+        np.random.seed(7)
+        retornos = np.random.randn(437, 6) @ np.random.randn(6, 6)
+        correlacao = CorrelacaoMovel(6, janela=50)
+        np.testing.assert_array_equal(correlacao.matriz(), np.eye(6))
+
+        for linha in retornos:
+            correlacao.atualizar(linha)
+        np.testing.assert_allclose(correlacao.matriz(), np.corrcoef(retornos[-50:].T), atol=1e-10)
+
+    def test_barras_alinhadas_em_lotes(self):
+        """
+        Testa se adicionar as barras em lotes dá a mesma correlação, mesmo com um ativo sem a última barra.
+        """
+        self.assertEqual(self.risco.adicionar_barras(self.barras), 300)
+        self.assertEqual(self.risco.adicionar_barras(self.barras), 0)
+
+        em_lotes = RiscoCarteira(list(self.barras), janela=50)
+        for fim in [100, 101, 250, 300]:
+            lote = {ativo: barras[barras['time'] <= self.tempos[fim - 1]] for ativo, barras in self.barras.items()}
+            lote['XAUUSD'] = lote['XAUUSD'].iloc[:-1]  # Sem a barra do ouro: o preço anterior é repetido
+            em_lotes.adicionar_barras(lote)
+
+        np.testing.assert_allclose(em_lotes.matriz_correlacao[:3, :3], self.risco.matriz_correlacao[:3, :3], atol=1e-10)
+        self.assertGreater(self.risco.correlacao_entre('EURUSD', 'GBPUSD'), 0.7)
+        self.assertLess(self.risco.correlacao_entre('EURUSD', 'USDCHF'), -0.7)
+
+    def test_limite_correlacionado(self):
+        """
+        Testa a redução e a recusa de sinais no mesmo sentido de posições correlacionadas.
+        """
+        self.risco.adicionar_barras(self.barras)
+        tempo = pd.Timestamp('2023-01-10 10:00')
+        self.risco.registrar_abertura(1, 'EURUSD', 'compra', 0.01, tempo=tempo)
+
+        # Compra de GBPUSD e venda de USDCHF somam risco com a compra de EURUSD: cabe metade
+        self.assertAlmostEqual(self.risco.avaliar_sinal('GBPUSD', 'compra', 0.01, tempo), 0.5)
+        self.assertAlmostEqual(self.risco.avaliar_sinal('USDCHF', 'venda', 0.01, tempo), 0.5)
+
+        # Sentidos opostos e ativos não correlacionados não somam
+        self.assertEqual(self.risco.avaliar_sinal('USDCHF', 'compra', 0.01, tempo), 1.0)
+        self.assertEqual(self.risco.avaliar_sinal('GBPUSD', 'venda', 0.01, tempo), 1.0)
+        self.assertEqual(self.risco.avaliar_sinal('XAUUSD', 'compra', 0.01, tempo), 1.0)
+
+        # Sem espaço suficiente, o sinal é recusado
+        self.risco.registrar_abertura(2, 'GBPUSD', 'compra', 0.004, tempo=tempo)
+        self.assertEqual(self.risco.avaliar_sinal('EURUSD', 'compra', 0.01, tempo), 0.0)
+
+        # Posições encerradas no terminal deixam de contar
+        self.risco.sincronizar_posicoes({2: {'ativo': 'GBPUSD', 'tipo': 'compra'}})
+        self.assertEqual(list(self.risco.exposicoes), [2])
+        self.assertAlmostEqual(self.risco.avaliar_sinal('EURUSD', 'compra', 0.01, tempo), 1.0)
+
+    def test_limite_diario(self):
+        """
+        Testa o risco máximo aberto no dia, o cancelamento e a virada do dia.
+        """
+        tempo = pd.Timestamp('2023-01-10 10:00')
+        for n in range(4):
+            self.risco.registrar_abertura(('XAUUSD', n), 'XAUUSD', 'compra', 0.01, tempo=tempo,
+                                          fim=tempo + pd.Timedelta(hours=1))
+
+        # Posições já encerradas não contam na correlação, mas continuam no risco do dia
+        tempo = tempo + pd.Timedelta(hours=2)
+        self.assertEqual(self.risco.avaliar_sinal('EURUSD', 'compra', 0.01, tempo), 1.0)
+        self.risco.registrar_abertura('EURUSD', 'EURUSD', 'compra', 0.01, tempo=tempo)
+        self.assertEqual(self.risco.avaliar_sinal('GBPUSD', 'venda', 0.01, tempo), 0.0)
+
+        # Ordem não executada devolve o risco ao dia
+        self.risco.cancelar_abertura('EURUSD')
+        self.assertAlmostEqual(self.risco.risco_dia, 0.04)
+        self.assertEqual(self.risco.avaliar_sinal('GBPUSD', 'venda', 0.01, tempo), 1.0)
+
+        self.risco.registrar_abertura(3, 'GBPUSD', 'venda', 0.01, tempo=tempo)
+        self.assertEqual(self.risco.avaliar_sinal('XAUUSD', 'venda', 0.01, tempo), 0.0)
+        self.assertEqual(self.risco.avaliar_sinal('XAUUSD', 'venda', 0.01, pd.Timestamp('2023-01-11 00:00')), 1.0)
+
+    def test_backtest_ativos_correlacionados(self):
+        """
+        Testa se o backtest alimenta a correlação e reduz as compras de EURUSD com uma
+        compra aberta em GBPUSD, que anda exatamente junto.
+        """
+        diretorio = tempfile.mkdtemp()
+        originais = (historico.HISTORICO_DIR, armazem.ARMAZEM_DIR, backtest.CHECKPOINT_DIR)
+        historico.HISTORICO_DIR = os.path.join(diretorio, 'historico')
+        armazem.ARMAZEM_DIR = os.path.join(diretorio, 'caracteristicas')
+        backtest.CHECKPOINT_DIR = os.path.join(diretorio, 'checkpoints')
+        try:
+            np.random.seed(11)
+            close = 1.1 + np.cumsum(np.random.randn(600) * 0.002)
+            open_ = np.concatenate(([close[0]], close[:-1]))
+            df = pd.DataFrame({
+                'time': 1672531200 + 3600 * np.arange(600),
+                'open': open_,
+                'high': np.maximum(open_, close) + 0.001,
+                'low': np.minimum(open_, close) - 0.001,
+                'close': close,
+            })
+            for ativo in ['EURUSD', 'GBPUSD']:
+                gravar_barras(ativo, 'H1', df)
+            barras = ler_barras('EURUSD', 'H1')
+
+            def executar(dados_carteira):
+                risco = RiscoCarteira(['EURUSD', 'GBPUSD'], janela=50, limiar_correlacao=0.7,
+                                      max_risco_correlacionado=0.015, max_risco_diario=1.0, fator_minimo=0.25)
+                risco.registrar_abertura('manual', 'GBPUSD', 'compra', 0.01, tempo=pd.Timestamp(1672531200, unit='s'))
+                trades = backtest.executar_backtest('EURUSD', barras, risco_carteira=risco,
+                                                    dados_carteira=dados_carteira)['trades'].para_dataframe()
+                return trades, risco
+
+            correlacionado, risco = executar({'EURUSD': barras, 'GBPUSD': ler_barras('GBPUSD', 'H1')})
+            sem_correlacao, _ = executar(None)
+            self.assertAlmostEqual(risco.correlacao_entre('EURUSD', 'GBPUSD'), 1.0)
+
+            # A primeira compra soma risco com a de GBPUSD e cabe pela metade; as vendas não mudam
+            compras = [trades[trades['tipo'] == 'compra'].iloc[0] for trades in (correlacionado, sem_correlacao)]
+            self.assertEqual(compras[0]['data_entrada'], compras[1]['data_entrada'])
+            self.assertAlmostEqual(compras[0]['lucro'], compras[1]['lucro'] * 0.5)
+            vendas = [trades[trades['tipo'] == 'venda'].reset_index(drop=True) for trades in (correlacionado, sem_correlacao)]
+            self.assertGreater(len(vendas[0]), 0)
+            pd.testing.assert_frame_equal(vendas[0], vendas[1])
+
+            # O backtest em blocos lê a correlação do histórico local e dá os mesmos trades
+            risco = RiscoCarteira(['EURUSD', 'GBPUSD'], janela=50, limiar_correlacao=0.7,
+                                  max_risco_correlacionado=0.015, max_risco_diario=1.0, fator_minimo=0.25)
+            risco.registrar_abertura('manual', 'GBPUSD', 'compra', 0.01, tempo=pd.Timestamp(1672531200, unit='s'))
+            em_blocos = backtest.executar_backtest_em_blocos('EURUSD', 'H1', tamanho_bloco=150, retomar=False,
+                                                             risco_carteira=risco)['trades'].para_dataframe()
+            em_blocos = em_blocos.sort_values('data_entrada', kind='stable')
+            self.assertEqual(list(pd.to_datetime(em_blocos['data_entrada'])), list(pd.to_datetime(correlacionado['data_entrada'])))
+            np.testing.assert_allclose(em_blocos['lucro'].to_numpy(), correlacionado['lucro'].to_numpy())
+        finally:
+            historico.HISTORICO_DIR, armazem.ARMAZEM_DIR, backtest.CHECKPOINT_DIR = originais
+            shutil.rmtree(diretorio)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from src.strategy import preparar_dados_para_estrategia, gerar_sinais
+from src.indicators import calcular_atr
+from src.risk_management import aplicar_gestao_risco, aplicar_gestao_risco_vetorizado, calcular_lote_vetorizado
+
+class TestRiskManagement(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        # Passeio aleatório com reversões frequentes para gerar sinais
+        np.random.seed(5)
+        num_barras = 600
+        close = 1.1 + np.cumsum(np.random.randn(num_barras) * 0.002)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        self.df = preparar_dados_para_estrategia(pd.DataFrame({
+            'time': pd.date_range(start='2023-01-01', periods=num_barras, freq='h'),
+            'open': open_,
+            'high': np.maximum(open_, close) + 0.001,
+            'low': np.minimum(open_, close) - 0.001,
+            'close': close,
+        }))
+
+    def test_gestao_vetorizada_igual_por_sinal(self):
+        """
+        Testa se a gestão vetorizada dá os mesmos níveis e distâncias de aplicar_gestao_risco.
+        """
+        sinais = gerar_sinais(self.df)
+        gestao = aplicar_gestao_risco_vetorizado(self.df, sinais)
+        self.assertGreater(len(gestao['indices']), 0)
+
+        # Com a coluna 'atr' já calculada, o resultado é o mesmo
+        gestao_atr = aplicar_gestao_risco_vetorizado(calcular_atr(self.df), sinais)
+        np.testing.assert_array_equal(gestao['distancia_sl'], gestao_atr['distancia_sl'])
+
+        for n, i in enumerate(gestao['indices']):
+            esperado = aplicar_gestao_risco('EURUSD', self.df.iloc[:i+1], gestao['tipos'][n])
+            self.assertAlmostEqual(gestao['stop_loss'][n], esperado['stop_loss'])
+            self.assertAlmostEqual(gestao['take_profit'][n], esperado['take_profit'])
+            self.assertAlmostEqual(gestao['distancia_sl'][n], esperado['distancia_sl'])
+
+    def test_calcular_lote_vetorizado(self):
+        """
+        Testa o lote pelo risco, os limites e o incremento do símbolo.
+        """
+        # 1% de 10000 = 100; distância de 0.001 com 1 por 0.00001 = 100 por lote
+        info = SimpleNamespace(trade_tick_value=1.0, trade_tick_size=0.00001,
+                               volume_min=0.01, volume_max=5.0, volume_step=0.01)
+        lote = calcular_lote_vetorizado([0.001, 0.0005, 1e-6, 10.0, 0.0, np.nan], 10000, 0.01,
+                                        info.trade_tick_value, info.trade_tick_size,
+                                        info.volume_min, info.volume_max, info.volume_step)
+        np.testing.assert_allclose(lote, [1.0, 2.0, 5.0, 0.01, 0.01, 0.01])
+
+        sinais = gerar_sinais(self.df)
+        gestao = aplicar_gestao_risco_vetorizado(self.df, sinais, saldo=10000, symbol_info=info)
+        np.testing.assert_allclose(gestao['lote'], calcular_lote_vetorizado(
+            gestao['distancia_sl'], 10000, 0.01, 1.0, 0.00001, 0.01, 5.0, 0.01))
+
+if __name__ == '__main__':
+    unittest.main()
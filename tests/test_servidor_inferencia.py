@@ -0,0 +1,197 @@
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+import time
+import multiprocessing
+import secrets
+from multiprocessing.connection import Client, AuthenticationError
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+import src.ai_model as ai_model
+import src.servidor_inferencia as servidor_inferencia
+from src.config import VARIAVEL_CHAVE_INFERENCIA
+from src.servidor_inferencia import (ServidorInferencia, ClienteInferencia, carregar_chave_inferencia,
+                                     gerar_chave_inferencia, conectar_servidor_inferencia)
+from src.ai_model import prever_qualidade_sinal
+
+def servir_em_processo(endereco, caminho_modelo):
+    """
+    Executa o servidor de inferência até o processo ser encerrado.
+    """
+    ServidorInferencia(endereco, caminho_modelo).servir()
+
+def iniciar_processo_servidor(endereco, caminho_modelo):
+    """
+    Inicia o servidor em outro processo e espera até ele aceitar conexões.
+    """
+    processo = multiprocessing.Process(target=servir_em_processo, args=(endereco, caminho_modelo), daemon=True)
+    processo.start()
+    limite = time.time() + 30
+    while True:
+        try:
+            Client(endereco, authkey=carregar_chave_inferencia()).close()
+            return processo
+        except OSError:
+            if time.time() > limite:
+                processo.kill()
+                raise
+            time.sleep(0.05)
+
+class TestServidorInferencia(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Configuração inicial para os testes.
+        """
+        self.diretorio = tempfile.mkdtemp()
+        self.chave_original = os.environ.get(VARIAVEL_CHAVE_INFERENCIA)
+        os.environ[VARIAVEL_CHAVE_INFERENCIA] = secrets.token_hex(32)
+        self.caminho_modelo = os.path.join(self.diretorio, 'modelo.pkl')
+        self.endereco = os.path.join(self.diretorio, 'inferencia.sock')
+
+        # Modelo pequeno treinado com dados aleatórios
+        np.random.seed(42)
+        self.X = np.random.rand(100, 8)
+        y = (self.X[:, 0] > 0.5).astype(int)
+        self.modelo = RandomForestClassifier(n_estimators=10, random_state=42).fit(self.X, y)
+        joblib.dump(self.modelo, self.caminho_modelo)
+
+        self.servidor = ServidorInferencia(self.endereco, self.caminho_modelo, janela_lote=0.05)
+        self.servidor.iniciar()
+
+    def tearDown(self):
+        self.servidor.parar()
+        if self.chave_original is None:
+            os.environ.pop(VARIAVEL_CHAVE_INFERENCIA, None)
+        else:
+            os.environ[VARIAVEL_CHAVE_INFERENCIA] = self.chave_original
+        shutil.rmtree(self.diretorio)
+
+    def test_previsao_igual_ao_modelo_local(self):
+        """
+        Testa se o cliente prevê o mesmo que o modelo carregado localmente.
+        """
+        cliente = ClienteInferencia(self.endereco)
+
+        np.testing.assert_array_equal(cliente.predict(self.X), self.modelo.predict(self.X))
+        np.testing.assert_allclose(cliente.predict_proba(self.X[:5]), self.modelo.predict_proba(self.X[:5]))
+        self.assertEqual(cliente.versao, self.servidor.versao)
+
+        # O cliente substitui o modelo em prever_qualidade_sinal
+        caracteristicas = dict(zip(['bb_position', 'adx', 'volatility', 'rsi', 'macd_position',
+                                    'stochastic_position', 'day_of_week', 'hour'], self.X[0]))
+        self.assertEqual(prever_qualidade_sinal(cliente, caracteristicas), self.modelo.predict(self.X[:1])[0])
+
+        cliente.fechar()
+
+    def test_lote_de_varios_clientes(self):
+        """
+        Testa se requisições simultâneas de vários clientes são previstas em lote.
+        """
+        clientes = [ClienteInferencia(self.endereco) for _ in range(4)]
+        resultados = {}
+
+        def prever(indice, cliente):
+            resultados[indice] = cliente.predict(self.X[indice * 10:(indice + 1) * 10])
+
+        threads = [threading.Thread(target=prever, args=(i, cliente)) for i, cliente in enumerate(clientes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for indice, previsao in resultados.items():
+            np.testing.assert_array_equal(previsao, self.modelo.predict(self.X[indice * 10:(indice + 1) * 10]))
+
+        estatisticas = clientes[0].estatisticas()
+        self.assertEqual(estatisticas['requisicoes'], 4)
+        self.assertLess(estatisticas['lotes'], 4)
+        self.assertEqual(estatisticas['clientes'], 4)
+        self.assertGreater(estatisticas['latencia_p99_ms'], 0)
+
+        for cliente in clientes:
+            cliente.fechar()
+
+    def test_servidor_encerrado_no_meio_da_sessao(self):
+        """
+        Testa se a queda do servidor cai no modelo local e se o cliente reconecta quando ele volta.
+        """
+        endereco = os.path.join(self.diretorio, 'processo.sock')
+        caminhos_originais = (ai_model.MODEL_PATH, ai_model.MODEL_COMPACTO_PATH)
+        ai_model.MODEL_PATH = self.caminho_modelo
+        ai_model.MODEL_COMPACTO_PATH = os.path.join(self.diretorio, 'compacto.npz')
+        caracteristicas = [dict(zip(ai_model.CARACTERISTICAS, linha)) for linha in self.X[:20]]
+        esperadas = list(self.modelo.predict(self.X[:20]))
+
+        processo = iniciar_processo_servidor(endereco, self.caminho_modelo)
+        try:
+            cliente = ClienteInferencia(endereco)
+            self.assertEqual([prever_qualidade_sinal(cliente, c) for c in caracteristicas], esperadas)
+
+            # Servidor morto: as previsões seguem com a floresta compacta local
+            processo.kill()
+            processo.join()
+            self.assertEqual([prever_qualidade_sinal(cliente, c) for c in caracteristicas], esperadas)
+            self.assertEqual([prever_qualidade_sinal(cliente, c, limiar=0.5) for c in caracteristicas],
+                             [int(p >= 0.5) for p in self.modelo.predict_proba(self.X[:20])[:, 1]])
+            self.assertIsNone(cliente.conexao)
+            self.assertTrue(os.path.exists(ai_model.MODEL_COMPACTO_PATH))
+
+            # Servidor reiniciado: o cliente volta a usá-lo sem ser recriado
+            processo = iniciar_processo_servidor(endereco, self.caminho_modelo)
+            cliente.versao = None
+            self.assertEqual(prever_qualidade_sinal(cliente, caracteristicas[0]), esperadas[0])
+            self.assertIsNotNone(cliente.versao)
+            cliente.fechar()
+        finally:
+            processo.kill()
+            ai_model.MODEL_PATH, ai_model.MODEL_COMPACTO_PATH = caminhos_originais
+
+    def test_chave_de_autenticacao(self):
+        """
+        Testa se o servidor e o cliente se recusam a iniciar sem chave e se a chave
+        gerada só pode ser lida pelo usuário.
+        """
+        caminho = os.path.join(self.diretorio, 'inferencia.chave')
+        chave_ambiente = os.environ.pop(VARIAVEL_CHAVE_INFERENCIA)
+        arquivo_original = servidor_inferencia.ARQUIVO_CHAVE_INFERENCIA
+        servidor_inferencia.ARQUIVO_CHAVE_INFERENCIA = caminho
+        try:
+            with self.assertRaises(RuntimeError):
+                ServidorInferencia(os.path.join(self.diretorio, 'outro.sock'), self.caminho_modelo)
+            with self.assertRaises(RuntimeError):
+                conectar_servidor_inferencia(self.endereco)
+
+            # Chave da instalação: aleatória, só do usuário e nunca sobrescrita
+            self.assertEqual(gerar_chave_inferencia(), caminho)
+            chave = carregar_chave_inferencia()
+            self.assertEqual(len(chave), servidor_inferencia.TAMANHO_CHAVE)
+            with self.assertRaises(FileExistsError):
+                gerar_chave_inferencia()
+            if os.name != 'nt':
+                self.assertEqual(os.stat(caminho).st_mode & 0o777, 0o600)
+                os.chmod(caminho, 0o644)
+                with self.assertRaises(RuntimeError):
+                    carregar_chave_inferencia()
+                os.chmod(caminho, 0o600)
+
+            # A variável de ambiente tem prioridade sobre o arquivo
+            os.environ[VARIAVEL_CHAVE_INFERENCIA] = chave_ambiente
+            self.assertEqual(carregar_chave_inferencia(), bytes.fromhex(chave_ambiente))
+            os.environ[VARIAVEL_CHAVE_INFERENCIA] = 'abcd'
+            with self.assertRaises(RuntimeError):
+                carregar_chave_inferencia()
+        finally:
+            os.environ[VARIAVEL_CHAVE_INFERENCIA] = chave_ambiente
+            servidor_inferencia.ARQUIVO_CHAVE_INFERENCIA = arquivo_original
+
+        # Um cliente com outra chave não é aceito pelo servidor
+        with self.assertRaises(AuthenticationError):
+            ClienteInferencia(self.endereco, chave)
+        self.assertIsNone(conectar_servidor_inferencia(self.endereco, chave))
+
+if __name__ == '__main__':
+    unittest.main()